@@ -0,0 +1,102 @@
+"""Benchmark: latencia de una nota de voz, de los bytes descargados al texto.
+
+Compara el camino anterior (OGA a disco → `ffmpeg` por shell a un WAV temporal →
+Whisper lee el WAV) con el actual (bytes → ffmpeg por pipe → numpy → Whisper) para
+notas de 5 s, 30 s y 2 min. Reporta aparte la decodificación, que es lo único que
+cambió: Whisper domina el total.
+
+Las notas se arman con ffmpeg a partir de --muestra (una nota de voz real, repetida
+hasta la duración) o, sin ella, con un tono sintético (Whisper tarda lo mismo por
+segundo de audio aunque no entienda nada). Requiere ffmpeg y faster-whisper.
+
+Uso: python3 bench_audio.py [--muestra voz.ogg] [--repeticiones N] [--sin-whisper]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+
+from processing import audio, modelos  # noqa: E402
+
+DURACIONES = (5, 30, 120)
+
+
+def _nota(segundos: int, muestra: str | None) -> bytes:
+    """Una nota OGG/Opus como las de Telegram (mono 48 kHz, ~32 kbps)."""
+    entrada = (["-stream_loop", "-1", "-i", muestra] if muestra
+               else ["-f", "lavfi", "-i", "sine=frequency=220:sample_rate=48000"])
+    proc = subprocess.run(["ffmpeg", "-nostdin", "-loglevel", "error", *entrada, "-t", str(segundos),
+                           "-ac", "1", "-c:a", "libopus", "-b:a", "32k", "-f", "ogg", "pipe:1"],
+                          capture_output=True, check=True)
+    return proc.stdout
+
+
+def _antes(datos: bytes, whisper: bool):
+    """El camino anterior: archivo descargado + WAV temporal vía os.system."""
+    with tempfile.NamedTemporaryFile(suffix=".oga", delete=False) as tmp:
+        tmp.write(datos)
+        origen = tmp.name
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+        destino = tmp.name
+    try:
+        os.system(f'ffmpeg -y -i "{origen}" -ar 16000 -ac 1 "{destino}" -loglevel quiet')
+        if whisper:
+            with modelos.usar("whisper") as model:
+                segments, _ = model.transcribe(destino, language="es", beam_size=1)
+                " ".join(s.text for s in segments)
+    finally:
+        os.remove(origen)
+        os.remove(destino)
+
+
+def _ahora(datos: bytes, whisper: bool):
+    muestras = audio.decodificar(datos)
+    if whisper:
+        audio.transcribir(muestras)
+
+
+def _ms(fn, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--muestra", help="nota de voz real para repetir (OGG/MP3/WAV)")
+    ap.add_argument("--repeticiones", type=int, default=3)
+    ap.add_argument("--sin-whisper", action="store_true", help="solo decodificación")
+    args = ap.parse_args()
+
+    try:
+        notas = {s: _nota(s, args.muestra) for s in DURACIONES}
+    except (FileNotFoundError, subprocess.CalledProcessError) as e:
+        sys.exit(f"Se necesita ffmpeg con libopus para armar las notas: {e}")
+    if not args.sin_whisper:
+        modelos.obtener("whisper")   # la carga no cuenta en la latencia
+
+    print(f"{'nota':>6} {'KB':>6} │ {'decodificar antes':>17} {'ahora':>8} │"
+          f" {'total antes':>11} {'ahora':>8}")
+    for segundos, datos in notas.items():
+        dec_antes = _ms(lambda: _antes(datos, False), args.repeticiones * 3)
+        dec_ahora = _ms(lambda: _ahora(datos, False), args.repeticiones * 3)
+        if args.sin_whisper:
+            total = "-"
+        else:
+            total_antes = _ms(lambda: _antes(datos, True), args.repeticiones)
+            total_ahora = _ms(lambda: _ahora(datos, True), args.repeticiones)
+            total = f"{total_antes:9.0f} ms {total_ahora:5.0f} ms"
+        print(f"{segundos:>5}s {len(datos) / 1024:6.0f} │ {dec_antes:14.1f} ms {dec_ahora:5.1f} ms │ {total}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Micro-benchmark: tiempo de DB por turno, pool de conexiones vs. abrir/cerrar.
+
+Reproduce las consultas que hace un turno típico del bot (continua_sesion,
+cargar_historial, un par de tools de gastos/despensa y los dos guardar_mensaje)
+contra una DB temporal sembrada, y compara:
+  - antes: sqlite3.connect() + close() en cada bloque (el get_conn original)
+  - ahora: db.get_conn() con conexiones por hilo y perfil de PRAGMAs
+
+Uso: python3 bench_db.py [turnos]
+"""
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_PATH"] = os.path.join(_tmp, "bench.db")
+
+import db  # noqa: E402
+
+USER = "bench"
+
+
+@contextmanager
+def _conn_por_llamada():
+    """El get_conn de antes: una conexión nueva por bloque."""
+    conn = sqlite3.connect(db.DATABASE_NAME)
+    conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _sembrar():
+    db.init_db()
+    with db.get_conn() as conn:
+        db.upsert_usuario(conn, USER, "Bench")
+        cat = db.get_or_create_categoria(conn, "Comida")
+        conn.executemany(
+            "INSERT INTO movimientos (user_id, username, fecha, concepto, monto_centavos, categoria_id, origen) "
+            "VALUES (?,?,?,?,?,?,'bench')",
+            [(USER, "Bench", f"2025-{m:02d}-{d:02d}", f"Gasto {i}", 1000 + i % 9000, cat)
+             for i, (m, d) in enumerate((m, d) for m in range(1, 13) for d in range(1, 29))],
+        )
+        conn.executemany(
+            "INSERT INTO historial_mensajes (user_id, tipo, contenido) VALUES (?,?,?)",
+            [(USER, "inbound" if i % 2 else "outbound", f"mensaje {i}") for i in range(500)],
+        )
+
+
+def _turno(get_conn):
+    """Las consultas de un turno, con el mismo patrón de bloques que el código real."""
+    with get_conn() as conn:  # continua_sesion
+        conn.execute("SELECT (julianday('now') - julianday(MAX(timestamp))) * 24 * 60 "
+                     "FROM historial_mensajes WHERE user_id = ?", (USER,)).fetchone()
+    with get_conn() as conn:  # cargar_historial
+        conn.execute("SELECT tipo, contenido FROM historial_mensajes WHERE user_id = ? "
+                     "ORDER BY timestamp DESC LIMIT 20", (USER,)).fetchall()
+    for _ in range(3):  # tools (resumen / listar / total)
+        with get_conn() as conn:
+            conn.execute("SELECT COALESCE(SUM(monto_centavos),0) FROM movimientos WHERE user_id=? "
+                         "AND fecha BETWEEN ? AND ?", (USER, "2025-06-01", "2025-06-30")).fetchone()
+            conn.execute("SELECT m.id, m.fecha, m.concepto, m.monto_centavos FROM movimientos m "
+                         "WHERE m.user_id = ? AND m.fecha >= ? AND m.fecha < ?",
+                         (USER, "2025-06-01", "2025-07-01")).fetchall()
+    for tipo in ("inbound", "outbound"):  # guardar_mensaje ×2
+        with get_conn() as conn:
+            conn.execute("INSERT INTO historial_mensajes (user_id, tipo, contenido) VALUES (?,?,?)",
+                         (USER, tipo, "bench"))
+
+
+def _medir(nombre, get_conn, turnos):
+    _turno(get_conn)  # calentamiento
+    t0 = time.perf_counter()
+    for _ in range(turnos):
+        _turno(get_conn)
+    ms = (time.perf_counter() - t0) * 1000 / turnos
+    print(f"  {nombre:<22} {ms:8.3f} ms/turno")
+    return ms
+
+
+def main():
+    turnos = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    _sembrar()
+    print(f"DB por turno ({turnos} turnos, {db.DATABASE_NAME}):")
+    antes = _medir("abrir/cerrar", _conn_por_llamada, turnos)
+    ahora = _medir("pool + PRAGMAs", db.get_conn, turnos)
+    print(f"  speedup: {antes / ahora:.1f}×")
+    db.cerrar_conexiones()
+
+
+if __name__ == "__main__":
+    main()
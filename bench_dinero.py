@@ -0,0 +1,103 @@
+"""Benchmark: SUM / GROUP BY sobre montos REAL (pesos) vs. INTEGER (centavos).
+
+Siembra N movimientos (1M por defecto) con los mismos montos en dos tablas, una con
+`monto REAL` (esquema anterior) y otra con `monto_centavos INTEGER` (actual), cada
+una con su índice de cobertura, y mide las agregaciones de consultar_total y
+resumen_financiero. También reporta el error acumulado de la suma en floats.
+
+Uso: python3 bench_dinero.py [filas]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+from utils.dinero import Dinero  # noqa: E402
+
+USUARIOS = 20
+CATEGORIAS = 8
+
+
+def _sembrar(conn, filas):
+    random.seed(7)
+    conn.execute("CREATE TABLE real_mov (id INTEGER PRIMARY KEY, user_id TEXT, fecha TEXT, "
+                 "categoria_id INTEGER, monto REAL)")
+    conn.execute("CREATE TABLE cent_mov (id INTEGER PRIMARY KEY, user_id TEXT, fecha TEXT, "
+                 "categoria_id INTEGER, monto_centavos INTEGER)")
+    lote = []
+    for i in range(filas):
+        centavos = random.randint(100, 500_000)
+        fila = (str(i % USUARIOS), f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}", i % CATEGORIAS, centavos)
+        lote.append(fila)
+        if len(lote) == 50_000:
+            _volcar(conn, lote)
+            lote = []
+    if lote:
+        _volcar(conn, lote)
+    conn.execute("CREATE INDEX idx_real ON real_mov (user_id, fecha, categoria_id, monto)")
+    conn.execute("CREATE INDEX idx_cent ON cent_mov (user_id, fecha, categoria_id, monto_centavos)")
+    conn.commit()
+    conn.execute("ANALYZE")
+
+
+def _volcar(conn, lote):
+    # El REAL se guarda como lo haría el float del LLM: centavos / 100.
+    conn.executemany("INSERT INTO real_mov (user_id, fecha, categoria_id, monto) VALUES (?,?,?,?)",
+                     [(u, f, c, m / 100) for u, f, c, m in lote])
+    conn.executemany("INSERT INTO cent_mov (user_id, fecha, categoria_id, monto_centavos) VALUES (?,?,?,?)",
+                     lote)
+
+
+def _medir(conn, sql, repeticiones=5):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        res = conn.execute(sql).fetchall()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor * 1000, res
+
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    conn = sqlite3.connect(os.path.join(tempfile.mkdtemp(), "bench_dinero.db"))
+    print(f"Sembrando {filas:,} movimientos…")
+    _sembrar(conn, filas)
+
+    consultas = {
+        "SUM total (todos)": ("SELECT SUM(monto) FROM real_mov",
+                              "SELECT SUM(monto_centavos) FROM cent_mov"),
+        "SUM por usuario/mes": (
+            "SELECT SUM(monto) FROM real_mov WHERE user_id='2' AND fecha BETWEEN '2025-03-01' AND '2025-03-31'",
+            "SELECT SUM(monto_centavos) FROM cent_mov WHERE user_id='2' AND fecha BETWEEN '2025-03-01' AND '2025-03-31'"),
+        "GROUP BY categoría": (
+            "SELECT categoria_id, SUM(monto) FROM real_mov GROUP BY categoria_id",
+            "SELECT categoria_id, SUM(monto_centavos) FROM cent_mov GROUP BY categoria_id"),
+        "GROUP BY usuario/mes/cat": (
+            "SELECT categoria_id, SUM(monto) FROM real_mov WHERE user_id='2' "
+            "AND fecha BETWEEN '2025-01-01' AND '2025-06-30' GROUP BY categoria_id",
+            "SELECT categoria_id, SUM(monto_centavos) FROM cent_mov WHERE user_id='2' "
+            "AND fecha BETWEEN '2025-01-01' AND '2025-06-30' GROUP BY categoria_id"),
+    }
+    print(f"\n{'consulta':<26}{'REAL ms':>10}{'INTEGER ms':>12}{'speedup':>9}")
+    for nombre, (sql_real, sql_cent) in consultas.items():
+        ms_real, _ = _medir(conn, sql_real)
+        ms_cent, _ = _medir(conn, sql_cent)
+        print(f"{nombre:<26}{ms_real:>10.2f}{ms_cent:>12.2f}{ms_real / ms_cent:>8.2f}×")
+
+    # Exactitud: la suma en floats vs. la exacta en centavos.
+    suma_real = conn.execute("SELECT SUM(monto) FROM real_mov").fetchone()[0]
+    suma_cent = Dinero(conn.execute("SELECT SUM(monto_centavos) FROM cent_mov").fetchone()[0])
+    error = abs(Decimal(repr(suma_real)) - suma_cent.pesos)
+    print(f"\nSUM REAL    = {suma_real!r}")
+    print(f"SUM centavos = {suma_cent}")
+    print(f"error acumulado en floats: {error} pesos")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
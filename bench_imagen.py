@@ -0,0 +1,137 @@
+"""Benchmark: tamaño de la petición y latencia de extracción con y sin preprocesado.
+
+Para cada imagen del corpus (tickets y capturas bancarias) mide:
+- bytes que viajan a Gemini (original vs. versión para visión) y lo que tarda
+  prepararla;
+- con GEMINI_API_KEY, la latencia de `imagen.extraer` en ambos modos y el total
+  extraído (el del ticket, o la suma de los movimientos), que no debe cambiar;
+- con easyocr/tesseract instalados, la latencia del OCR en ambos modos.
+
+El corpus es un directorio de imágenes (jpg/png/webp); junto a cada una puede ir un
+.json con lo esperado, p. ej. {"total": 1234.50}. Sin corpus se generan dos muestras
+sintéticas (una foto de ticket y una captura) solo para el tamaño.
+
+Uso: python3 bench_imagen.py [--corpus DIR] [--repeticiones N]
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+
+from dotenv import load_dotenv  # noqa: E402
+load_dotenv()
+
+from processing import imagen, preimagen  # noqa: E402
+
+_EXTENSIONES = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def _sinteticas(directorio: str) -> list[str]:
+    from PIL import Image, ImageDraw
+    foto = Image.effect_noise((3000, 4000), 12).convert("RGB")
+    foto = Image.blend(foto, Image.new("RGB", foto.size, (150, 140, 120)), 0.6)
+    captura = Image.new("RGBA", (1170, 2532), (245, 245, 250, 255))
+    for img, color in ((foto, (90, 85, 80)), (captura, (20, 20, 30))):
+        d = ImageDraw.Draw(img)
+        for i in range(30):
+            d.text((100, 120 + i * 70), f"COMPRA {i:02d} KIRKLAND   $ {i * 13.5:.2f}", fill=color)
+    rutas = [os.path.join(directorio, "ticket_sintetico.jpg"), os.path.join(directorio, "captura_sintetica.png")]
+    foto.save(rutas[0], quality=92)
+    captura.save(rutas[1])
+    return rutas
+
+
+def _total(data) -> float | None:
+    if not data:
+        return None
+    if data.get("total") is not None:
+        return round(float(data["total"]), 2)
+    montos = [float(m.get("monto") or 0) for m in data.get("movimientos") or []]
+    return round(sum(montos), 2) if montos else None
+
+
+def _ms(fn, repeticiones):
+    tiempos, res = [], None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        res = fn()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tiempos), res
+
+
+def _ocr_disponible() -> bool:
+    try:
+        import easyocr  # noqa: F401
+        return True
+    except ImportError:
+        try:
+            import pytesseract  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--corpus", default="test_data/imagenes")
+    ap.add_argument("--repeticiones", type=int, default=3)
+    args = ap.parse_args()
+
+    rutas = sorted(r for r in glob.glob(os.path.join(args.corpus, "*")) if r.lower().endswith(_EXTENSIONES))
+    if not rutas:
+        print(f"Sin imágenes en {args.corpus}/: uso dos muestras sintéticas (solo tamaño y OCR).")
+        rutas = _sinteticas(tempfile.mkdtemp())
+    con_llm, con_ocr = bool(os.getenv("GEMINI_API_KEY")), _ocr_disponible()
+
+    total_antes = total_ahora = 0
+    for ruta in rutas:
+        nombre = os.path.basename(ruta)
+        with open(ruta, "rb") as f:
+            original = f.read()
+        ms_prep, (datos, mime) = _ms(lambda: preimagen.para_vision(ruta), args.repeticiones)
+        total_antes, total_ahora = total_antes + len(original), total_ahora + len(datos)
+        print(f"\n{nombre}: {len(original) / 1024:,.0f} KB → {len(datos) / 1024:,.0f} KB {mime} "
+              f"({len(datos) / len(original):.0%}, {ms_prep:.0f} ms de preprocesado)")
+
+        if con_ocr:
+            for activo in (False, True):
+                preimagen.ACTIVO = activo
+                ms, texto = _ms(lambda: imagen._ocr_texto(ruta), 1)
+                print(f"  OCR {'preprocesado' if activo else 'original    '} {ms:7.0f} ms  {len(texto)} caracteres")
+
+        if con_llm:
+            esperado = None
+            if os.path.exists(os.path.splitext(ruta)[0] + ".json"):
+                with open(os.path.splitext(ruta)[0] + ".json", encoding="utf-8") as f:
+                    esperado = json.load(f).get("total")
+            totales = {}
+            for activo in (False, True):
+                preimagen.ACTIVO = activo
+                ms, data = _ms(lambda: imagen.extraer(ruta), args.repeticiones)
+                totales[activo] = _total(data)
+                print(f"  extraer {'preprocesado' if activo else 'original    '} {ms:7.0f} ms  "
+                      f"total {totales[activo]}")
+            iguales = totales[False] == totales[True]
+            print(f"  total {'igual' if iguales else 'DISTINTO'}"
+                  + (f"; esperado {esperado}: {'✅' if totales[True] == esperado else '❌'}"
+                     if esperado is not None else ""))
+        preimagen.ACTIVO = True
+
+    print(f"\nPayload total: {total_antes / 1024:,.0f} KB → {total_ahora / 1024:,.0f} KB "
+          f"({total_ahora / total_antes:.0%}).")
+    if not con_llm:
+        print("Sin GEMINI_API_KEY: no se midió la latencia de extracción ni los totales.")
+    if not con_ocr:
+        print("Sin easyocr ni pytesseract: no se midió el OCR.")
+
+
+if __name__ == "__main__":
+    main()
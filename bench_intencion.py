@@ -0,0 +1,87 @@
+"""Benchmark: turno resuelto por el atajo sin LLM vs. el mismo turno por el agente.
+
+Corre un corpus de mensajes (de fórmula y libres) por `reconocer` para medir la tasa
+de aciertos y el costo de la gramática, y luego los aciertos por `intencion_node`
+(herramienta + DB reales sobre una DB temporal). El agente necesita al menos dos idas
+a Gemini para lo mismo (pedir la tool y redactar la respuesta): con GEMINI_API_KEY se
+mide de verdad con `agente_node`; sin ella se usa --llm-ms por ida como estimado.
+
+Uso: python3 bench_intencion.py [--repeticiones N] [--llm-ms MS]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from dotenv import load_dotenv  # noqa: E402
+load_dotenv()
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+
+import db  # noqa: E402
+from context import set_user_context  # noqa: E402
+from nodes import intencion  # noqa: E402
+
+CORPUS = [
+    "Gasté $385 en Soriana", "gasté 120 en tacos", "pagué $620 de luz", "gaste 250 en uber",
+    "Pagué 199 de Netflix", "gasté $1,250.50 en gasolina", "ver despensa", "mi despensa",
+    "mis presupuestos", "lista de despensa", "qué necesito comprar", "Lista",
+    # Libres: deben ir al agente
+    "cómo voy este mes", "gasté 300 en regalo para mi mamá", "Gasté $385 en Soriana ayer",
+    "compré leche Kirkland $428", "cuánto llevo en comida", "hola", "gracias",
+    "elimina el gasto 12", "crear presupuesto comida $3000", "cuándo me toca comprar aceite",
+]
+
+
+def _ms(fn, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--repeticiones", type=int, default=200)
+    ap.add_argument("--llm-ms", type=float, default=1200.0,
+                    help="ida y vuelta a Gemini estimada si no hay GEMINI_API_KEY")
+    args = ap.parse_args()
+
+    db.init_db()
+    set_user_context("bench", "bench")
+    aciertos = [m for m in CORPUS if intencion.reconocer(m)]
+    print(f"Corpus: {len(CORPUS)} mensajes, {len(aciertos)} por el atajo "
+          f"({len(aciertos) / len(CORPUS):.0%}).")
+
+    gramatica = _ms(lambda: [intencion.reconocer(m) for m in CORPUS], args.repeticiones) / len(CORPUS)
+    print(f"  gramática (reconocer)          {gramatica * 1000:8.1f} µs/mensaje")
+
+    atajo = statistics.median(
+        _ms(lambda m=m: intencion.intencion_node({"messages": [HumanMessage(content=m)]}),
+            args.repeticiones // 10 or 1)
+        for m in aciertos)
+    print(f"  turno por el atajo (tool + DB) {atajo:8.2f} ms (mediana)")
+
+    if os.getenv("GEMINI_API_KEY"):
+        from nodes.agente import agente_node
+        agente = statistics.median(
+            _ms(lambda m=m: agente_node({"messages": [HumanMessage(content=m)]}), 1)
+            for m in aciertos[:5])
+        print(f"  turno por el agente (Gemini)   {agente:8.0f} ms (mediana de 5, medido)")
+    else:
+        agente = 2 * args.llm_ms + atajo
+        print(f"  turno por el agente (Gemini)   {agente:8.0f} ms (estimado: 2 × {args.llm_ms:.0f} ms de LLM)")
+    print(f"  ahorro por acierto: {agente - atajo:.0f} ms ({agente / atajo:,.0f}×)")
+    db.cerrar_conexiones()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark: reconstrucción de todos los patrones de despensa.
+
+Siembra una DB temporal con N productos y M compras (fechas al azar, con intervalos
+irregulares) y mide:
+  - antes: `patrones.recalcular` producto por producto (sobre una muestra, y se
+    extrapola al total);
+  - ahora: `patrones.reconstruir`, que lee compras_despensa en arreglos de numpy y
+    calcula todo por grupos.
+Al final revisa que ambos caminos dejan los mismos patrones en la muestra.
+
+Uso: python3 bench_patrones.py [--productos 100000] [--compras 5000000] [--muestra 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_patrones.db")
+
+import db  # noqa: E402
+from processing import patrones  # noqa: E402
+
+_COLUMNAS = "frec_prom_dias, ultima_compra, proxima_estimada, num_registros, suma_intervalos, suma_cuadrados"
+
+
+def _compras(productos: int, compras: int):
+    """(producto_id, fecha) en orden de inserción al azar entre productos."""
+    rnd = random.Random(1)
+    inicio = date(2020, 1, 1)
+    dia = {pid: rnd.randint(0, 365) for pid in range(1, productos + 1)}
+    for _ in range(compras):
+        pid = rnd.randint(1, productos)
+        dia[pid] += rnd.choice((1, 3, 7, 7, 14, 14, 30, 45))
+        yield pid, (inicio + timedelta(days=dia[pid])).isoformat()
+
+
+def _sembrar(productos: int, compras: int):
+    db.init_db()
+    t0 = time.perf_counter()
+    with db.get_conn() as conn:
+        conn.executemany("INSERT INTO compras_despensa (producto_id, user_id, fecha) VALUES (?, 'bench', ?)",
+                         _compras(productos, compras))
+    print(f"Sembradas {compras:,} compras de {productos:,} productos en {time.perf_counter() - t0:.1f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--productos", type=int, default=100_000)
+    parser.add_argument("--compras", type=int, default=5_000_000)
+    parser.add_argument("--muestra", type=int, default=2_000)
+    args = parser.parse_args()
+    _sembrar(args.productos, args.compras)
+
+    muestra = random.Random(2).sample(range(1, args.productos + 1), min(args.muestra, args.productos))
+    with db.get_conn() as conn:
+        t0 = time.perf_counter()
+        for pid in muestra:
+            patrones.recalcular(conn, pid)
+        uno_a_uno = time.perf_counter() - t0
+        antes = {pid: tuple(conn.execute(f"SELECT {_COLUMNAS} FROM patrones_despensa WHERE producto_id = ?",
+                                         (pid,)).fetchone()) for pid in muestra}
+    estimado = uno_a_uno / len(muestra) * args.productos
+    print(f"antes  recalcular × {len(muestra):,}: {uno_a_uno:.2f} s → ~{estimado:.0f} s para {args.productos:,}")
+
+    with db.get_conn() as conn:
+        t0 = time.perf_counter()
+        n = patrones.reconstruir(conn)
+        vectorizado = time.perf_counter() - t0
+        despues = {pid: tuple(conn.execute(f"SELECT {_COLUMNAS} FROM patrones_despensa WHERE producto_id = ?",
+                                           (pid,)).fetchone()) for pid in muestra}
+    print(f"ahora  reconstruir: {n:,} patrones en {vectorizado:.2f} s "
+          f"({args.compras / vectorizado / 1e6:.1f} M compras/s, ×{estimado / vectorizado:.0f})")
+    print("✓ mismos patrones en la muestra" if antes == despues else "✗ los patrones difieren en la muestra")
+    db.cerrar_conexiones()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Benchmark: tiempo y exactitud (WER) de la transcripción con y sin VAD/trozos.
+
+Sobre un corpus local de notas de voz compara:
+
+    completo   el audio entero en una sola llamada a Whisper (como antes)
+    vad        silencios recortados, trozos ≤ AUDIO_TROZO_S uno tras otro
+    paralelo   lo mismo, con los trozos repartidos entre N trabajadores de medios
+
+El corpus es un directorio con las grabaciones (ogg/oga/mp3/wav/m4a) y, junto a
+cada una, un .txt con lo que se dijo (p. ej. test_data/voz/despensa.ogg +
+despensa.txt). Las grabaciones no van en el repo: son voz de personas reales.
+WER = (sustituciones + inserciones + borrados) / palabras de la referencia, sin
+acentos, mayúsculas ni puntuación.
+
+Uso: python3 bench_transcripcion.py [--corpus DIR] [--trabajadores N]
+"""
+import argparse
+import glob
+import os
+import re
+import statistics
+import sys
+import time
+import unicodedata
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+
+from processing import audio, modelos, trabajadores  # noqa: E402
+
+_EXTENSIONES = (".ogg", ".oga", ".mp3", ".wav", ".m4a")
+
+
+def _palabras(texto: str) -> list[str]:
+    texto = unicodedata.normalize("NFD", texto.lower())
+    texto = "".join(c for c in texto if unicodedata.category(c) != "Mn")
+    return re.findall(r"[a-z0-9ñ]+", texto)
+
+
+def wer(referencia: str, hipotesis: str) -> float:
+    ref, hip = _palabras(referencia), _palabras(hipotesis)
+    if not ref:
+        return float(bool(hip))
+    fila = list(range(len(hip) + 1))
+    for i, r in enumerate(ref, 1):
+        anterior, fila[0] = fila[0], i
+        for j, h in enumerate(hip, 1):
+            anterior, fila[j] = fila[j], min(fila[j] + 1, fila[j - 1] + 1, anterior + (r != h))
+    return fila[-1] / len(ref)
+
+
+def _corpus(directorio: str) -> list[tuple[str, bytes, str, float]]:
+    """(nombre, bytes, referencia, segundos de audio)."""
+    res = []
+    for ruta in sorted(glob.glob(os.path.join(directorio, "*"))):
+        base, ext = os.path.splitext(ruta)
+        if ext.lower() not in _EXTENSIONES or not os.path.exists(base + ".txt"):
+            continue
+        with open(ruta, "rb") as f:
+            datos = f.read()
+        with open(base + ".txt", encoding="utf-8") as f:
+            referencia = f.read()
+        segundos = len(audio.decodificar(datos)) / audio.SAMPLE_RATE
+        res.append((os.path.basename(ruta), datos, referencia, segundos))
+    return res
+
+
+def _medir(nombre_modo: str, fn, corpus) -> tuple[float, float]:
+    tiempos, errores = [], []
+    for nombre, datos, referencia, segundos in corpus:
+        t0 = time.perf_counter()
+        texto = fn(datos)
+        tiempos.append(time.perf_counter() - t0)
+        errores.append(wer(referencia, texto))
+        print(f"  {nombre_modo:<9} {nombre:<28} {segundos:6.1f} s audio  "
+              f"{tiempos[-1]:6.2f} s  WER {errores[-1]:.1%}")
+    return sum(tiempos), statistics.mean(errores)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--corpus", default="test_data/voz")
+    ap.add_argument("--trabajadores", type=int, default=os.cpu_count() or 2)
+    args = ap.parse_args()
+
+    corpus = _corpus(args.corpus)
+    if not corpus:
+        sys.exit(f"No hay grabaciones con su .txt en {args.corpus}/ (ver el docstring).")
+    print(f"Corpus: {len(corpus)} notas, {sum(c[3] for c in corpus):.0f} s de audio. "
+          f"Whisper '{os.getenv('WHISPER_MODEL', 'tiny')}'.")
+    modelos.obtener("whisper")
+
+    audio.VAD = False
+    completo = _medir("completo", audio.transcribir, corpus)
+    audio.VAD = True
+    con_vad = _medir("vad", audio.transcribir, corpus)
+
+    trabajadores.TRABAJADORES = args.trabajadores
+    trabajadores.precargar("whisper")
+    paralelo = _medir("paralelo", trabajadores.transcribir, corpus)
+    trabajadores.cerrar()
+
+    print(f"\n{'modo':<10} {'total':>8} {'speed-up':>9} {'WER medio':>10}")
+    for nombre, (total, error) in (("completo", completo), ("vad", con_vad),
+                                   (f"paralelo×{args.trabajadores}", paralelo)):
+        print(f"{nombre:<10} {total:7.1f}s {completo[0] / total:8.2f}× {error:9.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,36 @@
 import os
 import re
 import html as _html
+import json
 import asyncio
+import functools
 import logging
+import signal
 import tempfile
+import time
+from datetime import datetime
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 from telegram import Update
 from telegram.constants import ChatAction, ParseMode
-from telegram.error import BadRequest
+from telegram.error import BadRequest, RetryAfter
 from telegram.ext import ApplicationBuilder, MessageHandler, CommandHandler, filters, ContextTypes
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk
 from graph import graph
-from persistence.historial import guardar_mensaje, cargar_historial, continua_sesion
+from nodes import intencion
+from persistence.historial import (
+    guardar_mensaje_async, cargar_historial_async, continua_sesion_async,
+)
 from context import set_user_context
+from db import get_conn, init_db
+from db_async import bd
+from planificador import planificador
+import salud
+import trazas
+from servidor import ServidorWebhook
 from stickers import sticker_para
+from processing import audio as audio_, imagen, lista_despensa, trabajadores
+from persistence import cache_medios
 
 load_dotenv()
 
@@ -27,6 +44,27 @@ logging.getLogger("httpcore").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+# Endpoint de métricas Prometheus (0 = apagado). Solo localhost por defecto.
+METRICAS_HOST = os.getenv("METRICAS_HOST", "127.0.0.1")
+METRICAS_PUERTO = int(os.getenv("METRICAS_PUERTO", "9464"))
+# Cómo llegan los updates: "polling" (default) o "webhook" (servidor local; ver servidor.py).
+MODO = os.getenv("BOT_MODO", "polling").lower()
+WEBHOOK_URL = os.getenv("BOT_WEBHOOK_URL", "")            # URL pública https://…/ruta
+WEBHOOK_SECRETO = os.getenv("BOT_WEBHOOK_SECRETO", "")    # X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_HOST = os.getenv("BOT_WEBHOOK_HOST", "127.0.0.1")
+WEBHOOK_PUERTO = int(os.getenv("BOT_WEBHOOK_PUERTO", "8080"))
+# Cargar Whisper/OCR/LLM al arrancar en vez de en el primer mensaje que los necesite.
+PRECALENTAR = os.getenv("BOT_PRECALENTAR", "1") != "0"
+# Respuesta del agente en vivo: se va escribiendo editando el mensaje (0 = al final, en tandas).
+STREAMING = os.getenv("BOT_STREAMING", "1") != "0"
+# Segundos mínimos entre ediciones del mismo chat (Telegram limita ~1 edición/s).
+STREAMING_INTERVALO = float(os.getenv("BOT_STREAMING_INTERVALO", "1.0"))
+# Fotos de un álbum: se procesan juntas cuando pasan estos segundos sin llegar otra.
+ALBUM_ESPERA_S = float(os.getenv("BOT_ALBUM_ESPERA_S", "1.5"))
+# Hora local (HH:MM) del trabajo diario que recalcula la lista de despensa de cada usuario.
+DESPENSA_HORA = os.getenv("DESPENSA_LISTA_HORA", "07:00")
+# Mandar en ese trabajo un aviso con lo que ya toca comprar (una vez por producto).
+DESPENSA_RECORDATORIOS = os.getenv("DESPENSA_RECORDATORIOS", "0") == "1"
 
 # IDs de Telegram autorizados (coma-separados en ALLOWED_USER_IDS). Vacío = nadie entra.
 _raw_allowed = os.getenv("ALLOWED_USER_IDS", "")
@@ -127,15 +165,189 @@ async def _responder_en_tandas(update, context, texto: str):
         if i > 0:
             await context.bot.send_chat_action(update.effective_chat.id, ChatAction.TYPING)
             await asyncio.sleep(min(1.6, 0.4 + len(parte) / 120))
+        else:
+            _marcar_primer_texto()
         await _responder(update.message, parte)
 
 
-def _historial_previo(user_id: str) -> list:
+def _marcar_primer_texto():
+    """Métrica: tiempo desde que llegó el mensaje hasta el primer texto visible."""
+    turno = trazas.turno_actual()
+    if turno:
+        trazas.registrar("respuesta", "primer_texto", time.perf_counter() - turno.t0)
+
+
+# ── Respuesta en vivo (streaming) ────────────────────────────────────────────
+
+# Mientras llega el texto, un marcador de sticker o un `///` pueden venir a medias
+# al final del buffer: no se muestran hasta completarse.
+_STICKER_PARCIAL = re.compile(r"\[\[?[^\]]*\]?$")
+_SEP_PARCIAL = re.compile(r"\n?\s*/{1,2}\s*$")
+
+
+def _texto_chunk(chunk) -> str:
+    contenido = chunk.content
+    if isinstance(contenido, list):
+        return "".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in contenido)
+    return contenido or ""
+
+
+def _grafo_en_vivo(state: dict, config: dict, emitir) -> dict:
+    """Corre el grafo en streaming (en el hilo del planificador). Por cada token de la
+    respuesta del agente llama `emitir(texto_acumulado)`; devuelve el estado final.
+
+    Solo cuenta el LLM del ReAct (nodo 'agent' dentro de 'agente'): la visión de las
+    fotos también usa LLM pero su salida es JSON interno. Si a un mensaje del LLM le
+    salen tool calls, su texto era preámbulo y se descarta (`emitir("")`)."""
+    final, actual, texto = None, None, ""
+    for ns, modo, dato in graph.stream(state, config, stream_mode=["messages", "values"],
+                                       subgraphs=True):
+        if modo == "values":
+            if not ns:
+                final = dato
+            continue
+        chunk, meta = dato
+        if not isinstance(chunk, AIMessageChunk) or meta.get("langgraph_node") != "agent":
+            continue
+        if chunk.id != actual:
+            actual, texto = chunk.id, ""
+        if chunk.tool_call_chunks:
+            if texto:
+                texto = ""
+                emitir("")
+            continue
+        delta = _texto_chunk(chunk)
+        if delta:
+            texto += delta
+            emitir(texto)
+    return final
+
+
+class _EnVivo:
+    """Muestra la respuesta mientras se genera: una burbuja por tanda (`///`), cada una
+    editada como mucho cada STREAMING_INTERVALO segundos. Durante el streaming va en
+    texto plano (el markdown a medias rompe el HTML); al cerrar cada tanda se le da
+    formato. Los marcadores de sticker nunca se muestran."""
+
+    def __init__(self, message):
+        self._message = message
+        self._enviados: list = []       # un Message de Telegram por tanda
+        self._mostrado: list[str] = []  # texto visible en cada uno
+        self._formateado: list[bool] = []
+        self._pendiente: str | None = None
+        self._ultimo = 0.0
+
+    @property
+    def activo(self) -> bool:
+        return bool(self._enviados)
+
+    @staticmethod
+    def _tandas(texto: str, final: bool) -> list[str]:
+        texto = _STICKER.sub("", texto)
+        if not final:
+            texto = _SEP_PARCIAL.sub("", _STICKER_PARCIAL.sub("", texto))
+        return [p for p in _en_tandas(texto) if p]
+
+    async def mostrar(self, texto: str | None = None):
+        """Recibe el texto acumulado; lo pinta si ya pasó el intervalo (si no, queda
+        pendiente para la próxima llamada)."""
+        if texto is not None:
+            self._pendiente = texto
+        if self._pendiente is None or time.monotonic() - self._ultimo < STREAMING_INTERVALO:
+            return
+        partes, self._pendiente = self._tandas(self._pendiente, final=False), None
+        await self._sincronizar(partes, final=False)
+
+    async def cerrar(self, respuesta: str):
+        """Deja en pantalla la respuesta final (sin marcador de sticker), con formato."""
+        await self._sincronizar(self._tandas(respuesta, final=True), final=True)
+
+    async def _sincronizar(self, partes: list[str], final: bool):
+        for i, parte in enumerate(partes):
+            cerrada = final or i < len(partes) - 1
+            if i >= len(self._enviados):
+                if not self._enviados:
+                    _marcar_primer_texto()
+                self._enviados.append(await self._enviar(parte, cerrada))
+                self._mostrado.append(parte)
+                self._formateado.append(cerrada)
+            elif parte != self._mostrado[i] or (cerrada and not self._formateado[i]):
+                await self._editar(i, parte, cerrada, reintentar=final)
+        if final:
+            # El texto final puede traer menos tandas que lo que se alcanzó a mostrar.
+            for msg in self._enviados[len(partes):]:
+                try:
+                    await msg.delete()
+                except Exception as e:
+                    logger.warning("No pude borrar tanda sobrante: %s", e)
+        self._ultimo = time.monotonic()
+
+    async def _enviar(self, texto: str, formatear: bool):
+        if formatear:
+            try:
+                return await self._message.reply_text(_telegram_html(texto), parse_mode=ParseMode.HTML)
+            except BadRequest:
+                pass
+        return await self._message.reply_text(texto)
+
+    async def _editar(self, i: int, texto: str, formatear: bool, reintentar: bool):
+        msg = self._enviados[i]
+        try:
+            if formatear:
+                try:
+                    await msg.edit_text(_telegram_html(texto), parse_mode=ParseMode.HTML)
+                except BadRequest as e:
+                    if "not modified" in str(e):
+                        raise
+                    await msg.edit_text(texto)
+            else:
+                await msg.edit_text(texto)
+        except BadRequest as e:
+            if "not modified" not in str(e):
+                logger.warning("No pude editar la tanda %d: %s", i, e)
+        except RetryAfter as e:
+            # Tope de ediciones: durante el streaming se salta; la edición final sí espera.
+            if not reintentar:
+                return
+            await asyncio.sleep(e.retry_after)
+            await self._editar(i, texto, formatear, reintentar=False)
+            return
+        self._mostrado[i], self._formateado[i] = texto, formatear
+
+
+def _carril(state: dict) -> str:
+    """Voz y fotos esperan al pool de medios: van por su propio carril del planificador."""
+    return "medios" if state.get("tipo") in ("voz", "foto") else "texto"
+
+
+async def _correr_en_vivo(update: Update, state: dict) -> tuple[dict, _EnVivo]:
+    """Corre el grafo en el planificador y va pintando los tokens que emite."""
+    loop = asyncio.get_running_loop()
+    cola: asyncio.Queue = asyncio.Queue()
+    emitir = lambda texto: loop.call_soon_threadsafe(cola.put_nowait, texto)
+    tarea = asyncio.ensure_future(planificador.correr(
+        _grafo_en_vivo, state, {"callbacks": [trazas.callbacks]}, emitir, carril=_carril(state)))
+    vivo = _EnVivo(update.message)
+    while not (tarea.done() and cola.empty()):
+        try:
+            texto = await asyncio.wait_for(cola.get(), timeout=0.25)
+            while not cola.empty():   # solo importa el acumulado más reciente
+                texto = cola.get_nowait()
+        except asyncio.TimeoutError:
+            texto = None
+        try:
+            await vivo.mostrar(texto)
+        except Exception as e:
+            logger.warning("Streaming: no pude actualizar el mensaje: %s", e)
+    return await tarea, vivo
+
+
+async def _historial_previo(user_id: str) -> list:
     """Mensajes anteriores (sin el turno actual) como objetos de LangChain."""
     return [
         HumanMessage(content=m["contenido"]) if m["tipo"] == "inbound"
         else AIMessage(content=m["contenido"])
-        for m in cargar_historial(user_id, limite=20)
+        for m in await cargar_historial_async(user_id, limite=20)
     ]
 
 
@@ -143,33 +355,46 @@ async def _procesar(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id:
                     username: str, extra: dict):
     """Núcleo común: arma el estado, corre el grafo, responde y persiste el historial.
 
-    `extra` trae el tipo y los insumos del turno (texto / audio_path / imagen_path / caption).
+    `extra` trae el tipo y los insumos del turno (texto / audio / imagen_path / imagenes /
+    caption).
     El texto que se guarda como inbound lo resuelve el grafo (texto_original): la
     transcripción del audio, o una etiqueta para las fotos.
     """
     try:
-        await context.bot.send_chat_action(update.effective_chat.id, ChatAction.TYPING)
-        set_user_context(user_id, username, continua_sesion=continua_sesion(user_id))
-        state = {"messages": _historial_previo(user_id), **extra}
-
-        result = graph.invoke(state)
-        raw = result["messages"][-1].content
-        respuesta = ("".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in raw)
-                     if isinstance(raw, list) else raw)
-
-        respuesta, vibe = _extraer_sticker(respuesta)
-        inbound = result.get("texto_original") or extra.get("texto") or "[mensaje]"
-        guardar_mensaje(user_id, "inbound", inbound, update.message.message_id)
-        # En el historial guardamos la respuesta sin los separadores de tanda.
-        guardar_mensaje(user_id, "outbound", _SEP.sub("\n\n", respuesta).strip())
-        await _responder_en_tandas(update, context, respuesta)
-        if vibe:
-            fid = sticker_para(vibe)
-            if fid:
-                try:
-                    await update.message.reply_sticker(fid)
-                except Exception as e:
-                    logger.warning("No pude mandar sticker (%s): %s", vibe, e)
+        with trazas.iniciar_turno(user_id, extra.get("tipo", "")):
+            await context.bot.send_chat_action(update.effective_chat.id, ChatAction.TYPING)
+            set_user_context(user_id, username, continua_sesion=await continua_sesion_async(user_id))
+            state = {"messages": await _historial_previo(user_id), **extra}
+
+            # El grafo es síncrono y lento: corre en el pool del planificador (con el
+            # contexto del turno) para no congelar el event loop.
+            if STREAMING:
+                result, vivo = await _correr_en_vivo(update, state)
+            else:
+                result, vivo = await planificador.correr(
+                    graph.invoke, state, config={"callbacks": [trazas.callbacks]},
+                    carril=_carril(state)), None
+            raw = result["messages"][-1].content
+            respuesta = ("".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in raw)
+                         if isinstance(raw, list) else raw)
+
+            respuesta, vibe = _extraer_sticker(respuesta)
+            inbound = result.get("texto_original") or extra.get("texto") or "[mensaje]"
+            await guardar_mensaje_async(user_id, "inbound", inbound, update.message.message_id)
+            # En el historial guardamos la respuesta sin los separadores de tanda.
+            await guardar_mensaje_async(user_id, "outbound", _SEP.sub("\n\n", respuesta).strip())
+            if vivo and vivo.activo:
+                await vivo.cerrar(respuesta)
+            else:
+                # Sin tokens en vivo (atajo sin LLM, o streaming apagado): en tandas.
+                await _responder_en_tandas(update, context, respuesta)
+            if vibe:
+                fid = sticker_para(vibe)
+                if fid:
+                    try:
+                        await update.message.reply_sticker(fid)
+                    except Exception as e:
+                        logger.warning("No pude mandar sticker (%s): %s", vibe, e)
     except Exception as e:
         logger.error("Error invocando grafo: %s", e, exc_info=True)
         await update.message.reply_text("❌ Error interno. Intenta de nuevo.")
@@ -177,6 +402,17 @@ async def _procesar(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id:
 
 # ── Handlers ──────────────────────────────────────────────────────────────────
 
+def _en_orden(handler):
+    """Serializa los mensajes de cada usuario (en orden de llegada, incluida la
+    descarga de audio/foto); usuarios distintos se atienden en paralelo."""
+    @functools.wraps(handler)
+    async def envoltura(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        async with planificador.turno(str(update.effective_user.id)):
+            await handler(update, context)
+        logger.debug("Planificador: %s", planificador.metricas())
+    return envoltura
+
+
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     if not _autorizado(str(user.id)):
@@ -193,6 +429,7 @@ async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+@_en_orden
 async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     user_id = str(user.id)
@@ -204,6 +441,7 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     {"tipo": "texto", "texto": text})
 
 
+@_en_orden
 async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Descarga la nota de voz y deja que el grafo la transcriba (rama 'transcribir')."""
     user = update.effective_user
@@ -212,44 +450,159 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await _rechazar(update); return
     try:
         voice = update.message.voice or update.message.audio
-        tg_file = await context.bot.get_file(voice.file_id)
-        with tempfile.NamedTemporaryFile(suffix=".oga", delete=False) as tmp:
-            audio_path = tmp.name
-        await tg_file.download_to_drive(audio_path)
-        try:
-            await _procesar(update, context, user_id, _display_name(user),
-                            {"tipo": "voz", "audio_path": audio_path})
-        finally:
-            if os.path.exists(audio_path):
-                os.remove(audio_path)
+        extra = {"tipo": "voz", "file_unique_id": voice.file_unique_id}
+        texto = await cache_medios.buscar_async("voz", audio_.version(), voice.file_unique_id)
+        if texto is not None:
+            extra["transcripcion"] = texto   # ya transcrita: ni descarga ni Whisper
+        else:
+            tg_file = await context.bot.get_file(voice.file_id)
+            # En memoria: la nota va directo a ffmpeg por pipe (ver processing.audio).
+            extra["audio"] = bytes(await tg_file.download_as_bytearray())
+        await _procesar(update, context, user_id, _display_name(user), extra)
     except Exception as e:
         logger.error("Error procesando voz: %s", e, exc_info=True)
         await update.message.reply_text("❌ Error procesando el audio.")
 
 
+async def _bajar_foto(context: ContextTypes.DEFAULT_TYPE, user_id: str, photo) -> dict:
+    """Del caché si ya se extrajo (ni descarga ni visión); si no, la descarga a una ruta
+    temporal única (dos fotos seguidas, o las de un álbum, no se pisan)."""
+    foto = {"file_unique_id": photo.file_unique_id}
+    guardado = await cache_medios.buscar_async("foto", imagen.version(), photo.file_unique_id)
+    if guardado is not None:
+        foto["datos_imagen"] = json.loads(guardado)
+        return foto
+    tg_file = await context.bot.get_file(photo.file_id)
+    fd, foto["imagen_path"] = tempfile.mkstemp(prefix=f"kontos_img_{user_id}_", suffix=".jpg")
+    os.close(fd)
+    await tg_file.download_to_drive(foto["imagen_path"])
+    return foto
+
+
+def _borrar_fotos(fotos: list[dict]):
+    """Lo extraído ya quedó en el grafo (y el caso ambiguo, en el contexto del usuario)."""
+    for foto in fotos:
+        if foto.get("imagen_path"):
+            try:
+                os.remove(foto["imagen_path"])
+            except OSError:
+                pass
+
+
+async def _error_foto(update: Update, e: Exception):
+    logger.error("Error procesando foto: %s", e, exc_info=True)
+    from telegram.error import TimedOut, NetworkError
+    if isinstance(e, (TimedOut, NetworkError)):
+        await update.message.reply_text("⏱️ Se me fue la señal al bajar la foto. Mándamela de nuevo.")
+    else:
+        await update.message.reply_text("❌ No pude procesar la imagen. Intenta con otra foto.")
+
+
 async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Descarga la foto y deja que el grafo la extraiga/registre (rama 'extraer_imagen')."""
+    """Descarga la foto y deja que el grafo la extraiga/registre (rama 'extraer_imagen').
+    Las fotos de un álbum se juntan en un solo turno (ver _recibir_album)."""
+    if update.message.media_group_id and _autorizado(str(update.effective_user.id)):
+        await _recibir_album(update, context)
+    else:
+        await _foto_suelta(update, context)
+
+
+@_en_orden
+async def _foto_suelta(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     user_id = str(user.id)
     if not _autorizado(user_id):
         await _rechazar(update); return
+    fotos = []
     try:
-        photo = update.message.photo[-1]
-        tg_file = await context.bot.get_file(photo.file_id)
-        # Ruta estable por usuario: se conserva entre turnos para el caso ambiguo
-        # (aclarar si era ticket o captura). La próxima foto la sobrescribe.
-        img_path = os.path.join(tempfile.gettempdir(), f"kontos_img_{user_id}.jpg")
-        await tg_file.download_to_drive(img_path)
-        caption = update.message.caption or ""
-        await _procesar(update, context, user_id, _display_name(user),
-                        {"tipo": "foto", "imagen_path": img_path, "caption": caption})
+        fotos.append(await _bajar_foto(context, user_id, update.message.photo[-1]))
+        extra = {"tipo": "foto", "caption": update.message.caption or "", **fotos[0]}
+        await _procesar(update, context, user_id, _display_name(user), extra)
     except Exception as e:
-        logger.error("Error procesando foto: %s", e, exc_info=True)
-        from telegram.error import TimedOut, NetworkError
-        if isinstance(e, (TimedOut, NetworkError)):
-            await update.message.reply_text("⏱️ Se me fue la señal al bajar la foto. Mándamela de nuevo.")
-        else:
-            await update.message.reply_text("❌ No pude procesar la imagen. Intenta con otra foto.")
+        await _error_foto(update, e)
+    finally:
+        _borrar_fotos(fotos)
+
+
+class _Album:
+    """Fotos de un media group que van llegando (Telegram manda un update por foto)."""
+
+    def __init__(self, update: Update):
+        self.updates = [update]
+        self.ultima = time.monotonic()
+        self.tarea: asyncio.Task | None = None
+
+
+_albumes: dict[tuple[str, str], _Album] = {}
+
+
+async def _recibir_album(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Junta las fotos que comparten media_group_id. La primera reserva el turno del
+    usuario (lo que llegue después del álbum espera detrás) y el álbum se procesa
+    cuando pasan ALBUM_ESPERA_S sin fotos nuevas."""
+    clave = (str(update.effective_user.id), str(update.message.media_group_id))
+    album = _albumes.get(clave)
+    if album is not None:
+        album.updates.append(update)
+        album.ultima = time.monotonic()
+        return
+    album = _albumes[clave] = _Album(update)
+    album.tarea = asyncio.create_task(_procesar_album(clave, album, context))
+
+
+async def _procesar_album(clave: tuple[str, str], album: _Album, context: ContextTypes.DEFAULT_TYPE):
+    user_id = clave[0]
+    async with planificador.turno(user_id):
+        while (resta := album.ultima + ALBUM_ESPERA_S - time.monotonic()) > 0:
+            await asyncio.sleep(resta)
+        del _albumes[clave]
+        primero = album.updates[0]
+        logger.info("ÁLBUM %s: %d fotos", user_id, len(album.updates))
+        fotos = []
+        try:
+            bajadas = await asyncio.gather(
+                *(_bajar_foto(context, user_id, u.message.photo[-1]) for u in album.updates),
+                return_exceptions=True)
+            for b in bajadas:
+                if isinstance(b, dict):
+                    fotos.append(b)
+            if not fotos:
+                raise next(b for b in bajadas if isinstance(b, Exception))
+            caption = next((u.message.caption for u in album.updates if u.message.caption), "")
+            extra = {"tipo": "foto", "caption": caption, "imagenes": fotos}
+            await _procesar(primero, context, user_id, _display_name(primero.effective_user), extra)
+        except Exception as e:
+            await _error_foto(primero, e)
+        finally:
+            _borrar_fotos(fotos)
+
+
+# ── Trabajo diario de la despensa ─────────────────────────────────────────────
+
+def _usuarios_despensa() -> list[str]:
+    with get_conn() as conn:
+        return lista_despensa.usuarios(conn)
+
+
+def _lista_del_dia(user_id: str) -> str | None:
+    """Rehace la lista de despensa del usuario; devuelve el recordatorio si toca mandarlo."""
+    with get_conn() as conn:
+        lista_despensa.actualizar(conn, user_id)
+        return lista_despensa.recordatorio(conn, user_id) if DESPENSA_RECORDATORIOS else None
+
+
+async def _despensa_diaria(context: ContextTypes.DEFAULT_TYPE):
+    usuarios = await bd.leer(_usuarios_despensa)
+    avisos = 0
+    for user_id in usuarios:
+        try:
+            aviso = await bd.escribir(_lista_del_dia, user_id)
+            if aviso and _autorizado(user_id):
+                await context.bot.send_message(int(user_id), aviso)
+                avisos += 1
+        except Exception as e:
+            logger.warning("Lista de despensa de %s: %s", user_id, e)
+    logger.info("🛒 Listas de despensa recalculadas: %d usuario(s), %d aviso(s).", len(usuarios), avisos)
 
 
 # ── Error handler global ──────────────────────────────────────────────────────
@@ -269,34 +622,165 @@ async def _on_error(update: object, context: ContextTypes.DEFAULT_TYPE):
 
 # ── Main ──────────────────────────────────────────────────────────────────────
 
-def main():
-    if not BOT_TOKEN:
-        logger.error("TELEGRAM_BOT_TOKEN no configurado en .env")
-        return
-
+def _registrar_metricas():
+    """Gauges de /metrics: la cola del planificador y los aciertos del atajo sin LLM."""
+    for clave, ayuda in (("en_curso", "Turnos corriendo en el pool."),
+                         ("esperando_hilo", "Turnos esperando un hilo libre."),
+                         ("turnos_en_fila", "Turnos recibidos aún sin terminar (en fila o en curso)."),
+                         ("usuarios_activos", "Usuarios con al menos un turno en fila.")):
+        trazas.registrar_gauge(f"kontos_planificador_{clave}", ayuda,
+                               lambda c=clave: planificador.metricas()[c])
+    trazas.registrar_gauge("kontos_intencion_evaluados_total",
+                           "Mensajes que revisó el atajo sin LLM.",
+                           lambda: intencion.estadisticas()["evaluados"], tipo="counter")
+    trazas.registrar_gauge("kontos_intencion_aciertos_total",
+                           "Mensajes que el atajo resolvió sin pasar por el agente.",
+                           lambda: intencion.estadisticas()["aciertos"], tipo="counter")
+    for clave, ayuda in (("consultas", "Consultas al caché de medios (por id de Telegram o contenido)."),
+                         ("aciertos", "Medios que salieron del caché sin descargar ni inferir de nuevo.")):
+        trazas.registrar_gauge(f"kontos_cache_medios_{clave}_total", ayuda,
+                               lambda c=clave: cache_medios.estadisticas()[c], tipo="counter")
+    for clave, ayuda in (("trabajos", "Trabajos de medios (audio/OCR) terminados."),
+                         ("tiempos_agotados", "Trabajos de medios que pasaron de MEDIOS_TIMEOUT_S."),
+                         ("reinicios", "Trabajadores de medios reiniciados (colgados o muertos).")):
+        trazas.registrar_gauge(f"kontos_medios_{clave}_total", ayuda,
+                               lambda c=clave: trabajadores.estadisticas()[c],
+                               tipo="counter")
+    for clave, ayuda in (("plantilla", "Tickets leídos con una plantilla local, sin LLM."),
+                         ("vision", "Fotos cuyos datos llegaron primero por la visión."),
+                         ("ocr", "Fotos cuyos datos llegaron primero por el OCR local."),
+                         ("coberturas", "Fotos en las que el OCR arrancó en paralelo a la visión."),
+                         ("tiempos_agotados", "Fotos que pasaron de IMAGEN_LIMITE_S sin datos.")):
+        trazas.registrar_gauge(f"kontos_imagen_{clave}_total", ayuda,
+                               lambda c=clave: imagen.estadisticas()[c], tipo="counter")
+    from processing import modelos
+    for nombre in ("whisper", "ocr"):
+        trazas.registrar_gauge(f"kontos_modelo_{nombre}_cargado", f"1 si {nombre} está en memoria.",
+                               lambda n=nombre: modelos.estado().get(n, {}).get("cargado", False))
+        trazas.registrar_gauge(f"kontos_modelo_{nombre}_carga_segundos",
+                               f"Lo que tardó la última carga de {nombre}.",
+                               lambda n=nombre: modelos.estado().get(n, {}).get("segundos_carga", 0))
+
+
+def _registrar_componentes():
+    """Lo que /readyz espera ver caliente antes de recibir tráfico (ver salud)."""
+    from processing import audio, imagen, modelos  # noqa: F401 (registran sus modelos)
+    from nodes import agente
+    # Con el pool de medios, los modelos se cargan dentro de cada trabajador.
+    salud.registrar("whisper", lambda: trabajadores.precargar("whisper"),
+                    cargado=lambda: trabajadores.cargado("whisper"))
+    salud.registrar("ocr", lambda: trabajadores.precargar("ocr"), opcional=True,   # hay respaldo con tesseract
+                    cargado=lambda: trabajadores.cargado("ocr"))
+    salud.registrar("llm", agente.calentar)
+    # Cada trabajador libera sus modelos inactivos; aquí solo si no hay pool (todo en el bot).
+    if trabajadores.TRABAJADORES <= 0:
+        modelos.iniciar_limpieza()
+
+
+async def _al_apagar(app):
+    planificador.cerrar()
+    trabajadores.cerrar()
+    bd.cerrar()
+
+
+def construir_app(builder: ApplicationBuilder | None = None):
+    """Application con todos los handlers. `builder` permite inyectar otro transporte
+    (los tests usan uno que responde la Bot API sin red)."""
+    if builder is None:
+        builder = (
+            ApplicationBuilder()
+            .token(BOT_TOKEN)
+            .connect_timeout(15)
+            .read_timeout(30)
+            .write_timeout(30)
+            .media_write_timeout(60)
+            .pool_timeout(15)
+        )
     app = (
-        ApplicationBuilder()
-        .token(BOT_TOKEN)
-        .connect_timeout(15)
-        .read_timeout(30)
-        .write_timeout(30)
-        .media_write_timeout(60)
-        .pool_timeout(15)
+        builder
+        .post_shutdown(_al_apagar)
+        # Los updates se atienden en paralelo; el orden por usuario lo da _en_orden.
+        .concurrent_updates(True)
         .build()
     )
-
     app.add_handler(CommandHandler("start", cmd_start))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text))
     app.add_handler(MessageHandler(filters.VOICE | filters.AUDIO, handle_voice))
     app.add_handler(MessageHandler(filters.PHOTO, handle_photo))
     app.add_error_handler(_on_error)
+    if app.job_queue is None:
+        logger.warning("Sin JobQueue (instala python-telegram-bot[job-queue]): la lista de despensa "
+                       "se recalcula al pedirla.")
+    else:
+        hora = datetime.strptime(DESPENSA_HORA, "%H:%M").time().replace(tzinfo=datetime.now().astimezone().tzinfo)
+        app.job_queue.run_daily(_despensa_diaria, hora, name="despensa_diaria")
+    return app
+
+
+async def iniciar_webhook(app, url: str, secreto: str, host: str, puerto: int) -> ServidorWebhook:
+    """Arranca la Application sin polling, levanta el servidor local y registra el
+    webhook en Telegram. Los updates que llegan entran a la misma cola (y handlers)
+    que en modo polling."""
+    async def encolar(data: dict):
+        await app.update_queue.put(Update.de_json(data, app.bot))
+
+    servidor = ServidorWebhook(urlparse(url).path or "/", secreto, encolar, host, puerto)
+    await app.initialize()
+    await app.start()
+    await servidor.iniciar()   # antes de set_webhook: Telegram empieza a entregar de inmediato
+    await app.bot.set_webhook(url, secret_token=secreto, allowed_updates=Update.ALL_TYPES)
+    return servidor
+
+
+async def detener_webhook(app, servidor: ServidorWebhook):
+    await servidor.cerrar()
+    await app.stop()
+    await app.shutdown()
+    await _al_apagar(app)   # post_shutdown solo lo llama run_polling/run_webhook
+
+
+async def _correr_webhook(app):
+    servidor = await iniciar_webhook(app, WEBHOOK_URL, WEBHOOK_SECRETO, WEBHOOK_HOST, WEBHOOK_PUERTO)
+    detener = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, detener.set)
+    try:
+        await detener.wait()
+    finally:
+        await detener_webhook(app, servidor)
+
+
+def main():
+    if not BOT_TOKEN:
+        logger.error("TELEGRAM_BOT_TOKEN no configurado en .env")
+        return
+    if MODO == "webhook" and not (WEBHOOK_URL and WEBHOOK_SECRETO):
+        logger.error("BOT_MODO=webhook requiere BOT_WEBHOOK_URL y BOT_WEBHOOK_SECRETO")
+        return
+    init_db()
+    _registrar_metricas()
+    _registrar_componentes()
+    if PRECALENTAR:
+        salud.precalentar()
+    else:
+        salud.bajo_demanda()
+    app = construir_app()
 
     if ALLOWED_IDS:
         logger.info("🔒 Acceso restringido a: %s", ALLOWED_IDS)
     else:
         logger.warning("⚠️  ALLOWED_USER_IDS vacío — nadie puede acceder al bot")
-    logger.info("🤖 Kontos bot escuchando...")
-    app.run_polling()
+    logger.info("🤖 Kontos bot escuchando por %s... (%d turnos de texto, %d de medios, "
+                "%d+%d trabajador(es) de audio+OCR)", MODO, planificador.max_turnos,
+                planificador.max_medios, trabajadores.TRABAJADORES, trabajadores.TRABAJADORES_OCR)
+    if MODO == "webhook":
+        # El servidor del webhook ya sirve /metrics, /healthz y /readyz.
+        asyncio.run(_correr_webhook(app))
+    else:
+        if METRICAS_PUERTO:
+            trazas.servir_metricas(METRICAS_HOST, METRICAS_PUERTO)
+        app.run_polling()
 
 
 if __name__ == "__main__":
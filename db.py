@@ -1,177 +1,120 @@
 import os
 import sqlite3
+import threading
 from contextlib import contextmanager
 from datetime import datetime
+from trazas import nombre_sql, span
+from utils.dinero import Dinero
 
 DATABASE_NAME = os.getenv("DATABASE_PATH", "gastos.db")
 
+# Perfil de PRAGMAs que se aplica UNA vez al abrir cada conexión del pool.
+# WAL deja leer mientras otro hilo escribe; synchronous=NORMAL es seguro con WAL y
+# evita un fsync por commit. El resto es caché/mmap para que las lecturas calientes
+# (historial, movimientos del mes) no toquen disco. Todo se ajusta por env.
+PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-16000")),  # negativo = KiB
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+}
+
+# Pool: una conexión por hilo, creada la primera vez que el hilo la pide y reutilizada
+# después (sqlite3 no permite compartir una conexión entre hilos sin candado). `depth`
+# cuenta los `get_conn()` anidados del hilo para que solo el más externo haga commit.
+_local = threading.local()
+_todas: list[sqlite3.Connection] = []
+_todas_lock = threading.Lock()
+_generacion = 0  # sube en cada cerrar_conexiones(): invalida las conexiones de otros hilos
+
+
+class _Conexion(sqlite3.Connection):
+    """Conexión que mide cada consulta como span 'db' (ver trazas)."""
+
+    def execute(self, sql, parametros=()):
+        with span("db", nombre_sql(sql)):
+            return super().execute(sql, parametros)
+
+    def executemany(self, sql, parametros):
+        with span("db", nombre_sql(sql)):
+            return super().executemany(sql, parametros)
+
+
+def _conectar(path: str = None) -> sqlite3.Connection:
+    """Abre una conexión nueva con el perfil de PRAGMAs aplicado."""
+    conn = sqlite3.connect(path or DATABASE_NAME, check_same_thread=False, factory=_Conexion)
+    conn.row_factory = sqlite3.Row
+    for nombre, valor in PRAGMAS.items():
+        conn.execute(f"PRAGMA {nombre} = {valor}")
+    return conn
+
+
+def _conexion_del_hilo() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    # Si cambió DATABASE_NAME (scripts/tests que apuntan a otra DB) o se cerró el pool,
+    # se abre una nueva.
+    if (conn is None or _local.path != DATABASE_NAME or _local.gen != _generacion):
+        if conn is not None:
+            _cerrar(conn)
+        conn = _conectar()
+        _local.conn, _local.path, _local.gen, _local.depth = conn, DATABASE_NAME, _generacion, 0
+        with _todas_lock:
+            _todas.append(conn)
+    return conn
+
+
+def _cerrar(conn: sqlite3.Connection):
+    with _todas_lock:
+        if conn in _todas:
+            _todas.remove(conn)
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+def cerrar_conexiones():
+    """Cierra todas las conexiones del pool (al apagar el bot o entre tests)."""
+    global _generacion
+    with _todas_lock:
+        _generacion += 1
+        conns = list(_todas)
+    for conn in conns:
+        _cerrar(conn)
+    _local.__dict__.clear()
+
 
 @contextmanager
 def get_conn():
-    conn = sqlite3.connect(DATABASE_NAME)
-    conn.row_factory = sqlite3.Row
+    """Conexión del pool para el hilo actual. Misma API de siempre: commit al salir,
+    rollback si hubo excepción. Anidar `get_conn()` es seguro: el bloque interno
+    comparte la transacción del externo y solo el externo hace commit/rollback."""
+    conn = _conexion_del_hilo()
+    _local.depth += 1
     try:
         yield conn
-        conn.commit()
+        if _local.depth == 1:
+            conn.commit()
     except Exception:
-        conn.rollback()
+        if _local.depth == 1:
+            conn.rollback()
         raise
     finally:
-        conn.close()
+        _local.depth -= 1
 
 
 def init_db():
+    """Lleva la DB a la última versión del esquema y refresca las estadísticas del
+    planificador. Se llama al arrancar (bot.main, seed, tests); importar `db` ya no
+    ejecuta DDL."""
+    from migrations import migrar
+    migrar()
     with get_conn() as conn:
-        c = conn.cursor()
-
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS usuarios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL UNIQUE,
-                username TEXT,
-                nombre TEXT,
-                email TEXT,
-                fecha_registro TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS categorias (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre TEXT NOT NULL UNIQUE,
-                tipo TEXT CHECK(tipo IN ('gasto', 'ingreso', 'general'))
-            )
-        ''')
-
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS movimientos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                username TEXT,
-                fecha TEXT NOT NULL,
-                concepto TEXT NOT NULL,
-                monto REAL NOT NULL,
-                categoria_id INTEGER,
-                origen TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (categoria_id) REFERENCES categorias(id),
-                FOREIGN KEY (user_id) REFERENCES usuarios(user_id)
-            )
-        ''')
-
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS gastos_fijos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                categoria_id INTEGER,
-                concepto TEXT NOT NULL,
-                monto REAL NOT NULL,
-                fecha_inicio TEXT,
-                periodicidad TEXT,
-                FOREIGN KEY (categoria_id) REFERENCES categorias(id),
-                FOREIGN KEY (user_id) REFERENCES usuarios(user_id)
-            )
-        ''')
-
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS ingresos_fijos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                categoria_id INTEGER,
-                concepto TEXT NOT NULL,
-                monto REAL NOT NULL,
-                fecha_inicio TEXT,
-                periodicidad TEXT,
-                FOREIGN KEY (categoria_id) REFERENCES categorias(id),
-                FOREIGN KEY (user_id) REFERENCES usuarios(user_id)
-            )
-        ''')
-
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS presupuestos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                categoria_id INTEGER,
-                monto_limite REAL NOT NULL,
-                periodo TEXT DEFAULT 'mensual',
-                FOREIGN KEY (categoria_id) REFERENCES categorias(id),
-                FOREIGN KEY (user_id) REFERENCES usuarios(user_id)
-            )
-        ''')
-
-        # ── NUEVAS TABLAS ─────────────────────────────────────────────────────
-
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS historial_mensajes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                tipo TEXT NOT NULL CHECK(tipo IN ('inbound', 'outbound')),
-                contenido TEXT NOT NULL,
-                tg_message_id INTEGER,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES usuarios(user_id)
-            )
-        ''')
-
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS productos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                categoria_id INTEGER,
-                nombre TEXT NOT NULL,
-                marca TEXT,
-                unidad TEXT,
-                precio_ref REAL,
-                tienda_pref TEXT,
-                activo INTEGER DEFAULT 1,
-                FOREIGN KEY (categoria_id) REFERENCES categorias(id),
-                FOREIGN KEY (user_id) REFERENCES usuarios(user_id)
-            )
-        ''')
-
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS tickets_ocr (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                fecha TEXT NOT NULL,
-                tienda TEXT,
-                total REAL,
-                imagen_path TEXT,
-                procesado INTEGER DEFAULT 0,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES usuarios(user_id)
-            )
-        ''')
-
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS compras_despensa (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                producto_id INTEGER NOT NULL,
-                user_id TEXT NOT NULL,
-                ticket_id INTEGER,
-                fecha TEXT NOT NULL,
-                precio REAL,
-                cantidad REAL DEFAULT 1,
-                tienda TEXT,
-                fuente TEXT DEFAULT 'manual' CHECK(fuente IN ('manual', 'voz', 'ocr')),
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (producto_id) REFERENCES productos(id),
-                FOREIGN KEY (user_id) REFERENCES usuarios(user_id),
-                FOREIGN KEY (ticket_id) REFERENCES tickets_ocr(id)
-            )
-        ''')
-
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS patrones_despensa (
-                producto_id INTEGER PRIMARY KEY,
-                frec_prom_dias REAL,
-                ultima_compra TEXT,
-                proxima_estimada TEXT,
-                num_registros INTEGER DEFAULT 0,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (producto_id) REFERENCES productos(id)
-            )
-        ''')
+        # Estadísticas para el planificador: sin ellas SQLite no sabe qué tan selectivo
+        # es cada índice y puede preferir un SCAN en tablas que crecieron.
+        conn.execute("ANALYZE")
 
 
 # ── Utilidades compartidas ────────────────────────────────────────────────────
@@ -209,19 +152,16 @@ def insertar_movimiento(user_id, username, fecha, concepto, monto, categoria_id,
 
     with get_conn() as conn:
         conn.execute(
-            '''INSERT INTO movimientos (user_id, username, fecha, concepto, monto, categoria_id, origen)
+            '''INSERT INTO movimientos (user_id, username, fecha, concepto, monto_centavos, categoria_id, origen)
                VALUES (?, ?, ?, ?, ?, ?, ?)''',
-            (user_id, username, fecha_db, concepto, monto, categoria_id, origen)
+            (user_id, username, fecha_db, concepto, Dinero.de_pesos(monto), categoria_id, origen)
         )
 
 
 def total_quincenal(user_id, fecha_inicio, fecha_fin):
     with get_conn() as conn:
         row = conn.execute(
-            'SELECT SUM(monto) FROM movimientos WHERE user_id = ? AND fecha BETWEEN ? AND ?',
+            'SELECT COALESCE(SUM(monto_centavos), 0) FROM movimientos WHERE user_id = ? AND fecha BETWEEN ? AND ?',
             (user_id, fecha_inicio, fecha_fin)
         ).fetchone()
-    return row[0] if row[0] is not None else 0.0
-
-
-init_db()
+    return Dinero(row[0])
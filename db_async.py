@@ -0,0 +1,78 @@
+"""Fachada asíncrona de la DB para el bot (corre dentro del event loop de asyncio).
+
+sqlite3 es bloqueante: si un handler lo llama directo, todo el bot espera a que
+termine la consulta. Aquí cada operación se manda a un hilo y se espera con `await`:
+
+- un ÚNICO hilo escritor: todas las escrituras del bot pasan en fila por él, así
+  SQLite nunca ve dos escritores del bot peleando el candado de la DB. Eso incluye
+  las tools que escriben: corren en los hilos del planificador (código síncrono), y
+  `@en_escritor` manda la función completa al hilo escritor y espera su resultado;
+- un pool chico de lectores: con WAL (ver db.PRAGMAS) leen en paralelo sin
+  bloquearse con el escritor.
+
+Cada hilo usa su conexión persistente del pool de `db.get_conn()`. El trabajo corre
+con una copia del contexto para que sus consultas se sumen a las trazas del turno.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from db import cerrar_conexiones
+
+
+_local = threading.local()
+
+
+def _marcar_escritor():
+    _local.escritor = True
+
+
+class BaseDatosAsync:
+    def __init__(self, lectores: int = 4):
+        self._escritor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-escritor",
+                                            initializer=_marcar_escritor)
+        self._lectores = ThreadPoolExecutor(max_workers=lectores, thread_name_prefix="db-lector")
+
+    async def leer(self, fn, *args, **kwargs):
+        """Corre `fn(*args, **kwargs)` (una función que solo lee) en el pool de lectores."""
+        return await self._correr(self._lectores, fn, *args, **kwargs)
+
+    async def escribir(self, fn, *args, **kwargs):
+        """Corre `fn(*args, **kwargs)` en el hilo escritor (en orden de llegada)."""
+        return await self._correr(self._escritor, fn, *args, **kwargs)
+
+    def escribir_sync(self, fn, *args, **kwargs):
+        """`escribir` para código síncrono fuera del event loop (hilos del planificador):
+        bloquea hasta que el hilo escritor corre `fn`. Desde el propio hilo escritor
+        (una escritura que llama a otra) corre directo, sin encolarse detrás de sí misma."""
+        if getattr(_local, "escritor", False):
+            return fn(*args, **kwargs)
+        ctx = contextvars.copy_context()
+        return self._escritor.submit(ctx.run, functools.partial(fn, *args, **kwargs)).result()
+
+    @staticmethod
+    async def _correr(pool, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(pool, ctx.run, functools.partial(fn, *args, **kwargs))
+
+    def cerrar(self):
+        """Espera lo pendiente y cierra hilos y conexiones (al apagar el bot)."""
+        self._escritor.shutdown(wait=True)
+        self._lectores.shutdown(wait=True)
+        cerrar_conexiones()
+
+
+bd = BaseDatosAsync(lectores=int(os.getenv("DB_LECTORES", "4")))
+
+
+def en_escritor(fn):
+    """Decorador para funciones síncronas que escriben (las tools): corren completas,
+    con sus lecturas, en el hilo escritor de `bd`. Va debajo de `@tool`."""
+    @functools.wraps(fn)
+    def envoltura(*args, **kwargs):
+        return bd.escribir_sync(fn, *args, **kwargs)
+    return envoltura
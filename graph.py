@@ -1,11 +1,13 @@
 """Ensamble del grafo de Kontos.
 
-    START ─dispatch(por tipo)─┬─ texto ──────────┐
-                             ├─ transcribir ─────┤→ agente ⇄ tools → END
-                             └─ extraer_imagen ──┘
+    START ─dispatch(por tipo)─┬─ texto ──────────┬→ intencion ─┬──────────────→ END
+                             ├─ transcribir ─────┘             └→ agente ⇄ tools → END
+                             └─ extraer_imagen ─────────────────→ agente
 
 Las tres ramas de entrada son deterministas: dejan el turno como TEXTO listo para
 el agente. El agente (ReAct) decide qué herramientas usar; no procesa medios.
+`intencion` es un atajo sin LLM para los mensajes de fórmula ("gasté $385 en
+Soriana", "ver despensa"): si no está seguro, pasa el turno al agente.
 """
 from langgraph.graph import StateGraph, START, END
 from dotenv import load_dotenv
@@ -14,25 +16,30 @@ from nodes.dispatch import route_por_tipo
 from nodes.texto import texto_node
 from nodes.transcribir import transcribir_node
 from nodes.extraer_imagen import extraer_imagen_node
+from nodes.intencion import intencion_node, route_intencion
 from nodes.agente import agente_node
+from trazas import nodo
 
 load_dotenv()
 
 
 def build_graph():
     g = StateGraph(State)
-    g.add_node("texto", texto_node)
-    g.add_node("transcribir", transcribir_node)
-    g.add_node("extraer_imagen", extraer_imagen_node)
-    g.add_node("agente", agente_node)
+    # Cada nodo se mide como span 'nodo' del turno (ver trazas).
+    g.add_node("texto", nodo("texto", texto_node))
+    g.add_node("transcribir", nodo("transcribir", transcribir_node))
+    g.add_node("extraer_imagen", nodo("extraer_imagen", extraer_imagen_node))
+    g.add_node("intencion", nodo("intencion", intencion_node))
+    g.add_node("agente", nodo("agente", agente_node))
 
     g.add_conditional_edges(START, route_por_tipo, {
         "texto": "texto",
         "transcribir": "transcribir",
         "extraer_imagen": "extraer_imagen",
     })
-    g.add_edge("texto", "agente")
-    g.add_edge("transcribir", "agente")
+    g.add_edge("texto", "intencion")
+    g.add_edge("transcribir", "intencion")
+    g.add_conditional_edges("intencion", route_intencion, {"fin": END, "agente": "agente"})
     g.add_edge("extraer_imagen", "agente")
     g.add_edge("agente", END)
     return g.compile()
@@ -0,0 +1,180 @@
+"""Motor de migraciones del esquema (versionado con PRAGMA user_version).
+
+`migrar()` aplica en orden las migraciones de `migrations.versiones` que la DB aún
+no tiene, cada una en su propia transacción junto con el nuevo `user_version`: si
+una falla, la DB queda en la versión anterior, nunca a medias.
+
+Las migraciones `en_linea` reconstruyen una tabla grande sin bloquearla: copian por
+lotes (cada lote es una transacción corta) mientras unos triggers reflejan en la tabla
+nueva lo que se escriba en la vieja; al final un swap breve renombra y fija la versión.
+
+CLI:  python3 -m migrations [--estado] [--hasta N] [--db ruta]
+"""
+import logging
+import time
+from typing import Callable, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Migracion(NamedTuple):
+    numero: int
+    descripcion: str
+    aplicar: Callable
+    # True si `aplicar(conn, al_terminar)` maneja sus propias transacciones por lotes
+    # (ver reconstruir_tabla) y llama `al_terminar` dentro de la transacción final.
+    en_linea: bool = False
+
+
+def _abrir(path: Optional[str] = None):
+    """Conexión dedicada en autocommit: las transacciones se abren a mano con BEGIN."""
+    import db
+    conn = db._conectar(path)
+    conn.isolation_level = None
+    return conn
+
+
+def version_actual(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _fijar_version(conn, numero: int):
+    conn.execute(f"PRAGMA user_version = {int(numero)}")
+
+
+def pendientes(conn, hasta: Optional[int] = None) -> list[Migracion]:
+    from migrations.versiones import MIGRACIONES
+    actual = version_actual(conn)
+    return [m for m in MIGRACIONES if m.numero > actual and (hasta is None or m.numero <= hasta)]
+
+
+def migrar(path: Optional[str] = None, hasta: Optional[int] = None) -> int:
+    """Aplica las migraciones pendientes y devuelve la versión final del esquema."""
+    conn = _abrir(path)
+    try:
+        for m in pendientes(conn, hasta):
+            t0 = time.perf_counter()
+            logger.info("Migración %03d: %s…", m.numero, m.descripcion)
+            if m.en_linea:
+                m.aplicar(conn, lambda c, n=m.numero: _fijar_version(c, n))
+            else:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    m.aplicar(conn)
+                    _fijar_version(conn, m.numero)
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            logger.info("Migración %03d lista (%.0f ms).", m.numero, (time.perf_counter() - t0) * 1000)
+        return version_actual(conn)
+    finally:
+        conn.close()
+
+
+# ── Reconstrucción de tablas ──────────────────────────────────────────────────
+
+def copiar_tabla(conn, tabla: str, ddl: str, columnas: dict[str, str], *,
+                 indices: Optional[dict[str, str]] = None):
+    """Reconstruye una tabla CHICA dentro de la transacción en curso (una sola copia).
+    Mismos argumentos que reconstruir_tabla; para tablas grandes usar esa."""
+    nueva = f"{tabla}__nueva"
+    conn.execute(f"DROP TABLE IF EXISTS {nueva}")
+    conn.execute(ddl.format(tabla=nueva))
+    conn.execute(f"INSERT INTO {nueva} ({', '.join(columnas)}) "
+                 f"SELECT {', '.join(columnas.values())} FROM {tabla}")
+    conn.execute(f"DROP TABLE {tabla}")
+    conn.execute(f"ALTER TABLE {nueva} RENAME TO {tabla}")
+    for nombre, definicion in (indices or {}).items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} {definicion}")
+
+
+def reconstruir_tabla(conn, tabla: str, ddl: str, columnas: dict[str, str], *,
+                      indices: Optional[dict[str, str]] = None, pk: str = "id",
+                      lote: int = 5000, pausa: float = 0.0,
+                      al_terminar: Optional[Callable] = None) -> int:
+    """Reconstruye `tabla` con un esquema nuevo copiando por lotes, sin bloquearla.
+
+    Args:
+        conn: conexión en autocommit (la de `migrar`).
+        tabla: tabla a reconstruir; debe tener PK entera (`pk`).
+        ddl: CREATE TABLE de la versión nueva, con `{tabla}` donde va el nombre.
+        columnas: columna nueva -> expresión SQL sobre las columnas viejas
+            (p. ej. {"monto_centavos": "CAST(ROUND(monto * 100) AS INTEGER)"}).
+        indices: nombre -> "(columnas)" de los índices a crear sobre la tabla nueva.
+        pk: columna INTEGER PRIMARY KEY (se conserva igual en la tabla nueva).
+        lote: filas por transacción de copia.
+        pausa: segundos a ceder entre lotes para que entren otras escrituras.
+        al_terminar: callback(conn) dentro de la transacción del swap (fija la versión).
+
+    Es reanudable: si el proceso muere a medias, volver a correrla descarta la copia
+    parcial y empieza de nuevo; la tabla original sigue intacta hasta el swap.
+    Devuelve el número de filas copiadas por lotes.
+    """
+    nueva = f"{tabla}__nueva"
+    cols = ", ".join(columnas)
+    exprs = ", ".join(columnas.values())
+    reflejo = f"INSERT OR REPLACE INTO {nueva} ({cols}) SELECT {exprs} FROM {tabla} WHERE {pk} = NEW.{pk}"
+
+    def _limpiar():
+        for t in ("ins", "upd", "del"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {tabla}__sync_{t}")
+        conn.execute(f"DROP TABLE IF EXISTS {nueva}")
+
+    # 1) Tabla nueva + triggers que reflejan en ella las escrituras concurrentes.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _limpiar()
+        conn.execute(ddl.format(tabla=nueva))
+        conn.execute(f"CREATE TRIGGER {tabla}__sync_ins AFTER INSERT ON {tabla} "
+                     f"BEGIN {reflejo}; END")
+        conn.execute(f"CREATE TRIGGER {tabla}__sync_upd AFTER UPDATE ON {tabla} BEGIN "
+                     f"DELETE FROM {nueva} WHERE {pk} = OLD.{pk}; {reflejo}; END")
+        conn.execute(f"CREATE TRIGGER {tabla}__sync_del AFTER DELETE ON {tabla} "
+                     f"BEGIN DELETE FROM {nueva} WHERE {pk} = OLD.{pk}; END")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    # 2) Copia por lotes en orden de PK. OR IGNORE: si un trigger ya reflejó una fila,
+    # esa versión es igual o más nueva que la del lote.
+    ultimo, copiadas = None, 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            desde = "" if ultimo is None else f"WHERE {pk} > {int(ultimo)}"
+            tope = conn.execute(
+                f"SELECT MAX({pk}), COUNT(*) FROM "
+                f"(SELECT {pk} FROM {tabla} {desde} ORDER BY {pk} LIMIT {int(lote)})"
+            ).fetchone()
+            if not tope[1]:
+                conn.execute("COMMIT")
+                break
+            rango = f"{pk} <= {int(tope[0])}" + ("" if ultimo is None else f" AND {pk} > {int(ultimo)}")
+            conn.execute(f"INSERT OR IGNORE INTO {nueva} ({cols}) SELECT {exprs} FROM {tabla} WHERE {rango}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        ultimo, copiadas = tope[0], copiadas + tope[1]
+        if pausa:
+            time.sleep(pausa)
+
+    # 3) Swap breve: la tabla nueva toma el nombre (y los índices) de la vieja.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for t in ("ins", "upd", "del"):
+            conn.execute(f"DROP TRIGGER {tabla}__sync_{t}")
+        conn.execute(f"DROP TABLE {tabla}")
+        conn.execute(f"ALTER TABLE {nueva} RENAME TO {tabla}")
+        for nombre, definicion in (indices or {}).items():
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} {definicion}")
+        if al_terminar:
+            al_terminar(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    logger.info("Tabla %s reconstruida (%d filas).", tabla, copiadas)
+    return copiadas
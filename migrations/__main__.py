@@ -0,0 +1,46 @@
+"""CLI de migraciones.
+
+Uso: python3 -m migrations            # aplica todas las pendientes
+     python3 -m migrations --estado   # versión actual y pendientes, sin tocar nada
+     python3 -m migrations --hasta 3  # aplica hasta la versión 3
+"""
+import argparse
+import logging
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python3 -m migrations",
+                                     description="Migraciones del esquema de Kontos.")
+    parser.add_argument("--db", help="ruta de la DB (por defecto DATABASE_PATH o gastos.db)")
+    parser.add_argument("--estado", action="store_true", help="solo mostrar versión y pendientes")
+    parser.add_argument("--hasta", type=int, help="aplicar solo hasta esta versión")
+    args = parser.parse_args()
+    if args.db:
+        os.environ["DATABASE_PATH"] = args.db
+
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
+    import db
+    from migrations import _abrir, migrar, pendientes, version_actual
+
+    conn = _abrir(args.db)
+    try:
+        actual, faltan = version_actual(conn), pendientes(conn, args.hasta)
+    finally:
+        conn.close()
+    print(f"DB: {args.db or db.DATABASE_NAME} · versión {actual}")
+    for m in faltan:
+        print(f"  pendiente {m.numero:03d}: {m.descripcion}" + (" (en línea)" if m.en_linea else ""))
+    if args.estado or not faltan:
+        if not faltan:
+            print("  al día.")
+        return
+    print(f"✓ Esquema en versión {migrar(args.db, args.hasta)}")
+
+
+if __name__ == "__main__":
+    main()
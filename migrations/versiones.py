@@ -0,0 +1,520 @@
+"""Migraciones numeradas del esquema de Kontos.
+
+Cada entrada de MIGRACIONES se aplica una sola vez, en orden, y deja la DB en
+`PRAGMA user_version = numero`. Nunca se edita una migración ya publicada: los
+cambios de esquema van en una migración nueva al final de la lista.
+"""
+import unicodedata
+
+from migrations import Migracion, copiar_tabla, reconstruir_tabla
+
+
+def _v001_esquema_inicial(conn):
+    """Las tablas originales. Usa IF NOT EXISTS para adoptar DBs creadas antes de que
+    existieran las migraciones (user_version = 0 pero con todas las tablas)."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL UNIQUE,
+            username TEXT,
+            nombre TEXT,
+            email TEXT,
+            fecha_registro TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS categorias (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL UNIQUE,
+            tipo TEXT CHECK(tipo IN ('gasto', 'ingreso', 'general'))
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS movimientos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            username TEXT,
+            fecha TEXT NOT NULL,
+            concepto TEXT NOT NULL,
+            monto REAL NOT NULL,
+            categoria_id INTEGER,
+            origen TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (categoria_id) REFERENCES categorias(id),
+            FOREIGN KEY (user_id) REFERENCES usuarios(user_id)
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS gastos_fijos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            categoria_id INTEGER,
+            concepto TEXT NOT NULL,
+            monto REAL NOT NULL,
+            fecha_inicio TEXT,
+            periodicidad TEXT,
+            FOREIGN KEY (categoria_id) REFERENCES categorias(id),
+            FOREIGN KEY (user_id) REFERENCES usuarios(user_id)
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS ingresos_fijos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            categoria_id INTEGER,
+            concepto TEXT NOT NULL,
+            monto REAL NOT NULL,
+            fecha_inicio TEXT,
+            periodicidad TEXT,
+            FOREIGN KEY (categoria_id) REFERENCES categorias(id),
+            FOREIGN KEY (user_id) REFERENCES usuarios(user_id)
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS presupuestos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            categoria_id INTEGER,
+            monto_limite REAL NOT NULL,
+            periodo TEXT DEFAULT 'mensual',
+            FOREIGN KEY (categoria_id) REFERENCES categorias(id),
+            FOREIGN KEY (user_id) REFERENCES usuarios(user_id)
+        )
+    ''')
+
+    # ── NUEVAS TABLAS ─────────────────────────────────────────────────────
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS historial_mensajes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            tipo TEXT NOT NULL CHECK(tipo IN ('inbound', 'outbound')),
+            contenido TEXT NOT NULL,
+            tg_message_id INTEGER,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES usuarios(user_id)
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS productos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            categoria_id INTEGER,
+            nombre TEXT NOT NULL,
+            marca TEXT,
+            unidad TEXT,
+            precio_ref REAL,
+            tienda_pref TEXT,
+            activo INTEGER DEFAULT 1,
+            FOREIGN KEY (categoria_id) REFERENCES categorias(id),
+            FOREIGN KEY (user_id) REFERENCES usuarios(user_id)
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS tickets_ocr (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            fecha TEXT NOT NULL,
+            tienda TEXT,
+            total REAL,
+            imagen_path TEXT,
+            procesado INTEGER DEFAULT 0,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES usuarios(user_id)
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS compras_despensa (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            producto_id INTEGER NOT NULL,
+            user_id TEXT NOT NULL,
+            ticket_id INTEGER,
+            fecha TEXT NOT NULL,
+            precio REAL,
+            cantidad REAL DEFAULT 1,
+            tienda TEXT,
+            fuente TEXT DEFAULT 'manual' CHECK(fuente IN ('manual', 'voz', 'ocr')),
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (producto_id) REFERENCES productos(id),
+            FOREIGN KEY (user_id) REFERENCES usuarios(user_id),
+            FOREIGN KEY (ticket_id) REFERENCES tickets_ocr(id)
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS patrones_despensa (
+            producto_id INTEGER PRIMARY KEY,
+            frec_prom_dias REAL,
+            ultima_compra TEXT,
+            proxima_estimada TEXT,
+            num_registros INTEGER DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (producto_id) REFERENCES productos(id)
+        )
+    ''')
+
+
+# Cada consulta por usuario filtra por user_id + una fecha/flag. Los índices llevan
+# las columnas que se agregan (categoria_id, monto) para que SUM/GROUP BY se resuelvan
+# solo con el índice (COVERING INDEX), sin ir a la tabla.
+INDICES = {
+    "idx_movimientos_user_fecha":
+        "movimientos (user_id, fecha, categoria_id, monto)",
+    "idx_historial_user_ts":
+        "historial_mensajes (user_id, timestamp)",
+    "idx_compras_producto_fecha":
+        "compras_despensa (producto_id, fecha)",
+    "idx_compras_user_fecha":
+        "compras_despensa (user_id, fecha)",
+    "idx_compras_ticket":
+        "compras_despensa (ticket_id)",
+    "idx_productos_user_activo":
+        "productos (user_id, activo, nombre)",
+    "idx_presupuestos_user":
+        "presupuestos (user_id, categoria_id)",
+    "idx_gastos_fijos_user":
+        "gastos_fijos (user_id)",
+    "idx_ingresos_fijos_user":
+        "ingresos_fijos (user_id)",
+    "idx_tickets_user":
+        "tickets_ocr (user_id)",
+}
+
+
+def _v002_indices(conn):
+    for nombre, definicion in INDICES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON {definicion}")
+
+
+# ── Dinero en centavos enteros ───────────────────────────────────────────────
+# Los montos pasan de REAL (pesos) a INTEGER (centavos). ROUND antes del CAST para
+# que 428.13 * 100 = 42812.999… quede en 42813.
+def _a_centavos(col: str) -> str:
+    return f"CAST(ROUND({col} * 100) AS INTEGER)"
+
+
+def _v003_movimientos_centavos(conn, al_terminar):
+    reconstruir_tabla(conn, "movimientos", '''
+        CREATE TABLE {tabla} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            username TEXT,
+            fecha TEXT NOT NULL,
+            concepto TEXT NOT NULL,
+            monto_centavos INTEGER NOT NULL,
+            categoria_id INTEGER,
+            origen TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (categoria_id) REFERENCES categorias(id),
+            FOREIGN KEY (user_id) REFERENCES usuarios(user_id)
+        )
+    ''', {
+        "id": "id", "user_id": "user_id", "username": "username", "fecha": "fecha",
+        "concepto": "concepto", "monto_centavos": _a_centavos("monto"),
+        "categoria_id": "categoria_id", "origen": "origen", "timestamp": "timestamp",
+    }, indices={
+        "idx_movimientos_user_fecha": "(user_id, fecha, categoria_id, monto_centavos)",
+    }, al_terminar=al_terminar)
+
+
+def _v004_compras_centavos(conn, al_terminar):
+    reconstruir_tabla(conn, "compras_despensa", '''
+        CREATE TABLE {tabla} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            producto_id INTEGER NOT NULL,
+            user_id TEXT NOT NULL,
+            ticket_id INTEGER,
+            fecha TEXT NOT NULL,
+            precio_centavos INTEGER,
+            cantidad REAL DEFAULT 1,
+            tienda TEXT,
+            fuente TEXT DEFAULT 'manual' CHECK(fuente IN ('manual', 'voz', 'ocr')),
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (producto_id) REFERENCES productos(id),
+            FOREIGN KEY (user_id) REFERENCES usuarios(user_id),
+            FOREIGN KEY (ticket_id) REFERENCES tickets_ocr(id)
+        )
+    ''', {
+        "id": "id", "producto_id": "producto_id", "user_id": "user_id", "ticket_id": "ticket_id",
+        "fecha": "fecha", "precio_centavos": _a_centavos("precio"), "cantidad": "cantidad",
+        "tienda": "tienda", "fuente": "fuente", "timestamp": "timestamp",
+    }, indices={
+        "idx_compras_producto_fecha": "(producto_id, fecha)",
+        "idx_compras_user_fecha": "(user_id, fecha)",
+        "idx_compras_ticket": "(ticket_id)",
+    }, al_terminar=al_terminar)
+
+
+def _v005_catalogos_centavos(conn):
+    """Tablas chicas (una fila por fijo/presupuesto/producto/ticket): se reconstruyen
+    completas dentro de la transacción de la migración."""
+    fijos = '''
+        CREATE TABLE {tabla} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            categoria_id INTEGER,
+            concepto TEXT NOT NULL,
+            monto_centavos INTEGER NOT NULL,
+            fecha_inicio TEXT,
+            periodicidad TEXT,
+            FOREIGN KEY (categoria_id) REFERENCES categorias(id),
+            FOREIGN KEY (user_id) REFERENCES usuarios(user_id)
+        )
+    '''
+    cols_fijos = {"id": "id", "user_id": "user_id", "categoria_id": "categoria_id",
+                  "concepto": "concepto", "monto_centavos": _a_centavos("monto"),
+                  "fecha_inicio": "fecha_inicio", "periodicidad": "periodicidad"}
+    copiar_tabla(conn, "gastos_fijos", fijos, cols_fijos,
+                 indices={"idx_gastos_fijos_user": "(user_id)"})
+    copiar_tabla(conn, "ingresos_fijos", fijos, cols_fijos,
+                 indices={"idx_ingresos_fijos_user": "(user_id)"})
+    copiar_tabla(conn, "presupuestos", '''
+        CREATE TABLE {tabla} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            categoria_id INTEGER,
+            limite_centavos INTEGER NOT NULL,
+            periodo TEXT DEFAULT 'mensual',
+            FOREIGN KEY (categoria_id) REFERENCES categorias(id),
+            FOREIGN KEY (user_id) REFERENCES usuarios(user_id)
+        )
+    ''', {"id": "id", "user_id": "user_id", "categoria_id": "categoria_id",
+          "limite_centavos": _a_centavos("monto_limite"), "periodo": "periodo"},
+        indices={"idx_presupuestos_user": "(user_id, categoria_id)"})
+    copiar_tabla(conn, "productos", '''
+        CREATE TABLE {tabla} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            categoria_id INTEGER,
+            nombre TEXT NOT NULL,
+            marca TEXT,
+            unidad TEXT,
+            precio_ref_centavos INTEGER,
+            tienda_pref TEXT,
+            activo INTEGER DEFAULT 1,
+            FOREIGN KEY (categoria_id) REFERENCES categorias(id),
+            FOREIGN KEY (user_id) REFERENCES usuarios(user_id)
+        )
+    ''', {"id": "id", "user_id": "user_id", "categoria_id": "categoria_id", "nombre": "nombre",
+          "marca": "marca", "unidad": "unidad", "precio_ref_centavos": _a_centavos("precio_ref"),
+          "tienda_pref": "tienda_pref", "activo": "activo"},
+        indices={"idx_productos_user_activo": "(user_id, activo, nombre)"})
+    copiar_tabla(conn, "tickets_ocr", '''
+        CREATE TABLE {tabla} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            fecha TEXT NOT NULL,
+            tienda TEXT,
+            total_centavos INTEGER,
+            imagen_path TEXT,
+            procesado INTEGER DEFAULT 0,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES usuarios(user_id)
+        )
+    ''', {"id": "id", "user_id": "user_id", "fecha": "fecha", "tienda": "tienda",
+          "total_centavos": _a_centavos("total"), "imagen_path": "imagen_path",
+          "procesado": "procesado", "timestamp": "timestamp"},
+        indices={"idx_tickets_user": "(user_id)"})
+
+
+def _v006_cache_medios(conn):
+    """Transcripciones y extracciones ya hechas, por archivo de Telegram y por contenido
+    (ver persistence/cache_medios.py)."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS cache_medios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT NOT NULL,
+            version TEXT NOT NULL,
+            sha256 TEXT NOT NULL,
+            file_unique_id TEXT,
+            resultado TEXT NOT NULL,
+            tamano INTEGER NOT NULL,
+            aciertos INTEGER NOT NULL DEFAULT 0,
+            creado DATETIME DEFAULT CURRENT_TIMESTAMP,
+            usado DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (tipo, version, sha256)
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_medios_archivo ON cache_medios (tipo, file_unique_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_medios_usado ON cache_medios (usado)")
+
+
+def _v007_alias_productos(conn):
+    """Nombres de ticket ya confirmados para un producto del catálogo (ver
+    processing/catalogo.py). El alias se guarda normalizado."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS alias_productos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            alias TEXT NOT NULL,
+            producto_id INTEGER NOT NULL,
+            usos INTEGER NOT NULL DEFAULT 0,
+            creado DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (producto_id) REFERENCES productos(id),
+            UNIQUE (user_id, alias)
+        )
+    ''')
+
+
+def _v008_patrones_acumulados(conn):
+    """Estadísticas acumuladas de cada patrón de compra para actualizarlo en O(1) al
+    registrar una compra (ver processing/patrones.py). Se llenan desde el historial."""
+    for columna in ("primera_compra TEXT", "suma_intervalos REAL NOT NULL DEFAULT 0",
+                    "suma_cuadrados REAL NOT NULL DEFAULT 0"):
+        conn.execute(f"ALTER TABLE patrones_despensa ADD COLUMN {columna}")
+    conn.execute('''
+        WITH intervalos AS (
+            SELECT producto_id, fecha,
+                   julianday(fecha) - julianday(LAG(fecha) OVER (PARTITION BY producto_id ORDER BY fecha)) AS d
+            FROM compras_despensa
+        ), acumulados AS (
+            SELECT producto_id, MIN(fecha) AS primera, COALESCE(SUM(d), 0) AS suma,
+                   COALESCE(SUM(d * d), 0) AS cuadrados
+            FROM intervalos GROUP BY producto_id
+        )
+        UPDATE patrones_despensa SET primera_compra = a.primera, suma_intervalos = a.suma,
+               suma_cuadrados = a.cuadrados
+        FROM acumulados a WHERE a.producto_id = patrones_despensa.producto_id
+    ''')
+
+
+def _v009_lista_despensa(conn):
+    """Lista de despensa precalculada por usuario (ver processing/lista_despensa.py):
+    el pronóstico de cada producto activo, con índice por fecha para sacar lo que toca
+    con un rango. `avisada` es la próxima compra de la que ya se mandó recordatorio."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS lista_despensa (
+            user_id TEXT NOT NULL,
+            producto_id INTEGER NOT NULL,
+            proxima_estimada TEXT,
+            desde TEXT,
+            hasta TEXT,
+            avisada TEXT,
+            calculada DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, producto_id),
+            FOREIGN KEY (producto_id) REFERENCES productos(id)
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lista_despensa_proxima ON lista_despensa (user_id, proxima_estimada)")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS lista_despensa_estado (
+            user_id TEXT PRIMARY KEY,
+            calculada TEXT NOT NULL
+        )
+    ''')
+
+
+def _llave_tienda(tienda):
+    # Copia congelada de processing.precios.llave_tienda: la migración no debe cambiar
+    # si esa función cambia después.
+    sin_acentos = unicodedata.normalize("NFKD", tienda or "")
+    return " ".join("".join(c for c in sin_acentos if not unicodedata.combining(c)).lower().split())
+
+
+def _v010_precios_productos(conn):
+    """Índice de precios unitarios de cada producto y tienda (ver processing/precios.py),
+    con los acumulados para mínimo, promedio, primero, penúltimo y último. Se llena
+    desde las compras con precio; la tienda se guarda por su llave normalizada."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS precios_productos (
+            user_id TEXT NOT NULL,
+            producto_id INTEGER NOT NULL,
+            tienda TEXT NOT NULL,
+            tienda_nombre TEXT,
+            compras INTEGER NOT NULL,
+            min_centavos INTEGER NOT NULL,
+            suma_centavos INTEGER NOT NULL,
+            primero_centavos INTEGER NOT NULL,
+            primera_fecha TEXT NOT NULL,
+            anterior_centavos INTEGER,
+            ultimo_centavos INTEGER NOT NULL,
+            ultima_fecha TEXT NOT NULL,
+            PRIMARY KEY (user_id, producto_id, tienda),
+            FOREIGN KEY (producto_id) REFERENCES productos(id)
+        )
+    ''')
+    conn.create_function("llave_tienda", 1, _llave_tienda, deterministic=True)
+    conn.execute('''
+        WITH c AS (
+            SELECT id, user_id, producto_id, llave_tienda(tienda) AS llave, tienda, fecha,
+                   precio_centavos AS p
+            FROM compras_despensa WHERE precio_centavos > 0
+        ), o AS (
+            SELECT *,
+                   COUNT(*) OVER g AS n, MIN(p) OVER g AS minimo, SUM(p) OVER g AS suma,
+                   FIRST_VALUE(p) OVER a AS primero, FIRST_VALUE(fecha) OVER a AS primera,
+                   LAG(p) OVER a AS anterior,
+                   ROW_NUMBER() OVER (PARTITION BY user_id, producto_id, llave ORDER BY fecha DESC, id DESC) AS rn
+            FROM c
+            WINDOW g AS (PARTITION BY user_id, producto_id, llave),
+                   a AS (PARTITION BY user_id, producto_id, llave ORDER BY fecha, id)
+        )
+        INSERT OR REPLACE INTO precios_productos
+            (user_id, producto_id, tienda, tienda_nombre, compras, min_centavos, suma_centavos,
+             primero_centavos, primera_fecha, anterior_centavos, ultimo_centavos, ultima_fecha)
+        SELECT user_id, producto_id, llave, tienda, n, minimo, suma, primero, primera, anterior, p, fecha
+        FROM o WHERE rn = 1
+    ''')
+
+
+def _v011_precios_unitarios(conn):
+    """precios_productos pasa a precio por unidad también para las compras registradas a
+    mano (su precio es lo pagado por el renglón: se divide entre la cantidad; el de los
+    tickets ya es unitario), y el mínimo, la suma y el número de compras cuentan solo
+    los 180 días que terminan en la última compra de cada tienda (`ventana_desde` es
+    la primera compra dentro). Se rehace la tabla completa desde compras_despensa."""
+    conn.execute("ALTER TABLE precios_productos ADD COLUMN ventana_desde TEXT NOT NULL DEFAULT ''")
+    conn.execute("DELETE FROM precios_productos")
+    # Copia congelada de processing.precios.unitario y VENTANA_DIAS.
+    conn.create_function("llave_tienda", 1, _llave_tienda, deterministic=True)
+    conn.execute('''
+        WITH c AS (
+            SELECT id, user_id, producto_id, llave_tienda(tienda) AS llave, tienda, fecha,
+                   CASE WHEN fuente = 'ocr' OR cantidad IS NULL OR cantidad <= 0 THEN precio_centavos
+                        ELSE CAST(precio_centavos * 1.0 / cantidad + 0.5 AS INTEGER) END AS p
+            FROM compras_despensa WHERE precio_centavos > 0
+        ), o AS (
+            SELECT *,
+                   MAX(fecha) OVER g AS ultima,
+                   FIRST_VALUE(p) OVER a AS primero, FIRST_VALUE(fecha) OVER a AS primera,
+                   LAG(p) OVER a AS anterior,
+                   ROW_NUMBER() OVER (PARTITION BY user_id, producto_id, llave ORDER BY fecha DESC, id DESC) AS rn
+            FROM c WHERE p > 0
+            WINDOW g AS (PARTITION BY user_id, producto_id, llave),
+                   a AS (PARTITION BY user_id, producto_id, llave ORDER BY fecha, id)
+        ), v AS (
+            SELECT user_id, producto_id, llave, COUNT(*) AS n, MIN(p) AS minimo, SUM(p) AS suma,
+                   MIN(fecha) AS desde
+            FROM o WHERE fecha >= COALESCE(date(ultima, '-180 days'), '')
+            GROUP BY user_id, producto_id, llave
+        )
+        INSERT INTO precios_productos
+            (user_id, producto_id, tienda, tienda_nombre, compras, min_centavos, suma_centavos, ventana_desde,
+             primero_centavos, primera_fecha, anterior_centavos, ultimo_centavos, ultima_fecha)
+        SELECT o.user_id, o.producto_id, o.llave, o.tienda, v.n, v.minimo, v.suma, v.desde,
+               o.primero, o.primera, o.anterior, o.p, o.fecha
+        FROM o JOIN v USING (user_id, producto_id, llave) WHERE o.rn = 1
+    ''')
+
+
+MIGRACIONES = [
+    Migracion(1, "esquema inicial", _v001_esquema_inicial),
+    Migracion(2, "índices de consultas por usuario", _v002_indices),
+    Migracion(3, "movimientos: monto en centavos", _v003_movimientos_centavos, en_linea=True),
+    Migracion(4, "compras_despensa: precio en centavos", _v004_compras_centavos, en_linea=True),
+    Migracion(5, "fijos, presupuestos, productos y tickets en centavos", _v005_catalogos_centavos),
+    Migracion(6, "caché de transcripciones y extracciones de imagen", _v006_cache_medios),
+    Migracion(7, "alias de productos para el emparejado de tickets", _v007_alias_productos),
+    Migracion(8, "patrones de despensa con estadísticas acumuladas", _v008_patrones_acumulados),
+    Migracion(9, "lista de despensa precalculada", _v009_lista_despensa),
+    Migracion(10, "índice de precios por producto y tienda", _v010_precios_productos),
+    Migracion(11, "precios por unidad y en ventana de 180 días", _v011_precios_unitarios),
+]
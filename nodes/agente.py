@@ -6,6 +6,7 @@ Se construye una sola vez (el modelo y las tools no cambian entre turnos).
 import os
 from langgraph.prebuilt import create_react_agent
 from langchain_google_genai import ChatGoogleGenerativeAI
+import salud
 from tools import ALL_TOOLS
 from agent.prompt import build_prompt
 from state import State
@@ -19,9 +20,16 @@ _llm = ChatGoogleGenerativeAI(
 _react = create_react_agent(model=_llm, tools=ALL_TOOLS, prompt=build_prompt)
 
 
+def calentar():
+    """Primera ida y vuelta al modelo al arrancar: abre la conexión y valida la API key
+    antes de que llegue el primer usuario (ver salud.precalentar)."""
+    _llm.invoke("Responde solo: ok")
+
+
 def agente_node(state: State) -> dict:
     """Corre el ciclo ReAct sobre los mensajes y devuelve solo los mensajes nuevos
     (evita duplicar el historial al volver al reducer del grafo padre)."""
     previos = len(state["messages"])
     salida = _react.invoke({"messages": state["messages"]})
+    salud.marcar("llm")   # sin precalentar, el LLM queda listo con su primera respuesta
     return {"messages": salida["messages"][previos:]}
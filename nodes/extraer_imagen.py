@@ -4,35 +4,120 @@ determinista— y le entrega al agente un texto con el resultado para que lo com
 El agente NO procesa la imagen: cuando llega aquí ya está extraída y (salvo caso
 ambiguo) registrada. Solo si no se distingue ticket de captura bancaria se deja
 pendiente y se le pide al agente que pregunte.
+
+Un álbum (varias fotos de un mismo media group, ver bot.py) llega en `imagenes`: se
+extraen en paralelo, se combinan las páginas (processing.album) y se registra todo en
+una sola transacción, con una sola respuesta del agente.
 """
+import contextvars
+import json
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from langchain_core.messages import HumanMessage
 from state import State
-from db import get_conn
 from context import (
     get_user_id, get_username, set_datos_imagen, set_imagen_pendiente,
 )
-from processing.imagen import extraer
+from db import get_conn
+from db_async import bd
+from persistence import cache_medios
+from processing import album
+from processing.imagen import extraer, version
 from tools.imagen import registrar_movimientos, registrar_ticket
 
 logger = logging.getLogger(__name__)
 
+# Fotos de un álbum que se extraen a la vez (cada una puede ocupar la visión y el OCR).
+ALBUM_PARALELO = int(os.getenv("IMAGEN_ALBUM_PARALELO", "3"))
+
 
 def _msg(texto: str, original: str) -> dict:
     return {"messages": [HumanMessage(content=texto)], "texto_original": original}
 
 
+def _extraer(imagen_path: str, file_unique_id) -> dict | None:
+    """Del caché por contenido si esta imagen ya se extrajo; si no, visión/OCR y se
+    guarda."""
+    with open(imagen_path, "rb") as f:
+        sha = cache_medios.huella(f.read())
+    llave = version()
+    guardado = cache_medios.buscar("foto", llave, sha256=sha)
+    if guardado is not None:
+        return json.loads(guardado)
+    data = extraer(imagen_path)
+    if data:
+        cache_medios.guardar("foto", llave, sha, json.dumps(data, ensure_ascii=False), file_unique_id)
+    return data
+
+
+def _extraer_todas(imagenes: list[dict]) -> list[dict | None]:
+    """Datos de cada foto del álbum (del caché o extraídos en paralelo), en orden."""
+    def una(img: dict) -> dict | None:
+        if img.get("datos_imagen") is not None:
+            return img["datos_imagen"]
+        if not img.get("imagen_path"):
+            return None
+        try:
+            return _extraer(img["imagen_path"], img.get("file_unique_id"))
+        except Exception as e:
+            logger.warning("No se pudo extraer %s: %s", img["imagen_path"], e)
+            return None
+
+    hilos = max(1, min(len(imagenes), ALBUM_PARALELO))
+    with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="album") as pool:
+        # Una copia del contexto por foto: trazas del turno en cada hilo.
+        futuros = [pool.submit(contextvars.copy_context().run, una, img) for img in imagenes]
+        return [f.result() for f in futuros]
+
+
+def _album(imagenes: list[dict], user_id: str, username: str) -> dict:
+    n = len(imagenes)
+    paginas = [p for p in _extraer_todas(imagenes) if p]
+    if not paginas:
+        return _msg(f"[Sistema] Ángel envió {n} fotos juntas y no se pudo leer ninguna. Pídele "
+                    "fotos más nítidas.", f"[álbum de {n} fotos ilegible]")
+
+    def registrar_todo() -> tuple[list[str], dict | None]:
+        # En el hilo escritor: ahí registrar_ticket/registrar_movimientos corren directo
+        # y comparten esta conexión, así que todo el álbum es una sola transacción.
+        resumenes, pendiente = [], None
+        with get_conn():
+            for doc in album.combinar(paginas):
+                if doc["tipo"] == "desconocido":
+                    pendiente = doc
+                elif doc["tipo"] == "ticket_compra":
+                    resumenes.append(registrar_ticket(user_id, username, doc))
+                else:
+                    resumenes.append(registrar_movimientos(user_id, username, doc))
+        return resumenes, pendiente
+
+    resumenes, pendiente = bd.escribir_sync(registrar_todo)
+    set_datos_imagen(pendiente)
+    set_imagen_pendiente(pendiente is not None)
+
+    partes = [f"[Sistema] Ángel envió {n} fotos juntas (un álbum)"
+              + (f"; {n - len(paginas)} no se pudieron leer" if len(paginas) < n else "") + "."]
+    if resumenes:
+        partes.append("Ya se registró automáticamente, todo junto y sin renglones repetidos entre "
+                      "fotos. Resultado:\n" + "\n\n".join(resumenes))
+    if pendiente:
+        partes.append(f"{pendiente['paginas']} foto(s) no se distinguen con seguridad entre TICKET de "
+                      "compra y CAPTURA bancaria; pregúntale en una línea cuál es. Eso aún no se registró.")
+    partes.append("Responde una sola vez, con naturalidad y brevedad, por todo el álbum.")
+    return _msg("\n\n".join(partes), f"[álbum de {n} fotos]")
+
+
 def extraer_imagen_node(state: State) -> dict:
     user_id, username = get_user_id(), get_username()
+    if state.get("imagenes"):
+        return _album(state["imagenes"], user_id, username)
     imagen_path = state.get("imagen_path")
 
-    with get_conn() as conn:
-        catalogo = conn.execute(
-            "SELECT nombre FROM productos WHERE user_id = ? AND activo = 1", (user_id,)
-        ).fetchall()
-    nombres = [r["nombre"] for r in catalogo]
-
-    data = extraer(imagen_path, nombres) if imagen_path else None
+    # Acierto del caché por file_unique_id: bot.py ni siquiera descargó la foto.
+    data = state.get("datos_imagen")
+    if data is None and imagen_path:
+        data = _extraer(imagen_path, state.get("file_unique_id"))
     if not data:
         return _msg("[Sistema] No se pudo leer la imagen que envió Ángel. Pídele una foto más "
                     "nítida.", "[foto ilegible]")
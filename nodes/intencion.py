@@ -0,0 +1,188 @@
+"""Atajo determinista: resuelve sin LLM los mensajes de fórmula.
+
+"Gasté $385 en Soriana", "ver despensa", "mis presupuestos", "lista de despensa"…
+no necesitan que Gemini razone: basta una gramática que reconozca la intención y
+llame la herramienta directo. Si el mensaje encaja COMPLETO en una regla y la
+regla está segura, el nodo responde con la salida de la herramienta y el turno
+termina; en cualquier otro caso (dudas, fechas, categorías que no conoce, foto
+pendiente de aclarar) no toca nada y el turno sigue al agente.
+
+Se desactiva con INTENCION_RAPIDA=0. `estadisticas()` da la tasa de aciertos.
+"""
+import os
+import re
+import threading
+import unicodedata
+from datetime import datetime
+from typing import Callable, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from context import get_imagen_pendiente, get_user_id
+from db import get_conn
+from state import State
+from tools.despensa import generar_lista_despensa, listar_productos_despensa
+from tools.gastos import registrar_gasto
+from tools.presupuestos import ver_presupuestos
+from utils.dinero import Dinero
+
+ACTIVO = os.getenv("INTENCION_RAPIDA", "1") != "0"
+
+
+def normalizar(texto: str) -> str:
+    """minúsculas, sin acentos, sin signos de puntuación sueltos ni espacios de más."""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    # Puntos y comas solo entre dígitos sobreviven ($1,250.50).
+    texto = re.sub(r"[¿?¡!;:]+|(?<!\d)[.,]|[.,](?!\d)", " ", texto)
+    texto = re.sub(r"\s+(?:por favor|porfa|plis)$", "", texto.strip())
+    return re.sub(r"\s+", " ", texto).strip()
+
+
+# ── Gastos ────────────────────────────────────────────────────────────────────
+
+# Comercios/conceptos frecuentes -> categoría de registrar_gasto. Un concepto que no
+# esté aquí va al agente (él sí sabe inferir la categoría de algo nuevo).
+CATEGORIAS: dict[str, tuple[str, ...]] = {
+    "Comida": ("soriana", "walmart", "chedraui", "costco", "oxxo", "la comer", "super",
+               "supermercado", "mercado", "tianguis", "tacos", "restaurante", "comida",
+               "cafe", "starbucks", "uber eats", "rappi", "didi food", "pizza", "despensa"),
+    "Transporte": ("gasolina", "pemex", "uber", "didi", "taxi", "metro", "camion",
+                   "estacionamiento", "caseta", "peaje"),
+    "Servicios": ("luz", "cfe", "agua", "internet", "telmex", "izzi", "totalplay",
+                  "telcel", "gas", "renta"),
+    "Entretenimiento": ("netflix", "spotify", "cine", "cinepolis", "cinemex", "disney",
+                        "hbo", "max", "prime video", "steam", "xbox", "playstation"),
+    "Salud": ("farmacia", "doctor", "medico", "dentista", "consulta", "medicinas",
+              "farmacias guadalajara", "similares"),
+}
+# "uber eats" antes que "uber": se prueba primero el alias más largo.
+_ALIAS = sorted(((a, c) for c, alias in CATEGORIAS.items() for a in alias),
+                key=lambda ac: -len(ac[0]))
+
+_MONTO = r"\$?\s*(?P<monto>\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)(?:\s*(?:pesos|mxn))?"
+_CONCEPTO = r"(?P<concepto>[a-z][a-z0-9 &'-]{1,39})"
+_VERBO = r"(?:gaste|pague)"
+_GASTO = [
+    re.compile(rf"^{_VERBO} {_MONTO} (?:en|de) {_CONCEPTO}$"),   # gasté $385 en soriana
+    re.compile(rf"^{_VERBO} (?:en|de) {_CONCEPTO} {_MONTO}$"),   # pagué de luz 620
+]
+# Si el concepto trae fecha u otra cantidad, ya no es de fórmula: lo decide el agente.
+_DUDOSO = re.compile(r"\b(?:ayer|antier|anteayer|hoy|manana|lunes|martes|miercoles|jueves|"
+                     r"viernes|sabado|domingo|pasad[oa]|dia|mes|semana|msi|meses|y|con)\b|\d")
+
+
+def _categoria(concepto: str) -> Optional[str]:
+    for alias, categoria in _ALIAS:
+        if re.search(rf"\b{re.escape(alias)}\b", concepto):
+            return categoria
+    return None
+
+
+def _alerta_presupuesto(categoria: str) -> str:
+    """La alerta que el agente daría tras registrar: si el mes ya va al 90% o más del
+    presupuesto de la categoría, se agrega como tanda aparte (`///`, ver bot.py)."""
+    hoy = datetime.now()
+    with get_conn() as conn:
+        r = conn.execute(
+            """SELECT p.limite_centavos lim,
+                      (SELECT COALESCE(SUM(m.monto_centavos), 0) FROM movimientos m
+                       WHERE m.user_id = p.user_id AND m.categoria_id = p.categoria_id
+                         AND m.fecha BETWEEN ? AND ?) gastado
+               FROM presupuestos p JOIN categorias c ON p.categoria_id = c.id
+               WHERE p.user_id = ? AND c.nombre = ? AND p.periodo = 'mensual'""",
+            (hoy.replace(day=1).strftime("%Y-%m-%d"), hoy.strftime("%Y-%m-%d"),
+             get_user_id(), categoria),
+        ).fetchone()
+    if not r or not r["lim"]:
+        return ""
+    pct = Dinero(r["gastado"]) / Dinero(r["lim"]) * 100
+    if pct < 90:
+        return ""
+    return f"\n///\n⚠️ Ojo: ya vas al {pct:.0f}% de tu presupuesto de {categoria} este mes."
+
+
+def _gasto(texto: str) -> Optional[tuple[str, Callable[[], str]]]:
+    for patron in _GASTO:
+        m = patron.match(texto)
+        if not m:
+            continue
+        concepto = m.group("concepto").strip()
+        categoria = _categoria(concepto)
+        if categoria is None or _DUDOSO.search(concepto):
+            return None
+        monto = float(m.group("monto").replace(",", ""))
+        if monto <= 0:
+            return None
+        args = {"concepto": concepto.title(), "monto": monto, "categoria": categoria}
+        return "registrar_gasto", lambda: registrar_gasto.invoke(args) + _alerta_presupuesto(categoria)
+    return None
+
+
+# ── Consultas sin argumentos ──────────────────────────────────────────────────
+
+_CONSULTAS: list[tuple[re.Pattern, str, Callable[[], str]]] = [
+    (re.compile(r"^(?:(?:generar?|genera|hazme|dame|ver|mi) )?(?:la )?lista(?: de(?: la)? despensa| del super)?$"
+                r"|^que (?:tengo que|necesito|me falta) comprar$"),
+     "generar_lista_despensa", lambda: generar_lista_despensa.invoke({})),
+    (re.compile(r"^(?:(?:ver|mostrar|muestrame|ensename) )?(?:mi |la )?despensa$"
+                r"|^(?:ver |mis )?productos(?: de(?: la)? despensa)?$"),
+     "listar_productos_despensa", lambda: listar_productos_despensa.invoke({})),
+    (re.compile(r"^(?:(?:ver|mostrar|muestrame|ensename) )?(?:mis |los )?presupuestos$"),
+     "ver_presupuestos", lambda: ver_presupuestos.invoke({})),
+]
+
+
+def reconocer(texto: str) -> Optional[tuple[str, Callable[[], str]]]:
+    """(intención, acción) si `texto` encaja completo en una regla segura; si no, None."""
+    t = normalizar(texto)
+    if not t or len(t) > 80:
+        return None
+    for patron, nombre, accion in _CONSULTAS:
+        if patron.match(t):
+            return nombre, accion
+    return _gasto(t)
+
+
+# ── Estadísticas ──────────────────────────────────────────────────────────────
+
+_lock = threading.Lock()
+_evaluados = 0
+_aciertos: dict[str, int] = {}
+
+
+def _contar(intencion: Optional[str]):
+    global _evaluados
+    with _lock:
+        _evaluados += 1
+        if intencion:
+            _aciertos[intencion] = _aciertos.get(intencion, 0) + 1
+
+
+def estadisticas() -> dict:
+    with _lock:
+        aciertos = sum(_aciertos.values())
+        return {"evaluados": _evaluados, "aciertos": aciertos,
+                "tasa": aciertos / _evaluados if _evaluados else 0.0,
+                "por_intencion": dict(_aciertos)}
+
+
+# ── Nodo ──────────────────────────────────────────────────────────────────────
+
+def intencion_node(state: State) -> dict:
+    """Intenta el atajo. Si acierta agrega la respuesta y marca `intencion`; si no,
+    devuelve {} y route_intencion manda el turno al agente."""
+    msgs = state.get("messages") or []
+    if not ACTIVO or not msgs or not isinstance(msgs[-1], HumanMessage) or get_imagen_pendiente():
+        return {}
+    contenido = msgs[-1].content
+    hallazgo = reconocer(contenido) if isinstance(contenido, str) else None
+    _contar(hallazgo and hallazgo[0])
+    if not hallazgo:
+        return {}
+    nombre, accion = hallazgo
+    return {"messages": [AIMessage(content=accion())], "intencion": nombre}
+
+
+def route_intencion(state: State) -> str:
+    return "fin" if state.get("intencion") else "agente"
@@ -2,14 +2,34 @@
 import logging
 from langchain_core.messages import HumanMessage
 from state import State
-from processing.audio import transcribir
+from persistence import cache_medios
+from processing import audio as audio_
+from processing.trabajadores import transcribir
 
 logger = logging.getLogger(__name__)
 
 
+def _transcribir(audio, file_unique_id) -> str:
+    """Del caché por contenido si ya se transcribió; si no, Whisper (en el pool de
+    procesos de medios: este hilo solo espera el texto) y se guarda."""
+    if isinstance(audio, str):
+        with open(audio, "rb") as f:
+            audio = f.read()
+    version, sha = audio_.version(), cache_medios.huella(audio)
+    texto = cache_medios.buscar("voz", version, sha256=sha)
+    if texto is None:
+        texto = transcribir(audio)
+        if texto:
+            cache_medios.guardar("voz", version, sha, texto, file_unique_id)
+    return texto
+
+
 def transcribir_node(state: State) -> dict:
-    audio_path = state.get("audio_path")
-    texto = transcribir(audio_path) if audio_path else ""
+    # Acierto del caché por file_unique_id: bot.py ni siquiera descargó el audio.
+    texto = state.get("transcripcion")
+    if texto is None:
+        audio = state.get("audio") or state.get("audio_path")
+        texto = _transcribir(audio, state.get("file_unique_id")) if audio else ""
     if not texto:
         # Sin transcripción no hay nada que el agente pueda hacer: se lo decimos para
         # que le pida a Ángel reintentar, en vez de inventar.
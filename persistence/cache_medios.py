@@ -0,0 +1,133 @@
+"""Caché persistente de lo caro de los medios: transcripciones de voz y datos
+extraídos de fotos.
+
+Telegram reenvía a veces el mismo update, y la gente manda dos veces el mismo ticket
+o reenvía la misma nota. Cada resultado se guarda con dos llaves:
+
+- `file_unique_id` de Telegram: se consulta ANTES de descargar (bot.py), así un
+  acierto se salta la descarga y la inferencia;
+- sha256 del contenido: atrapa el mismo archivo subido de nuevo (otro
+  file_unique_id) y los archivos locales de chat.py.
+
+`version` identifica lo que produjo el resultado (modelo de Whisper y VAD, modelo de
+visión + versión del prompt + catálogo del usuario): si cambia, la entrada vieja ya
+no se usa y el desalojo la termina sacando. El caché es compartido entre usuarios:
+para acertar hay que tener el mismo archivo, así que no revela nada nuevo.
+
+Desalojo: entradas de más de CACHE_MEDIOS_DIAS, y por tamaño (CACHE_MEDIOS_MAX_MB) las
+menos usadas recientemente.
+
+`buscar` (un acierto actualiza `usado`), `guardar` y `desalojar` escriben: corren en el
+hilo escritor de db_async aunque las llamen los nodos desde el planificador.
+"""
+import hashlib
+import os
+import threading
+from typing import Optional
+
+from db import get_conn
+from db_async import bd, en_escritor
+
+MAX_BYTES = int(float(os.getenv("CACHE_MEDIOS_MAX_MB", "20")) * 1024 * 1024)
+MAX_DIAS = float(os.getenv("CACHE_MEDIOS_DIAS", "90"))
+
+_stats = {"consultas_id": 0, "aciertos_id": 0, "consultas_hash": 0, "aciertos_hash": 0,
+          "guardados": 0, "desalojados": 0}
+_lock = threading.Lock()
+
+
+def huella(datos: bytes) -> str:
+    return hashlib.sha256(datos).hexdigest()
+
+
+def _contar(**incrementos):
+    with _lock:
+        for clave, n in incrementos.items():
+            _stats[clave] += n
+
+
+@en_escritor
+def buscar(tipo: str, version: str, file_unique_id: Optional[str] = None,
+           sha256: Optional[str] = None) -> Optional[str]:
+    """Resultado guardado para ese archivo (por id de Telegram o por contenido), o None.
+    Un acierto por contenido adopta el file_unique_id nuevo para la próxima vez."""
+    vigente = f"-{MAX_DIAS:g} days"
+    with get_conn() as conn:
+        for columna, valor, clave in (("file_unique_id", file_unique_id, "id"), ("sha256", sha256, "hash")):
+            if not valor:
+                continue
+            _contar(**{f"consultas_{clave}": 1})
+            row = conn.execute(
+                f"""SELECT id, resultado FROM cache_medios
+                    WHERE tipo = ? AND {columna} = ? AND version = ?
+                      AND creado >= datetime('now', ?)
+                    ORDER BY id DESC LIMIT 1""",
+                (tipo, valor, version, vigente)).fetchone()
+            if row:
+                _contar(**{f"aciertos_{clave}": 1})
+                conn.execute(
+                    """UPDATE cache_medios SET usado = CURRENT_TIMESTAMP, aciertos = aciertos + 1,
+                           file_unique_id = COALESCE(?, file_unique_id)
+                       WHERE id = ?""", (file_unique_id, row["id"]))
+                return row["resultado"]
+    return None
+
+
+@en_escritor
+def guardar(tipo: str, version: str, sha256: str, resultado: str,
+            file_unique_id: Optional[str] = None):
+    """Guarda (o reemplaza) el resultado y desaloja lo que sobre."""
+    with get_conn() as conn:
+        conn.execute(
+            """INSERT INTO cache_medios (tipo, version, sha256, file_unique_id, resultado, tamano)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT (tipo, version, sha256) DO UPDATE SET
+                   resultado = excluded.resultado, tamano = excluded.tamano,
+                   file_unique_id = COALESCE(excluded.file_unique_id, file_unique_id),
+                   creado = CURRENT_TIMESTAMP, usado = CURRENT_TIMESTAMP""",
+            (tipo, version, sha256, file_unique_id, resultado, len(resultado.encode())))
+    _contar(guardados=1)
+    desalojar()
+
+
+@en_escritor
+def desalojar(max_bytes: Optional[int] = None, max_dias: Optional[float] = None) -> int:
+    """Borra lo vencido y, si el caché pasa de `max_bytes`, lo menos usado
+    recientemente. Devuelve cuántas entradas salieron."""
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    max_dias = MAX_DIAS if max_dias is None else max_dias
+    with get_conn() as conn:
+        vencidas = conn.execute("DELETE FROM cache_medios WHERE creado < datetime('now', ?)",
+                                (f"-{max_dias:g} days",)).rowcount
+        # Acumulado de tamaño de la más reciente a la más vieja: sale lo que no cabe.
+        sobrantes = conn.execute(
+            """DELETE FROM cache_medios WHERE id IN (
+                   SELECT id FROM (
+                       SELECT id, SUM(tamano) OVER (ORDER BY usado DESC, id DESC) AS acumulado
+                       FROM cache_medios)
+                   WHERE acumulado > ?)""", (max_bytes,)).rowcount
+    if vencidas + sobrantes:
+        _contar(desalojados=vencidas + sobrantes)
+    return vencidas + sobrantes
+
+
+def estadisticas() -> dict:
+    """Contadores del proceso, tasa de aciertos y tamaño actual del caché."""
+    with _lock:
+        res = dict(_stats)
+    consultas = res["consultas_id"] + res["consultas_hash"]
+    aciertos = res["aciertos_id"] + res["aciertos_hash"]
+    res["consultas"], res["aciertos"] = consultas, aciertos
+    res["tasa_aciertos"] = round(aciertos / consultas, 3) if consultas else 0.0
+    with get_conn() as conn:
+        row = conn.execute("SELECT COUNT(*) AS n, COALESCE(SUM(tamano), 0) AS b FROM cache_medios").fetchone()
+    res["entradas"], res["bytes"] = row["n"], row["b"]
+    return res
+
+
+# ── Versión awaitable para los handlers (no bloquea el event loop) ────────────
+
+async def buscar_async(tipo: str, version: str, file_unique_id: Optional[str] = None,
+                       sha256: Optional[str] = None) -> Optional[str]:
+    # Un acierto actualiza `usado`: va por el escritor.
+    return await bd.escribir(buscar, tipo, version, file_unique_id, sha256)
@@ -1,6 +1,7 @@
 import re
 from typing import Optional
 from db import get_conn, upsert_usuario
+from db_async import bd
 
 # Saludos/modismos con que abrían las respuestas viejas. Se recortan del historial
 # al cargarlo para que el modelo no los imite (Gemini copia el patrón del historial
@@ -65,3 +66,18 @@ def continua_sesion(user_id: str, ventana_min: int = VENTANA_SESION_MIN) -> bool
         ).fetchone()
     mins = row["mins"] if row else None
     return mins is not None and mins <= ventana_min
+
+
+# ── Versiones awaitables para el bot (no bloquean el event loop) ──────────────
+
+async def guardar_mensaje_async(user_id: str, tipo: str, contenido: str,
+                                tg_message_id: Optional[int] = None):
+    await bd.escribir(guardar_mensaje, user_id, tipo, contenido, tg_message_id)
+
+
+async def cargar_historial_async(user_id: str, limite: int = 20) -> list[dict]:
+    return await bd.leer(cargar_historial, user_id, limite)
+
+
+async def continua_sesion_async(user_id: str, ventana_min: int = VENTANA_SESION_MIN) -> bool:
+    return await bd.leer(continua_sesion, user_id, ventana_min)
@@ -0,0 +1,130 @@
+"""Planificador de turnos del bot.
+
+El grafo (Gemini, Whisper, easyocr) es síncrono y puede tardar segundos; si se
+corriera dentro del event loop, un turno lento congelaría el bot para todos. Aquí:
+
+- cada turno corre en un pool de hilos acotado (BOT_TURNOS_CONCURRENTES);
+- las notas de voz y fotos van por un carril aparte ("medios",
+  BOT_TURNOS_MEDIOS): esperan al pool de procesos de processing.trabajadores y, si
+  compartieran hilos con el texto, una ráfaga de audios dejaría a los mensajes de
+  texto haciendo fila detrás;
+- los mensajes de un mismo usuario se atienden en fila, en orden de llegada
+  (un asyncio.Lock por usuario: es FIFO), y usuarios distintos van en paralelo;
+- el trabajo se manda al hilo con una copia del contexto, así las ContextVar de
+  `context.py` (user_id, username, sesión) llegan intactas a nodos y herramientas.
+
+`metricas()` expone profundidad de cola y tiempos de espera. Las esperas también van
+al histograma de trazas (/metrics): `kontos_span_segundos{tipo="cola"}` con
+nombre "usuario" (fila del usuario) y "hilo <carril>" (un hilo libre).
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import trazas
+
+logger = logging.getLogger(__name__)
+
+
+class Planificador:
+    def __init__(self, max_turnos: int = 4, max_medios: int = 2, muestras: int = 500):
+        self.max_turnos, self.max_medios = max_turnos, max_medios
+        self._pools = {
+            "texto": ThreadPoolExecutor(max_workers=max_turnos, thread_name_prefix="turno"),
+            "medios": ThreadPoolExecutor(max_workers=max_medios, thread_name_prefix="medios"),
+        }
+        self._mutex = threading.Lock()   # los contadores del pool se tocan desde los hilos
+        self._candados: dict[str, asyncio.Lock] = {}
+        self._en_fila: dict[str, int] = {}   # turnos por usuario (esperando o en curso)
+        self._esperando_hilo = 0
+        self._en_curso = 0
+        self._atendidos = 0
+        # Últimas esperas (ms): en la fila del usuario y por un hilo libre.
+        self._espera_usuario: deque[float] = deque(maxlen=muestras)
+        self._espera_hilo: deque[float] = deque(maxlen=muestras)
+
+    @asynccontextmanager
+    async def turno(self, user_id: str):
+        """Sección serial de un usuario: un solo turno suyo a la vez, en orden."""
+        candado = self._candados.setdefault(user_id, asyncio.Lock())
+        self._en_fila[user_id] = self._en_fila.get(user_id, 0) + 1
+        t0 = time.perf_counter()
+        try:
+            async with candado:
+                espera = time.perf_counter() - t0
+                self._espera_usuario.append(espera * 1000)
+                trazas.registrar("cola", "usuario", espera)
+                yield
+        finally:
+            self._en_fila[user_id] -= 1
+            if not self._en_fila[user_id]:
+                # Nadie más espera a este usuario: se libera su candado.
+                del self._en_fila[user_id]
+                self._candados.pop(user_id, None)
+
+    async def correr(self, fn, *args, carril: str = "texto", **kwargs):
+        """Corre `fn(*args, **kwargs)` en el pool del carril con el contexto actual y lo
+        espera."""
+        pool = self._pools[carril]
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        encolado = time.perf_counter()
+        with self._mutex:
+            self._esperando_hilo += 1
+
+        def _medido(espera):
+            trazas.registrar("cola", f"hilo {carril}", espera)   # corre dentro del contexto del turno
+            return fn(*args, **kwargs)
+
+        def _en_hilo():
+            espera = time.perf_counter() - encolado
+            with self._mutex:
+                self._esperando_hilo -= 1
+                self._en_curso += 1
+                self._espera_hilo.append(espera * 1000)
+            try:
+                return ctx.run(_medido, espera)
+            finally:
+                with self._mutex:
+                    self._en_curso -= 1
+                    self._atendidos += 1
+
+        return await loop.run_in_executor(pool, _en_hilo)
+
+    def metricas(self) -> dict:
+        """Foto instantánea de la cola y percentiles de espera (ms)."""
+        with self._mutex:
+            espera_hilo = list(self._espera_hilo)
+        return {
+            "max_turnos": self.max_turnos,
+            "max_medios": self.max_medios,
+            "en_curso": self._en_curso,
+            "esperando_hilo": self._esperando_hilo,
+            "usuarios_activos": len(self._en_fila),
+            "turnos_en_fila": sum(self._en_fila.values()),
+            "atendidos": self._atendidos,
+            "espera_usuario_ms": _percentiles(self._espera_usuario),
+            "espera_hilo_ms": _percentiles(espera_hilo),
+        }
+
+    def cerrar(self):
+        for pool in self._pools.values():
+            pool.shutdown(wait=True)
+
+
+def _percentiles(valores) -> dict:
+    if not valores:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    orden = sorted(valores)
+    en = lambda q: orden[min(len(orden) - 1, int(q * len(orden)))]
+    return {"p50": round(en(0.50), 1), "p95": round(en(0.95), 1), "max": round(orden[-1], 1)}
+
+
+planificador = Planificador(max_turnos=int(os.getenv("BOT_TURNOS_CONCURRENTES", "4")),
+                            max_medios=int(os.getenv("BOT_TURNOS_MEDIOS", "2")))
@@ -0,0 +1,145 @@
+"""Combina lo extraído de las fotos de un álbum de Telegram (media group).
+
+Un estado de cuenta largo llega como 3–4 capturas hechas con scroll, y un ticket
+largo en dos fotos: los renglones del borde salen repetidos al final de una página
+y al principio de la siguiente. `combinar` junta las páginas en un resultado por
+documento, quitando ese traslape (no duplicados en general: dos cafés iguales el
+mismo día son dos gastos).
+
+    documentos = album.combinar([datos_foto_1, datos_foto_2, ...])
+
+- Capturas bancarias (estado_cuenta / gasto_suelto): un solo documento con todos
+  los movimientos.
+- Tickets: páginas seguidas de la misma tienda son un mismo ticket hasta la que trae
+  el total; la siguiente empieza otro.
+- Páginas ambiguas: si las claras son todas de una clase, se asumen de esa (un álbum
+  es de una sola cosa); si no hay claras, o son de clases distintas, van juntas en un
+  documento "desconocido" para que el agente pregunte.
+"""
+from typing import Callable, Optional
+
+from processing.catalogo import normalizar
+from utils.dinero import Dinero
+
+_BANCO = ("estado_cuenta", "gasto_suelto")
+
+
+def _clase(data: dict) -> Optional[str]:
+    tipo = (data.get("tipo") or "").lower()
+    if tipo == "desconocido" or (data.get("confianza") or "alta").lower() == "baja":
+        return None
+    if tipo == "ticket_compra":
+        return "ticket"
+    return "banco" if tipo in _BANCO else None
+
+
+def _centavos(valor) -> Optional[int]:
+    try:
+        monto = Dinero.opcional(valor)
+    except (ArithmeticError, ValueError):
+        return None
+    return monto.centavos if monto is not None else None
+
+
+def _llave_movimiento(m: dict) -> tuple:
+    return m.get("fecha"), _centavos(m.get("monto")), normalizar(m.get("concepto") or "")
+
+
+def _llave_producto(p: dict) -> tuple:
+    return normalizar(p.get("nombre_ticket") or ""), _centavos(p.get("precio")), p.get("cantidad")
+
+
+def _traslape(a: list, b: list) -> int:
+    """Largo del mayor final de `a` que es también el principio de `b`."""
+    for n in range(min(len(a), len(b)), 0, -1):
+        if a[-n:] == b[:n]:
+            return n
+    return 0
+
+
+def sin_traslape(paginas: list[list], llave: Callable) -> list:
+    """Concatena las páginas quitando los renglones repetidos en el borde de cada par
+    consecutivo (también si llegaron en orden inverso)."""
+    res: list = []
+    for pagina in paginas:
+        claves_res, claves = [llave(x) for x in res], [llave(x) for x in pagina]
+        adelante, atras = _traslape(claves_res, claves), _traslape(claves, claves_res)
+        if atras > adelante:
+            res = pagina[:len(pagina) - atras] + res
+        else:
+            res = res + pagina[adelante:]
+    return res
+
+
+def _banco(paginas: list[dict]) -> dict:
+    unico = len(paginas) == 1 and (paginas[0].get("tipo") or "").lower() == "gasto_suelto"
+    return {
+        "tipo": "gasto_suelto" if unico else "estado_cuenta",
+        "confianza": "alta",
+        "tienda": next((p["tienda"] for p in paginas if p.get("tienda")), None),
+        "fecha": next((p["fecha"] for p in paginas if p.get("fecha")), None),
+        "total": None,
+        "productos": [],
+        "movimientos": sin_traslape([p.get("movimientos") or [] for p in paginas], _llave_movimiento),
+        "paginas": len(paginas),
+    }
+
+
+def _tickets(paginas: list[dict]) -> list[dict]:
+    grupos: list[list[dict]] = []
+    for p in paginas:
+        actual = grupos[-1] if grupos else None
+        abierto = actual is not None and actual[-1].get("total") is None
+        misma = actual is not None and (not p.get("tienda") or not actual[0].get("tienda")
+                                        or normalizar(p["tienda"]) == normalizar(actual[0]["tienda"]))
+        if abierto and misma:
+            actual.append(p)
+        else:
+            grupos.append([p])
+    return [{
+        "tipo": "ticket_compra",
+        "confianza": "alta",
+        "tienda": next((p["tienda"] for p in g if p.get("tienda")), None),
+        "fecha": next((p["fecha"] for p in g if p.get("fecha")), None),
+        "total": next((p["total"] for p in reversed(g) if p.get("total") is not None), None),
+        "productos": sin_traslape([p.get("productos") or [] for p in g], _llave_producto),
+        "movimientos": [],
+        "paginas": len(g),
+    } for g in grupos]
+
+
+def _ambiguo(paginas: list[dict]) -> dict:
+    return {
+        "tipo": "desconocido",
+        "confianza": "baja",
+        "tienda": next((p["tienda"] for p in paginas if p.get("tienda")), None),
+        "fecha": next((p["fecha"] for p in paginas if p.get("fecha")), None),
+        "total": next((p["total"] for p in reversed(paginas) if p.get("total") is not None), None),
+        "productos": sin_traslape([p.get("productos") or [] for p in paginas], _llave_producto),
+        "movimientos": sin_traslape([p.get("movimientos") or [] for p in paginas], _llave_movimiento),
+        "paginas": len(paginas),
+    }
+
+
+def combinar(paginas: list[dict]) -> list[dict]:
+    """Documentos (con la forma del JSON de processing.imagen) que salen de las páginas
+    de un álbum, en orden: tickets, capturas bancarias y, al final, lo ambiguo."""
+    unicas = []
+    for p in paginas:
+        if p and (not unicas or p != unicas[-1]):   # la misma foto dos veces seguidas
+            unicas.append(p)
+    clases = [_clase(p) for p in unicas]
+    claras = {c for c in clases if c}
+    if len(claras) == 1:
+        clases = [claras.pop()] * len(unicas)
+    docs = []
+    tickets = [p for p, c in zip(unicas, clases) if c == "ticket"]
+    banco = [p for p, c in zip(unicas, clases) if c == "banco"]
+    dudosas = [p for p, c in zip(unicas, clases) if c is None]
+    if tickets:
+        docs += _tickets(tickets)
+    if banco:
+        docs.append(_banco(banco))
+    if dudosas:
+        docs.append(_ambiguo(dudosas))
+    return docs
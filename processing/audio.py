@@ -1,50 +1,92 @@
 """Transcripción de notas de voz con faster-whisper (CPU, modelo configurable).
 
-Convierte el OGG/OGA de Telegram a WAV antes de transcribir. Usa ffmpeg directo
-para la conversión: en Python 3.13+ `pydub` está roto (se eliminó `audioop` de la
-stdlib), así que no dependemos de él.
+El audio llega como bytes (la nota de voz descargada en memoria) o como ruta. Se
+decodifica en memoria a float32 mono 16 kHz —lo que Whisper consume— pasando los
+bytes por ffmpeg con pipes: sin WAV temporal y sin shell. En Python 3.13+ `pydub`
+está roto (se eliminó `audioop` de la stdlib), así que no dependemos de él.
+
+Antes de Whisper se recortan los silencios y un audio largo se parte en trozos de
+a lo más AUDIO_TROZO_S, cortados en pausas (ver processing.vad). Aquí los trozos
+van uno tras otro; processing.trabajadores los reparte entre sus procesos.
 """
+import io
 import os
-import tempfile
 import logging
+import subprocess
+
+from processing import modelos, vad
 
 logger = logging.getLogger(__name__)
 
-# El modelo de Whisper se carga una sola vez y se reutiliza (singleton).
-_model = None
+SAMPLE_RATE = 16000
+VAD = os.getenv("AUDIO_VAD", "1") != "0"
+TROZO_S = float(os.getenv("AUDIO_TROZO_S", "30"))
+_FFMPEG = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+           "-f", "f32le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"]
+
+
+def version() -> str:
+    """Lo que determina el texto de una transcripción (llave del caché de medios)."""
+    vad_ = f"vad{TROZO_S:g}" if VAD else "completo"
+    return f"whisper-{os.getenv('WHISPER_MODEL', 'tiny')}/{vad_}"
+
+
+def _cargar_whisper():
+    from faster_whisper import WhisperModel
+    model_size = os.getenv("WHISPER_MODEL", "tiny")
+    logger.info("Whisper modelo '%s' en CPU.", model_size)
+    return WhisperModel(model_size, device="cpu", compute_type="int8")
+
+
+# Una sola instancia compartida, precargada al arrancar (ver processing.modelos).
+modelos.registrar("whisper", _cargar_whisper)
+
+
+def decodificar(datos: bytes):
+    """OGG/OGA/MP3/WAV en memoria → numpy float32 mono 16 kHz.
+
+    ffmpeg lee de stdin y escribe PCM crudo a stdout. Si no hay binario de ffmpeg, o
+    el contenedor no se deja leer de un pipe (m4a con el índice al final), se usa el
+    decodificador de faster-whisper (PyAV) sobre un buffer en memoria."""
+    import numpy as np
+    try:
+        proc = subprocess.run(_FFMPEG, input=bytes(datos), capture_output=True, timeout=120)
+        if proc.returncode == 0 and proc.stdout:
+            return np.frombuffer(proc.stdout, dtype=np.float32)
+        logger.warning("ffmpeg no pudo decodificar el audio (%s); uso PyAV.",
+                       proc.stderr.decode(errors="replace").strip()[:200])
+    except FileNotFoundError:
+        logger.warning("No hay ffmpeg en el PATH; decodifico con PyAV.")
+    from faster_whisper.audio import decode_audio
+    return decode_audio(io.BytesIO(datos), sampling_rate=SAMPLE_RATE)
+
 
+def preparar(audio) -> list:
+    """bytes, ruta o muestras → trozos de voz (numpy float32 a 16 kHz) listos para
+    Whisper, en orden. Con AUDIO_VAD=0, el audio completo en un solo trozo."""
+    if isinstance(audio, str):
+        with open(audio, "rb") as f:
+            audio = f.read()
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        audio = decodificar(audio)
+    return vad.trozos(audio, SAMPLE_RATE, TROZO_S) if VAD else [audio]
 
-def _get_model():
-    global _model
-    if _model is None:
-        from faster_whisper import WhisperModel
-        model_size = os.getenv("WHISPER_MODEL", "tiny")
-        logger.info("Cargando Whisper modelo '%s' en CPU...", model_size)
-        _model = WhisperModel(model_size, device="cpu", compute_type="int8")
-        logger.info("Whisper listo.")
-    return _model
 
+def transcribir_trozo(muestras) -> str:
+    """Un trozo ya preparado por Whisper. Lanza si falla (lo maneja quien llama)."""
+    with modelos.usar("whisper") as model:
+        # segments es un generador: se consume dentro del bloque (el modelo en uso).
+        segments, _ = model.transcribe(muestras, language="es", beam_size=1)
+        return " ".join(seg.text.strip() for seg in segments).strip()
 
-def _a_wav(origen: str) -> str:
-    """Convierte un audio a WAV 16kHz mono con ffmpeg y devuelve la ruta del WAV."""
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-        destino = tmp.name
-    código = os.system(f'ffmpeg -y -i "{origen}" -ar 16000 -ac 1 "{destino}" -loglevel quiet')
-    if código != 0:
-        logger.warning("ffmpeg devolvió código %s al convertir %s", código, origen)
-    return destino
 
+def transcribir(audio) -> str:
+    """Transcribe un audio y devuelve el texto en español, o "" si falla o no hay voz.
 
-def transcribir(audio_path: str) -> str:
-    """Transcribe un audio (OGG/OGA/MP3/WAV) y devuelve el texto en español, o "" si falla."""
-    wav_path = None
+    `audio`: bytes del archivo (OGG/OGA/MP3/WAV), su ruta, o muestras ya decodificadas
+    (numpy float32 a 16 kHz)."""
     try:
-        wav_path = audio_path if audio_path.endswith(".wav") else _a_wav(audio_path)
-        segments, _ = _get_model().transcribe(wav_path, language="es", beam_size=1)
-        return " ".join(seg.text for seg in segments).strip()
+        return " ".join(t for t in map(transcribir_trozo, preparar(audio)) if t)
     except Exception as e:
         logger.error("Error en transcripción Whisper: %s", e)
         return ""
-    finally:
-        if wav_path and wav_path != audio_path and os.path.exists(wav_path):
-            os.remove(wav_path)
@@ -0,0 +1,134 @@
+"""Empareja los renglones de un ticket con los productos del catálogo del usuario.
+
+El modelo (o la plantilla local) solo devuelve el nombre tal como aparece en el
+ticket ("KS PAPEL HIG 36R"); aquí se decide a qué producto corresponde, sin LLM:
+
+    emparejador = catalogo.cargar(conn, user_id)
+    coincidencia = emparejador.emparejar("KS PAPEL HIG 36R")   # → Papel Higiénico
+
+En orden: alias ya confirmados (tabla alias_productos), nombre igual tras
+normalizar, y por último tokens: sin acentos, sin tallas ni medidas ("10L",
+"3X946ML"), con las abreviaturas de ticket expandidas ("deo" → desodorante) y
+aceptando prefijos ("deslac" → deslactosada). La marca del producto cuenta a favor
+pero no es obligatoria. Si dos productos empatan, no se elige ninguno.
+"""
+import re
+import unicodedata
+from typing import NamedTuple, Optional
+
+UMBRAL = 0.5
+
+# Abreviaturas de ticket que no son prefijo de la palabra completa.
+ABREVIATURAS = {
+    "ks": "kirkland", "deo": "desodorante", "desod": "desodorante", "jbn": "jabon",
+    "det": "detergente", "detg": "detergente", "pnl": "panales", "sh": "shampoo",
+    "bca": "blanca", "bco": "blanco", "pq": "paquete", "paq": "paquete",
+}
+_VACIAS = {"de", "del", "la", "el", "los", "las", "en", "con", "y", "para", "sin", "a"}
+
+
+class Coincidencia(NamedTuple):
+    producto_id: int
+    nombre: str
+    puntaje: float
+    via: str   # "alias" | "nombre" | "tokens"
+
+
+def plegar(texto: str) -> str:
+    """Minúsculas y sin acentos: 'Líquido' → 'liquido', 'Pañales' → 'panales'."""
+    sin_acentos = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in sin_acentos if not unicodedata.combining(c)).lower()
+
+
+def tokens(texto: str) -> list[str]:
+    """Palabras significativas: sin vacías ni tallas/medidas, abreviaturas expandidas."""
+    res = []
+    for t in re.findall(r"[a-z0-9]+", plegar(texto)):
+        if t in _VACIAS or any(c.isdigit() for c in t) or len(t) < 2:
+            continue
+        res.append(ABREVIATURAS.get(t, t))
+    return res
+
+
+def normalizar(texto: str) -> str:
+    """Llave de alias y de nombre exacto."""
+    return " ".join(tokens(texto))
+
+
+def _casan(a: str, b: str) -> bool:
+    if a == b:
+        return True
+    corto, largo = (a, b) if len(a) <= len(b) else (b, a)
+    return len(corto) >= 3 and largo.startswith(corto)
+
+
+class Emparejador:
+    """Catálogo de un usuario listo para emparejar. `productos` son filas
+    (id, nombre, marca); `alias`, alias normalizado → producto_id."""
+
+    def __init__(self, productos, alias: Optional[dict] = None):
+        self._productos = [(pid, nombre, tokens(nombre), tokens(marca or ""))
+                           for pid, nombre, marca in productos]
+        self._nombres = {pid: nombre for pid, nombre, _, _ in self._productos}
+        self._por_nombre = {normalizar(nombre): pid for pid, nombre, _, _ in self._productos}
+        self._alias = {a: pid for a, pid in (alias or {}).items() if pid in self._nombres}
+
+    def __len__(self):
+        return len(self._productos)
+
+    def emparejar(self, nombre_ticket: str) -> Optional[Coincidencia]:
+        llave = normalizar(nombre_ticket)
+        if not llave:
+            return None
+        for via, tabla in (("alias", self._alias), ("nombre", self._por_nombre)):
+            if llave in tabla:
+                pid = tabla[llave]
+                return Coincidencia(pid, self._nombres[pid], 1.0, via)
+
+        ticket = llave.split()
+        puntajes = []
+        for pid, nombre, del_nombre, de_marca in self._productos:
+            if not del_nombre:
+                continue
+            casan = [t for t in ticket if any(_casan(t, c) for c in del_nombre + de_marca)]
+            cubiertos = [c for c in del_nombre if any(_casan(t, c) for t in ticket)]
+            if not cubiertos:
+                continue
+            a, b = len(casan) / len(ticket), len(cubiertos) / len(del_nombre)
+            puntajes.append((min(a, b), (a + b) / 2, pid, nombre))
+        if not puntajes:
+            return None
+        puntajes.sort(reverse=True)
+        mejor = puntajes[0]
+        if mejor[0] < UMBRAL or (len(puntajes) > 1 and puntajes[1][:2] == mejor[:2]):
+            return None
+        return Coincidencia(mejor[2], mejor[3], round(mejor[0], 3), "tokens")
+
+
+def cargar(conn, user_id: str) -> Emparejador:
+    """Productos activos y alias del usuario."""
+    productos = conn.execute(
+        "SELECT id, nombre, marca FROM productos WHERE user_id = ? AND activo = 1", (user_id,)
+    ).fetchall()
+    alias = conn.execute(
+        "SELECT alias, producto_id FROM alias_productos WHERE user_id = ?", (user_id,)
+    ).fetchall()
+    return Emparejador([(r["id"], r["nombre"], r["marca"]) for r in productos],
+                       {r["alias"]: r["producto_id"] for r in alias})
+
+
+def aprender(conn, user_id: str, nombre_ticket: str, producto_id: int) -> bool:
+    """Guarda (o corrige) el alias confirmado de un renglón de ticket."""
+    alias = normalizar(nombre_ticket)
+    if not alias:
+        return False
+    conn.execute(
+        """INSERT INTO alias_productos (user_id, alias, producto_id) VALUES (?, ?, ?)
+           ON CONFLICT (user_id, alias) DO UPDATE SET producto_id = excluded.producto_id""",
+        (user_id, alias, producto_id))
+    return True
+
+
+def contar_uso(conn, user_id: str, nombre_ticket: str):
+    conn.execute("UPDATE alias_productos SET usos = usos + 1 WHERE user_id = ? AND alias = ?",
+                 (user_id, normalizar(nombre_ticket)))
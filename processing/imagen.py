@@ -3,43 +3,88 @@
 Corre SIEMPRE al recibir una foto (no la decide el agente): manda la imagen al
 modelo de visión y devuelve datos estructurados (tipo, movimientos, productos…).
 No toca la base de datos: registrar es responsabilidad de las tools, que el
-agente elige según el tipo. Si la visión falla, cae a OCR local (easyocr/tesseract).
+agente elige según el tipo. Si la visión falla o tarda, corre también OCR local
+(easyocr/tesseract) y gana la primera vía que entregue datos.
+Visión y OCR reciben cada uno su versión preprocesada de la foto (ver
+processing.preimagen). Los tickets de tiendas conocidas se leen del texto del OCR con
+una plantilla local (processing.recibos), que compite con la visión desde el inicio:
+si cuadra primero, gana sin esperar al modelo.
 """
 import os
 import base64
+import contextvars
 import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime
 from langchain_core.messages import HumanMessage
+import trazas
+from processing import modelos, preimagen, recibos
 
 logger = logging.getLogger(__name__)
 
+VISION_PLAZO_S = float(os.getenv("IMAGEN_VISION_PLAZO_S", "8"))
+LIMITE_S = float(os.getenv("IMAGEN_LIMITE_S", "60"))
+PLANTILLAS_PRIMERO = os.getenv("IMAGEN_PLANTILLAS_PRIMERO", "1") != "0"
+
+_stats = {"plantilla": 0, "vision": 0, "ocr": 0, "sin_datos": 0, "tiempos_agotados": 0, "coberturas": 0}
+_stats_lock = threading.Lock()
+
 _MIME = {".png": "image/png", ".webp": "image/webp", ".gif": "image/gif"}
+# Súbela al cambiar `_instrucciones` o el formato del JSON: invalida el caché de medios.
+PROMPT_VERSION = 2
 
 
 def _data_uri(imagen_path: str) -> str:
-    with open(imagen_path, "rb") as f:
-        b64 = base64.b64encode(f.read()).decode()
-    mime = _MIME.get(os.path.splitext(imagen_path)[1].lower(), "image/jpeg")
-    return f"data:{mime};base64,{b64}"
+    if preimagen.ACTIVO:
+        datos, mime = preimagen.para_vision(imagen_path)
+    else:
+        with open(imagen_path, "rb") as f:
+            datos = f.read()
+        mime = _MIME.get(os.path.splitext(imagen_path)[1].lower(), "image/jpeg")
+    return f"data:{mime};base64,{base64.b64encode(datos).decode()}"
+
+
+def _cargar_easyocr():
+    import easyocr
+    return easyocr.Reader(["es", "en"], gpu=False, verbose=False)
+
+
+# El lector de easyocr tarda segundos en cargar sus pesos: una sola instancia
+# compartida, precargada al arrancar (ver processing.modelos).
+modelos.registrar("ocr", _cargar_easyocr)
 
 
 def _ocr_texto(imagen_path: str) -> str:
     """Respaldo: extrae texto con OCR cuando la visión del modelo no está disponible."""
     try:
-        import easyocr
-        reader = easyocr.Reader(["es", "en"], gpu=False, verbose=False)
-        return "\n".join(reader.readtext(imagen_path, detail=0))
+        img = preimagen.para_ocr(imagen_path) if preimagen.ACTIVO else None
+    except Exception as e:
+        return f"ERROR_OCR: {e}"
+    try:
+        import numpy as np
+        with modelos.usar("ocr") as reader:
+            return "\n".join(reader.readtext(imagen_path if img is None else np.asarray(img), detail=0))
     except ImportError:
         pass
     try:
         from PIL import Image
         import pytesseract
-        return pytesseract.image_to_string(Image.open(imagen_path), lang="spa")
+        return pytesseract.image_to_string(Image.open(imagen_path) if img is None else img, lang="spa")
     except Exception as e:
         return f"ERROR_OCR: {e}"
 
 
-def _instrucciones(nombres_catalogo: list[str]) -> str:
+def version() -> str:
+    """Lo que determina el JSON extraído: modelo, prompt, plantillas y preprocesado.
+    Llave del caché de medios. El catálogo del usuario no entra: los productos se
+    emparejan al registrar (processing.catalogo)."""
+    return (f"{os.getenv('GEMINI_MODEL', 'gemini-2.5-flash')}/p{PROMPT_VERSION}/"
+            f"r{recibos.VERSION}/{preimagen.version()}")
+
+
+def _instrucciones() -> str:
     hoy = datetime.now().strftime("%Y-%m-%d")
     anio = hoy[:4]
     return f"""Eres un extractor de datos financieros. HOY es {hoy} (año actual: {anio}).
@@ -54,15 +99,13 @@ Analiza la imagen que envió el usuario y clasifícala:
 - "gasto_suelto": comprobante de UN solo pago/cargo (transferencia, recibo de servicio, una compra individual).
 - "desconocido": no se puede determinar o no es financiero.
 
-Catálogo de despensa del usuario (mapea productos SOLO si es ticket_compra): {nombres_catalogo}
-
 Responde SOLO con JSON válido, sin texto adicional:
 {{"tipo": "ticket_compra|estado_cuenta|gasto_suelto|desconocido",
   "confianza": "alta|baja (usa 'baja' si dudas entre ticket_compra y estado_cuenta)",
   "tienda": "nombre de la tienda o null",
   "fecha": "YYYY-MM-DD (usa {hoy} si no aparece)",
   "total": <número o null: total del ticket_compra>,
-  "productos": [{{"nombre_catalogo": "nombre EXACTO del catálogo si coincide, si no null", "nombre_ticket": "como aparece", "precio": <número o null>, "cantidad": <número>}}],
+  "productos": [{{"nombre_ticket": "tal como aparece en el ticket", "precio": <número o null: precio unitario>, "cantidad": <número>}}],
   "movimientos": [{{"concepto": "descripción del cargo", "monto": <número positivo>, "fecha": "YYYY-MM-DD (completa el año según la regla de HOY de arriba)", "categoria": "Comida|Transporte|Entretenimiento|Servicios|Salud|Compras|General"}}]}}
 
 Reglas IMPORTANTES:
@@ -73,49 +116,212 @@ Reglas IMPORTANTES:
 - Si un monto no se ve con claridad, déjalo igualmente como movimiento con tu mejor lectura; no lo descartes por dudar."""
 
 
-def extraer(imagen_path: str, nombres_catalogo: list[str]) -> dict | None:
-    """Devuelve los datos financieros estructurados de la imagen, o None si no se pudo leer.
-
-    Args:
-        imagen_path: ruta local de la imagen.
-        nombres_catalogo: nombres de productos de la despensa del usuario (para mapear tickets).
-    """
+def _llm(timeout: float = LIMITE_S):
     from langchain_google_genai import ChatGoogleGenerativeAI
-    from utils.json_parser import parse_json_from_text
-
-    llm = ChatGoogleGenerativeAI(
+    # Cada vía arma su cliente (corren en hilos distintos). Una llamada HTTP en curso no
+    # se puede matar: el timeout (lo que le queda a la carrera) y no reintentar (la otra
+    # vía es el reintento) acotan lo que una llamada abandonada ocupa su hilo.
+    return ChatGoogleGenerativeAI(
         model=os.getenv("GEMINI_MODEL", "gemini-2.5-flash"),
         google_api_key=os.getenv("GEMINI_API_KEY"),
         temperature=0,
+        timeout=max(1.0, timeout),
+        max_retries=0,
     )
-    instrucciones = _instrucciones(nombres_catalogo)
 
-    # 1) Visión directa sobre la imagen.
+
+def _restante(limite: float | None) -> float:
+    return LIMITE_S if limite is None else max(0.0, limite - time.perf_counter())
+
+
+def _parsear(raw) -> dict | None:
+    from utils.json_parser import parse_json_from_text
+    return parse_json_from_text(raw if isinstance(raw, str) else str(raw))
+
+
+def _via_vision(imagen_path: str, instrucciones: str, cancelado: threading.Event,
+                limite: float | None = None) -> dict | None:
+    """Visión directa sobre la imagen. Si la carrera ya terminó (`cancelado`), ni llama
+    al modelo ni parsea su respuesta."""
+    if cancelado.is_set():
+        return None
     try:
         msg = HumanMessage(content=[
             {"type": "text", "text": instrucciones},
             {"type": "image_url", "image_url": _data_uri(imagen_path)},
         ])
-        raw = llm.invoke([msg]).content
-        data = parse_json_from_text(raw if isinstance(raw, str) else str(raw))
-        if data:
-            logger.info("Imagen extraída vía visión.")
-            return data
+        raw = _llm(_restante(limite)).invoke([msg]).content
     except Exception as e:
-        logger.warning("Visión falló (%s); intento OCR de respaldo.", e)
+        if not cancelado.is_set():
+            logger.warning("Visión falló: %s", e)
+        return None
+    return None if cancelado.is_set() else _parsear(raw)
 
-    # 2) Respaldo: OCR a texto y se lo pasamos al modelo como texto plano.
-    texto = _ocr_texto(imagen_path)
+
+def _via_ocr(imagen_path: str, instrucciones: str, cancelado: threading.Event,
+             leido: Future | None = None, limite: float | None = None) -> dict | None:
+    """Respaldo: OCR a texto (en el pool de procesos de medios), que se intenta leer
+    con las plantillas y si no se le pasa al modelo como texto plano. El OCR tiene de
+    tope lo que le queda a la carrera; si la visión gana antes, termina en su trabajador
+    (que conserva el modelo cargado), su texto se descarta y no se gasta la llamada al
+    modelo. `leido` es la lectura
+    que arrancó `extraer` para las plantillas: se reutiliza (esperándola si aún no
+    termina) en vez de repetir el OCR."""
+    if leido is None:
+        from processing import trabajadores
+        texto = trabajadores.ocr_texto(imagen_path, timeout=_restante(limite))
+    else:
+        texto = leido.result()
+    if cancelado.is_set():
+        return None
+    if not texto.startswith("ERROR_OCR"):
+        data = recibos.parsear(texto)
+        if data:
+            return data
     if texto.startswith("ERROR_OCR"):
         logger.error("Fallo OCR: %s", texto)
         return None
+    if cancelado.is_set():
+        return None
     logger.info("OCR imagen (%d chars): %s", len(texto), texto[:200].replace("\n", " | "))
     try:
-        raw = llm.invoke(f"{instrucciones}\n\nTexto OCR de la imagen:\n---\n{texto[:3500]}\n---").content
-        data = parse_json_from_text(raw if isinstance(raw, str) else str(raw))
-        if data:
-            logger.info("Imagen extraída vía OCR.")
-        return data
+        raw = _llm(_restante(limite)).invoke(
+            f"{instrucciones}\n\nTexto OCR de la imagen:\n---\n{texto[:3500]}\n---").content
     except Exception as e:
-        logger.error("No se pudo extraer datos de la imagen ni por OCR: %s", e)
+        if not cancelado.is_set():
+            logger.error("No se pudo extraer datos de la imagen por OCR: %s", e)
+        return None
+    return None if cancelado.is_set() else _parsear(raw)
+
+
+_hilos: ThreadPoolExecutor | None = None
+_lectores: ThreadPoolExecutor | None = None   # aparte: las vías esperan a la lectura
+_hilos_lock = threading.Lock()
+
+
+def _lanzar(via: str, imagen_path: str, instrucciones: str, cancelado: threading.Event,
+            **kw) -> Future:
+    """Corre una vía en el pool de la carrera, con el contexto del turno (trazas) y
+    midiendo su latencia tanto si da datos como si no."""
+    global _hilos
+    with _hilos_lock:
+        if _hilos is None:
+            _hilos = ThreadPoolExecutor(max_workers=4, thread_name_prefix="imagen")
+    fn = _via_vision if via == "vision" else _via_ocr
+
+    def medida():
+        t0 = time.perf_counter()
+        data = fn(imagen_path, instrucciones, cancelado, **kw)
+        trazas.registrar("imagen", via if data else f"{via} (sin datos)", time.perf_counter() - t0)
+        return data
+
+    return _hilos.submit(contextvars.copy_context().run, medida)
+
+
+def _contar(clave: str):
+    with _stats_lock:
+        _stats[clave] += 1
+
+
+def _leer(imagen_path: str, timeout: float) -> Future:
+    """Arranca el OCR local de la foto; el Future da su texto (o 'ERROR_OCR: …')."""
+    global _lectores
+    from processing import trabajadores
+    with _hilos_lock:
+        if _lectores is None:
+            _lectores = ThreadPoolExecutor(max_workers=4, thread_name_prefix="imagen-ocr")
+    return _lectores.submit(contextvars.copy_context().run, trabajadores.ocr_texto, imagen_path,
+                            timeout=timeout)
+
+
+def _por_plantilla(leido: Future) -> Future:
+    """Vía de las plantillas: en cuanto termina la lectura del OCR la pasa por las
+    plantillas de tienda, sin LLM. No ocupa un hilo esperando: corre al terminar
+    `leido`, y el Future da los datos o None si ningún formato cuadró."""
+    t0, resultado = time.perf_counter(), Future()
+    resultado.set_running_or_notify_cancel()   # nadie lo cancela: lo resuelve al_leer
+
+    def al_leer(f: Future):
+        try:
+            texto = f.result()
+            data = None if texto.startswith("ERROR_OCR") else recibos.parsear(texto)
+        except Exception as e:
+            logger.warning("Plantillas fallaron: %s", e)
+            data = None
+        trazas.registrar("imagen", "plantilla" if data else "plantilla (sin datos)", time.perf_counter() - t0)
+        resultado.set_result(data)
+
+    leido.add_done_callback(al_leer)
+    return resultado
+
+
+def estadisticas() -> dict:
+    """Cuántas extracciones resolvió una plantilla local, cuántas ganó cada vía, cuántas no dieron nada y cuántas veces
+    hubo que arrancar el OCR en paralelo."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def extraer(imagen_path: str) -> dict | None:
+    """Devuelve los datos financieros estructurados de la imagen, o None si no se pudo leer.
+
+    Carrera con cobertura: arranca la visión y, con IMAGEN_PLANTILLAS_PRIMERO, a la par
+    el OCR local con las plantillas de tienda (processing.recibos): un ticket conocido
+    que cuadra gana sin esperar al modelo. Si la visión no respondió en
+    IMAGEN_VISION_PLAZO_S (o falló antes), arranca también la vía de OCR (que reutiliza
+    esa lectura) y gana el primer JSON válido. Las demás vías se cancelan: su resultado
+    se descarta y ninguna llega a llamar al modelo después; un OCR en curso termina
+    (sin matar al trabajador ni su modelo) dentro del tope. Todo tiene un tope de
+    IMAGEN_LIMITE_S.
+
+    Args:
+        imagen_path: ruta local de la imagen.
+    """
+    t0 = time.perf_counter()
+    cancelado = threading.Event()
+    leido, pendientes = None, {}
+    con_ocr = False
+    try:
+        instrucciones = _instrucciones()
+        plazo, limite = t0 + VISION_PLAZO_S, t0 + LIMITE_S
+        pendientes[_lanzar("vision", imagen_path, instrucciones, cancelado, limite=limite)] = "vision"
+        if PLANTILLAS_PRIMERO:
+            leido = _leer(imagen_path, LIMITE_S)
+            pendientes[_por_plantilla(leido)] = "plantilla"
+
+        def cubrir():
+            nonlocal con_ocr
+            con_ocr = True
+            _contar("coberturas")
+            pendientes[_lanzar("ocr", imagen_path, instrucciones, cancelado,
+                               leido=leido, limite=limite)] = "ocr"
+
+        while pendientes:
+            ahora = time.perf_counter()
+            hasta = limite if con_ocr else min(plazo, limite)
+            listos, _ = wait(pendientes, timeout=max(0.0, hasta - ahora), return_when=FIRST_COMPLETED)
+            if not listos:
+                if con_ocr or time.perf_counter() >= limite:
+                    logger.error("Extracción de imagen sin respuesta en %g s.", LIMITE_S)
+                    _contar("tiempos_agotados")
+                    return None
+                logger.info("La visión no respondió en %g s; arranco el OCR en paralelo.", VISION_PLAZO_S)
+                cubrir()
+                continue
+            for futuro in listos:
+                via = pendientes.pop(futuro)
+                data = futuro.result()
+                if data:
+                    logger.info("Imagen extraída vía %s.", {"vision": "visión", "ocr": "OCR"}.get(
+                        via, f"plantilla {data.get('plantilla')}, sin esperar al LLM"))
+                    _contar(via)
+                    return data
+                if via == "vision" and not con_ocr:
+                    cubrir()
+        _contar("sin_datos")
         return None
+    finally:
+        cancelado.set()
+        for futuro in pendientes:
+            futuro.cancel()
+        trazas.registrar("imagen", "extraer", time.perf_counter() - t0)
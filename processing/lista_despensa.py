@@ -0,0 +1,109 @@
+"""Lista de despensa precalculada (tabla lista_despensa).
+
+El pronóstico de cada producto activo (processing/pronostico.py) se guarda por
+usuario, así que pedir la lista es leer tres rangos del índice
+(user_id, proxima_estimada) en vez de recalcular:
+
+- toca: próxima compra dentro de HORIZONTE_DIAS;
+- pronto: después;
+- sin patrón: productos sin compras suficientes (proxima_estimada NULL).
+
+Se rehace completa una vez al día (trabajo diario del bot, o al leerla si aún no se
+calculó hoy) y por producto con cada escritura de compras o del catálogo:
+
+    lista_despensa.actualizar(conn, user_id, producto_id)   # tras registrar una compra
+    cubetas = lista_despensa.leer(conn, user_id)
+    texto = lista_despensa.recordatorio(conn, user_id)      # lo que vence hoy, una vez
+"""
+from datetime import date, timedelta
+from typing import Optional
+
+from processing import pronostico
+
+HORIZONTE_DIAS = 7
+
+
+def _hoy(hoy: Optional[date]) -> str:
+    return (hoy or date.today()).isoformat()
+
+
+def actualizar(conn, user_id: str, producto_id: Optional[int] = None, hoy: Optional[date] = None):
+    """Recalcula la lista del usuario, o solo el renglón de un producto."""
+    filtro, params = ("", [user_id]) if producto_id is None else (" AND id = ?", [user_id, producto_id])
+    activos = [r[0] for r in conn.execute(
+        f"SELECT id FROM productos WHERE user_id = ? AND activo = 1{filtro}", params)]
+    if producto_id is None:
+        conn.execute("""DELETE FROM lista_despensa WHERE user_id = ? AND producto_id NOT IN
+                        (SELECT id FROM productos WHERE user_id = ? AND activo = 1)""", (user_id, user_id))
+        conn.execute("""INSERT INTO lista_despensa_estado (user_id, calculada) VALUES (?, ?)
+                        ON CONFLICT (user_id) DO UPDATE SET calculada = excluded.calculada""",
+                     (user_id, _hoy(hoy)))
+    elif not activos:
+        conn.execute("DELETE FROM lista_despensa WHERE user_id = ? AND producto_id = ?", (user_id, producto_id))
+        return
+    pronosticos = pronostico.pronosticar(conn, user_id, producto_id)
+    filas = []
+    for pid in activos:
+        p = pronosticos.get(pid)
+        filas.append((user_id, pid) + ((p.proxima, p.desde, p.hasta) if p else (None, None, None)))
+    conn.executemany(
+        """INSERT INTO lista_despensa (user_id, producto_id, proxima_estimada, desde, hasta)
+           VALUES (?, ?, ?, ?, ?)
+           ON CONFLICT (user_id, producto_id) DO UPDATE SET proxima_estimada = excluded.proxima_estimada,
+           desde = excluded.desde, hasta = excluded.hasta, calculada = CURRENT_TIMESTAMP""", filas)
+
+
+def vigente(conn, user_id: str, hoy: Optional[date] = None) -> bool:
+    row = conn.execute("SELECT calculada FROM lista_despensa_estado WHERE user_id = ?", (user_id,)).fetchone()
+    return row is not None and row[0] == _hoy(hoy)
+
+
+_COLUMNAS = """p.nombre, p.tienda_pref, l.proxima_estimada, pd.num_registros,
+               CAST(julianday(l.proxima_estimada) - julianday(:hoy) AS INTEGER) AS dias,
+               CAST(julianday(l.desde) - julianday(:hoy) AS INTEGER) AS dias_desde,
+               CAST(julianday(l.hasta) - julianday(:hoy) AS INTEGER) AS dias_hasta
+               FROM lista_despensa l JOIN productos p ON p.id = l.producto_id
+               LEFT JOIN patrones_despensa pd ON pd.producto_id = l.producto_id"""
+
+
+def leer(conn, user_id: str, hoy: Optional[date] = None) -> dict:
+    """Cubetas 'toca', 'pronto' y 'sin_patron' del usuario (filas con nombre,
+    tienda_pref, proxima_estimada, num_registros y días hasta la próxima compra y los
+    extremos de su banda). Si la lista no se ha calculado hoy, la calcula."""
+    if not vigente(conn, user_id, hoy):
+        actualizar(conn, user_id, hoy=hoy)
+    params = {"u": user_id, "hoy": _hoy(hoy),
+              "limite": ((hoy or date.today()) + timedelta(days=HORIZONTE_DIAS)).isoformat()}
+    return {
+        "toca": conn.execute(
+            f"SELECT {_COLUMNAS} WHERE l.user_id = :u AND l.proxima_estimada <= :limite "
+            "ORDER BY l.proxima_estimada", params).fetchall(),
+        "pronto": conn.execute(
+            f"SELECT {_COLUMNAS} WHERE l.user_id = :u AND l.proxima_estimada > :limite "
+            "ORDER BY l.proxima_estimada", params).fetchall(),
+        "sin_patron": conn.execute(
+            f"SELECT {_COLUMNAS} WHERE l.user_id = :u AND l.proxima_estimada IS NULL "
+            "ORDER BY p.nombre", params).fetchall(),
+    }
+
+
+def usuarios(conn) -> list[str]:
+    """Usuarios con productos activos en la despensa."""
+    return [r[0] for r in conn.execute("SELECT DISTINCT user_id FROM productos WHERE activo = 1")]
+
+
+def recordatorio(conn, user_id: str, hoy: Optional[date] = None) -> Optional[str]:
+    """Texto del aviso con lo que ya toca comprar y aún no se avisó (cada producto se
+    avisa una vez por próxima compra estimada), o None. Lo marca como avisado."""
+    filas = conn.execute(
+        """SELECT l.producto_id, p.nombre, p.tienda_pref FROM lista_despensa l
+           JOIN productos p ON p.id = l.producto_id
+           WHERE l.user_id = ? AND l.proxima_estimada <= ?
+             AND (l.avisada IS NULL OR l.avisada <> l.proxima_estimada)
+           ORDER BY l.proxima_estimada""", (user_id, _hoy(hoy))).fetchall()
+    if not filas:
+        return None
+    conn.executemany("UPDATE lista_despensa SET avisada = proxima_estimada WHERE user_id = ? AND producto_id = ?",
+                     [(user_id, r["producto_id"]) for r in filas])
+    lineas = [f"• {r['nombre']}" + (f" ({r['tienda_pref']})" if r["tienda_pref"] else "") for r in filas]
+    return "🛒 Según tu ritmo de consumo, ya toca comprar:\n" + "\n".join(lineas)
@@ -0,0 +1,187 @@
+"""Administrador de modelos pesados (Whisper, easyocr): una instancia compartida por
+proceso, precarga en segundo plano y liberación por inactividad.
+
+Cada módulo de `processing` registra su cargador:
+
+    modelos.registrar("whisper", _cargar_whisper)
+
+y lo usa con
+
+    with modelos.usar("whisper") as model:
+        ...
+
+`usar` carga el modelo si hace falta (una sola vez aunque lo pidan varios hilos) y lo
+marca en uso: el limpiador nunca libera un modelo a media transcripción. Si
+MODELOS_TTL_S > 0, un modelo que lleva ese tiempo sin usarse se suelta para
+devolverle la memoria al sistema; el siguiente uso lo vuelve a cargar.
+
+`observar(fn)` avisa `fn(nombre, cargado)` en cada carga y liberación (así salud y el
+pool de medios saben qué está caliente sin preguntarle a cada proceso).
+"""
+import ctypes
+import gc
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+TTL_S = float(os.getenv("MODELOS_TTL_S", "0"))   # 0 = nunca liberar
+
+
+class _Modelo:
+    def __init__(self, nombre: str, cargar: Callable[[], object]):
+        self.nombre, self.cargar = nombre, cargar
+        self.instancia = None
+        self.lock = threading.Lock()     # serializa carga/liberación
+        self.en_uso = 0
+        self.ultimo_uso = 0.0
+        self.segundos_carga = 0.0
+        self.cargas = 0
+
+
+_modelos: dict[str, _Modelo] = {}
+_registro_lock = threading.Lock()
+_limpiador: Optional[threading.Thread] = None
+_observadores: list[Callable[[str, bool], None]] = []
+
+
+def registrar(nombre: str, cargar: Callable[[], object]):
+    with _registro_lock:
+        if nombre not in _modelos:
+            _modelos[nombre] = _Modelo(nombre, cargar)
+
+
+def nombres() -> list[str]:
+    return list(_modelos)
+
+
+def observar(fn: Callable[[str, bool], None]):
+    """`fn(nombre, cargado)` se llama tras cargar (True) o liberar (False) un modelo."""
+    _observadores.append(fn)
+
+
+def _avisar(nombre: str, cargado: bool):
+    for fn in list(_observadores):
+        try:
+            fn(nombre, cargado)
+        except Exception as e:
+            logger.warning("Observador de modelos falló: %s", e)
+
+
+def cargado(nombre: str) -> bool:
+    m = _modelos.get(nombre)
+    return m is not None and m.instancia is not None
+
+
+def _cargado(m: _Modelo):
+    """Devuelve la instancia, cargándola si hace falta. Llamar con m.lock tomado."""
+    if m.instancia is None:
+        logger.info("Cargando modelo %s…", m.nombre)
+        t0 = time.perf_counter()
+        m.instancia = m.cargar()
+        m.segundos_carga = time.perf_counter() - t0
+        m.cargas += 1
+        logger.info("Modelo %s listo (%.1f s).", m.nombre, m.segundos_carga)
+        _avisar(m.nombre, True)
+    return m.instancia
+
+
+@contextmanager
+def usar(nombre: str):
+    """Presta la instancia compartida del modelo mientras dure el bloque."""
+    m = _modelos[nombre]
+    with m.lock:
+        instancia = _cargado(m)
+        m.en_uso += 1
+    try:
+        yield instancia
+    finally:
+        with m.lock:
+            m.en_uso -= 1
+            m.ultimo_uso = time.monotonic()
+
+
+def obtener(nombre: str):
+    """Carga (si hace falta) y devuelve el modelo; para precargar o usos cortos."""
+    with usar(nombre) as instancia:
+        return instancia
+
+
+def precargar(nombres_: Optional[list[str]] = None) -> threading.Thread:
+    """Carga en un hilo de fondo los modelos indicados (todos por defecto)."""
+    def _cargar_todos():
+        for nombre in nombres_ or nombres():
+            try:
+                obtener(nombre)
+            except Exception as e:
+                logger.warning("No se pudo precargar %s: %s", nombre, e)
+    hilo = threading.Thread(target=_cargar_todos, name="precargar-modelos", daemon=True)
+    hilo.start()
+    return hilo
+
+
+def liberar_inactivos(ttl: Optional[float] = None) -> list[str]:
+    """Suelta los modelos sin uso desde hace más de `ttl` segundos. Devuelve cuáles."""
+    ttl = TTL_S if ttl is None else ttl
+    ahora, liberados = time.monotonic(), []
+    for m in list(_modelos.values()):
+        with m.lock:
+            if m.instancia is None or m.en_uso or ahora - m.ultimo_uso < ttl:
+                continue
+            m.instancia = None
+            liberados.append(m.nombre)
+    for nombre in liberados:
+        _avisar(nombre, False)
+    if liberados:
+        gc.collect()
+        _devolver_memoria()
+        logger.info("Modelos liberados por inactividad: %s", ", ".join(liberados))
+    return liberados
+
+
+def _devolver_memoria():
+    """glibc se queda con la memoria liberada; malloc_trim se la regresa al sistema."""
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def iniciar_limpieza(ttl: Optional[float] = None) -> Optional[threading.Thread]:
+    """Hilo de fondo que revisa cada ttl/4 (máx. 60 s) qué modelos liberar."""
+    global _limpiador
+    ttl = TTL_S if ttl is None else ttl
+    if ttl <= 0 or _limpiador is not None:
+        return _limpiador
+
+    def _ciclo():
+        while True:
+            time.sleep(min(60.0, max(1.0, ttl / 4)))
+            try:
+                liberar_inactivos(ttl)
+            except Exception as e:
+                logger.warning("Limpieza de modelos falló: %s", e)
+
+    _limpiador = threading.Thread(target=_ciclo, name="limpiar-modelos", daemon=True)
+    _limpiador.start()
+    return _limpiador
+
+
+def estado() -> dict:
+    """Por modelo: si está cargado, cuánto tardó su última carga, cuántas veces se ha
+    cargado y hace cuánto se usó."""
+    ahora, res = time.monotonic(), {}
+    for m in list(_modelos.values()):
+        with m.lock:
+            res[m.nombre] = {
+                "cargado": m.instancia is not None,
+                "en_uso": m.en_uso,
+                "segundos_carga": round(m.segundos_carga, 2),
+                "cargas": m.cargas,
+                "inactivo_s": round(ahora - m.ultimo_uso, 1) if m.ultimo_uso else None,
+            }
+    return res
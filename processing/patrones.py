@@ -0,0 +1,260 @@
+"""Patrones de compra de la despensa (tabla patrones_despensa).
+
+Cada producto guarda estadísticas acumuladas de sus compras: cuántas van, la primera y
+la última fecha, y la suma y la suma de cuadrados de los intervalos (en días) entre
+compras consecutivas. Con eso salen la frecuencia promedio y la próxima compra
+estimada sin volver a leer el historial:
+
+    patrones.agregar_compra(conn, producto_id, "2025-03-01")   # O(1), al insertar
+    patrones.recalcular(conn, producto_id)                     # desde compras_despensa
+
+`agregar_compra` solo sirve si la compra nueva es la más reciente del producto (lo
+normal); una compra con fecha anterior a la última, una fecha editada o una compra
+borrada cambian intervalos de en medio, y ahí se recalcula completo. `verificar`
+compara lo acumulado con un recálculo desde cero.
+
+Para rehacer todos los patrones de golpe (cambió la fórmula, importación masiva),
+`reconstruir` lee compras_despensa completa en arreglos de numpy y calcula todo por
+grupos, sin un ciclo por producto:
+
+    python3 -m processing.patrones --reconstruir [--verificar] [--db ruta]
+"""
+import argparse
+import logging
+import math
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Filas por lote al leer compras_despensa en `reconstruir`, y al escribir patrones.
+LOTE = 50_000
+# Diferencia tolerada entre lo acumulado y el recálculo (sumas en días, en float).
+_TOLERANCIA = 1e-6
+
+
+class Patron(NamedTuple):
+    num_registros: int
+    primera_compra: str
+    ultima_compra: str
+    suma_intervalos: float
+    suma_cuadrados: float
+
+    @property
+    def frec_prom_dias(self) -> Optional[float]:
+        if self.num_registros < 2:
+            return None
+        return self.suma_intervalos / (self.num_registros - 1)
+
+    @property
+    def desviacion_dias(self) -> Optional[float]:
+        """Desviación estándar de los intervalos entre compras."""
+        if self.num_registros < 2:
+            return None
+        n = self.num_registros - 1
+        media = self.suma_intervalos / n
+        return math.sqrt(max(self.suma_cuadrados / n - media * media, 0.0))
+
+    @property
+    def proxima_estimada(self) -> Optional[str]:
+        frec = self.frec_prom_dias
+        if frec is None:
+            return None
+        return (_fecha(self.ultima_compra) + timedelta(days=int(frec))).isoformat()
+
+
+def _fecha(texto: str) -> date:
+    return datetime.strptime(texto, "%Y-%m-%d").date()
+
+
+def _dias(desde: str, hasta: str) -> int:
+    return (_fecha(hasta) - _fecha(desde)).days
+
+
+def desde_fechas(fechas: list[str]) -> Optional[Patron]:
+    """Patrón de una lista de fechas YYYY-MM-DD ordenadas."""
+    if not fechas:
+        return None
+    intervalos = [_dias(a, b) for a, b in zip(fechas, fechas[1:])]
+    return Patron(len(fechas), fechas[0], fechas[-1],
+                  float(sum(intervalos)), float(sum(d * d for d in intervalos)))
+
+
+def _leer(conn, producto_id: int) -> Optional[Patron]:
+    row = conn.execute(
+        """SELECT num_registros, primera_compra, ultima_compra, suma_intervalos, suma_cuadrados
+           FROM patrones_despensa WHERE producto_id = ?""", (producto_id,)
+    ).fetchone()
+    if not row or not row["num_registros"] or row["primera_compra"] is None:
+        return None
+    return Patron(*row)
+
+
+def _guardar(conn, producto_id: int, p: Patron):
+    conn.execute(
+        """INSERT INTO patrones_despensa (producto_id, frec_prom_dias, ultima_compra, proxima_estimada,
+               num_registros, primera_compra, suma_intervalos, suma_cuadrados, updated_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+           ON CONFLICT(producto_id) DO UPDATE SET frec_prom_dias=excluded.frec_prom_dias,
+           ultima_compra=excluded.ultima_compra, proxima_estimada=excluded.proxima_estimada,
+           num_registros=excluded.num_registros, primera_compra=excluded.primera_compra,
+           suma_intervalos=excluded.suma_intervalos, suma_cuadrados=excluded.suma_cuadrados,
+           updated_at=CURRENT_TIMESTAMP""",
+        (producto_id, p.frec_prom_dias, p.ultima_compra, p.proxima_estimada, p.num_registros,
+         p.primera_compra, p.suma_intervalos, p.suma_cuadrados),
+    )
+
+
+def _fechas(conn, producto_id: int) -> list[str]:
+    return [r[0] for r in conn.execute(
+        "SELECT fecha FROM compras_despensa WHERE producto_id = ? ORDER BY fecha ASC", (producto_id,))]
+
+
+def recalcular(conn, producto_id: int):
+    """Rehace el patrón del producto desde todas sus compras."""
+    patron = desde_fechas(_fechas(conn, producto_id))
+    if patron is None:
+        conn.execute("DELETE FROM patrones_despensa WHERE producto_id = ?", (producto_id,))
+    else:
+        _guardar(conn, producto_id, patron)
+
+
+def agregar_compra(conn, producto_id: int, fecha: str):
+    """Suma al patrón una compra recién insertada (llamar después del INSERT)."""
+    actual = _leer(conn, producto_id)
+    if actual is None or fecha < actual.ultima_compra:
+        # Primera compra del producto (o patrón de antes de las sumas) o compra
+        # atrasada: el intervalo nuevo cae en medio, hay que rehacerlo.
+        recalcular(conn, producto_id)
+        return
+    d = _dias(actual.ultima_compra, fecha)
+    _guardar(conn, producto_id, actual._replace(
+        num_registros=actual.num_registros + 1, ultima_compra=fecha,
+        suma_intervalos=actual.suma_intervalos + d, suma_cuadrados=actual.suma_cuadrados + d * d))
+
+
+def _difiere(a: Optional[Patron], b: Optional[Patron]) -> bool:
+    if a is None or b is None:
+        return a is not b
+    return (a.num_registros != b.num_registros or a.primera_compra != b.primera_compra
+            or a.ultima_compra != b.ultima_compra
+            or abs(a.suma_intervalos - b.suma_intervalos) > _TOLERANCIA
+            or abs(a.suma_cuadrados - b.suma_cuadrados) > _TOLERANCIA)
+
+
+def verificar(conn, producto_ids: Optional[list[int]] = None, corregir: bool = False) -> list[int]:
+    """Productos cuyo patrón guardado no coincide con un recálculo desde cero (todos si
+    no se indican). Con `corregir`, además los recalcula."""
+    if producto_ids is None:
+        producto_ids = [r[0] for r in conn.execute(
+            "SELECT producto_id FROM compras_despensa GROUP BY producto_id "
+            "UNION SELECT producto_id FROM patrones_despensa")]
+    distintos = []
+    for pid in producto_ids:
+        if _difiere(_leer(conn, pid), desde_fechas(_fechas(conn, pid))):
+            distintos.append(pid)
+            if corregir:
+                recalcular(conn, pid)
+    if distintos:
+        logger.warning("Patrones de despensa inconsistentes: %s", distintos[:20])
+    return distintos
+
+
+def _grupos(producto, dias):
+    """Patrones por producto de compras ordenadas por (producto_id, fecha): ids,
+    conteo, primer y último día, suma y suma de cuadrados de los intervalos."""
+    import numpy as np
+    inicios = np.flatnonzero(np.r_[True, producto[1:] != producto[:-1]])
+    finales = np.r_[inicios[1:], len(producto)] - 1
+    grupo = np.cumsum(np.r_[False, producto[1:] != producto[:-1]])
+    intervalos = np.diff(dias).astype(np.float64)
+    mismo = grupo[1:] == grupo[:-1]
+    n = len(inicios)
+    suma = np.bincount(grupo[1:][mismo], weights=intervalos[mismo], minlength=n)
+    cuadrados = np.bincount(grupo[1:][mismo], weights=intervalos[mismo] ** 2, minlength=n)
+    return producto[inicios], finales - inicios + 1, dias[inicios], dias[finales], suma, cuadrados
+
+
+def reconstruir(conn, lote: int = LOTE) -> int:
+    """Rehace patrones_despensa completa desde compras_despensa, vectorizado. Devuelve
+    cuántos productos tienen patrón. Corre en la transacción de `conn`."""
+    import numpy as np
+    total = conn.execute("SELECT COUNT(*) FROM compras_despensa").fetchone()[0]
+    # Días desde 1970-01-01 (julianday de una fecha a medianoche termina en .5).
+    cur = conn.cursor()
+    cur.row_factory = None   # tuplas, que numpy copia directo al arreglo
+    cur.execute(
+        """SELECT producto_id, CAST(julianday(fecha) - 2440587.5 AS INTEGER)
+           FROM compras_despensa WHERE julianday(fecha) IS NOT NULL
+           ORDER BY producto_id, fecha""")
+    filas = np.empty(total, dtype=[("producto", np.int64), ("dias", np.int64)])
+    leidas = 0
+    while bloque := cur.fetchmany(lote):
+        filas[leidas:leidas + len(bloque)] = bloque
+        leidas += len(bloque)
+    filas = filas[:leidas]
+
+    conn.execute("DELETE FROM patrones_despensa WHERE producto_id NOT IN (SELECT producto_id FROM compras_despensa)")
+    if not leidas:
+        return 0
+    ids, num, primera, ultima, suma, cuadrados = _grupos(filas["producto"], filas["dias"])
+    con_frec = num >= 2
+    frec = np.divide(suma, num - 1, out=np.zeros_like(suma), where=con_frec)
+    proxima = ultima + np.floor(frec).astype(np.int64)
+    primera, ultima, proxima = (np.datetime_as_string(d.astype("datetime64[D]"), unit="D")
+                                for d in (primera, ultima, proxima))
+
+    def _filas(desde, hasta):
+        for i in range(desde, hasta):
+            hay = bool(con_frec[i])
+            yield (int(ids[i]), float(frec[i]) if hay else None, str(ultima[i]),
+                   str(proxima[i]) if hay else None, int(num[i]), str(primera[i]),
+                   float(suma[i]), float(cuadrados[i]))
+
+    for desde in range(0, len(ids), lote):
+        conn.executemany(
+            """INSERT INTO patrones_despensa (producto_id, frec_prom_dias, ultima_compra, proxima_estimada,
+                   num_registros, primera_compra, suma_intervalos, suma_cuadrados, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+               ON CONFLICT(producto_id) DO UPDATE SET frec_prom_dias=excluded.frec_prom_dias,
+               ultima_compra=excluded.ultima_compra, proxima_estimada=excluded.proxima_estimada,
+               num_registros=excluded.num_registros, primera_compra=excluded.primera_compra,
+               suma_intervalos=excluded.suma_intervalos, suma_cuadrados=excluded.suma_cuadrados,
+               updated_at=CURRENT_TIMESTAMP""",
+            _filas(desde, min(desde + lote, len(ids))))
+    return len(ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python3 -m processing.patrones",
+                                     description="Patrones de compra de la despensa.")
+    parser.add_argument("--db", help="ruta de la DB (por defecto DATABASE_PATH o gastos.db)")
+    parser.add_argument("--reconstruir", action="store_true", help="rehacer todos los patrones")
+    parser.add_argument("--verificar", action="store_true",
+                        help="comparar lo guardado con un recálculo desde cero")
+    args = parser.parse_args()
+    if not (args.reconstruir or args.verificar):
+        parser.error("indica --reconstruir y/o --verificar")
+    if args.db:
+        os.environ["DATABASE_PATH"] = args.db
+
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
+    import db
+    db.init_db()
+    with db.get_conn() as conn:
+        if args.reconstruir:
+            t0 = time.perf_counter()
+            n = reconstruir(conn)
+            print(f"✓ {n} patrones reconstruidos en {time.perf_counter() - t0:.1f} s")
+        if args.verificar:
+            distintos = verificar(conn)
+            print(f"{'✓' if not distintos else '✗'} {len(distintos)} patrones no cuadran"
+                  + (f": {distintos[:20]}" if distintos else ""))
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    main()
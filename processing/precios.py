@@ -0,0 +1,142 @@
+"""Índice de precios de la despensa (tabla precios_productos).
+
+Por producto y tienda se acumula, con cada compra que trae precio, el precio por
+unidad: el primero y el último con sus fechas y el penúltimo, y de las compras de los
+últimos VENTANA_DIAS (contados desde la última en esa tienda) cuántas van, el mínimo
+y la suma para el promedio. Comparar tiendas o ver cuánto subió algo es leer las
+filas de (user_id, producto_id) por la llave primaria, sin recorrer compras_despensa:
+
+    precios.agregar_compra(conn, user_id, producto_id, "Costco", "2025-03-01", precio, cantidad, fuente)
+    precios.consultar(conn, user_id, producto_id)   # [Precio], una por tienda
+
+En compras_despensa el precio de un ticket ('ocr') ya es por unidad; el de una compra
+registrada a mano es lo pagado por el renglón, así que se divide entre la cantidad
+(`unitario`).
+
+La tienda se agrupa por su llave (minúsculas, sin acentos ni espacios de más): 'Soriana'
+y 'SORIANA ' son la misma; las compras sin tienda van juntas bajo la llave ''.
+
+Igual que en processing/patrones.py, `agregar_compra` solo sirve si la compra es la más
+reciente del producto en esa tienda y no deja fuera de la ventana a ninguna de las
+acumuladas; si no, o si una compra se edita o se borra, el producto se rehace desde su
+historial con `recalcular`.
+"""
+from datetime import date, timedelta
+from typing import NamedTuple, Optional
+
+from processing.catalogo import plegar
+from utils.dinero import Dinero
+
+# Días de compras (hasta la última en cada tienda) que cuentan para el mínimo y el
+# promedio. Cambiarlo pide una migración que rehaga precios_productos.
+VENTANA_DIAS = 180
+
+
+class Precio(NamedTuple):
+    tienda: Optional[str]       # como se escribió la última vez (None: sin tienda)
+    compras: int                # en la ventana, igual que minimo y suma
+    minimo: Dinero
+    suma: Dinero
+    primero: Dinero
+    primera_fecha: str
+    anterior: Optional[Dinero]  # penúltimo precio en la tienda
+    ultimo: Dinero
+    ultima_fecha: str
+
+    @property
+    def promedio(self) -> Dinero:
+        return self.suma / self.compras
+
+
+def llave_tienda(tienda: Optional[str]) -> str:
+    """'  Sam's  CLUB ' → "sam's club"; None → ''."""
+    return " ".join(plegar(tienda or "").split())
+
+
+def unitario(centavos: Optional[int], cantidad, fuente: Optional[str]) -> Optional[int]:
+    """Precio por unidad en centavos de una compra: tal cual si viene de un ticket, lo
+    pagado entre la cantidad si se registró a mano. None si no trae precio."""
+    if not centavos or centavos <= 0:
+        return None
+    if fuente == "ocr" or not cantidad or cantidad <= 0:
+        return int(centavos)
+    return int(centavos / cantidad + 0.5) or None
+
+
+def _desde(fecha: str) -> str:
+    """Primera fecha que entra en la ventana que termina en `fecha` ('' = todas)."""
+    try:
+        return (date.fromisoformat(fecha[:10]) - timedelta(days=VENTANA_DIAS)).isoformat()
+    except ValueError:
+        return ""
+
+
+_UPSERT = """
+    INSERT INTO precios_productos (user_id, producto_id, tienda, tienda_nombre, compras, min_centavos,
+        suma_centavos, ventana_desde, primero_centavos, primera_fecha, ultimo_centavos, ultima_fecha)
+    VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (user_id, producto_id, tienda) DO UPDATE SET
+        tienda_nombre = excluded.tienda_nombre, compras = compras + 1,
+        min_centavos = MIN(min_centavos, excluded.min_centavos),
+        suma_centavos = suma_centavos + excluded.suma_centavos,
+        anterior_centavos = ultimo_centavos, ultimo_centavos = excluded.ultimo_centavos,
+        ultima_fecha = excluded.ultima_fecha"""
+
+
+def agregar_compra(conn, user_id: str, producto_id: int, tienda: Optional[str], fecha: str, precio,
+                   cantidad=1, fuente: str = "manual"):
+    """Suma al índice una compra recién insertada (llamar después del INSERT) con los
+    mismos precio (Dinero o centavos), cantidad y fuente. Las compras sin precio no
+    cuentan."""
+    centavos = unitario(precio.centavos if isinstance(precio, Dinero) else precio, cantidad, fuente)
+    if centavos is None:
+        return
+    llave = llave_tienda(tienda)
+    actual = conn.execute(
+        """SELECT ultima_fecha, ventana_desde FROM precios_productos
+           WHERE user_id = ? AND producto_id = ? AND tienda = ?""",
+        (user_id, producto_id, llave)).fetchone()
+    if actual is not None and (fecha < actual[0] or actual[1] < _desde(fecha)):
+        recalcular(conn, user_id, producto_id)
+        return
+    conn.execute(_UPSERT, (user_id, producto_id, llave, tienda, centavos, centavos, fecha, centavos, fecha,
+                           centavos, fecha))
+
+
+def recalcular(conn, user_id: str, producto_id: int):
+    """Rehace las filas del producto desde compras_despensa."""
+    conn.execute("DELETE FROM precios_productos WHERE user_id = ? AND producto_id = ?", (user_id, producto_id))
+    tiendas = {}
+    for tienda, fecha, centavos, cantidad, fuente in conn.execute(
+            """SELECT tienda, fecha, precio_centavos, cantidad, fuente FROM compras_despensa
+               WHERE producto_id = ? AND user_id = ? AND precio_centavos > 0 ORDER BY fecha, id""",
+            (producto_id, user_id)):
+        centavos = unitario(centavos, cantidad, fuente)
+        if centavos is not None:
+            tiendas.setdefault(llave_tienda(tienda), []).append((tienda, fecha, centavos))
+    filas = []
+    for llave, compras in tiendas.items():
+        tienda, ultima_fecha, ultimo = compras[-1]
+        desde = _desde(ultima_fecha)
+        ventana = [(f, c) for _, f, c in compras if f >= desde]
+        filas.append((user_id, producto_id, llave, tienda, len(ventana), min(c for _, c in ventana),
+                      sum(c for _, c in ventana), ventana[0][0], compras[0][2], compras[0][1],
+                      compras[-2][2] if len(compras) > 1 else None, ultimo, ultima_fecha))
+    conn.executemany(
+        """INSERT INTO precios_productos (user_id, producto_id, tienda, tienda_nombre, compras, min_centavos,
+               suma_centavos, ventana_desde, primero_centavos, primera_fecha, anterior_centavos, ultimo_centavos,
+               ultima_fecha)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", filas)
+
+
+def consultar(conn, user_id: str, producto_id: int) -> list[Precio]:
+    """Precios del producto por tienda, del último más barato al más caro."""
+    filas = conn.execute(
+        """SELECT tienda_nombre, compras, min_centavos, suma_centavos, primero_centavos, primera_fecha,
+                  anterior_centavos, ultimo_centavos, ultima_fecha
+           FROM precios_productos WHERE user_id = ? AND producto_id = ?""", (user_id, producto_id)).fetchall()
+    precios = [Precio(r["tienda_nombre"] or None, r["compras"], Dinero(r["min_centavos"]),
+                      Dinero(r["suma_centavos"]), Dinero(r["primero_centavos"]),
+                      r["primera_fecha"], Dinero.de_db(r["anterior_centavos"]), Dinero(r["ultimo_centavos"]),
+                      r["ultima_fecha"]) for r in filas]
+    return sorted(precios, key=lambda p: (p.ultimo, p.tienda or ""))
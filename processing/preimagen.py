@@ -0,0 +1,68 @@
+"""Preprocesado de fotos antes de la visión y del OCR.
+
+Una foto de Telegram llega a 1280–2560 px en color; tal cual, infla la petición a
+Gemini (va en base64) y le da al OCR más píxeles de los que necesita. De un mismo
+original salen dos versiones:
+
+    datos, mime = preimagen.para_vision(ruta)   # JPEG/WebP chico, para el data URI
+    img = preimagen.para_ocr(ruta)              # PIL en grises, contraste fuerte
+
+Ambas se enderezan según el EXIF (las fotos del celular vienen giradas), pasan a
+escala de grises (un ticket o una captura no necesita color para leerse) y se
+reducen a un lado mayor máximo; nunca se agrandan. La de visión normaliza el
+contraste con suavidad y se recomprime; la de OCR lo estira más y se le da al
+lector en memoria, sin recomprimir (los artefactos de JPEG estorban al OCR).
+"""
+import io
+import os
+
+from PIL import Image, ImageFilter, ImageOps
+
+ACTIVO = os.getenv("IMAGEN_PREPROCESAR", "1") != "0"
+VISION_LADO = int(os.getenv("IMAGEN_VISION_LADO", "1600"))
+VISION_FORMATO = os.getenv("IMAGEN_VISION_FORMATO", "jpeg").lower()   # jpeg | webp
+VISION_CALIDAD = int(os.getenv("IMAGEN_VISION_CALIDAD", "80"))
+OCR_LADO = int(os.getenv("IMAGEN_OCR_LADO", "2000"))
+
+_MIME = {"jpeg": "image/jpeg", "webp": "image/webp"}
+
+
+def version() -> str:
+    """Lo que cambia el resultado de la extracción (entra en la llave del caché)."""
+    if not ACTIVO:
+        return "original"
+    return f"{VISION_FORMATO}{VISION_LADO}q{VISION_CALIDAD}-ocr{OCR_LADO}"
+
+
+def _abrir(origen) -> Image.Image:
+    """Ruta o bytes → imagen enderezada según el EXIF, en escala de grises."""
+    img = Image.open(origen if isinstance(origen, str) else io.BytesIO(origen))
+    img = ImageOps.exif_transpose(img)
+    if img.mode in ("RGBA", "LA", "P"):
+        # Capturas con transparencia: sobre blanco, si no el fondo queda negro.
+        img = img.convert("RGBA")
+        fondo = Image.new("RGBA", img.size, "white")
+        img = Image.alpha_composite(fondo, img)
+    return img.convert("L")
+
+
+def _reducir(img: Image.Image, lado: int) -> Image.Image:
+    if max(img.size) <= lado:
+        return img
+    escala = lado / max(img.size)
+    return img.resize((round(img.width * escala), round(img.height * escala)), Image.LANCZOS)
+
+
+def para_vision(origen) -> tuple[bytes, str]:
+    """(bytes, mime) listos para el data URI de la visión."""
+    img = ImageOps.autocontrast(_reducir(_abrir(origen), VISION_LADO), cutoff=1)
+    buf = io.BytesIO()
+    formato = VISION_FORMATO if VISION_FORMATO in _MIME else "jpeg"
+    img.save(buf, format=formato.upper(), quality=VISION_CALIDAD, optimize=True)
+    return buf.getvalue(), _MIME[formato]
+
+
+def para_ocr(origen) -> Image.Image:
+    """Imagen en grises para el OCR: contraste estirado y un poco de nitidez."""
+    img = ImageOps.autocontrast(_reducir(_abrir(origen), OCR_LADO), cutoff=2)
+    return img.filter(ImageFilter.UnsharpMask(radius=1.5, percent=80, threshold=2))
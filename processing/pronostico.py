@@ -0,0 +1,123 @@
+"""Pronóstico de cuándo se acaba cada producto de la despensa.
+
+El patrón de processing/patrones.py promedia los días entre compras; aquí se usa
+también la cantidad: si Ángel compra 2 paquetes, le duran el doble. Por producto:
+
+- Cada intervalo entre dos compras da una tasa en días por unidad: días hasta la
+  compra siguiente / unidades compradas (las compras del mismo día se suman).
+- Los intervalos raros (un viaje, un olvido) no mandan: se acotan a la mediana ±
+  3 desviaciones robustas (MAD) del producto.
+- Los intervalos recientes pesan más: el peso se reduce a la mitad cada
+  DESPENSA_VIDA_MEDIA compras hacia atrás.
+- La próxima compra es la última más (unidades de la última compra × tasa), con
+  una banda de ± DESPENSA_BANDA_Z desviaciones (ponderadas) de la tasa.
+
+Todo va en arreglos de numpy, en una sola consulta por usuario:
+
+    pronosticos = pronostico.pronosticar(conn, user_id)   # {producto_id: Pronostico}
+"""
+import os
+from typing import NamedTuple, Optional
+
+# Compras (días distintos) mínimas para pronosticar, como antes con los patrones.
+MIN_COMPRAS = 3
+VIDA_MEDIA = float(os.getenv("DESPENSA_VIDA_MEDIA", "4"))
+BANDA_Z = float(os.getenv("DESPENSA_BANDA_Z", "1.28"))   # ≈ 80 %
+# Escala mínima para acotar intervalos raros, como fracción de la mediana (si casi
+# todos los intervalos son iguales la MAD es 0 y cualquier variación sería "rara").
+_ESCALA_MIN = 0.15
+
+
+class Pronostico(NamedTuple):
+    producto_id: int
+    compras: int
+    dias_por_unidad: float
+    ultima_compra: str
+    cantidad_ultima: float
+    proxima: str
+    desde: str      # banda de confianza de la próxima compra
+    hasta: str
+
+
+def _mediana(valores, grupo, inicios, cuantos):
+    """Mediana de `valores` por grupo; `grupo` viene ordenado y cada grupo empieza en
+    `inicios` con `cuantos` elementos (todos > 0)."""
+    import numpy as np
+    ordenados = valores[np.lexsort((valores, grupo))]
+    return (ordenados[inicios + (cuantos - 1) // 2] + ordenados[inicios + cuantos // 2]) / 2
+
+
+def calcular(producto, dias, cantidad) -> dict:
+    """Pronósticos a partir de compras ordenadas por (producto, día), con un día por
+    compra (días desde 1970-01-01) y su cantidad. Devuelve arreglos por producto."""
+    import numpy as np
+    producto, dias = np.asarray(producto), np.asarray(dias, dtype=np.int64)
+    cantidad = np.asarray(cantidad, dtype=np.float64)
+    cantidad = np.where(cantidad > 0, cantidad, 1.0)
+
+    nuevo = np.r_[True, producto[1:] != producto[:-1]]
+    grupo = np.cumsum(nuevo) - 1
+    compras = np.bincount(grupo)
+    finales = np.cumsum(compras) - 1
+    # Grupos con suficientes compras; sus intervalos quedan contiguos y en orden.
+    validos = compras >= MIN_COMPRAS
+    intervalo = (grupo[1:] == grupo[:-1]) & validos[grupo[:-1]]
+    gi = grupo[:-1][intervalo]
+    tasa = np.diff(dias)[intervalo] / cantidad[:-1][intervalo]
+    ids = np.flatnonzero(validos)
+    gi = np.searchsorted(ids, gi)   # grupo → índice entre los válidos
+    n = compras[ids] - 1
+    inicios = np.cumsum(n) - n
+
+    mediana = _mediana(tasa, gi, inicios, n)
+    mad = _mediana(np.abs(tasa - mediana[gi]), gi, inicios, n)
+    escala = np.maximum(1.4826 * mad, _ESCALA_MIN * mediana)
+    tasa = np.clip(tasa, (mediana - 3 * escala)[gi], (mediana + 3 * escala)[gi])
+
+    atras = (n - 1)[gi] - (np.arange(len(tasa)) - inicios[gi])
+    peso = 0.5 ** (atras / VIDA_MEDIA)
+    suma_pesos = np.bincount(gi, weights=peso)
+    media = np.bincount(gi, weights=peso * tasa) / suma_pesos
+    desviacion = np.sqrt(np.bincount(gi, weights=peso * (tasa - media[gi]) ** 2) / suma_pesos)
+
+    ultimo = finales[ids]
+    cant = cantidad[ultimo]
+    return {
+        "producto": producto[ultimo],
+        "compras": compras[ids],
+        "dias_por_unidad": media,
+        "ultima": dias[ultimo],
+        "cantidad_ultima": cant,
+        "proxima": dias[ultimo] + np.rint(cant * media).astype(np.int64),
+        "desde": dias[ultimo] + np.rint(cant * np.maximum(media - BANDA_Z * desviacion, 0)).astype(np.int64),
+        "hasta": dias[ultimo] + np.rint(cant * (media + BANDA_Z * desviacion)).astype(np.int64),
+    }
+
+
+def pronosticar(conn, user_id: str, producto_id: Optional[int] = None) -> dict[int, Pronostico]:
+    """Pronósticos de los productos activos del usuario (o solo de uno) que tienen al
+    menos MIN_COMPRAS compras."""
+    import numpy as np
+    filtro, params = "", [user_id]
+    if producto_id is not None:
+        filtro, params = " AND p.id = ?", [user_id, producto_id]
+    cur = conn.cursor()
+    cur.row_factory = None
+    filas = cur.execute(
+        f"""SELECT p.id, CAST(julianday(cd.fecha) - 2440587.5 AS INTEGER), SUM(COALESCE(cd.cantidad, 1))
+            FROM productos p JOIN compras_despensa cd ON cd.producto_id = p.id
+            WHERE p.user_id = ? AND p.activo = 1{filtro} AND julianday(cd.fecha) IS NOT NULL
+            GROUP BY p.id, cd.fecha ORDER BY p.id, cd.fecha""", params).fetchall()
+    if not filas:
+        return {}
+    arr = np.array(filas, dtype=np.float64)
+    r = calcular(arr[:, 0].astype(np.int64), arr[:, 1], arr[:, 2])
+
+    def fecha(d):
+        return np.datetime_as_string(np.asarray(d, dtype="datetime64[D]"), unit="D")
+
+    ultima, proxima, desde, hasta = (fecha(r[k]) for k in ("ultima", "proxima", "desde", "hasta"))
+    return {int(pid): Pronostico(int(pid), int(r["compras"][i]), float(r["dias_por_unidad"][i]),
+                                 str(ultima[i]), float(r["cantidad_ultima"][i]),
+                                 str(proxima[i]), str(desde[i]), str(hasta[i]))
+            for i, pid in enumerate(r["producto"])}
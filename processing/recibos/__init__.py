@@ -0,0 +1,53 @@
+"""Lectura local de tickets de tiendas conocidas a partir del texto del OCR.
+
+Cada tienda tiene su plantilla (regex y reglas de columnas) que saca renglones,
+cantidades, precios, totales y fecha. Solo se acepta el resultado si cuadra con los
+totales impresos en el ticket; si no, o si ninguna plantilla reconoce la tienda,
+`parsear` devuelve None y la extracción sigue con el LLM.
+
+    data = recibos.parsear(texto_ocr)
+
+`data` tiene la misma forma que el JSON del LLM (ver processing.imagen), así que va
+directo a tools.imagen.registrar_ticket, que empareja los nombres con el catálogo.
+"""
+import logging
+from datetime import date
+from typing import Optional
+
+from processing.recibos.base import cuadra, pesos
+from processing.recibos.costco import Costco
+
+logger = logging.getLogger(__name__)
+
+# Súbela al cambiar una plantilla: invalida el caché de medios.
+VERSION = 2
+PLANTILLAS = [Costco()]
+UMBRAL = 0.8
+
+
+def parsear(texto: str) -> Optional[dict]:
+    """Datos del ticket si alguna plantilla lo reconoce y lo leído cuadra; si no, None."""
+    candidatas = sorted(((p.detectar(texto), p) for p in PLANTILLAS), key=lambda c: -c[0])
+    for puntaje, plantilla in candidatas:
+        if puntaje < UMBRAL:
+            break
+        leido = plantilla.leer(texto)
+        if not leido or not cuadra(leido):
+            logger.info("Plantilla %s reconoció el ticket pero no cuadra; se usa el LLM.", plantilla.nombre)
+            continue
+        return {
+            "tipo": "ticket_compra",
+            "confianza": "alta",
+            "tienda": plantilla.tienda,
+            "fecha": leido["fecha"] or date.today().isoformat(),
+            "total": pesos(leido["total"]),
+            "productos": [
+                {"nombre_ticket": r["nombre"],
+                 "precio": pesos(round(r["importe"] / r["cantidad"])),
+                 "cantidad": r["cantidad"]}
+                for r in leido["renglones"]
+            ],
+            "movimientos": [],
+            "plantilla": plantilla.nombre,
+        }
+    return None
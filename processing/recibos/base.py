@@ -0,0 +1,66 @@
+"""Piezas comunes de las plantillas de tickets: montos, fechas y la verificación
+de que lo leído cuadra con los totales impresos."""
+import re
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import Optional
+
+# 1,234.56 · 1234.56 · 1234,56 (el OCR a veces cambia el punto decimal por coma).
+MONTO = r"\d{1,3}(?:[,.]?\d{3})*[.,]\d{2}"
+_FECHA = re.compile(r"\b(\d{2})[/-](\d{2})[/-](\d{4}|\d{2})\b")
+
+
+def centavos(texto: str) -> int:
+    """'1,234.56' → 123456. El último separador es el decimal."""
+    digitos = re.sub(r"[^\d]", "", texto)
+    return int(digitos)
+
+
+def pesos(cent: Optional[int]) -> Optional[float]:
+    return None if cent is None else round(cent / 100, 2)
+
+
+def fecha(texto: str) -> Optional[str]:
+    """Primera fecha dd/mm/aaaa válida del texto, en ISO."""
+    for d, m, a in _FECHA.findall(texto):
+        anio = int(a) + (2000 if len(a) == 2 else 0)
+        try:
+            return date(anio, int(m), int(d)).isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+class Plantilla(ABC):
+    """Formato de ticket de una tienda.
+
+    `detectar` dice qué tan seguro es que el texto sea de esta tienda (0–1);
+    `leer` devuelve los renglones y totales en centavos, o None si no pudo."""
+    nombre = ""
+    tienda = ""
+
+    @abstractmethod
+    def detectar(self, texto: str) -> float:
+        ...
+
+    @abstractmethod
+    def leer(self, texto: str) -> Optional[dict]:
+        ...
+
+
+def cuadra(leido: dict, tolerancia: int = 5) -> bool:
+    """¿Lo leído es confiable? Hay renglones, un total, y la suma de los renglones
+    (con descuentos) da el subtotal o el total impreso; si el ticket imprime cuántos
+    artículos son, también debe coincidir."""
+    renglones = leido.get("renglones") or []
+    if not renglones or leido.get("total") is None:
+        return False
+    suma = sum(r["importe"] for r in renglones)
+    referencias = [v for v in (leido.get("subtotal"), leido.get("total")) if v is not None]
+    if not any(abs(suma - ref) <= tolerancia for ref in referencias):
+        return False
+    if leido.get("subtotal") is not None and leido.get("impuestos") is not None:
+        if abs(leido["subtotal"] + leido["impuestos"] - leido["total"]) > tolerancia:
+            return False
+    articulos = leido.get("articulos")
+    return articulos is None or articulos == sum(r["cantidad"] for r in renglones)
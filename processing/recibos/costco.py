@@ -0,0 +1,75 @@
+"""Ticket de Costco México.
+
+    COSTCO WHOLESALE
+    QUERETARO #557
+       E  1165432 KS LECHE DESLAC        856.26 A
+             2 @ 428.13
+          1203441 PERSIL LIQ 10L         369.54 B
+       362541 /1165432 CUPON              50.00-
+       **** SUBTOTAL                   1,175.80
+       IVA                                50.97
+       **** TOTAL                      1,226.77
+    08/09/2025 14:32
+    TOTAL DE ARTICULOS VENDIDOS = 3
+
+Cada renglón es número de artículo + descripción abreviada + importe + letra de
+impuesto; la cantidad, si es más de uno, va en el renglón siguiente ("2 @ 428.13").
+Los cupones restan del artículo cuyo número citan tras la diagonal.
+"""
+import re
+from typing import Optional
+
+from processing.recibos.base import MONTO, Plantilla, centavos, fecha
+
+_ARTICULO = re.compile(rf"^\s*(?:E\s+)?(\d{{4,7}})\s+(.+?)\s+({MONTO})\s*[A-Z]?\s*$")
+_CANTIDAD = re.compile(rf"^\s*(\d{{1,3}})\s*[@xX]\s*({MONTO})\s*$")
+_CUPON = re.compile(rf"^\s*\d{{0,7}}\s*/\s*(\d{{4,7}})\b.*?({MONTO})\s*-\s*[A-Z]?\s*$")
+_SUBTOTAL = re.compile(rf"\bSUB\s?TOTAL\s*\$?\s*({MONTO})\s*$")
+_IVA = re.compile(rf"^\W*I\.?V\.?A\.?\b.*?({MONTO})\s*$")
+_TOTAL = re.compile(rf"(?<!SUB)(?<!SUB )\bTOTAL\s*\$?\s*({MONTO})\s*$")
+_ARTICULOS = re.compile(r"TOTAL\s+DE\s+ART[IÍ1]CULOS\D*(\d+)")
+
+
+class Costco(Plantilla):
+    nombre = "costco"
+    tienda = "Costco"
+
+    def detectar(self, texto: str) -> float:
+        cabecera = texto[:400].upper()
+        if "COSTCO" in cabecera:
+            return 1.0
+        if "WHOLESALE" in cabecera:
+            return 0.8
+        return 0.0
+
+    def leer(self, texto: str) -> Optional[dict]:
+        renglones, por_codigo = [], {}
+        leido = {"renglones": renglones, "subtotal": None, "impuestos": None, "total": None,
+                 "articulos": None, "fecha": fecha(texto)}
+        for linea in texto.upper().splitlines():
+            if m := _CUPON.match(linea):
+                afectado = por_codigo.get(m[1])
+                if afectado is None:
+                    return None   # un descuento que no sabemos a qué aplicar: mejor el LLM
+                afectado["importe"] -= centavos(m[2])
+            elif m := _CANTIDAD.match(linea):
+                if not renglones:
+                    return None
+                ultimo = renglones[-1]
+                ultimo["cantidad"], ultimo["unitario"] = int(m[1]), centavos(m[2])
+                if abs(ultimo["cantidad"] * ultimo["unitario"] - ultimo["importe"]) > ultimo["cantidad"]:
+                    return None
+            elif m := _SUBTOTAL.search(linea):
+                leido["subtotal"] = centavos(m[1])
+            elif m := _IVA.match(linea):
+                leido["impuestos"] = centavos(m[1])
+            elif m := _ARTICULOS.search(linea):
+                leido["articulos"] = int(m[1])
+            elif m := _TOTAL.search(linea):
+                leido["total"] = centavos(m[1])
+            elif m := _ARTICULO.match(linea):
+                renglon = {"codigo": m[1], "nombre": m[2].strip(), "importe": centavos(m[3]),
+                           "cantidad": 1, "unitario": None}
+                renglones.append(renglon)
+                por_codigo[m[1]] = renglon
+        return leido
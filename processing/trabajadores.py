@@ -0,0 +1,312 @@
+"""Pool de procesos para el trabajo pesado de medios (Whisper, easyocr).
+
+Transcribir y hacer OCR es CPU puro y ocupa cientos de MB: dentro del proceso del
+bot peleaban el GIL y la RAM con todo lo demás. Aquí corren en procesos aparte, en
+dos pools: el de audio (MEDIOS_TRABAJADORES, por defecto 2, para que los trozos de
+una nota larga sí vayan en paralelo) y el de OCR (MEDIOS_TRABAJADORES_OCR, por
+defecto 1), así una foto no deja esperando a las notas de voz ni al revés. Cada
+trabajador carga solo los modelos de su pool; la memoria crece con el número de
+trabajadores. La comunicación es por Pipe local.
+
+    texto = trabajadores.transcribir(audio)   # bloquea el hilo del turno, no el loop
+
+Cada trabajo tiene un tope de MEDIOS_TIMEOUT_S: si el trabajador se cuelga se mata
+y se levanta otro (que vuelve a cargar los modelos que tenía). Quien necesite que un
+trabajo no ocupe al trabajador más de cierto tiempo le pasa ese `timeout` (p. ej. el
+OCR de la carrera de processing.imagen: lo que le queda a la carrera). Cada trabajador anota en memoria compartida qué modelos tiene
+cargados (`cargado("whisper")`), para que /readyz lo lea sin mandarle un trabajo. Con
+MEDIOS_TRABAJADORES=0 todo corre en el mismo proceso, como antes.
+"""
+import contextvars
+import importlib
+import logging
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import trazas
+
+logger = logging.getLogger(__name__)
+
+TRABAJADORES = int(os.getenv("MEDIOS_TRABAJADORES", "2"))
+TRABAJADORES_OCR = int(os.getenv("MEDIOS_TRABAJADORES_OCR", "1"))
+TIMEOUT_S = float(os.getenv("MEDIOS_TIMEOUT_S", "120"))
+
+# tarea -> (módulo, función) que corre DENTRO del trabajador (se le manda la ruta, no
+# el nombre: el trabajador importa la función al recibir el trabajo).
+TAREAS = {
+    "transcribir": ("processing.audio", "transcribir"),
+    "trozo": ("processing.audio", "transcribir_trozo"),
+    "ocr": ("processing.imagen", "_ocr_texto"),
+    "cargar": ("processing.modelos", "obtener"),
+    "estado": ("processing.modelos", "estado"),
+}
+# Modelos cuyo estado (cargado o no) publica cada trabajador.
+MODELOS = ("whisper", "ocr")
+# Pool en el que corre cada tarea y cada modelo; lo que no aparece va al de audio.
+CARRILES = {"ocr": "ocr", "whisper": "audio"}
+
+
+# ── Lado del trabajador ───────────────────────────────────────────────────────
+
+def _bucle(conn, cargados=None):
+    """Proceso trabajador: atiende ((módulo, función), args) por el pipe hasta recibir None.
+    `cargados` (un byte por modelo de MODELOS) refleja qué modelos tiene en memoria."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)   # el Ctrl-C lo maneja el bot
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+                        level=logging.INFO)
+    # Registran sus modelos en processing.modelos (se cargan al primer uso o "cargar").
+    from processing import audio, imagen, modelos  # noqa: F401
+    if cargados is not None:
+        def _publicar(nombre, cargado):
+            if nombre in MODELOS:
+                cargados[MODELOS.index(nombre)] = cargado
+        modelos.observar(_publicar)
+    modelos.iniciar_limpieza()
+    while True:
+        try:
+            mensaje = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if mensaje is None:
+            break
+        (modulo, funcion), args = mensaje
+        try:
+            respuesta = ("ok", getattr(importlib.import_module(modulo), funcion)(*args))
+        except Exception as e:
+            respuesta = ("error", f"{type(e).__name__}: {e}")
+        conn.send(respuesta)
+
+
+# ── Lado del bot ──────────────────────────────────────────────────────────────
+
+class TiempoAgotado(TimeoutError):
+    pass
+
+
+class _Trabajador:
+    def __init__(self, ctx, numero: int, nombre: str = "medios"):
+        self.numero = numero
+        self.conn, hijo = ctx.Pipe()
+        self.cargados = ctx.Array("b", len(MODELOS), lock=False)
+        self.proceso = ctx.Process(target=_bucle, args=(hijo, self.cargados), name=f"{nombre}-{numero}",
+                                   daemon=True)
+        self.proceso.start()
+        hijo.close()
+
+    def matar(self):
+        try:
+            self.proceso.kill()
+            self.proceso.join(5)
+        finally:
+            self.conn.close()
+
+    def cerrar(self):
+        try:
+            self.conn.send(None)
+            self.proceso.join(5)
+        except (OSError, ValueError):
+            pass
+        if self.proceso.is_alive():
+            self.matar()
+        else:
+            self.conn.close()
+
+
+class PoolMedios:
+    def __init__(self, n: int, nombre: str = "medios"):
+        self.nombre = nombre
+        self._ctx = mp.get_context("spawn")   # fork + hilos del bot = candados heredados
+        self._trabajadores = [_Trabajador(self._ctx, i, nombre) for i in range(n)]
+        self._libres = list(self._trabajadores)
+        self._cond = threading.Condition()
+        self.stats = {"trabajos": 0, "errores": 0, "tiempos_agotados": 0, "reinicios": 0}
+        logger.info("Pool %s: %d trabajador(es).", nombre, n)
+
+    def _tomar(self, numero: Optional[int] = None) -> _Trabajador:
+        """Un trabajador libre (o uno en particular: se reemplaza conservando su número)."""
+        elegible = lambda t: numero is None or t.numero == numero
+        with self._cond:
+            self._cond.wait_for(lambda: any(elegible(t) for t in self._libres))
+            t = next(t for t in self._libres if elegible(t))
+            self._libres.remove(t)
+            return t
+
+    def _devolver(self, t: _Trabajador):
+        with self._cond:
+            self._libres.append(t)
+            self._cond.notify_all()
+
+    def _contar(self, clave: str):
+        with self._cond:
+            self.stats[clave] += 1
+
+    def _reemplazar(self, t: _Trabajador) -> _Trabajador:
+        """Mata al trabajador y levanta otro con su número; el nuevo vuelve a cargar (en
+        segundo plano, en cuanto quede libre) los modelos que tenía el anterior."""
+        recargar = [m for i, m in enumerate(MODELOS) if t.cargados[i]]
+        t.matar()
+        nuevo = _Trabajador(self._ctx, t.numero, self.nombre)
+        with self._cond:
+            self._trabajadores[self._trabajadores.index(t)] = nuevo
+        self._contar("reinicios")
+        for modelo in recargar:
+            threading.Thread(target=self._recargar, args=(modelo, t.numero), daemon=True,
+                             name=f"{self.nombre}-recarga").start()
+        return nuevo
+
+    def _recargar(self, modelo: str, numero: int):
+        try:
+            self.ejecutar("cargar", modelo, timeout=max(TIMEOUT_S, 600), trabajador=numero)
+        except Exception as e:
+            logger.error("No se pudo recargar %s en el trabajador %d: %s", modelo, numero, e)
+
+    def ejecutar(self, tarea: str, *args, timeout: Optional[float] = None,
+                 trabajador: Optional[int] = None):
+        """Corre `tarea(*args)` en un trabajador libre y devuelve su resultado.
+        Lanza TiempoAgotado (y reinicia el trabajador) si pasa del tope; RuntimeError si
+        la tarea falla dentro del trabajador."""
+        timeout = TIMEOUT_S if timeout is None else timeout
+        t0 = time.perf_counter()
+        t = self._tomar(trabajador)
+        trazas.registrar("cola", "medios", time.perf_counter() - t0)
+        try:
+            with trazas.span("medios", tarea):
+                t.conn.send((TAREAS[tarea], args))
+                if not t.conn.poll(timeout):
+                    self._contar("tiempos_agotados")
+                    logger.error("Trabajador %d: '%s' pasó de %g s; se reinicia.", t.numero, tarea, timeout)
+                    t = self._reemplazar(t)
+                    raise TiempoAgotado(f"{tarea} excedió {timeout:g} s")
+                estado, valor = t.conn.recv()
+        except TiempoAgotado:
+            raise
+        except (EOFError, OSError) as e:   # el proceso murió (o el pipe se rompió)
+            logger.error("Trabajador %d murió en '%s' (%s); se reinicia.", t.numero, tarea, e)
+            t = self._reemplazar(t)
+            raise RuntimeError(f"el trabajador de medios murió en {tarea}") from e
+        finally:
+            self._devolver(t)
+        self._contar("trabajos")
+        if estado == "error":
+            self._contar("errores")
+            raise RuntimeError(valor)
+        return valor
+
+    def en_cada(self, tarea: str, *args, timeout: Optional[float] = None) -> list:
+        """Corre la tarea una vez en CADA trabajador (p. ej. precargar un modelo)."""
+        with ThreadPoolExecutor(len(self._trabajadores)) as pool:
+            return list(pool.map(lambda n: self.ejecutar(tarea, *args, timeout=timeout, trabajador=n),
+                                 range(len(self._trabajadores))))
+
+    def cargado(self, modelo: str) -> bool:
+        """Si algún trabajador tiene el modelo en memoria."""
+        i = MODELOS.index(modelo)
+        return any(t.cargados[i] for t in list(self._trabajadores))
+
+    def cerrar(self):
+        for t in list(self._trabajadores):
+            t.cerrar()
+
+
+_pools: dict[str, PoolMedios] = {}
+_pool_lock = threading.Lock()
+
+
+def _tamano(carril: str) -> int:
+    if TRABAJADORES <= 0:   # 0 = todo en el proceso del bot
+        return 0
+    return TRABAJADORES_OCR if carril == "ocr" else TRABAJADORES
+
+
+def pool(carril: str = "audio") -> Optional[PoolMedios]:
+    """El pool del carril ("audio" u "ocr"; se crea al primer uso); None si su tamaño es 0."""
+    n = _tamano(carril)
+    if n <= 0:
+        return None
+    with _pool_lock:
+        if carril not in _pools:
+            _pools[carril] = PoolMedios(n, f"medios-{carril}")
+        return _pools[carril]
+
+
+def cerrar():
+    with _pool_lock:
+        for p in _pools.values():
+            p.cerrar()
+        _pools.clear()
+
+
+def estadisticas() -> dict:
+    """Contadores de los pools sumados (en ceros si aún no arrancan o están apagados)."""
+    total = {"trabajos": 0, "errores": 0, "tiempos_agotados": 0, "reinicios": 0}
+    for p in list(_pools.values()):
+        for clave, n in p.stats.items():
+            total[clave] += n
+    return total
+
+
+def cargado(modelo: str) -> bool:
+    """Si `modelo` está en memoria en algún trabajador de su pool (o en este proceso sin
+    pool). No arranca el pool ni le manda trabajo: sirve para /readyz."""
+    carril = CARRILES.get(modelo, "audio")
+    if _tamano(carril) <= 0:
+        from processing import modelos
+        return modelos.cargado(modelo)
+    p = _pools.get(carril)
+    return p is not None and p.cargado(modelo)
+
+
+def _local(tarea: str, *args):
+    modulo, funcion = TAREAS[tarea]
+    return getattr(importlib.import_module(modulo), funcion)(*args)
+
+
+def ejecutar(tarea: str, *args, timeout: Optional[float] = None):
+    p = pool(CARRILES.get(tarea, "audio"))
+    return p.ejecutar(tarea, *args, timeout=timeout) if p else _local(tarea, *args)
+
+
+def precargar(modelo: str):
+    """Deja `modelo` cargado en todos los trabajadores de su pool (o en este proceso)."""
+    p = pool(CARRILES.get(modelo, "audio"))
+    if p:
+        p.en_cada("cargar", modelo, timeout=max(TIMEOUT_S, 600))
+    else:
+        _local("cargar", modelo)
+
+
+def transcribir(audio) -> str:
+    """Transcribe bytes o ruta; "" si falla, no hay voz o se agota el tiempo.
+
+    Con pool, el audio se decodifica y se parte en trozos de voz aquí (ffmpeg y numpy,
+    baratos), y los trozos se transcriben en paralelo, uno por trabajador libre, y se
+    vuelven a unir en orden."""
+    p = pool()
+    if p is None:
+        return _local("transcribir", audio)
+    try:
+        from processing.audio import preparar
+        trozos = preparar(audio)
+        if len(trozos) <= 1:
+            return p.ejecutar("trozo", trozos[0]) if trozos else ""
+        # Cada trozo con su copia del contexto: sus spans caen en el turno.
+        with ThreadPoolExecutor(min(len(trozos), TRABAJADORES)) as hilos:
+            futuros = [hilos.submit(contextvars.copy_context().run, p.ejecutar, "trozo", t)
+                       for t in trozos]
+            return " ".join(t for t in (f.result() for f in futuros) if t)
+    except Exception as e:
+        logger.error("Transcripción fuera de proceso falló: %s", e)
+        return ""
+
+
+def ocr_texto(imagen_path: str, timeout: Optional[float] = None) -> str:
+    """processing.imagen._ocr_texto en un trabajador (mismo contrato: 'ERROR_OCR: …')."""
+    try:
+        return ejecutar("ocr", imagen_path, timeout=timeout)
+    except Exception as e:
+        return f"ERROR_OCR: {e}"
@@ -0,0 +1,124 @@
+"""Salud del proceso: qué componentes pesados ya están calientes.
+
+Whisper, el lector de OCR y el cliente del LLM tardan en cargar la primera vez; el
+primer usuario que los necesita paga esa espera. `precalentar()` los carga en un hilo
+de fondo al arrancar el bot, y `estado()` / `listo()` alimentan /readyz (ver
+servidor.py) para que un balanceador no mande tráfico antes de tiempo.
+
+El estado de los modelos no es una bandera de una sola vez: un componente registrado
+con `cargado` (p. ej. `trabajadores.cargado("whisper")`) se lee en vivo, así cuenta
+como listo si se cargó al primer uso aunque no se precalentara, y vuelve a "frio" si
+processing.modelos lo libera por inactividad (MODELOS_TTL_S). Los que no tienen
+modelo que leer (el LLM) se marcan con `marcar()` la primera vez que responden.
+
+Con BOT_PRECALENTAR=0 el bot llama `bajo_demanda()`: los componentes fríos no frenan
+/readyz (se cargan con el primer mensaje que los necesite), pero `estado()` sigue
+mostrando cuáles están calientes.
+
+Un componente `opcional` (p. ej. easyocr, que tiene respaldo con tesseract) no frena
+la disponibilidad si falla: solo si aún se está cargando.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+FRIO, CALENTANDO, LISTO, ERROR = "frio", "calentando", "listo", "error"
+
+
+class Componente:
+    __slots__ = ("nombre", "calentar", "opcional", "cargado", "estado", "detalle", "segundos")
+
+    def __init__(self, nombre: str, calentar: Callable[[], object], opcional: bool = False,
+                 cargado: Optional[Callable[[], bool]] = None):
+        self.nombre, self.calentar, self.opcional, self.cargado = nombre, calentar, opcional, cargado
+        self.estado, self.detalle, self.segundos = FRIO, "", 0.0
+
+    def actual(self) -> str:
+        """El estado de ahora: con `cargado`, el del modelo en memoria (salvo mientras
+        se calienta o si falló y sigue sin cargar)."""
+        if self.cargado is None or self.estado == CALENTANDO:
+            return self.estado
+        try:
+            en_memoria = self.cargado()
+        except Exception:
+            en_memoria = False
+        if en_memoria:
+            return LISTO
+        return ERROR if self.estado == ERROR else FRIO
+
+    def listo(self) -> bool:
+        actual = self.actual()
+        return (actual == LISTO or (self.opcional and actual == ERROR)
+                or (_bajo_demanda and actual == FRIO))
+
+
+_componentes: dict[str, Componente] = {}
+_lock = threading.Lock()
+_bajo_demanda = False
+
+
+def registrar(nombre: str, calentar: Callable[[], object], opcional: bool = False,
+              cargado: Optional[Callable[[], bool]] = None):
+    """Da de alta un componente; `calentar()` lo deja cargado (o lanza si no se puede) y
+    `cargado()`, si se da, dice en vivo si su modelo está en memoria."""
+    with _lock:
+        _componentes[nombre] = Componente(nombre, calentar, opcional, cargado)
+
+
+def bajo_demanda():
+    """Sin precalentar: lo frío se carga al primer uso y no frena /readyz."""
+    global _bajo_demanda
+    _bajo_demanda = True
+
+
+def marcar(nombre: str):
+    """Anota como listo un componente que se calentó solo, al primer uso."""
+    with _lock:
+        c = _componentes.get(nombre)
+        if c is not None and c.estado != LISTO:
+            c.estado, c.detalle = LISTO, ""
+
+
+def calentar(nombre: str):
+    """Carga un componente (en el hilo actual) y anota el resultado."""
+    c = _componentes[nombre]
+    with _lock:
+        if c.actual() in (CALENTANDO, LISTO):
+            return
+        c.estado = CALENTANDO
+    t0 = time.perf_counter()
+    try:
+        c.calentar()
+        estado, detalle = LISTO, ""
+    except Exception as e:
+        estado, detalle = ERROR, f"{type(e).__name__}: {e}"
+        logger.warning("No se pudo precalentar %s: %s", nombre, detalle)
+    with _lock:
+        c.estado, c.detalle, c.segundos = estado, detalle, time.perf_counter() - t0
+    if estado == LISTO:
+        logger.info("🔥 %s listo (%.1f s).", nombre, c.segundos)
+
+
+def precalentar() -> threading.Thread:
+    """Calienta todos los componentes registrados en un hilo de fondo."""
+    def _todos():
+        for nombre in list(_componentes):
+            calentar(nombre)
+    hilo = threading.Thread(target=_todos, name="precalentar", daemon=True)
+    hilo.start()
+    return hilo
+
+
+def estado() -> dict:
+    with _lock:
+        return {c.nombre: {"estado": c.actual(), "opcional": c.opcional,
+                           "segundos": round(c.segundos, 2), **({"detalle": c.detalle} if c.detalle else {})}
+                for c in _componentes.values()}
+
+
+def listo() -> bool:
+    with _lock:
+        return all(c.listo() for c in _componentes.values())
@@ -9,6 +9,7 @@ import sys
 import os
 from dotenv import load_dotenv
 from db import get_conn, init_db, upsert_usuario, get_or_create_categoria
+from utils.dinero import Dinero
 
 load_dotenv()
 
@@ -52,9 +53,9 @@ def seed(user_id: str, username: str = "angel"):
                 continue
             cat_id = get_or_create_categoria(conn, categoria, "gasto")
             conn.execute(
-                '''INSERT INTO productos (user_id, categoria_id, nombre, marca, unidad, precio_ref, tienda_pref)
+                '''INSERT INTO productos (user_id, categoria_id, nombre, marca, unidad, precio_ref_centavos, tienda_pref)
                    VALUES (?, ?, ?, ?, ?, ?, ?)''',
-                (user_id, cat_id, nombre, marca, unidad, precio_ref, tienda)
+                (user_id, cat_id, nombre, marca, unidad, Dinero.opcional(precio_ref), tienda)
             )
             print(f"  ✅ {nombre} ({tienda}) ${precio_ref or '—'}")
             insertados += 1
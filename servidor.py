@@ -0,0 +1,114 @@
+"""Servidor HTTP mínimo (asyncio puro) para el modo webhook del bot.
+
+Corre dentro del mismo event loop que python-telegram-bot, así que un update entra
+a la cola de la Application sin cruzar hilos. Rutas:
+
+    POST <ruta del webhook>  update de Telegram (exige X-Telegram-Bot-Api-Secret-Token)
+    GET  /healthz            el proceso vive (siempre 200)
+    GET  /readyz             200 si Whisper, OCR y LLM están calientes; 503 si no
+    GET  /metrics            métricas Prometheus (ver trazas)
+
+Telegram solo habla HTTPS: en producción va detrás de un proxy (caddy, nginx,
+tailscale funnel) que termina TLS y reenvía a este puerto local.
+"""
+import asyncio
+import hmac
+import json
+import logging
+from typing import Awaitable, Callable
+
+import salud
+import trazas
+from processing import modelos
+
+logger = logging.getLogger(__name__)
+
+_MAX_CUERPO = 1024 * 1024    # un update de Telegram pesa unos pocos KB
+_RAZON = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+          405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error",
+          503: "Service Unavailable"}
+
+
+class ServidorWebhook:
+    def __init__(self, ruta: str, secreto: str, al_recibir: Callable[[dict], Awaitable[None]],
+                 host: str = "127.0.0.1", puerto: int = 8080):
+        self.ruta, self.host, self.puerto = ruta, host, puerto
+        self._secreto = secreto.encode()
+        self._al_recibir = al_recibir
+        self._server: asyncio.AbstractServer | None = None
+
+    async def iniciar(self):
+        self._server = await asyncio.start_server(self._atender, self.host, self.puerto)
+        # Con puerto 0 el sistema elige uno libre (tests).
+        self.puerto = self._server.sockets[0].getsockname()[1]
+        logger.info("🌐 Webhook escuchando en http://%s:%d%s", self.host, self.puerto, self.ruta)
+
+    async def cerrar(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                estado, tipo, cuerpo = await asyncio.wait_for(self._leer_y_responder(reader), 15)
+            except (ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                estado, tipo, cuerpo = 400, "text/plain", b"peticion invalida\n"
+            encabezado = (f"HTTP/1.1 {estado} {_RAZON.get(estado, '')}\r\n"
+                          f"Content-Type: {tipo}\r\nContent-Length: {len(cuerpo)}\r\n"
+                          "Connection: close\r\n\r\n")
+            writer.write(encabezado.encode() + cuerpo)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _leer_y_responder(self, reader) -> tuple[int, str, bytes]:
+        metodo, ruta, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+        encabezados = {}
+        while True:
+            linea = await reader.readline()
+            if linea in (b"\r\n", b"\n", b""):
+                break
+            clave, _, valor = linea.decode("latin-1").partition(":")
+            encabezados[clave.strip().lower()] = valor.strip()
+        largo = int(encabezados.get("content-length") or 0)
+        if largo > _MAX_CUERPO:
+            return 413, "text/plain", b"demasiado grande\n"
+        cuerpo = await reader.readexactly(largo) if largo else b""
+        return await self._ruta(metodo, ruta.split("?", 1)[0], encabezados, cuerpo)
+
+    async def _ruta(self, metodo: str, ruta: str, encabezados: dict, cuerpo: bytes):
+        if ruta == self.ruta:
+            if metodo != "POST":
+                return 405, "text/plain", b"solo POST\n"
+            return await self._update(encabezados, cuerpo)
+        if metodo != "GET":
+            return 405, "text/plain", b"solo GET\n"
+        if ruta == "/healthz":
+            return 200, "text/plain", b"ok\n"
+        if ruta == "/readyz":
+            cuerpo = json.dumps({"listo": salud.listo(), "componentes": salud.estado(),
+                                 "modelos": modelos.estado()}, ensure_ascii=False).encode()
+            return (200 if salud.listo() else 503), "application/json", cuerpo
+        if ruta == "/metrics":
+            return 200, "text/plain; version=0.0.4; charset=utf-8", trazas.exportar().encode()
+        return 404, "text/plain", b"no existe\n"
+
+    async def _update(self, encabezados: dict, cuerpo: bytes):
+        recibido = encabezados.get("x-telegram-bot-api-secret-token", "").encode()
+        if not hmac.compare_digest(recibido, self._secreto):
+            logger.warning("Webhook: secret token inválido; update descartado.")
+            return 401, "text/plain", b"no autorizado\n"
+        try:
+            update = json.loads(cuerpo)
+        except ValueError:
+            return 400, "text/plain", b"json invalido\n"
+        try:
+            await self._al_recibir(update)
+        except Exception as e:
+            # 500 hace que Telegram reintente el update más tarde.
+            logger.error("Webhook: no pude encolar el update: %s", e, exc_info=True)
+            return 500, "text/plain", b"error\n"
+        return 200, "text/plain", b"ok\n"
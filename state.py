@@ -16,8 +16,19 @@ class State(TypedDict, total=False):
     tipo: str  # "texto" | "voz" | "foto"
     # Insumos crudos según el tipo (los pone bot.py; los consumen los nodos).
     texto: Optional[str]        # texto tal cual (rama "texto")
-    audio_path: Optional[str]   # ruta del audio a transcribir (rama "voz")
+    audio: Optional[bytes]      # nota de voz descargada en memoria (rama "voz")
+    audio_path: Optional[str]   # o la ruta del audio a transcribir (chat.py)
     imagen_path: Optional[str]  # ruta de la imagen a extraer (rama "foto")
     caption: Optional[str]      # texto que acompaña a la foto, si lo hay
+    # Caché de medios (persistence/cache_medios): id estable del archivo en Telegram y,
+    # si ya se procesó antes, el resultado (entonces no se descarga ni se infiere).
+    file_unique_id: Optional[str]
+    transcripcion: Optional[str]   # rama "voz"
+    datos_imagen: Optional[dict]   # rama "foto"
+    # Álbum (media group): una entrada por foto con imagen_path / file_unique_id /
+    # datos_imagen; si viene, la rama "foto" ignora los campos sueltos de arriba.
+    imagenes: Optional[list]
     # Texto resuelto del turno para persistir en el historial (lo fija el nodo de entrada).
     texto_original: Optional[str]
+    # Intención que resolvió el atajo determinista (nodes/intencion); None = va al agente.
+    intencion: Optional[str]
@@ -0,0 +1,191 @@
+"""Test de los álbumes de fotos (media groups).
+
+Verifica la combinación de páginas (processing/album.py): traslape entre capturas
+con scroll, la misma foto dos veces, un ticket largo en dos fotos, dos tickets en un
+mismo álbum y páginas ambiguas. En el nodo: las fotos se extraen en paralelo y todo
+se registra en una sola transacción. En bot.py: las fotos con el mismo
+media_group_id se juntan en un solo turno, lo que llega después espera detrás del
+álbum, y cada foto va a una ruta temporal única que se borra al terminar.
+
+Uso:  python3 test_album.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(), "album.db")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ["ALLOWED_USER_IDS"] = "42"
+
+import db
+from context import set_user_context
+from processing import album
+
+fallos = []
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+def _mov(dia, concepto, monto):
+    return {"fecha": f"2025-10-{dia:02d}", "concepto": concepto, "monto": monto, "categoria": "General"}
+
+
+def _captura(*movs):
+    return {"tipo": "estado_cuenta", "confianza": "alta", "movimientos": list(movs)}
+
+
+P1 = _captura(_mov(14, "OXXO CANDILES", 85), _mov(13, "UBER", 120.5), _mov(13, "STARBUCKS", 79))
+P2 = _captura(_mov(13, "Starbucks", 79.0), _mov(12, "CFE", 650), _mov(12, "OXXO CANDILES", 85))
+P3 = _captura(_mov(12, "OXXO CANDILES", 85), _mov(11, "NETFLIX", 219))
+
+
+def _combinar():
+    docs = album.combinar([P1, P2, P3])
+    movs = docs[0]["movimientos"] if len(docs) == 1 else []
+    check(len(docs) == 1 and [m["concepto"] for m in movs]
+          == ["OXXO CANDILES", "UBER", "STARBUCKS", "CFE", "OXXO CANDILES", "NETFLIX"],
+          "capturas con scroll: se quita el traslape y se conservan los gastos repetidos legítimos")
+    check(len(album.combinar([P2, P1])[0]["movimientos"]) == 5, "también si las páginas llegaron al revés")
+    check(len(album.combinar([P1, P1])[0]["movimientos"]) == 3, "la misma foto dos veces cuenta una")
+
+    arriba = {"tipo": "ticket_compra", "tienda": "Costco", "total": None, "productos": [
+        {"nombre_ticket": "KS LECHE", "precio": 428.13, "cantidad": 2},
+        {"nombre_ticket": "PERSIL LIQ", "precio": 369.54, "cantidad": 1}]}
+    abajo = {"tipo": "ticket_compra", "tienda": "COSTCO", "total": 1500, "productos": [
+        {"nombre_ticket": "PERSIL LIQ", "precio": 369.54, "cantidad": 1},
+        {"nombre_ticket": "SABA ULTRA", "precio": 224.04, "cantidad": 1}]}
+    otro = {"tipo": "ticket_compra", "tienda": "Walmart", "total": 99, "productos": [
+        {"nombre_ticket": "JABON", "precio": 99, "cantidad": 1}]}
+    docs = album.combinar([arriba, abajo, otro])
+    check(len(docs) == 2 and len(docs[0]["productos"]) == 3 and docs[0]["total"] == 1500
+          and docs[1]["tienda"] == "Walmart", "ticket largo en dos fotos + otro ticket: dos tickets")
+
+    dudosa = {"tipo": "desconocido", "confianza": "baja", "movimientos": [_mov(10, "AMAZON", 300)]}
+    docs = album.combinar([P1, dudosa])
+    check(len(docs) == 1 and docs[0]["tipo"] == "estado_cuenta" and len(docs[0]["movimientos"]) == 4,
+          "una página dudosa en un álbum de capturas se toma como captura")
+    docs = album.combinar([P1, arriba, dudosa])
+    check([d["tipo"] for d in docs] == ["ticket_compra", "estado_cuenta", "desconocido"],
+          "álbum mixto: cada cosa por su lado y lo dudoso para preguntar")
+
+
+def _nodo():
+    from nodes import extraer_imagen
+    set_user_context("42", "angel")
+    paginas = {"a.jpg": P1, "b.jpg": P2, "c.jpg": P3, "rota.jpg": None}
+
+    def extraer_lento(ruta, fuid):
+        time.sleep(0.3)
+        return paginas[ruta]
+
+    extraer_imagen._extraer = extraer_lento
+    extraer_imagen.ALBUM_PARALELO = 4
+    imagenes = [{"imagen_path": r} for r in ("a.jpg", "b.jpg", "c.jpg", "rota.jpg")]
+    t0 = time.perf_counter()
+    res = extraer_imagen.extraer_imagen_node({"tipo": "foto", "imagenes": imagenes})
+    s = time.perf_counter() - t0
+    check(s < 0.55, f"4 fotos extraídas en paralelo ({s * 1000:.0f} ms)")
+    with db.get_conn() as conn:
+        n = conn.execute("SELECT COUNT(*) FROM movimientos").fetchone()[0]
+    texto = res["messages"][0].content
+    check(n == 6 and "1 no se pudieron leer" in texto and res["texto_original"] == "[álbum de 4 fotos]",
+          f"un solo registro del álbum sin repetidos ({n} gastos)")
+
+    # Un error a media inserción no deja el álbum a medias: el ticket (primer documento)
+    # se registra y la captura (segundo) falla; no debe quedar nada.
+    from tools.despensa import agregar_producto_despensa
+    agregar_producto_despensa.invoke({"nombre": "Persil"})
+    tablas = ("tickets_ocr", "compras_despensa", "movimientos")
+
+    def contar():
+        with db.get_conn() as conn:
+            return [conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in tablas]
+
+    antes = contar()
+    original = extraer_imagen.registrar_movimientos
+    extraer_imagen.registrar_movimientos = lambda *a: (_ for _ in ()).throw(RuntimeError("falla"))
+    paginas["t.jpg"] = {"tipo": "ticket_compra", "tienda": "Costco", "total": 10, "fecha": "2025-10-01",
+                        "productos": [{"nombre_ticket": "PERSIL", "precio": 10, "cantidad": 1}]}
+    paginas["d.jpg"] = _captura(_mov(1, "GASOLINA", 500))
+    try:
+        extraer_imagen.extraer_imagen_node({"tipo": "foto", "imagenes": [{"imagen_path": "d.jpg"},
+                                                                            {"imagen_path": "t.jpg"}]})
+        check(False, "el error del segundo documento llega al nodo")
+    except RuntimeError:
+        pass
+    extraer_imagen.registrar_movimientos = original
+    despues = contar()
+    check(despues == antes, "todo el álbum va en una transacción: si falla el segundo documento, "
+                            f"el ticket tampoco queda ({dict(zip(tablas, despues))})")
+
+
+async def _handlers():
+    import bot
+    bot.ALBUM_ESPERA_S = 0.3
+    turnos, rutas, en_disco = [], [], []
+
+    async def _procesar(update, context, user_id, username, extra):
+        for foto in extra.get("imagenes") or [extra]:
+            if foto.get("imagen_path"):
+                rutas.append(foto["imagen_path"])
+                en_disco.append(os.path.exists(foto["imagen_path"]))
+        turnos.append(extra)
+
+    async def get_file(file_id):
+        async def bajar(ruta):
+            with open(ruta, "wb") as f:
+                f.write(file_id.encode())
+        return SimpleNamespace(download_to_drive=bajar)
+
+    bot._procesar = _procesar
+    contexto = SimpleNamespace(bot=SimpleNamespace(get_file=get_file))
+
+    def update(foto_id=None, grupo=None, texto=None):
+        foto = [SimpleNamespace(file_id=foto_id, file_unique_id=f"U-{foto_id}")] if foto_id else None
+        return SimpleNamespace(effective_user=SimpleNamespace(id=42, username="angel", first_name="Ángel"),
+                               effective_chat=SimpleNamespace(id=42),
+                               message=SimpleNamespace(photo=foto, caption=None, text=texto,
+                                                       media_group_id=grupo, message_id=1))
+
+    tareas = []
+    for i in range(3):
+        tareas.append(asyncio.create_task(bot.handle_photo(update(f"alb-{i}", grupo="G1"), contexto)))
+        await asyncio.sleep(0.1)
+    tareas.append(asyncio.create_task(bot.handle_text(update(texto="¿cuánto llevo?"), contexto)))
+    await asyncio.gather(*tareas)
+    while bot._albumes or any(not t.done() for t in asyncio.all_tasks() if t is not asyncio.current_task()):
+        await asyncio.sleep(0.05)
+    check(len(turnos) == 2 and len(turnos[0].get("imagenes") or []) == 3 and turnos[1]["tipo"] == "texto",
+          "3 fotos del álbum = un turno, y el texto que llegó después va detrás")
+
+    await bot.handle_photo(update("suelta-1"), contexto)
+    await bot.handle_photo(update("suelta-2"), contexto)
+    check(len(set(rutas)) == len(rutas) == 5 and all(en_disco), "cada foto en su propia ruta temporal")
+    check(not any(os.path.exists(r) for r in rutas), "las rutas temporales se borran al terminar el turno")
+
+
+def main():
+    db.init_db()
+    _combinar()
+    _nodo()
+    asyncio.run(_handlers())
+    db.cerrar_conexiones()
+
+    print()
+    if fallos:
+        print(f"❌ {len(fallos)} fallo(s)")
+        sys.exit(1)
+    print("✅ Todo bien")
+
+
+if __name__ == "__main__":
+    main()
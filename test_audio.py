@@ -0,0 +1,153 @@
+"""Test de la preparación de voz (processing.audio, processing.vad).
+
+Con señales sintéticas y un Whisper falso verifica que:
+- `transcribir` acepta bytes, ruta o muestras, le entrega a Whisper float32 en
+  memoria (nunca una ruta) y no deja archivos temporales;
+- el VAD recorta los silencios, no encuentra voz en una grabación muda y parte un
+  audio largo en trozos ≤ AUDIO_TROZO_S cortados en pausas, en orden;
+- con el pool de medios los trozos se transcriben en paralelo y se unen en orden.
+Si hay ffmpeg, decodifica además una nota OGG/Opus real desde bytes.
+
+Uso:  python3 test_audio.py
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+
+import numpy as np
+
+from processing import audio, modelos, trabajadores, vad
+
+SR = audio.SAMPLE_RATE
+fallos = []
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+def _voz(segundos, hz=220.0):
+    t = np.arange(int(segundos * SR)) / SR
+    return (0.3 * np.sin(2 * np.pi * hz * t)).astype(np.float32)
+
+
+def _silencio(segundos):
+    return (np.random.default_rng(0).standard_normal(int(segundos * SR)) * 3e-4).astype(np.float32)
+
+
+class _Segmento:
+    text = "gasté cien pesos"
+
+
+class _WhisperFalso:
+    def __init__(self):
+        self.entradas = []
+
+    def transcribe(self, entrada, **kw):
+        self.entradas.append(entrada)
+        return iter([_Segmento()]), None
+
+
+def _trozo_falso(muestras):
+    """Corre en los trabajadores del pool: tarda y devuelve el largo del trozo."""
+    time.sleep(0.5)
+    return str(len(muestras))
+
+
+def _entradas():
+    falso = _WhisperFalso()
+    modelos._modelos["whisper"].cargar = lambda: falso
+    decodificados = []
+    decodificar_real = audio.decodificar
+    audio.decodificar = lambda datos: decodificados.append(bytes(datos)) or _voz(1)
+    antes = set(os.listdir(tempfile.gettempdir()))
+
+    check(audio.transcribir(b"OggS-falso") == "gasté cien pesos", "transcribe desde bytes")
+    check(decodificados == [b"OggS-falso"], "los bytes van directo al decodificador")
+    with tempfile.NamedTemporaryFile(suffix=".oga", delete=False) as tmp:
+        tmp.write(b"OggS-archivo")
+    audio.transcribir(tmp.name)
+    os.remove(tmp.name)
+    check(decodificados[-1] == b"OggS-archivo", "una ruta se lee y se decodifica igual (chat.py)")
+    audio.transcribir(_voz(2))
+    check(len(decodificados) == 2, "muestras ya decodificadas no se vuelven a decodificar")
+    check(all(isinstance(e, np.ndarray) and e.dtype == np.float32 for e in falso.entradas),
+          "Whisper recibe siempre float32 en memoria, nunca una ruta")
+    check(set(os.listdir(tempfile.gettempdir())) - antes == set(), "sin archivos temporales")
+    check(audio.transcribir(_silencio(5)) == "" and len(falso.entradas) == 3,
+          "una grabación muda no llega a Whisper")
+    audio.decodificar = decodificar_real
+
+
+def _vad():
+    nota = np.concatenate([_silencio(2), _voz(3), _silencio(1.5), _voz(2), _silencio(5)])
+    segs = vad.segmentos_voz(nota, SR)
+    voz_s = sum(fin - ini for ini, fin in segs) / SR
+    check(len(segs) == 2 and 5 <= voz_s <= 6.5,
+          f"13.5 s con 5 s de voz → {len(segs)} tramos, {voz_s:.1f} s a Whisper")
+    check(vad.segmentos_voz(_silencio(10), SR) == [], "sin voz en una grabación muda")
+
+    # 3 min "hablando": tramos de 7 s con pausas de 1 s.
+    tramos = [_voz(7, 200 + 10 * i) for i in range(22)]
+    larga = np.concatenate([x for t in tramos for x in (t, _silencio(1))])
+    trozos = vad.trozos(larga, SR, max_s=30)
+    check(all(len(t) <= 30 * SR for t in trozos) and len(trozos) >= 6,
+          f"{len(larga) / SR:.0f} s → {len(trozos)} trozos ≤ 30 s "
+          f"({', '.join(f'{len(t) / SR:.0f}' for t in trozos)} s)")
+    esperado = np.concatenate([larga[a:b] for a, b in vad.segmentos_voz(larga, SR)])
+    check(np.array_equal(np.concatenate(trozos), esperado), "los trozos conservan el orden")
+    check(len(vad.trozos(_voz(75), SR, max_s=30)) == 3, "un tramo continuo de 75 s se parte en 3")
+    return larga
+
+
+def _paralelo(larga):
+    trabajadores.TRABAJADORES = 2
+    trabajadores.TAREAS["trozo"] = ("test_audio", "_trozo_falso")
+    trabajadores.pool().en_cada("estado")   # que ya estén arriba
+    esperado = " ".join(str(len(t)) for t in audio.preparar(larga))
+    t0 = time.perf_counter()
+    texto = trabajadores.transcribir(larga)
+    dur = time.perf_counter() - t0
+    n = len(esperado.split())
+    check(texto == esperado, "el pool une los trozos en orden")
+    check(dur < 0.5 * n * 0.75, f"{n} trozos de 0.5 s en 2 trabajadores: {dur:.2f} s (serie: {0.5 * n:.1f} s)")
+    trabajadores.cerrar()
+
+
+def _ffmpeg():
+    if not shutil.which("ffmpeg"):
+        print("⚠️  Sin ffmpeg en el PATH: se omite la decodificación real.")
+        return
+    nota = subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-f", "lavfi",
+         "-i", "sine=frequency=440:sample_rate=48000", "-t", "3", "-ac", "1",
+         "-c:a", "libopus", "-f", "ogg", "pipe:1"], capture_output=True, check=True).stdout
+    muestras = audio.decodificar(nota)
+    check(muestras.dtype == np.float32 and abs(len(muestras) - 3 * SR) < 1600,
+          f"OGG/Opus de 3 s → {len(muestras)} muestras float32 a 16 kHz")
+    check(0.1 < float(np.abs(muestras).max()) <= 1.0, "muestras normalizadas en [-1, 1]")
+
+
+def main():
+    _entradas()
+    larga = _vad()
+    _paralelo(larga)
+    _ffmpeg()
+
+    print()
+    if fallos:
+        print(f"❌ {len(fallos)} fallo(s)")
+        sys.exit(1)
+    print("✅ Todo bien")
+
+
+if __name__ == "__main__":
+    main()
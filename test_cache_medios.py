@@ -0,0 +1,180 @@
+"""Test del caché de medios (persistence/cache_medios.py).
+
+Verifica las dos llaves (file_unique_id y sha256 del contenido), que una versión
+distinta (otro modelo o prompt) no acierta, el desalojo por edad y por
+tamaño (sale lo menos usado), los contadores, que sus escrituras corren en el hilo
+escritor aunque las llamen otros hilos, y que en un acierto los nodos no infieren y los handlers ni siquiera descargan el archivo.
+
+Uso:  python3 test_cache_medios.py
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(), "cache.db")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ["ALLOWED_USER_IDS"] = "42"
+
+import db
+from context import set_user_context
+from persistence import cache_medios
+
+fallos = []
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+def _llaves():
+    sha = cache_medios.huella(b"nota-1")
+    cache_medios.guardar("voz", "v1", sha, "gasté cien en tacos", "U-1")
+    check(cache_medios.buscar("voz", "v1", file_unique_id="U-1") == "gasté cien en tacos",
+          "acierta por file_unique_id")
+    check(cache_medios.buscar("voz", "v1", sha256=sha) == "gasté cien en tacos", "acierta por contenido")
+    check(cache_medios.buscar("voz", "v2", "U-1", sha) is None, "otra versión no acierta")
+    check(cache_medios.buscar("foto", "v1", "U-1", sha) is None, "otro tipo no acierta")
+    # El mismo archivo subido de nuevo: otro file_unique_id, mismo contenido.
+    check(cache_medios.buscar("voz", "v1", "U-2", sha) == "gasté cien en tacos"
+          and cache_medios.buscar("voz", "v1", "U-2") == "gasté cien en tacos",
+          "un acierto por contenido adopta el file_unique_id nuevo")
+
+    with db.get_conn() as conn:
+        conn.execute("UPDATE cache_medios SET creado = datetime('now', '-100 days')")
+    check(cache_medios.buscar("voz", "v1", "U-1") is None, "una entrada vencida ya no acierta")
+    check(cache_medios.desalojar(max_dias=90) == 1, "el desalojo por edad la borra")
+
+
+def _tamano():
+    for i in range(5):
+        cache_medios.guardar("foto", "v1", f"sha-{i}", "x" * 1000)
+    with db.get_conn() as conn:   # la 0 es la más usada recientemente
+        conn.execute("UPDATE cache_medios SET usado = datetime('now', '-1 hour') WHERE sha256 != 'sha-0'")
+    cache_medios.desalojar(max_bytes=2500)
+    with db.get_conn() as conn:
+        quedan = {r[0] for r in conn.execute("SELECT sha256 FROM cache_medios")}
+    check(quedan == {"sha-0", "sha-4"}, f"por tamaño sale lo menos usado recientemente (quedan {sorted(quedan)})")
+    est = cache_medios.estadisticas()
+    check(est["entradas"] == 2 and est["bytes"] == 2000 and est["aciertos"] == 4
+          and est["desalojados"] == 4 and 0 < est["tasa_aciertos"] < 1,
+          f"contadores ({est})")
+
+
+def _escritor():
+    hilos, original = set(), cache_medios.get_conn
+
+    def get_conn_espia():
+        hilos.add(threading.current_thread().name)
+        return original()
+
+    def turno(i):
+        cache_medios.guardar("voz", "v9", f"sha-h{i}", "hola")
+        return cache_medios.buscar("voz", "v9", sha256=f"sha-h{i}")
+
+    cache_medios.get_conn = get_conn_espia
+    try:
+        with ThreadPoolExecutor(max_workers=4, thread_name_prefix="planificador") as pool:
+            res = list(pool.map(turno, range(8)))
+    finally:
+        cache_medios.get_conn = original
+    check(res == ["hola"] * 8 and hilos and all(h.startswith("db-escritor") for h in hilos),
+          f"buscar/guardar/desalojar escriben desde el hilo escritor ({hilos})")
+
+
+def _nodos():
+    from nodes import extraer_imagen, transcribir
+    set_user_context("42", "angel")
+    inferencias = []
+    transcribir.transcribir = lambda audio: inferencias.append("whisper") or "compré leche"
+    estado = {"tipo": "voz", "audio": b"OggS-nota-leche", "file_unique_id": "V-9"}
+    primero = transcribir.transcribir_node(estado)["texto_original"]
+    segundo = transcribir.transcribir_node({**estado, "file_unique_id": "V-10"})["texto_original"]
+    check(primero == segundo == "compré leche" and inferencias == ["whisper"],
+          "la misma nota otra vez no vuelve a Whisper")
+    check(transcribir.transcribir_node({"transcripcion": "ya estaba"})["texto_original"] == "ya estaba",
+          "con la transcripción del caché el nodo no transcribe")
+
+    datos = {"tipo": "desconocido", "tienda": "Costco"}
+    extraer_imagen.extraer = lambda ruta: inferencias.append("vision") or datos
+    with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as tmp:
+        tmp.write(b"\xff\xd8 ticket")
+    for fuid in ("F-1", "F-2"):
+        extraer_imagen.extraer_imagen_node({"tipo": "foto", "imagen_path": tmp.name, "file_unique_id": fuid})
+    check(inferencias.count("vision") == 1, "el mismo ticket otra vez no vuelve a la visión")
+    with db.get_conn() as conn:
+        conn.execute("INSERT INTO usuarios (user_id) VALUES ('42') ON CONFLICT DO NOTHING")
+        conn.execute("INSERT INTO productos (user_id, nombre) VALUES ('42', 'Leche Kirkland')")
+    extraer_imagen.extraer_imagen_node({"tipo": "foto", "imagen_path": tmp.name})
+    check(inferencias.count("vision") == 1,
+          "un catálogo distinto no invalida la extracción (se empareja al registrar)")
+    os.remove(tmp.name)
+
+
+async def _handlers():
+    import bot
+    descargas, turnos = [], []
+
+    async def _procesar(update, context, user_id, username, extra):
+        turnos.append(extra)
+
+    async def get_file(file_id):
+        async def bajar(*a, **kw):
+            descargas.append(file_id)
+            return bytearray(b"OggS-nueva")
+        return SimpleNamespace(download_as_bytearray=bajar, download_to_drive=bajar)
+
+    bot._procesar = _procesar
+    contexto = SimpleNamespace(bot=SimpleNamespace(get_file=get_file))
+
+    def update(voz=None, foto=None):
+        return SimpleNamespace(effective_user=SimpleNamespace(id=42, username="angel"),
+                               message=SimpleNamespace(voice=voz, audio=None, photo=foto, caption=None,
+                                                 media_group_id=None))
+
+    await bot.handle_voice(update(voz=SimpleNamespace(file_id="f-9", file_unique_id="V-9")), contexto)
+    await bot.handle_voice(update(voz=SimpleNamespace(file_id="f-7", file_unique_id="V-7")), contexto)
+    check(descargas == ["f-7"], f"la nota ya vista no se descarga ({descargas})")
+    check(turnos[0].get("transcripcion") == "compré leche" and "audio" not in turnos[0]
+          and turnos[1].get("audio") == b"OggS-nueva", "el grafo recibe la transcripción o los bytes")
+
+    foto = [SimpleNamespace(file_id="p-1", file_unique_id="F-1")]
+    await bot.handle_photo(update(foto=foto), contexto)
+    check(descargas == ["f-7"] and turnos[-1].get("datos_imagen", {}).get("tienda") == "Costco",
+          "la foto ya extraída no se descarga aunque el catálogo cambió")
+    foto = [SimpleNamespace(file_id="p-2", file_unique_id="F-2b")]
+    await bot.handle_photo(update(foto=foto), contexto)
+    check(descargas == ["f-7", "p-2"], "una foto nueva sí se descarga")
+    cache_medios.guardar("foto", bot.imagen.version(), "sha-ticket",
+                         json.dumps({"tipo": "ticket_compra", "tienda": "Costco"}), "F-3")
+    await bot.handle_photo(update(foto=[SimpleNamespace(file_id="p-3", file_unique_id="F-3")]), contexto)
+    check("p-3" not in descargas and turnos[-1].get("datos_imagen", {}).get("tienda") == "Costco",
+          "la foto ya extraída no se descarga y el grafo recibe sus datos")
+
+
+def main():
+    db.init_db()
+    _llaves()
+    _tamano()
+    _escritor()
+    _nodos()
+    asyncio.run(_handlers())
+    db.cerrar_conexiones()
+
+    print()
+    if fallos:
+        print(f"❌ {len(fallos)} fallo(s)")
+        sys.exit(1)
+    print("✅ Todo bien")
+
+
+if __name__ == "__main__":
+    main()
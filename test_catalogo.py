@@ -0,0 +1,126 @@
+"""Test del emparejado de renglones de ticket con el catálogo (processing/catalogo.py).
+
+Verifica que los nombres abreviados de los tickets del corpus (test_data/recibos/)
+caen en el producto correcto del catálogo de seed.py, que un empate no elige a
+ciegas, que `registrar_ticket` usa el emparejador (y sigue aceptando extracciones
+viejas con nombre_catalogo), que un alias confirmado con la tool se aprende y se
+usa en el siguiente ticket, y que el prompt de la visión ya no lleva el catálogo.
+
+Uso:  python3 test_catalogo.py
+"""
+import glob
+import os
+import sys
+import tempfile
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(), "catalogo.db")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import db
+from context import set_user_context
+from processing import catalogo, imagen, recibos
+from seed import PRODUCTOS, seed
+
+fallos = []
+
+ESPERADOS = {
+    "KS LECHE DESLAC UHT": "Leche Deslactosada UHT",
+    "TENA SLIP MDN 60": "Pañales Tena Slip MDN",
+    "PERSIL LIQ 10L": "Persil Líquido",
+    "DOWNY SUAV 8.5L": "Suavizante Downy",
+    "NUTRIOLI 3X946ML": "Aceite Nutrioli",
+    "KS PAPEL HIG 36R": "Papel Higiénico",
+    "ATUN DOLORES AGUA 10P": "Atún en Agua",
+    "REXONA DEO 5PZ": "Desodorante Rexona",
+    "KS BOLSA BASURA 147L": "Bolsas de Basura",
+    "SABA ULTRA 80PZ": "Saba Ultra",
+    "PLATANO TABASCO": None,
+    "CEREAL KORNFLAKES 1KG": "Cereal Kornflakes",
+    "NESCAFE CLASICO 400G": "Nescafé Clásico",
+}
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+def _emparejador():
+    productos = [(i, nombre, marca) for i, (nombre, marca, *_resto) in enumerate(PRODUCTOS, 1)]
+    return catalogo.Emparejador(productos)
+
+
+def _corpus():
+    emparejador = _emparejador()
+    renglones = []
+    for ruta in sorted(glob.glob("test_data/recibos/*.txt")):
+        with open(ruta, encoding="utf-8") as f:
+            data = recibos.parsear(f.read())
+        renglones += [p["nombre_ticket"] for p in (data or {}).get("productos", [])]
+    aciertos = 0
+    for nombre in renglones:
+        c = emparejador.emparejar(nombre)
+        if (c.nombre if c else None) == ESPERADOS.get(nombre, "?"):
+            aciertos += 1
+        else:
+            print(f"   {nombre!r} → {c}")
+    check(renglones and aciertos == len(renglones),
+          f"corpus: {aciertos}/{len(renglones)} renglones al producto correcto")
+    check(catalogo.normalizar("Líquido  DE 10L") == catalogo.normalizar("LIQUIDO"), "acentos, vacías y medidas fuera")
+    check(emparejador.emparejar("CEREAL 1KG") is None, "un empate entre dos cereales no elige a ciegas")
+    check(emparejador.emparejar("leche deslactosada uht").via == "nombre", "el nombre exacto gana sin puntajes")
+
+
+def _registro():
+    from tools.imagen import registrar_ticket, vincular_producto_ticket
+    seed("42", "angel")
+    set_user_context("42", "angel")
+    data = recibos.parsear(open("test_data/recibos/costco_queretaro.txt", encoding="utf-8").read())
+    resumen = registrar_ticket("42", "angel", data)
+    with db.get_conn() as conn:
+        n = conn.execute("SELECT COUNT(*) FROM compras_despensa").fetchone()[0]
+    check(n == 10 and "PLATANO TABASCO" in resumen, f"registrar_ticket empareja 10 de 11 renglones ({n})")
+
+    viejo = {"tienda": "Costco", "total": 100, "fecha": "2025-01-02",
+             "productos": [{"nombre_catalogo": "Saba Ultra", "nombre_ticket": "SABA ULT", "precio": 100, "cantidad": 1}]}
+    check("Saba Ultra" in registrar_ticket("42", "angel", viejo), "extracciones viejas con nombre_catalogo siguen sirviendo")
+
+    with db.get_conn() as conn:
+        conn.execute("INSERT INTO productos (user_id, nombre) VALUES ('42', 'Plátano')")
+    respuesta = vincular_producto_ticket.invoke({"nombre_ticket": "PLATANO TABASCO", "producto": "platano"})
+    check(respuesta.startswith("✅"), f"la tool aprende el alias ({respuesta})")
+    otro = {"tienda": "Costco", "total": 50, "fecha": "2025-02-01",
+            "productos": [{"nombre_ticket": "PLATANO  TABASCO", "precio": 42.9, "cantidad": 1}]}
+    check("Plátano" in registrar_ticket("42", "angel", otro), "el siguiente ticket usa el alias")
+    with db.get_conn() as conn:
+        usos = conn.execute("SELECT usos FROM alias_productos WHERE user_id = '42'").fetchone()[0]
+    check(usos == 1, "se cuenta el uso del alias")
+    check(vincular_producto_ticket.invoke({"nombre_ticket": "X 1", "producto": "cereal"}).startswith("⚠️"),
+          "un producto ambiguo no se vincula")
+
+
+def _prompt():
+    instrucciones = imagen._instrucciones()
+    check("Catálogo" not in instrucciones and "nombre_catalogo" not in instrucciones,
+          f"el prompt de la visión ya no lleva el catálogo ({len(instrucciones)} caracteres fijos)")
+
+
+def main():
+    db.init_db()
+    _corpus()
+    _registro()
+    _prompt()
+    db.cerrar_conexiones()
+
+    print()
+    if fallos:
+        print(f"❌ {len(fallos)} fallo(s)")
+        sys.exit(1)
+    print("✅ Todo bien")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Test de la fachada asíncrona de la DB (db_async).
+
+Verifica que las escrituras del bot pasan todas por un solo hilo (también las de
+las tools, que corren en hilos del planificador), que los lectores ven lo escrito,
+y que mientras la DB trabaja el event loop sigue atendiendo.
+
+Uso:  python3 test_db_async.py
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+os.environ.setdefault("DATABASE_PATH", "/tmp/kontos_db_async.db")
+if os.path.exists(os.environ["DATABASE_PATH"]):
+    os.remove(os.environ["DATABASE_PATH"])
+
+import db
+from db_async import bd
+from persistence.historial import (
+    guardar_mensaje, guardar_mensaje_async, cargar_historial_async, continua_sesion_async,
+)
+
+fallos = []
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+def _hilo_que_escribe(user_id, i):
+    guardar_mensaje(user_id, "inbound", f"m{i}")
+    return threading.current_thread().name
+
+
+def _lectura_lenta():
+    time.sleep(0.3)
+    return True
+
+
+async def _escenario():
+    hilos = await asyncio.gather(*(bd.escribir(_hilo_que_escribe, "u1", i) for i in range(30)))
+    check(len(set(hilos)) == 1, f"30 escrituras en un solo hilo escritor ({set(hilos)})")
+
+    await asyncio.gather(*(guardar_mensaje_async("u2", "inbound", f"x{i}") for i in range(10)))
+    hist = await cargar_historial_async("u2", limite=50)
+    check(len(hist) == 10, f"lector ve las 10 escrituras ({len(hist)})")
+    check(await continua_sesion_async("u2"), "continua_sesion_async detecta la sesión activa")
+
+    # El loop sigue vivo mientras un lector tarda.
+    latidos = 0
+
+    async def latir():
+        nonlocal latidos
+        while True:
+            latidos += 1
+            await asyncio.sleep(0.01)
+
+    tarea = asyncio.create_task(latir())
+    await bd.leer(_lectura_lenta)
+    tarea.cancel()
+    check(latidos >= 10, f"el event loop no se bloqueó durante la lectura ({latidos} latidos)")
+
+
+def _tools_concurrentes():
+    """Como en un turno del grafo: varias tools que escriben a la vez desde el pool
+    del planificador. Todas deben correr en el hilo escritor."""
+    import tools.gastos
+    from context import set_user_context
+    hilos, original = set(), tools.gastos.get_conn
+
+    def get_conn_espia():
+        hilos.add(threading.current_thread().name)
+        return original()
+
+    def turno(i):
+        set_user_context(f"u{i % 4}", "test")
+        tools.gastos.registrar_gasto.invoke({"concepto": f"Super {i}", "monto": 10 + i})
+        return tools.gastos.eliminar_gasto.invoke({"id": 10_000 + i})   # no existe: solo lee y borra nada
+
+    tools.gastos.get_conn = get_conn_espia
+    try:
+        with ThreadPoolExecutor(max_workers=8, thread_name_prefix="planificador") as pool:
+            list(pool.map(turno, range(40)))
+    finally:
+        tools.gastos.get_conn = original
+    with db.get_conn() as conn:
+        n = conn.execute("SELECT COUNT(*) FROM movimientos WHERE concepto LIKE 'Super %'").fetchone()[0]
+    check(n == 40 and all(h.startswith("db-escritor") for h in hilos),
+          f"las tools escriben desde el hilo escritor aunque las llamen 8 hilos ({n} gastos, {hilos})")
+
+
+def main():
+    db.init_db()
+    _tools_concurrentes()
+    asyncio.run(_escenario())
+    bd.cerrar()
+
+    print()
+    if fallos:
+        print(f"💥 {len(fallos)} fallo(s) en db_async.")
+        sys.exit(1)
+    print("🎉 db_async OK.")
+
+
+if __name__ == "__main__":
+    main()
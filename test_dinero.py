@@ -0,0 +1,115 @@
+"""Test del tipo Dinero (utils/dinero.py).
+
+Verifica que de_pesos redondea al centavo sin arrastrar el error de los floats
+(0.1 + 0.2, 19.995, 428.13) y limpia los montos en texto; que opcional y de_db
+respetan None; que la aritmética es entera (con otro Dinero, por enteros y con sum)
+y no mezcla Dinero con pesos sueltos; que dividir entre un número da Dinero
+redondeado y entre otro Dinero una proporción; que el formato es el de siempre, y
+que sqlite3 lo guarda como sus centavos y de_db lo recupera igual.
+
+Uso:  python3 test_dinero.py
+"""
+import os
+import sqlite3
+import sys
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+
+from utils.dinero import Dinero
+
+fallos = []
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+def _de_pesos():
+    check(Dinero.de_pesos(0.1 + 0.2).centavos == 30, "0.1 + 0.2 pesos son 30 centavos, no 30.000000000000004")
+    check(Dinero.de_pesos(19.995).centavos == 2000, "19.995 redondea hacia arriba a 20.00")
+    check(Dinero.de_pesos(428.13).centavos == 42813, "428.13 no se queda en 42812")
+    check(Dinero.de_pesos(-19.995).centavos == -2000, "el redondeo de negativos es simétrico")
+    check(Dinero.de_pesos("$1,234.50").centavos == 123450, "un monto en texto se limpia ($ y comas)")
+    check(Dinero.de_pesos(7).centavos == 700, "un entero son pesos completos")
+    d = Dinero(15)
+    check(Dinero.de_pesos(d) is d, "un Dinero pasa tal cual")
+
+
+def _nulos():
+    check(Dinero.opcional(None) is None, "opcional(None) es None")
+    check(Dinero.opcional(0) == Dinero(0) and Dinero.opcional(0) is not None,
+          "opcional(0) es un Dinero en cero, no None")
+    check(Dinero.opcional("12.30") == Dinero(1230), "opcional convierte lo que no es None")
+    check(Dinero.de_db(None) is None, "de_db(None) es None")
+    check(Dinero.de_db(1999) == Dinero(1999), "de_db envuelve los centavos de la columna")
+
+
+def _aritmetica():
+    a, b = Dinero(1050), Dinero(295)
+    check(a + b == Dinero(1345) and a - b == Dinero(755), "suma y resta entre Dinero")
+    check(-b == Dinero(-295) and abs(Dinero(-295)) == b, "negación y valor absoluto")
+    check(a * 3 == Dinero(3150) and 3 * a == Dinero(3150), "multiplicar por un entero (por ambos lados)")
+    check(Dinero(333) * 1.5 == Dinero(500), "multiplicar por un float redondea al centavo")
+    check(sum([a, b, Dinero(5)]) == Dinero(1350), "sum() arranca en 0 y da Dinero")
+    check(sum([]) == 0 and Dinero(0) == 0 and not Dinero(0), "cero se compara con 0 y es falso")
+    for op in (lambda: a + 5, lambda: a - 5, lambda: 5 - a):
+        try:
+            op()
+            check(False, "Dinero no se mezcla con pesos sueltos")
+        except TypeError:
+            pass
+    check(Dinero(-1) < 0 < Dinero(1) and b < a and a >= b, "comparaciones entre Dinero y contra 0")
+    check(len({Dinero(100), Dinero(100), Dinero(200)}) == 2, "el hash va por los centavos")
+
+
+def _division():
+    check(Dinero(1000) / 3 == Dinero(333), "1000 centavos / 3 son 333 centavos")
+    check(Dinero(200) / 3 == Dinero(67), "200 centavos / 3 redondean a 67")
+    check(Dinero(1001) / 2 == Dinero(501), "la mitad de un centavo impar redondea hacia arriba")
+    check(Dinero(900) / 1.5 == Dinero(600), "dividir entre un float también da Dinero")
+    p = Dinero(300) / Dinero(1200)
+    check(isinstance(p, float) and p == 0.25, "Dinero / Dinero es una proporción (float)")
+
+
+def _formato():
+    d = Dinero(123456)
+    check(f"{d:,.2f}" == "1,234.56", "el formato con spec es el de siempre")
+    check(f"{d}" == "1,234.56" and str(d) == "1,234.56", "sin spec se formatea con ,.2f")
+    check(f"{d:.0f}" == "1235" and f"{d:>10,.2f}" == "  1,234.56", "acepta cualquier spec numérico")
+    check(f"{Dinero(-50)}" == "-0.50", "los negativos llevan su signo")
+    check(repr(Dinero(42)) == "Dinero(42)", "repr muestra los centavos")
+
+
+def _sqlite():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (monto_centavos INTEGER)")
+    conn.execute("INSERT INTO t VALUES (?)", (Dinero.de_pesos(19.995),))
+    conn.execute("INSERT INTO t VALUES (?)", (Dinero.opcional(None),))
+    filas = [r[0] for r in conn.execute("SELECT monto_centavos FROM t ORDER BY rowid")]
+    check(filas == [2000, None], f"sqlite3 guarda Dinero como sus centavos ({filas})")
+    check([Dinero.de_db(c) for c in filas] == [Dinero(2000), None], "y de_db lo recupera igual")
+    suma = conn.execute("SELECT SUM(monto_centavos) FROM t WHERE monto_centavos > ?", (Dinero(0),)).fetchone()[0]
+    check(suma == 2000, "un Dinero también sirve como parámetro de consulta")
+    conn.close()
+
+
+def main():
+    _de_pesos()
+    _nulos()
+    _aritmetica()
+    _division()
+    _formato()
+    _sqlite()
+
+    print()
+    if fallos:
+        print(f"❌ {len(fallos)} fallo(s)")
+        sys.exit(1)
+    print("✅ Todo bien")
+
+
+if __name__ == "__main__":
+    main()
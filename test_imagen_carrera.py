@@ -0,0 +1,166 @@
+"""Test de la carrera visión/OCR de processing/imagen.extraer.
+
+Con vías falsas (sleep + datos) verifica que una visión rápida gana sin arrancar el
+OCR; que una visión lenta arranca el OCR al vencer el plazo y gana el primero con
+datos; que si la visión falla el OCR arranca sin esperar el plazo; que el OCR
+abandonado no llega a llamar al modelo y, si seguía en su trabajador, termina ahí sin
+reiniciarlo (salvo que pase del tope de la carrera); que una visión cancelada no
+parsea su respuesta; que todo respeta el tope total, y los
+contadores y latencias por vía.
+
+Uso:  python3 test_imagen_carrera.py
+"""
+import os
+import sys
+import threading
+import time
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import trazas
+from processing import imagen, trabajadores
+
+fallos = []
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+llamadas = []
+
+
+def _via(nombre, segundos, data):
+    """Vía falsa: tarda `segundos` y devuelve `data`; anota si llegó a 'llamar al modelo'."""
+    def fn(imagen_path, instrucciones, cancelado, **kw):
+        llamadas.append(f"{nombre} inicia")
+        fin = time.perf_counter() + segundos
+        while time.perf_counter() < fin:
+            time.sleep(0.01)
+        if nombre == "ocr" and cancelado.is_set():
+            llamadas.append("ocr cancelado")
+            return None
+        llamadas.append(f"{nombre} termina")
+        return data
+    return fn
+
+
+def _ocr_lento(imagen_path):
+    """Tarea del trabajador de OCR que termina después de la visión."""
+    time.sleep(1)
+    return "texto"
+
+
+def _ocr_colgado(imagen_path):
+    """Tarea del trabajador de OCR que nunca termina a tiempo."""
+    time.sleep(30)
+    return "texto"
+
+
+def _eco():
+    return os.getpid()
+
+
+def _cancelaciones(via_vision, via_ocr, V):
+    """Con las vías de verdad (modelo y OCR falsos): el perdedor no llega al modelo y
+    el OCR que pierde termina en su trabajador sin reiniciarlo."""
+    class _Modelo:
+        def invoke(self, _):
+            time.sleep(0.3)
+            return type("R", (), {"content": '{"tipo": "ticket_compra"}'})()
+
+    parseadas = []
+    imagen._llm, imagen._data_uri, parsear = (lambda timeout=None: _Modelo()), (lambda ruta: ""), imagen._parsear
+    imagen._parsear = lambda raw: parseadas.append(raw) or parsear(raw)
+    cancelado = threading.Event()
+    threading.Timer(0.1, cancelado.set).start()
+    check(via_vision("ticket.jpg", "", cancelado) is None and parseadas == [],
+          "una visión cancelada a media llamada no parsea ni devuelve datos")
+
+    trabajadores.TRABAJADORES, trabajadores.TRABAJADORES_OCR = 1, 1
+    trabajadores.TAREAS.update({"ocr": ("test_imagen_carrera", "_ocr_lento"),
+                                "eco": ("test_imagen_carrera", "_eco")})
+    ocr = trabajadores.pool("ocr")
+    pid = ocr.ejecutar("eco")   # que ya esté arriba
+    imagen.VISION_PLAZO_S, imagen.LIMITE_S = 0.1, 3
+    data, s = _correr(_via("vision", 0.5, V), via_ocr)
+    t0 = time.perf_counter()
+    mismo = ocr.ejecutar("eco", timeout=10)
+    libre = time.perf_counter() - t0
+    check(data == V and mismo == pid and ocr.stats["reinicios"] == 0 and libre < 1.5,
+          f"el OCR que pierde termina en su trabajador (libre en {libre:.1f} s) y no se "
+          f"reinicia ni recarga su modelo ({ocr.stats})")
+
+    trabajadores.TAREAS["ocr"] = ("test_imagen_carrera", "_ocr_colgado")
+    imagen.LIMITE_S = 1.5
+    data, s = _correr(_via("vision", 0.5, V), via_ocr)
+    t0 = time.perf_counter()
+    nuevo = ocr.ejecutar("eco", timeout=10)
+    libre = time.perf_counter() - t0
+    check(data == V and nuevo != pid and ocr.stats["tiempos_agotados"] == 1 and libre < 5,
+          f"un OCR colgado se corta al tope de la carrera: trabajador libre en {libre:.1f} s, "
+          f"no en {trabajadores.TIMEOUT_S:g} s")
+    trabajadores.cerrar()
+
+
+def _correr(vision, ocr):
+    llamadas.clear()
+    imagen._via_vision, imagen._via_ocr = vision, ocr
+    t0 = time.perf_counter()
+    data = imagen.extraer("ticket.jpg")
+    return data, time.perf_counter() - t0
+
+
+def main():
+    via_vision, via_ocr = imagen._via_vision, imagen._via_ocr
+    imagen.VISION_PLAZO_S, imagen.LIMITE_S = 0.3, 1.5
+    imagen.PLANTILLAS_PRIMERO = False
+    V, O = {"tipo": "ticket_compra", "via": "vision"}, {"tipo": "ticket_compra", "via": "ocr"}
+
+    data, s = _correr(_via("vision", 0.05, V), _via("ocr", 0.05, O))
+    check(data == V and "ocr inicia" not in llamadas and s < 0.25,
+          f"visión rápida gana sin arrancar el OCR ({s * 1000:.0f} ms)")
+
+    data, s = _correr(_via("vision", 1.0, V), _via("ocr", 0.2, O))
+    check(data == O and 0.45 < s < 0.8, f"visión lenta: el OCR arranca al plazo y gana ({s * 1000:.0f} ms)")
+
+    data, s = _correr(_via("vision", 0.05, None), _via("ocr", 0.1, O))
+    check(data == O and s < 0.25, f"si la visión falla, el OCR arranca sin esperar el plazo ({s * 1000:.0f} ms)")
+
+    data, s = _correr(_via("vision", 0.5, V), _via("ocr", 0.6, O))
+    time.sleep(0.5)   # deja terminar al OCR abandonado
+    check(data == V and "ocr cancelado" in llamadas and "ocr termina" not in llamadas,
+          "la visión gana tarde y el OCR abandonado no llama al modelo")
+
+    data, s = _correr(_via("vision", 0.4, V), _via("ocr", 0.05, None))
+    check(data == V, "un OCR sin datos no gana: se espera a la visión")
+
+    data, s = _correr(_via("vision", 3, V), _via("ocr", 3, O))
+    check(data is None and 1.4 < s < 1.7, f"nada responde: None al tope total ({s * 1000:.0f} ms)")
+
+    imagen.VISION_PLAZO_S = 5
+    data, s = _correr(_via("vision", 3, V), _via("ocr", 0.05, O))
+    check(data is None and s < 1.7, "con el plazo más allá del tope, el tope manda")
+
+    est = imagen.estadisticas()
+    check(est == {"plantilla": 0, "vision": 3, "ocr": 2, "sin_datos": 0, "tiempos_agotados": 2, "coberturas": 5},
+          f"contadores por vía ({est})")
+    texto = trazas.exportar()
+    check('tipo="imagen",nombre="vision"' in texto and 'tipo="imagen",nombre="ocr"' in texto
+          and 'tipo="imagen",nombre="extraer"' in texto, "latencias por vía y total en /metrics")
+    check(threading.active_count() <= 6, "los hilos de la carrera se reutilizan")
+    _cancelaciones(via_vision, via_ocr, V)
+
+    print()
+    if fallos:
+        print(f"❌ {len(fallos)} fallo(s)")
+        sys.exit(1)
+    print("✅ Todo bien")
+
+
+if __name__ == "__main__":
+    main()
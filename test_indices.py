@@ -0,0 +1,157 @@
+"""Test de planes de consulta: ninguna consulta caliente debe recorrer una tabla completa.
+
+Corre las tools y funciones de persistencia de un turno típico contra una DB
+sembrada, captura cada sentencia que ejecutan (trace callback de sqlite3) y revisa
+su EXPLAIN QUERY PLAN. Si alguna hace `SCAN <tabla>` sin índice, falla: quiere
+decir que una query nueva (o un índice borrado) la dejó sin respaldo en los índices
+de migrations/versiones.py.
+
+Uso:  python3 test_indices.py
+"""
+import os
+import re
+import sys
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+os.environ.setdefault("DATABASE_PATH", "/tmp/kontos_indices.db")
+if os.path.exists(os.environ["DATABASE_PATH"]):
+    os.remove(os.environ["DATABASE_PATH"])
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import db
+from db import init_db, get_conn
+from db_async import bd
+from context import set_user_context
+from persistence.historial import guardar_mensaje, cargar_historial, continua_sesion
+from tools.gastos import registrar_gasto, listar_gastos, consultar_total
+from tools.analisis import resumen_financiero
+from tools.presupuestos import crear_presupuesto, ver_presupuestos
+from tools.fijos import registrar_gasto_fijo, listar_gastos_fijos
+from tools.despensa import (
+    agregar_producto_despensa, listar_productos_despensa, registrar_compra_despensa,
+    listar_compras_despensa, generar_lista_despensa, consultar_prediccion_despensa,
+)
+from tools.precios import comparar_precios, historial_precio
+from tools.imagen import listar_tickets
+
+USER = "3003"
+fallos = []
+# "SCAN m" a secas = recorrido completo. "SCAN m USING INDEX ..." es un recorrido del
+# índice en orden (válido para ORDER BY) y no cuenta como full scan.
+_FULL_SCAN = re.compile(r"\bSCAN (\w+)(?! USING)")
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+def _sembrar():
+    set_user_context(USER, "Indices")
+    # Otros usuarios: que el planificador vea tablas con datos que NO son del usuario.
+    with get_conn() as conn:
+        conn.executemany(
+            "INSERT INTO movimientos (user_id, fecha, concepto, monto_centavos) VALUES (?,?,?,?)",
+            [(str(u), f"2025-{m:02d}-15", "otro", 10) for u in range(50) for m in range(1, 13)],
+        )
+        conn.executemany(
+            "INSERT INTO historial_mensajes (user_id, tipo, contenido) VALUES (?,?,?)",
+            [(str(u), "inbound", "hola") for u in range(50) for _ in range(10)],
+        )
+        for tabla in ("gastos_fijos", "ingresos_fijos"):
+            conn.executemany(f"INSERT INTO {tabla} (user_id, concepto, monto_centavos) VALUES (?,?,?)",
+                             [(str(u), "otro", 100) for u in range(50)])
+        conn.executemany("INSERT INTO presupuestos (user_id, categoria_id, limite_centavos) VALUES (?,?,?)",
+                         [(str(u), 1, 100) for u in range(50)])
+        conn.executemany("INSERT INTO productos (user_id, nombre) VALUES (?,?)",
+                         [(str(u), f"Producto {i}") for u in range(50) for i in range(5)])
+        conn.executemany(
+            "INSERT INTO compras_despensa (producto_id, user_id, fecha) VALUES (?,?,?)",
+            [(pid, "otro", "2025-01-01") for pid in range(1, 251)],
+        )
+        conn.executemany("INSERT INTO patrones_despensa (producto_id, num_registros) VALUES (?,1)",
+                         [(pid,) for pid in range(1, 251)])
+        conn.executemany("INSERT INTO lista_despensa (user_id, producto_id, proxima_estimada) VALUES (?,?,?)",
+                         [(str((pid - 1) // 5), pid, None if pid % 3 else "2025-02-01") for pid in range(1, 251)])
+        conn.executemany(
+            """INSERT INTO precios_productos (user_id, producto_id, tienda, compras, min_centavos, suma_centavos,
+                   primero_centavos, primera_fecha, ultimo_centavos, ultima_fecha)
+               VALUES (?, ?, ?, 1, 100, 100, 100, '2025-01-01', 100, '2025-01-01')""",
+            [(str((pid - 1) // 5), pid, tienda) for pid in range(1, 251) for tienda in ("costco", "walmart")])
+    registrar_gasto.invoke({"concepto": "Super", "monto": 500, "categoria": "Comida"})
+    crear_presupuesto.invoke({"categoria": "Comida", "monto_limite": 3000})
+    registrar_gasto_fijo.invoke({"concepto": "Renta", "monto": 5000})
+    agregar_producto_despensa.invoke({"nombre": "Leche", "tienda": "Costco"})
+    for fecha in ("2025-01-01", "2025-01-15", "2025-02-01"):
+        registrar_compra_despensa.invoke({"producto": "Leche", "precio": 400, "tienda": "Costco", "fecha": fecha})
+    guardar_mensaje(USER, "inbound", "hola")
+    with get_conn() as conn:
+        conn.execute("ANALYZE")
+
+
+def _capturar(llamadas) -> list[str]:
+    """Ejecuta las llamadas y devuelve las sentencias SQL (con parámetros) que corrieron.
+    Corre en el hilo escritor: ahí van las tools que escriben (db_async.en_escritor), y
+    así todas usan la conexión a la que se le pone el trace."""
+    return bd.escribir_sync(_capturar_aqui, llamadas)
+
+
+def _capturar_aqui(llamadas) -> list[str]:
+    sentencias = []
+    with get_conn() as conn:
+        conn.set_trace_callback(sentencias.append)
+        try:
+            for fn in llamadas:
+                fn()
+        finally:
+            conn.set_trace_callback(None)
+    return [s for s in sentencias if re.match(r"\s*(SELECT|UPDATE|DELETE|WITH)", s, re.I)]
+
+
+def main():
+    init_db()
+    _sembrar()
+
+    casos = {
+        "listar_gastos": lambda: listar_gastos.invoke({}),
+        "consultar_total": lambda: consultar_total.invoke({}),
+        "resumen_financiero": lambda: resumen_financiero.invoke({}),
+        "ver_presupuestos": lambda: ver_presupuestos.invoke({}),
+        "listar_gastos_fijos": lambda: listar_gastos_fijos.invoke({}),
+        "cargar_historial": lambda: cargar_historial(USER),
+        "continua_sesion": lambda: continua_sesion(USER),
+        "listar_productos_despensa": lambda: listar_productos_despensa.invoke({}),
+        "registrar_compra_despensa (+patrones/precios.agregar_compra)":
+            lambda: registrar_compra_despensa.invoke({"producto": "Leche", "precio": 410, "tienda": "Costco"}),
+        "listar_compras_despensa": lambda: listar_compras_despensa.invoke({}),
+        "generar_lista_despensa": lambda: generar_lista_despensa.invoke({}),
+        "consultar_prediccion_despensa": lambda: consultar_prediccion_despensa.invoke({"producto": "Leche"}),
+        "comparar_precios": lambda: comparar_precios.invoke({"producto": "Leche"}),
+        "historial_precio": lambda: historial_precio.invoke({"producto": "Leche"}),
+        "listar_tickets": lambda: listar_tickets.invoke({}),
+    }
+    for nombre, fn in casos.items():
+        sentencias = _capturar([fn])
+        scans = []
+        with get_conn() as conn:
+            for sql in sentencias:
+                plan = " | ".join(r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql))
+                scans += [f"{t}: {sql.strip()[:80]}" for t in _FULL_SCAN.findall(plan)]
+        check(sentencias and not scans,
+              f"{nombre}: {len(sentencias)} consulta(s) sin full scan" if not scans
+              else f"{nombre}: full scan en {scans}")
+
+    print()
+    db.cerrar_conexiones()
+    if fallos:
+        print(f"💥 {len(fallos)} consulta(s) sin índice.")
+        sys.exit(1)
+    print("🎉 Índices OK: todas las consultas calientes usan índice.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Test del atajo determinista (nodes/intencion).
+
+Verifica que los mensajes de fórmula se reconocen con los argumentos correctos,
+que lo dudoso (fechas, categorías desconocidas, frases libres) se deja al agente,
+y que el nodo registra de verdad, avisa del presupuesto y cuenta la tasa de aciertos.
+
+Uso:  python3 test_intencion.py
+"""
+import os
+import sys
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+os.environ.setdefault("DATABASE_PATH", "/tmp/kontos_intencion.db")
+if os.path.exists(os.environ["DATABASE_PATH"]):
+    os.remove(os.environ["DATABASE_PATH"])
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+import db
+from context import set_user_context, set_imagen_pendiente
+from nodes import intencion
+from nodes.intencion import intencion_node, reconocer, route_intencion
+from tools.presupuestos import crear_presupuesto
+
+fallos = []
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+ACIERTOS = {
+    "Gasté $385 en Soriana": "registrar_gasto",
+    "gaste 1,250.50 en gasolina": "registrar_gasto",
+    "Pagué de luz 620 pesos": "registrar_gasto",
+    "pague $199 de Netflix.": "registrar_gasto",
+    "Ver despensa": "listar_productos_despensa",
+    "mi despensa": "listar_productos_despensa",
+    "¿Mis presupuestos?": "ver_presupuestos",
+    "Lista de despensa": "generar_lista_despensa",
+    "qué necesito comprar": "generar_lista_despensa",
+}
+AL_AGENTE = [
+    "Gasté $385 en Soriana ayer",            # fecha
+    "gasté 300 en regalo para mi mamá",      # categoría que no conoce
+    "gasté 200 en uber y 150 en tacos",      # dos gastos
+    "Compré leche Kirkland $428",            # compra de despensa, no gasto
+    "cómo voy",                              # pide análisis
+    "qué onda, cómo estás",
+    "Crear presupuesto comida $3000",
+]
+
+
+def main():
+    for texto, esperado in ACIERTOS.items():
+        r = reconocer(texto)
+        check(r is not None and r[0] == esperado, f"«{texto}» → {esperado}")
+    for texto in AL_AGENTE:
+        check(reconocer(texto) is None, f"«{texto}» → agente")
+
+    db.init_db()
+    set_user_context("u_int", "tester")
+    crear_presupuesto.invoke({"categoria": "Comida", "monto_limite": 400})
+
+    salida = intencion_node({"messages": [HumanMessage(content="Gasté $385.50 en Soriana")]})
+    texto = salida["messages"][0].content
+    check(salida.get("intencion") == "registrar_gasto" and route_intencion(salida) == "fin",
+          "el atajo termina el turno sin agente")
+    check("Soriana $385.50 [Comida]" in texto, f"registra concepto, monto y categoría ({texto[:50]}…)")
+    check("96%" in texto and "\n///\n" in texto, "avisa en otra tanda que va al 96% del presupuesto")
+    with db.get_conn() as conn:
+        n = conn.execute("SELECT monto_centavos FROM movimientos WHERE user_id='u_int'").fetchall()
+    check([r[0] for r in n] == [38550], "el movimiento queda en la DB en centavos")
+
+    salida = intencion_node({"messages": [HumanMessage(content="cómo voy este mes")]})
+    check(salida == {} and route_intencion(salida) == "agente", "sin acierto el turno va al agente")
+    salida = intencion_node({"messages": [AIMessage(content="[foto procesada]")]})
+    check(salida == {}, "no actúa si el último mensaje no es del usuario")
+    set_imagen_pendiente(True)
+    salida = intencion_node({"messages": [HumanMessage(content="ver despensa")]})
+    check(salida == {}, "con foto pendiente de aclarar, todo va al agente")
+    set_imagen_pendiente(False)
+
+    est = intencion.estadisticas()
+    check(est["evaluados"] == 2 and est["aciertos"] == 1 and est["tasa"] == 0.5,
+          f"estadísticas de aciertos ({est})")
+    db.cerrar_conexiones()
+
+    print()
+    if fallos:
+        print(f"💥 {len(fallos)} fallo(s) en el atajo de intenciones.")
+        sys.exit(1)
+    print("🎉 Atajo de intenciones OK.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Test de la lista de despensa precalculada (processing/lista_despensa.py).
+
+Verifica que generar_lista_despensa, ya calculada la lista del día, solo lee la
+tabla lista_despensa (sin tocar el historial de compras) y que lo que toca sale por
+rango del índice de proxima_estimada; que registrar o borrar una compra y agregar o
+quitar un producto actualizan su renglón al momento; que al cambiar de día se
+recalcula; y que el trabajo diario del bot manda el recordatorio una sola vez por
+producto.
+
+Uso:  python3 test_lista_despensa.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(), "lista.db")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ["ALLOWED_USER_IDS"] = "42"
+
+import db
+from context import set_user_context
+from processing import lista_despensa
+
+USER = "42"
+HOY = date.today()
+fallos = []
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+def _hace(dias: int) -> str:
+    return (HOY - timedelta(days=dias)).isoformat()
+
+
+def _sentencias(fn) -> tuple:
+    sentencias = []
+    with db.get_conn() as conn:
+        conn.set_trace_callback(sentencias.append)
+        try:
+            resultado = fn()
+        finally:
+            conn.set_trace_callback(None)
+    return resultado, sentencias
+
+
+def _renglon(nombre: str):
+    with db.get_conn() as conn:
+        return conn.execute("""SELECT l.* FROM lista_despensa l JOIN productos p ON p.id = l.producto_id
+                               WHERE p.nombre = ?""", (nombre,)).fetchone()
+
+
+def _tools():
+    from tools.despensa import (agregar_producto_despensa, eliminar_compra_despensa,
+                                generar_lista_despensa, quitar_producto_despensa,
+                                registrar_compra_despensa)
+    set_user_context(USER, "angel")
+    for nombre in ("Leche", "Café", "Atún", "Jabón"):
+        agregar_producto_despensa.invoke({"nombre": nombre})
+    check(_renglon("Atún") is not None and _renglon("Atún")["proxima_estimada"] is None,
+          "un producto nuevo entra a la lista sin patrón")
+    for d in (30, 20, 10):
+        registrar_compra_despensa.invoke({"producto": "Leche", "fecha": _hace(d)})
+    for d in (60, 35, 10):
+        registrar_compra_despensa.invoke({"producto": "Café", "fecha": _hace(d)})
+    check(_renglon("Leche")["proxima_estimada"] == HOY.isoformat(),
+          "registrar una compra actualiza el renglón del producto al momento")
+
+    generar_lista_despensa.invoke({})
+    lista, sentencias = _sentencias(lambda: generar_lista_despensa.invoke({}))
+    check(not any("compras_despensa" in s for s in sentencias) and not any(
+          s.lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE")) for s in sentencias),
+          f"pedir la lista ya calculada es solo leer ({len(sentencias)} sentencias)")
+    ahora, despues = lista.split("Próximamente")
+    check("Leche" in ahora and "Café" in despues and "• Atún (0 registros)" in lista,
+          "cubetas: toca, pronto y sin patrón")
+    with db.get_conn() as conn:
+        plan = " ".join(r[3] for r in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT producto_id FROM lista_despensa WHERE user_id = ? AND proxima_estimada <= ?",
+            (USER, HOY.isoformat())))
+    check("idx_lista_despensa_proxima" in plan, f"lo que toca sale por rango del índice ({plan})")
+
+    registrar_compra_despensa.invoke({"producto": "Leche", "fecha": HOY.isoformat()})
+    check(_renglon("Leche")["proxima_estimada"] == (HOY + timedelta(days=10)).isoformat(),
+          "tras comprar, la leche deja de tocar hoy")
+    with db.get_conn() as conn:
+        ultima = conn.execute("SELECT MAX(id) FROM compras_despensa").fetchone()[0]
+    eliminar_compra_despensa.invoke({"id": ultima})
+    check(_renglon("Leche")["proxima_estimada"] == HOY.isoformat(), "y borrar esa compra lo regresa")
+    with db.get_conn() as conn:
+        jabon = conn.execute("SELECT id FROM productos WHERE nombre = 'Jabón'").fetchone()[0]
+    quitar_producto_despensa.invoke({"id": jabon})
+    check(_renglon("Jabón") is None, "un producto quitado sale de la lista")
+
+    manana = HOY + timedelta(days=1)
+    with db.get_conn() as conn:
+        check(lista_despensa.vigente(conn, USER) and not lista_despensa.vigente(conn, USER, manana),
+              "la lista vale por el día")
+        _, sentencias = _sentencias(lambda: lista_despensa.leer(conn, USER, manana))
+    check(any("compras_despensa" in s for s in sentencias), "al día siguiente se recalcula al leerla")
+
+
+async def _trabajo_diario():
+    import bot
+    bot.DESPENSA_RECORDATORIOS = True
+    enviados = []
+
+    async def send_message(chat_id, texto):
+        enviados.append((chat_id, texto))
+
+    contexto = SimpleNamespace(bot=SimpleNamespace(send_message=send_message))
+    await bot._despensa_diaria(contexto)
+    check(len(enviados) == 1 and enviados[0][0] == 42 and "Leche" in enviados[0][1]
+          and "Café" not in enviados[0][1], "el trabajo diario avisa lo que ya toca")
+    await bot._despensa_diaria(contexto)
+    check(len(enviados) == 1, "y no repite el aviso del mismo producto")
+    bot.bd.cerrar()
+
+
+def main():
+    db.init_db()
+    _tools()
+    asyncio.run(_trabajo_diario())
+    db.cerrar_conexiones()
+
+    print()
+    if fallos:
+        print(f"❌ {len(fallos)} fallo(s)")
+        sys.exit(1)
+    print("✅ Todo bien")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Test del motor de migraciones y de la reconstrucción de tablas en línea.
+
+Verifica que una DB nueva llega a la última versión, que volver a migrar no hace
+nada, que una DB vieja (tablas creadas sin user_version) se adopta sin perder datos,
+y que reconstruir_tabla conserva las escrituras que ocurren entre lotes.
+
+Uso:  python3 test_migraciones.py
+"""
+import os
+import sys
+import tempfile
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+os.environ.setdefault("DATABASE_PATH", "/tmp/kontos_migraciones.db")
+if os.path.exists(os.environ["DATABASE_PATH"]):
+    os.remove(os.environ["DATABASE_PATH"])
+
+import db
+from migrations import migrar, reconstruir_tabla, version_actual, _abrir
+from migrations.versiones import MIGRACIONES
+
+fallos = []
+ULTIMA = MIGRACIONES[-1].numero
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+def main():
+    # ── DB nueva ─────────────────────────────────────────────────────────────
+    check(migrar() == ULTIMA, f"DB nueva migra hasta la versión {ULTIMA}")
+    check(migrar() == ULTIMA, "volver a migrar no hace nada")
+    with db.get_conn() as conn:
+        tablas = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    check({"movimientos", "historial_mensajes", "patrones_despensa"} <= tablas, "tablas creadas")
+
+    # ── DB vieja: tablas del init_db original, user_version = 0 ─────────────
+    vieja = os.path.join(tempfile.mkdtemp(), "vieja.db")
+    conn = _abrir(vieja)
+    MIGRACIONES[0].aplicar(conn)
+    conn.execute("INSERT INTO usuarios (user_id) VALUES ('7')")
+    conn.execute("INSERT INTO movimientos (user_id, fecha, concepto, monto) VALUES ('7', '2025-01-01', 'x', 428.13)")
+    conn.execute("INSERT INTO compras_despensa (producto_id, user_id, fecha, precio) VALUES (1, '7', '2025-01-01', NULL)")
+    check(version_actual(conn) == 0, "DB vieja arranca en versión 0")
+    conn.close()
+    check(migrar(vieja) == ULTIMA, "DB vieja se adopta y migra")
+    conn = _abrir(vieja)
+    check(conn.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0] == 1, "sin perder sus datos")
+    check(conn.execute("SELECT monto_centavos FROM movimientos").fetchone()[0] == 42813,
+          "montos REAL pasan a centavos enteros (428.13 → 42813)")
+    check(conn.execute("SELECT precio_centavos FROM compras_despensa").fetchone()[0] is None,
+          "precios NULL siguen en NULL")
+    conn.close()
+
+    # ── Reconstrucción en línea con escrituras entre lotes ──────────────────
+    conn = _abrir(os.path.join(tempfile.mkdtemp(), "rebuild.db"))
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY AUTOINCREMENT, monto REAL)")
+    conn.executemany("INSERT INTO t (monto) VALUES (?)", [(i + 0.5,) for i in range(1000)])
+    otra = _abrir(conn.execute("PRAGMA database_list").fetchone()[2])
+    lotes = {"n": 0}
+
+    def _pausa_con_escrituras(_):
+        # Simula al bot escribiendo mientras la migración copia.
+        lotes["n"] += 1
+        if lotes["n"] == 2:
+            otra.execute("INSERT INTO t (monto) VALUES (9999.5)")
+            otra.execute("UPDATE t SET monto = 1.25 WHERE id = 1")
+            otra.execute("DELETE FROM t WHERE id = 900")
+
+    original_sleep = __import__("time").sleep
+    import migrations
+    migrations.time.sleep = _pausa_con_escrituras
+    try:
+        reconstruir_tabla(
+            conn, "t",
+            "CREATE TABLE {tabla} (id INTEGER PRIMARY KEY AUTOINCREMENT, monto_centavos INTEGER NOT NULL)",
+            {"id": "id", "monto_centavos": "CAST(ROUND(monto * 100) AS INTEGER)"},
+            indices={"idx_t_monto": "(monto_centavos)"}, lote=300, pausa=0.001,
+            al_terminar=lambda c: c.execute("PRAGMA user_version = 42"),
+        )
+    finally:
+        migrations.time.sleep = original_sleep
+    filas = dict(conn.execute("SELECT id, monto_centavos FROM t").fetchall())
+    check(len(filas) == 1000, "misma cantidad de filas (1000 + 1 insert - 1 delete)")
+    check(filas.get(1) == 125, "un UPDATE concurrente quedó reflejado")
+    check(900 not in filas, "un DELETE concurrente quedó reflejado")
+    check(filas.get(1001) == 999950, "un INSERT concurrente quedó reflejado")
+    check(version_actual(conn) == 42, "al_terminar corre en la transacción del swap")
+    idx = conn.execute("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='t'").fetchall()
+    check([r[0] for r in idx] == ["idx_t_monto"], "índices recreados sobre la tabla nueva")
+    trig = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='trigger'").fetchone()[0]
+    check(trig == 0, "sin triggers de sincronización residuales")
+    otra.close()
+    conn.close()
+
+    print()
+    db.cerrar_conexiones()
+    if fallos:
+        print(f"💥 {len(fallos)} fallo(s) en migraciones.")
+        sys.exit(1)
+    print("🎉 Migraciones OK.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Test del administrador de modelos (processing.modelos).
+
+Usa cargadores falsos (lentos, que cuentan cuántas veces cargan) para verificar que
+varios hilos comparten una sola instancia, que la precarga corre en segundo plano,
+que se reporta el tiempo de carga y que la liberación por inactividad respeta los
+modelos en uso y los vuelve a cargar al pedirlos.
+
+Uso:  python3 test_modelos.py
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+
+from processing import modelos
+
+fallos = []
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+cargas = {"lento": 0}
+
+
+def _cargar_lento():
+    cargas["lento"] += 1
+    time.sleep(0.2)
+    return object()
+
+
+def main():
+    modelos.registrar("lento", _cargar_lento)
+    avisos = []
+    modelos.observar(lambda nombre, cargado: avisos.append((nombre, cargado)))
+
+    hilo = modelos.precargar(["lento"])
+    check(hilo.is_alive(), "la precarga no bloquea al que arranca")
+    with ThreadPoolExecutor(8) as pool:
+        instancias = list(pool.map(lambda _: modelos.obtener("lento"), range(8)))
+    hilo.join()
+    check(cargas["lento"] == 1 and len({id(i) for i in instancias}) == 1,
+          f"8 hilos + precarga comparten una instancia ({cargas['lento']} carga)")
+    est = modelos.estado()["lento"]
+    check(est["cargado"] and est["segundos_carga"] >= 0.2, f"reporta carga y su duración ({est})")
+
+    # En uso: el limpiador no lo toca aunque el TTL ya venció.
+    dentro, soltar = threading.Event(), threading.Event()
+
+    def usarlo():
+        with modelos.usar("lento"):
+            dentro.set()
+            soltar.wait()
+
+    t = threading.Thread(target=usarlo)
+    t.start()
+    dentro.wait()
+    check(modelos.liberar_inactivos(ttl=0) == [], "no libera un modelo en uso")
+    soltar.set()
+    t.join()
+
+    time.sleep(0.05)
+    check(modelos.liberar_inactivos(ttl=10) == [], "no libera antes del TTL")
+    check(modelos.liberar_inactivos(ttl=0.01) == ["lento"], "libera pasado el TTL sin uso")
+    check(not modelos.estado()["lento"]["cargado"], "queda descargado")
+    modelos.obtener("lento")
+    check(cargas["lento"] == 2 and modelos.estado()["lento"]["cargas"] == 2,
+          "el siguiente uso lo vuelve a cargar")
+    check(avisos == [("lento", True), ("lento", False), ("lento", True)],
+          f"los observadores se enteran de cada carga y liberación ({avisos})")
+
+    print()
+    if fallos:
+        print(f"💥 {len(fallos)} fallo(s) en modelos.")
+        sys.exit(1)
+    print("🎉 Modelos OK.")
+
+
+if __name__ == "__main__":
+    main()
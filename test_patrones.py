@@ -0,0 +1,160 @@
+"""Test de los patrones de compra acumulados (processing/patrones.py).
+
+Verifica que registrar compras en orden actualiza el patrón sin leer el historial,
+que una compra atrasada, una fecha editada o una compra borrada lo rehacen completo,
+que el resultado es el mismo que el cálculo de antes (promedio de intervalos), que
+`verificar` detecta (y corrige) un patrón que no cuadra, que la migración 8 llena
+las sumas de una DB con compras previas, y que `reconstruir` (vectorizado) deja
+exactamente lo mismo que el recálculo producto por producto.
+
+Uso:  python3 test_patrones.py
+"""
+import os
+import random
+import sys
+import tempfile
+from datetime import date, timedelta
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(), "patrones.db")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import db
+from context import set_user_context
+from migrations import _abrir, migrar
+from processing import patrones
+
+fallos = []
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+def _legado(fechas: list[str]):
+    """El cálculo que hacía tools.despensa antes de las sumas acumuladas."""
+    ds = [date.fromisoformat(f) for f in sorted(fechas)]
+    intervalos = [(b - a).days for a, b in zip(ds, ds[1:])]
+    frec = sum(intervalos) / len(intervalos)
+    return frec, (ds[-1] + timedelta(days=frec)).isoformat()
+
+
+def _patron(conn, pid):
+    return conn.execute("SELECT * FROM patrones_despensa WHERE producto_id = ?", (pid,)).fetchone()
+
+
+def _incremental():
+    from tools.despensa import (agregar_producto_despensa, editar_compra_despensa,
+                                eliminar_compra_despensa, registrar_compra_despensa)
+    set_user_context("42", "angel")
+    agregar_producto_despensa.invoke({"nombre": "Leche"})
+    rnd = random.Random(7)
+    fechas, dia = [], date(2025, 1, 1)
+    for _ in range(12):
+        dia += timedelta(days=rnd.randint(3, 20))
+        fechas.append(dia.isoformat())
+        registrar_compra_despensa.invoke({"producto": "Leche", "fecha": dia.isoformat()})
+    with db.get_conn() as conn:
+        pid = conn.execute("SELECT id FROM productos WHERE nombre = 'Leche'").fetchone()[0]
+        p = _patron(conn, pid)
+        frec, proxima = _legado(fechas)
+        check(p["num_registros"] == 12 and abs(p["frec_prom_dias"] - frec) < 1e-9
+              and p["proxima_estimada"] == proxima and p["primera_compra"] == fechas[0],
+              f"12 compras en orden: cada {p['frec_prom_dias']:.1f} días, próxima {p['proxima_estimada']}")
+
+        sentencias = []
+        conn.set_trace_callback(sentencias.append)
+        conn.execute("INSERT INTO compras_despensa (producto_id, user_id, fecha) VALUES (?, '42', '2025-12-01')", (pid,))
+        patrones.agregar_compra(conn, pid, "2025-12-01")
+        conn.set_trace_callback(None)
+        fechas.append("2025-12-01")
+        check(sum("FROM compras_despensa" in s for s in sentencias) == 0,
+              "una compra nueva no vuelve a leer el historial")
+        check(patrones.verificar(conn) == [], "lo acumulado coincide con el recálculo")
+
+    registrar_compra_despensa.invoke({"producto": "Leche", "fecha": "2025-01-02"})   # atrasada
+    fechas.append("2025-01-02")
+    with db.get_conn() as conn:
+        p = _patron(conn, pid)
+        check(p["primera_compra"] == "2025-01-02" and abs(p["frec_prom_dias"] - _legado(fechas)[0]) < 1e-9
+              and patrones.verificar(conn) == [], "una compra atrasada rehace el patrón")
+        ultima = conn.execute("SELECT id FROM compras_despensa WHERE fecha = '2025-12-01'").fetchone()[0]
+    editar_compra_despensa.invoke({"id": ultima, "fecha": "2025-11-20"})
+    eliminar_compra_despensa.invoke({"id": ultima - 1})
+    with db.get_conn() as conn:
+        p = _patron(conn, pid)
+        check(p["ultima_compra"] == "2025-11-20" and p["num_registros"] == 13 and patrones.verificar(conn) == [],
+              "editar la fecha y borrar una compra dejan el patrón consistente")
+
+        conn.execute("UPDATE patrones_despensa SET suma_intervalos = suma_intervalos + 3 WHERE producto_id = ?", (pid,))
+        check(patrones.verificar(conn) == [pid], "verificar detecta un patrón que no cuadra")
+        patrones.verificar(conn, corregir=True)
+        check(patrones.verificar(conn) == [], "y con corregir lo recalcula")
+        d = patrones.desde_fechas(["2025-01-01", "2025-01-11", "2025-01-31"]).desviacion_dias
+        check(abs(d - 5.0) < 1e-9, f"desviación de los intervalos (10 y 20 días → {d})")
+
+
+def _migracion():
+    ruta = os.path.join(tempfile.mkdtemp(), "v7.db")
+    migrar(ruta, hasta=7)
+    conn = _abrir(ruta)
+    conn.executemany("INSERT INTO compras_despensa (producto_id, user_id, fecha) VALUES (?, '7', ?)",
+                     [(1, "2025-01-01"), (1, "2025-01-11"), (1, "2025-01-31"), (2, "2025-03-03")])
+    conn.executemany("INSERT INTO patrones_despensa (producto_id, num_registros, ultima_compra) VALUES (?, ?, ?)",
+                     [(1, 3, "2025-01-31"), (2, 1, "2025-03-03")])
+    conn.close()
+    migrar(ruta)
+    conn = _abrir(ruta)
+    p1, p2 = _patron(conn, 1), _patron(conn, 2)
+    check(p1["primera_compra"] == "2025-01-01" and p1["suma_intervalos"] == 30 and p1["suma_cuadrados"] == 500
+          and p2["suma_intervalos"] == 0 and p2["primera_compra"] == "2025-03-03",
+          "la migración 8 llena las sumas desde las compras previas")
+    check(patrones.verificar(conn) == [], "y quedan consistentes")
+    conn.close()
+
+
+def _reconstruir():
+    rnd = random.Random(3)
+    filas = []
+    for pid in range(1000, 1300):
+        dia = date(2024, 1, 1) + timedelta(days=rnd.randint(0, 300))
+        for _ in range(rnd.choice([1, 1, 2, 5, 30])):
+            filas.append((pid, dia.isoformat()))
+            dia += timedelta(days=rnd.choice([0, 1, 7, 15, 40]))
+    rnd.shuffle(filas)
+    with db.get_conn() as conn:
+        conn.executemany("INSERT INTO compras_despensa (producto_id, user_id, fecha) VALUES (?, '9', ?)", filas)
+        conn.execute("INSERT INTO patrones_despensa (producto_id, num_registros) VALUES (999, 4)")  # sin compras
+        conn.execute("UPDATE patrones_despensa SET proxima_estimada = NULL, suma_cuadrados = 0")
+        n = patrones.reconstruir(conn, lote=97)
+        guardados = {r["producto_id"]: tuple(r)[1:5] for r in conn.execute(
+            "SELECT producto_id, frec_prom_dias, ultima_compra, proxima_estimada, num_registros FROM patrones_despensa")}
+        check(n == len(guardados) == 301 and 999 not in guardados,
+              f"reconstruir: {n} patrones (los de productos sin compras se borran)")
+        check(patrones.verificar(conn) == [], "las sumas de la reconstrucción coinciden con el recálculo")
+        for pid in guardados:
+            patrones.recalcular(conn, pid)
+        uno_a_uno = {r["producto_id"]: tuple(r)[1:5] for r in conn.execute(
+            "SELECT producto_id, frec_prom_dias, ultima_compra, proxima_estimada, num_registros FROM patrones_despensa")}
+        check(guardados == uno_a_uno, "frecuencia y próxima compra iguales a las de producto por producto")
+
+
+def main():
+    db.init_db()
+    _incremental()
+    _migracion()
+    _reconstruir()
+    db.cerrar_conexiones()
+
+    print()
+    if fallos:
+        print(f"❌ {len(fallos)} fallo(s)")
+        sys.exit(1)
+    print("✅ Todo bien")
+
+
+if __name__ == "__main__":
+    main()
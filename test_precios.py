@@ -0,0 +1,190 @@
+"""Test del índice de precios de la despensa (processing/precios.py, tools/precios.py).
+
+Verifica que registrar compras acumula por producto y tienda (con la tienda
+normalizada) lo mismo que un recálculo desde el historial, también con una compra
+atrasada; que lo pagado a mano se divide entre la cantidad y el precio de un ticket
+no; que el mínimo y el promedio solo cuentan la ventana de VENTANA_DIAS; que editar
+o borrar una compra y borrar un ticket lo rehacen; que consultar es una sola lectura
+por la llave primaria; que comparar_precios e historial_precio dan la tienda más
+barata y las variaciones; y que la migración 11 rehace el índice por unidad.
+
+Uso:  python3 test_precios.py
+"""
+import os
+import sys
+import tempfile
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(), "precios.db")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import db
+from context import set_user_context
+from migrations import _abrir, migrar
+from processing import precios
+
+USER = "42"
+fallos = []
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+def _filas(conn, producto_id=None) -> list[tuple]:
+    filtro, params = ("", ()) if producto_id is None else (" WHERE producto_id = ?", (producto_id,))
+    return [tuple(r) for r in conn.execute(
+        f"SELECT * FROM precios_productos{filtro} ORDER BY user_id, producto_id, tienda", params)]
+
+
+def _fila(nombre: str, tienda: str):
+    with db.get_conn() as conn:
+        return conn.execute("""SELECT pp.* FROM precios_productos pp JOIN productos p ON p.id = pp.producto_id
+                               WHERE p.nombre = ? AND pp.tienda = ?""", (nombre, tienda)).fetchone()
+
+
+def _id(nombre: str) -> int:
+    with db.get_conn() as conn:
+        return conn.execute("SELECT id FROM productos WHERE nombre = ?", (nombre,)).fetchone()[0]
+
+
+def _registro():
+    from tools.despensa import agregar_producto_despensa, registrar_compra_despensa
+    set_user_context(USER, "angel")
+    for nombre in ("Persil", "Leche", "Atún", "Jabón"):
+        agregar_producto_despensa.invoke({"nombre": nombre})
+    for precio, tienda, fecha in ((189, "Costco", "2025-01-10"), (209, "Walmart", "2025-01-12"),
+                                  (179, " COSTCO ", "2025-02-10"), (199, "Costco", "2025-03-10")):
+        registrar_compra_despensa.invoke({"producto": "Persil", "precio": precio, "tienda": tienda, "fecha": fecha})
+    for precio, fecha in ((22, "2025-01-01"), (24, "2025-02-01"), (26.5, "2025-03-01"), (23, "2025-01-15")):
+        registrar_compra_despensa.invoke({"producto": "Leche", "precio": precio, "tienda": "Walmart", "fecha": fecha})
+    registrar_compra_despensa.invoke({"producto": "Atún", "fecha": "2025-01-01"})
+    registrar_compra_despensa.invoke({"producto": "Jabón", "precio": 90, "cantidad": 3, "tienda": "Walmart",
+                                      "fecha": "2025-01-05"})
+    jabon = _fila("Jabón", "walmart")
+    check((jabon["ultimo_centavos"], jabon["suma_centavos"]) == (3000, 3000),
+          "lo pagado a mano por 3 piezas se guarda por unidad")
+    registrar_compra_despensa.invoke({"producto": "Jabón", "precio": 35, "tienda": "Walmart", "fecha": "2025-12-01"})
+
+    costco = _fila("Persil", "costco")
+    check(costco is not None and _fila("Persil", "walmart") is not None and costco["compras"] == 3,
+          "'Costco' y ' COSTCO ' son la misma tienda")
+    check((costco["min_centavos"], costco["anterior_centavos"], costco["ultimo_centavos"], costco["tienda_nombre"])
+          == (17900, 17900, 19900, "Costco"), "mínimo, penúltimo y último por tienda")
+    leche = _fila("Leche", "walmart")
+    check((leche["compras"], leche["primero_centavos"], leche["anterior_centavos"], leche["ultimo_centavos"])
+          == (4, 2200, 2400, 2650), "una compra atrasada queda en su lugar del historial")
+    check(_fila("Atún", "") is None, "las compras sin precio no entran al índice")
+    jabon = _fila("Jabón", "walmart")
+    check((jabon["compras"], jabon["min_centavos"], jabon["suma_centavos"], jabon["primero_centavos"],
+           jabon["anterior_centavos"]) == (1, 3500, 3500, 3000, 3000),
+          f"una compra de hace más de {precios.VENTANA_DIAS} días sale del mínimo y el promedio")
+
+    with db.get_conn() as conn:
+        antes = _filas(conn)
+        for nombre in ("Persil", "Leche", "Jabón"):
+            precios.recalcular(conn, USER, _id(nombre))
+        check(_filas(conn) == antes, "lo acumulado coincide con recalcular desde el historial")
+
+        persil, sentencias = _id("Persil"), []
+        conn.set_trace_callback(sentencias.append)
+        try:
+            filas = precios.consultar(conn, USER, persil)
+        finally:
+            conn.set_trace_callback(None)
+        plan = " ".join(r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sentencias[0]))
+    check(len(sentencias) == 1 and "USING INDEX" in plan and [p.tienda for p in filas] == ["Costco", "Walmart"],
+          f"consultar es una lectura por la llave primaria ({plan})")
+
+
+def _tools():
+    from tools.despensa import editar_compra_despensa, eliminar_compra_despensa
+    from tools.precios import comparar_precios, historial_precio
+    respuesta = comparar_precios.invoke({"producto": "el persil"})
+    check("Más barato: Costco ($199.00), $10.00 menos que en Walmart" in respuesta
+          and "prom $189.00 | 3 compra(s)" in respuesta, "comparar_precios da la tienda más barata")
+    respuesta = historial_precio.invoke({"producto": "leche"})
+    check("Cambio total: +$4.50 (+20.5%)" in respuesta and "anterior en Walmart: +$2.50 (+10.4%)" in respuesta
+          and "Últimos 180 días: promedio $23.88 en 4 compra(s)" in respuesta, "historial_precio da las variaciones")
+    check("no hay compras con precio" in historial_precio.invoke({"producto": "atún"}), "sin precios lo dice")
+    check(comparar_precios.invoke({"producto": "caviar"}).startswith("❌"), "producto inexistente")
+
+    with db.get_conn() as conn:
+        ultima = conn.execute("SELECT id FROM compras_despensa WHERE fecha = '2025-03-01'").fetchone()[0]
+    editar_compra_despensa.invoke({"id": ultima, "precio": 25})
+    check(_fila("Leche", "walmart")["ultimo_centavos"] == 2500, "editar el precio rehace el índice")
+    editar_compra_despensa.invoke({"id": ultima, "cantidad": 2})
+    check(_fila("Leche", "walmart")["ultimo_centavos"] == 1250, "editar la cantidad cambia el precio por unidad")
+    editar_compra_despensa.invoke({"id": ultima, "tienda": "Soriana"})
+    check(_fila("Leche", "soriana")["compras"] == 1 and _fila("Leche", "walmart")["ultimo_centavos"] == 2400,
+          "cambiar la tienda mueve la compra")
+    eliminar_compra_despensa.invoke({"id": ultima})
+    check(_fila("Leche", "soriana") is None, "borrar la compra la quita del índice")
+
+
+def _ticket():
+    from tools.imagen import eliminar_ticket, registrar_ticket
+    data = {"tienda": "Soriana", "total": 185, "fecha": "2025-04-01",
+            "productos": [{"nombre_ticket": "PERSIL", "precio": 185, "cantidad": 2}]}
+    registrar_ticket(USER, "angel", data)
+    check(_fila("Persil", "soriana") is not None and _fila("Persil", "soriana")["ultimo_centavos"] == 18500,
+          "registrar un ticket suma sus precios (ya son por unidad)")
+    with db.get_conn() as conn:
+        ticket = conn.execute("SELECT MAX(id) FROM tickets_ocr").fetchone()[0]
+    eliminar_ticket.invoke({"id": ticket})
+    check(_fila("Persil", "soriana") is None, "y borrar el ticket los quita")
+
+
+def _migracion():
+    ruta = os.path.join(tempfile.mkdtemp(), "v9.db")
+    migrar(ruta, hasta=9)
+    conn = _abrir(ruta)
+    conn.executemany(
+        """INSERT INTO compras_despensa (producto_id, user_id, fecha, precio_centavos, cantidad, tienda, fuente)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        [(1, "7", "2025-03-01", 300, 1, "Costco", "manual"), (1, "7", "2025-01-01", 100, 1, "costco", "manual"),
+         (1, "7", "2025-02-01", 200, 1, "Costcó", "manual"), (1, "7", "2025-02-01", 150, 1, None, "manual"),
+         (1, "7", "2025-02-15", None, 1, "Walmart", "manual"), (2, "7", "2025-01-01", 500, 1, "Walmart", "manual"),
+         (2, "7", "2025-02-01", 1001, 4, "Walmart", "manual"), (2, "7", "2025-03-01", 600, 3, "Walmart", "ocr"),
+         (3, "8", "2025-01-01", 0, 1, "Walmart", "manual"),
+         (4, "7", "2024-01-01", 100, 1, "Soriana", "manual"), (4, "7", "2025-01-01", 120, 1, "Soriana", "manual")])
+    conn.close()
+    migrar(ruta, hasta=10)
+    conn = _abrir(ruta)
+    check(conn.execute("SELECT suma_centavos FROM precios_productos WHERE producto_id = 2").fetchone()[0] == 2101,
+          "en la versión 10 lo pagado por 4 piezas contaba como precio por unidad")
+    conn.close()
+    migrar(ruta)
+    conn = _abrir(ruta)
+    migrada = _filas(conn)
+    check([(f[1], f[2], f[4]) for f in migrada] == [(1, "", 1), (1, "costco", 3), (2, "walmart", 3), (4, "soriana", 1)],
+          "la migración 11 rehace el índice desde las compras con precio, con la ventana")
+    walmart = conn.execute("SELECT min_centavos, suma_centavos, ultimo_centavos FROM precios_productos "
+                           "WHERE producto_id = 2").fetchone()
+    check(tuple(walmart) == (250, 1350, 600), "y divide lo pagado a mano entre la cantidad, no los tickets")
+    for producto_id in (1, 2, 4):
+        precios.recalcular(conn, "7", producto_id)
+    check(_filas(conn) == migrada, "y coincide con recalcular")
+    conn.close()
+
+
+def main():
+    db.init_db()
+    _registro()
+    _tools()
+    _ticket()
+    _migracion()
+    db.cerrar_conexiones()
+
+    print()
+    if fallos:
+        print(f"❌ {len(fallos)} fallo(s)")
+        sys.exit(1)
+    print("✅ Todo bien")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Test del preprocesado de fotos (processing/preimagen.py).
+
+Con imágenes sintéticas verifica que la versión para visión se endereza según el
+EXIF, queda en grises, respeta el lado mayor máximo, se recomprime (JPEG o WebP) y
+pesa menos que el original; que la de OCR estira el contraste sin recomprimir; que
+una captura con transparencia queda sobre fondo blanco y que nada se agranda.
+
+Uso:  python3 test_preimagen.py
+"""
+import base64
+import io
+import os
+import sys
+import tempfile
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+
+from PIL import Image, ImageDraw
+
+from processing import imagen, preimagen
+
+fallos = []
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+def _foto_ticket(ancho=3000, alto=4000) -> bytes:
+    """Ticket 'fotografiado' en color, con poco contraste y girado 90° vía EXIF."""
+    img = Image.effect_noise((ancho, alto), 12).convert("RGB")
+    img = Image.blend(img, Image.new("RGB", img.size, (150, 140, 120)), 0.6)
+    d = ImageDraw.Draw(img)
+    for i in range(40):
+        d.text((200, 150 + i * 90), f"KIRKLAND LECHE 1L x{i}   $ {i * 13.5:.2f}", fill=(90, 85, 80))
+    # Guardada "acostada": el EXIF (orientación 6) dice cómo enderezarla.
+    img = img.rotate(90, expand=True)
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=95, exif=exif)
+    return buf.getvalue()
+
+
+def main():
+    original = _foto_ticket()
+    datos, mime = preimagen.para_vision(original)
+    vision = Image.open(io.BytesIO(datos))
+    check(mime == "image/jpeg" and vision.format == "JPEG", "visión: recomprimida en JPEG")
+    check(vision.size[1] > vision.size[0], f"visión: enderezada según el EXIF ({vision.size})")
+    check(max(vision.size) == preimagen.VISION_LADO, f"visión: lado mayor = {preimagen.VISION_LADO}")
+    check(vision.mode == "L", "visión: en escala de grises")
+    check(len(datos) < len(original) / 4,
+          f"visión: {len(original) / 1024:.0f} KB → {len(datos) / 1024:.0f} KB")
+
+    preimagen.VISION_FORMATO = "webp"
+    datos_webp, mime = preimagen.para_vision(original)
+    check(mime == "image/webp" and Image.open(io.BytesIO(datos_webp)).format == "WEBP",
+          f"visión: WebP configurable ({len(datos_webp) / 1024:.0f} KB)")
+    preimagen.VISION_FORMATO = "jpeg"
+
+    ocr = preimagen.para_ocr(original)
+    check(ocr.mode == "L" and max(ocr.size) == preimagen.OCR_LADO and ocr.size[1] > ocr.size[0],
+          f"OCR: grises, enderezada, lado mayor = {preimagen.OCR_LADO}")
+    minimo, maximo = ocr.getextrema()
+    check(minimo <= 5 and maximo >= 250, f"OCR: contraste estirado ({minimo}–{maximo})")
+
+    captura = Image.new("RGBA", (600, 1300), (0, 0, 0, 0))
+    ImageDraw.Draw(captura).text((20, 20), "Pago con tarjeta OXXO $85.00", fill=(20, 20, 20, 255))
+    buf = io.BytesIO()
+    captura.save(buf, "PNG")
+    chica = Image.open(io.BytesIO(preimagen.para_vision(buf.getvalue())[0]))
+    check(chica.size == (600, 1300), "una captura chica no se agranda")
+    check(chica.getpixel((300, 1200)) > 240, "la transparencia queda sobre fondo blanco")
+
+    with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as tmp:
+        tmp.write(original)
+    uri = imagen._data_uri(tmp.name)
+    check(uri.startswith("data:image/jpeg;base64,") and len(base64.b64decode(uri.split(",", 1)[1])) == len(datos),
+          "el data URI de la visión lleva la versión preprocesada")
+    preimagen.ACTIVO = False
+    check(len(base64.b64decode(imagen._data_uri(tmp.name).split(",", 1)[1])) == len(original),
+          "con IMAGEN_PREPROCESAR=0 va el original")
+    sin_preprocesar = imagen.version()
+    preimagen.ACTIVO = True
+    check(imagen.version() != sin_preprocesar, "el preprocesado entra en la versión del caché")
+    os.remove(tmp.name)
+
+    print()
+    if fallos:
+        print(f"❌ {len(fallos)} fallo(s)")
+        sys.exit(1)
+    print("✅ Todo bien")
+
+
+if __name__ == "__main__":
+    main()
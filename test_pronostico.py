@@ -0,0 +1,126 @@
+"""Test del pronóstico de consumo de la despensa (processing/pronostico.py).
+
+Verifica que la cantidad cuenta (2 paquetes duran el doble), que un intervalo raro
+no mueve el pronóstico, que los intervalos recientes pesan más, que la banda se
+abre cuando el consumo es irregular, que calcular todos los productos de golpe da
+lo mismo que uno por uno, y que generar_lista_despensa / consultar_prediccion_despensa
+lo usan. También mide un usuario con 500 productos y 100 compras de cada uno.
+
+Uso:  python3 test_pronostico.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(), "pronostico.db")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import db
+from context import set_user_context
+from processing import pronostico
+
+USER = "42"
+HOY = date.today()
+fallos = []
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+def _producto(conn, nombre: str, compras: list[tuple[int, float]], user: str = USER) -> int:
+    """Da de alta un producto con compras (días antes de hoy, cantidad)."""
+    pid = conn.execute("INSERT INTO productos (user_id, nombre) VALUES (?, ?)", (user, nombre)).lastrowid
+    conn.executemany(
+        "INSERT INTO compras_despensa (producto_id, user_id, fecha, cantidad) VALUES (?, ?, ?, ?)",
+        [(pid, user, (HOY - timedelta(days=d)).isoformat(), q) for d, q in compras])
+    return pid
+
+
+def _en(dias: int) -> str:
+    return (HOY + timedelta(days=dias)).isoformat()
+
+
+def _modelo():
+    with db.get_conn() as conn:
+        fijo = _producto(conn, "Leche", [(40, 1), (30, 1), (20, 1), (10, 1)])
+        doble = _producto(conn, "Papel", [(100, 2), (80, 2), (60, 2), (40, 2), (20, 2), (0, 1)])
+        viaje = _producto(conn, "Café", [(101, 1), (94, 1), (87, 1), (80, 1), (20, 1), (13, 1), (6, 1)])
+        cambio = _producto(conn, "Pan", [(96, 1), (82, 1), (68, 1), (54, 1), (40, 1), (33, 1), (26, 1), (19, 1), (12, 1)])
+        mismo_dia = _producto(conn, "Agua", [(30, 2), (20, 1), (20, 1), (10, 1), (10, 1)])
+        irregular = _producto(conn, "Jabón", [(60, 1), (57, 1), (42, 1), (35, 1), (14, 1)])
+        pocas = _producto(conn, "Atún", [(20, 1), (10, 1)])
+        todos = pronostico.pronosticar(conn, USER)
+        uno = pronostico.pronosticar(conn, USER, viaje)
+
+    p = todos[fijo]
+    check(p.proxima == p.desde == p.hasta == _en(0) and p.dias_por_unidad == 10,
+          f"consumo fijo: cada 10 días, banda cerrada ({p.desde}–{p.hasta})")
+    p = todos[doble]
+    check(p.dias_por_unidad == 10 and p.proxima == _en(10),
+          f"2 paquetes cada 20 días = 10 días por paquete; tras comprar 1, próxima en 10 días ({p.proxima})")
+    p = todos[viaje]
+    check(abs(p.dias_por_unidad - 7) < 1.5 and p.proxima in (_en(1), _en(2)),
+          f"un intervalo de 60 días no mueve el pronóstico ({p.dias_por_unidad:.1f} días)")
+    p = todos[cambio]
+    check(p.dias_por_unidad < 10.5, f"los intervalos recientes pesan más (14 → 7 días: {p.dias_por_unidad:.1f})")
+    p = todos[mismo_dia]
+    check(p.compras == 3 and p.cantidad_ultima == 2 and p.dias_por_unidad == 5,
+          "las compras del mismo día se suman")
+    p = todos[irregular]
+    check(p.desde < p.proxima < p.hasta, f"consumo irregular: banda {p.desde} – {p.hasta}")
+    check(pocas not in todos, "con menos de 3 compras no hay pronóstico")
+    check(uno == {viaje: todos[viaje]}, "un producto solo da lo mismo que todos de golpe")
+
+
+def _tools():
+    from tools.despensa import consultar_prediccion_despensa, generar_lista_despensa
+    set_user_context(USER, "angel")
+    lista = generar_lista_despensa.invoke({})
+    ahora, despues = lista.split("Próximamente")
+    check("Leche" in ahora and "Papel" in despues and "• Atún" in lista.split("Sin patrón aún")[-1],
+          "la lista usa el pronóstico por cantidad")
+    respuesta = consultar_prediccion_despensa.invoke({"producto": "papel"})
+    check("cada ~10 días" in respuesta and "(1 unidad)" in respuesta and "Rango probable" in respuesta,
+          "la predicción de un producto muestra consumo por unidad y rango")
+
+
+def _rendimiento():
+    rnd = random.Random(5)
+    with db.get_conn() as conn:
+        for i in range(500):
+            dia, compras = 800, []
+            for _ in range(100):
+                compras.append((dia, rnd.choice((1, 1, 2, 3))))
+                dia -= rnd.randint(1, 8)
+            _producto(conn, f"Producto {i}", compras, user="77")
+    with db.get_conn() as conn:
+        t0 = time.perf_counter()
+        todos = pronostico.pronosticar(conn, "77")
+        s = time.perf_counter() - t0
+    check(len(todos) == 500 and s < 0.5, f"500 productos × 100 compras en {s * 1000:.0f} ms")
+
+
+def main():
+    db.init_db()
+    _modelo()
+    _tools()
+    _rendimiento()
+    db.cerrar_conexiones()
+
+    print()
+    if fallos:
+        print(f"❌ {len(fallos)} fallo(s)")
+        sys.exit(1)
+    print("✅ Todo bien")
+
+
+if __name__ == "__main__":
+    main()
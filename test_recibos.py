@@ -0,0 +1,140 @@
+"""Test de las plantillas locales de tickets (processing/recibos).
+
+Recorre el corpus de textos de OCR de test_data/recibos/: cada .txt se compara con
+su .json (null = la plantilla debe rechazarlo y dejárselo al LLM). Además verifica
+que en `imagen.extraer` la plantilla compite con la visión desde el inicio: un ticket
+conocido gana sin esperar al modelo, una foto que no cuadra no espera al OCR, y la
+vía de OCR reutiliza la misma lectura.
+
+Uso:  python3 test_recibos.py
+"""
+import glob
+import json
+import os
+import sys
+import time
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+from processing import imagen, recibos, trabajadores
+from processing.recibos.base import Plantilla, centavos
+
+fallos = []
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+def _corpus():
+    rutas = sorted(glob.glob("test_data/recibos/*.txt"))
+    check(len(rutas) >= 4, f"corpus con {len(rutas)} tickets")
+    for ruta in rutas:
+        with open(ruta, encoding="utf-8") as f:
+            texto = f.read()
+        with open(ruta[:-4] + ".json", encoding="utf-8") as f:
+            esperado = json.load(f)
+        data = recibos.parsear(texto)
+        if esperado is not None:
+            check(data == esperado, f"{os.path.basename(ruta)}: {len(esperado['productos'])} productos, "
+                                    f"total {esperado['total']}")
+        else:
+            check(data is None, f"{os.path.basename(ruta)}: se deja al LLM")
+
+
+def _piezas():
+    check(centavos("1,234.56") == centavos("1234,56") == 123456, "montos con coma o punto decimal")
+
+    class SinLeer(Plantilla):
+        def detectar(self, texto):
+            return 0.0
+    try:
+        SinLeer()
+        check(False, "una plantilla sin `leer` no se puede instanciar")
+    except TypeError:
+        check(True, "una plantilla sin `leer` no se puede instanciar")
+
+
+def _extraer():
+    with open("test_data/recibos/costco_queretaro.txt", encoding="utf-8") as f:
+        costco = f.read()
+    with open("test_data/recibos/costco_renglon_perdido.txt", encoding="utf-8") as f:
+        perdido = f.read()
+    ocr, llamadas = [], []
+    imagen.PLANTILLAS_PRIMERO = True
+
+    def via_vision(*a, **kw):
+        llamadas.append("vision")
+        time.sleep(0.2)
+        return {"tipo": "ticket_compra", "via": "vision"}
+
+    imagen._via_vision = via_vision
+
+    def via_ocr(imagen_path, instrucciones, cancelado, **kw):
+        llamadas.append(("ocr", kw.get("leido") is not None))
+        return None
+
+    via_ocr_real, imagen._via_ocr = imagen._via_ocr, via_ocr
+    trabajadores.ocr_texto = lambda ruta, **kw: ocr.append(ruta) or costco
+    t0 = time.perf_counter()
+    data = imagen.extraer("ticket.jpg")
+    dur = time.perf_counter() - t0
+    check(data and data.get("plantilla") == "costco" and dur < 0.15,
+          f"un ticket de Costco lo resuelve la plantilla sin esperar al LLM ({dur * 1000:.0f} ms)")
+
+    trabajadores.ocr_texto = lambda ruta, **kw: ocr.append(ruta) or perdido
+    imagen.VISION_PLAZO_S = 0
+    data = imagen.extraer("ticket.jpg")
+    check(data == {"tipo": "ticket_compra", "via": "vision"} and "vision" in llamadas,
+          "si la plantilla no cuadra, decide el LLM")
+    check(len(ocr) == 2 and ("ocr", True) in llamadas, "la vía de OCR reutiliza el texto ya leído")
+    check(imagen.estadisticas()["plantilla"] == 1, "contador de tickets resueltos por plantilla")
+
+    def ocr_lento(texto):
+        def fn(ruta, **kw):
+            ocr.append(ruta)
+            time.sleep(1.0)
+            return texto
+        return fn
+
+    imagen.LIMITE_S, imagen.VISION_PLAZO_S = 3, 5
+    trabajadores.ocr_texto = ocr_lento(perdido)
+    t0 = time.perf_counter()
+    data = imagen.extraer("ticket.jpg")
+    dur = time.perf_counter() - t0
+    check(data == {"tipo": "ticket_compra", "via": "vision"} and dur < 0.4,
+          f"con un OCR de 1 s, la visión no lo espera ({dur:.2f} s)")
+
+    imagen._via_ocr = via_ocr_real
+    imagen.LIMITE_S, imagen.VISION_PLAZO_S = 3, 0.1
+    trabajadores.ocr_texto = ocr_lento(costco)
+    imagen._via_vision = lambda *a, **kw: time.sleep(2) or {"tipo": "ticket_compra", "via": "vision"}
+    ocr.clear()
+    data = imagen.extraer("ticket.jpg")
+    check(data and data.get("plantilla") == "costco" and len(ocr) == 1,
+          "si el OCR tarda, la plantilla se prueba sobre esa misma lectura en la carrera")
+
+    imagen.PLANTILLAS_PRIMERO = False
+    sin_plantilla = imagen.version()
+    recibos.VERSION += 1
+    check(imagen.version() != sin_plantilla, "la versión de las plantillas entra en la llave del caché")
+
+
+def main():
+    _corpus()
+    _piezas()
+    _extraer()
+
+    print()
+    if fallos:
+        print(f"❌ {len(fallos)} fallo(s)")
+        sys.exit(1)
+    print("✅ Todo bien")
+
+
+if __name__ == "__main__":
+    main()
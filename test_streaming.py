@@ -0,0 +1,141 @@
+"""Test de la respuesta en vivo (streaming) del bot.
+
+Sustituye el grafo por uno con un LLM falso que emite la respuesta palabra por
+palabra (dentro de un ReAct, como el agente real) y un Message de Telegram falso que
+anota cada envío/edición. Verifica que cada tanda `///` queda en su propia burbuja,
+que el marcador de sticker nunca se ve, que al cerrar se aplica el formato y que se
+registra el tiempo al primer texto visible.
+
+Uso:  python3 test_streaming.py
+"""
+import asyncio
+import os
+import sys
+import time
+import warnings
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+os.environ.setdefault("GEMINI_API_KEY", "test")   # el grafo real se construye pero no se usa
+warnings.filterwarnings("ignore")
+
+from typing import Annotated
+from typing_extensions import TypedDict
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import StateGraph, START, END
+from langgraph.graph.message import add_messages
+from langgraph.prebuilt import create_react_agent
+
+import bot
+import trazas
+
+fallos = []
+RESPUESTA = ("Listo, quedó **registrado**.///Llevas $4,200 este mes y vas bien con tu "
+             "presupuesto de comida.\n[[sticker:festejo]]")
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+class _Modelo(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _stream(self, *args, **kwargs):
+        # Como Gemini: los tokens llegan espaciados, no de golpe.
+        for chunk in super()._stream(*args, **kwargs):
+            time.sleep(0.02)
+            yield chunk
+
+
+class _S(TypedDict, total=False):
+    messages: Annotated[list, add_messages]
+
+
+def _grafo_falso():
+    react = create_react_agent(model=_Modelo(messages=iter([AIMessage(content=RESPUESTA)])), tools=[])
+
+    def agente(state):
+        previos = len(state["messages"])
+        salida = react.invoke({"messages": state["messages"]})
+        return {"messages": salida["messages"][previos:]}
+
+    g = StateGraph(_S)
+    g.add_node("agente", agente)
+    g.add_edge(START, "agente")
+    g.add_edge("agente", END)
+    return g.compile()
+
+
+class _Msg:
+    """Message de Telegram falso: anota lo que el bot hace con él."""
+    def __init__(self, log, texto=""):
+        self.log, self.text = log, texto
+
+    async def reply_text(self, texto, parse_mode=None):
+        m = _Msg(self.log, texto)
+        self.log.append(("envio", texto, parse_mode))
+        return m
+
+    async def edit_text(self, texto, parse_mode=None):
+        self.text = texto
+        self.log.append(("edicion", texto, parse_mode))
+
+    async def delete(self):
+        self.log.append(("borrado", self.text, None))
+
+
+class _Update:
+    def __init__(self, log):
+        self.message = _Msg(log)
+
+
+async def _escenario():
+    bot.graph = _grafo_falso()
+    bot.STREAMING_INTERVALO = 0.05
+    log = []
+    with trazas.iniciar_turno("u_stream", "texto") as turno:
+        result, vivo = await bot._correr_en_vivo(_Update(log), {"messages": [HumanMessage("¿cómo voy?")]})
+        respuesta, vibe = bot._extraer_sticker(result["messages"][-1].content)
+        await vivo.cerrar(respuesta)
+    return log, vivo, vibe, turno
+
+
+def main():
+    log, vivo, vibe, turno = asyncio.run(_escenario())
+    envios = [t for op, t, _ in log if op == "envio"]
+    ediciones = [t for op, t, _ in log if op == "edicion"]
+
+    check(vivo.activo and len(envios) == 2, f"dos tandas → dos burbujas ({len(envios)})")
+    check(len(ediciones) >= 2, f"el texto se fue editando en vivo ({len(ediciones)} ediciones)")
+    check(len(envios[0]) < len("Listo, quedó **registrado**."), "la primera burbuja arrancó con texto parcial")
+    check(not any("[[" in t or "sticker" in t or "///" in t for _, t, _ in log),
+          "nunca se muestran marcadores de sticker ni `///`")
+    finales = {}
+    for op, t, modo in log:
+        if op in ("envio", "edicion"):
+            finales[t.split(" ")[0]] = (t, modo)
+    primera, segunda = finales.get("Listo,"), finales.get("Llevas")
+    check(primera == ("Listo, quedó <b>registrado</b>.", "HTML"), f"tanda 1 cerrada con formato ({primera})")
+    check(segunda and segunda[1] == "HTML" and segunda[0].endswith("comida."), "tanda 2 cerrada con formato")
+    tandas = bot._EnVivo._tandas
+    check(tandas("Va bien [[stic", final=False) == ["Va bien"]
+          and tandas("Va bien\n//", final=False) == ["Va bien"],
+          "un marcador o separador a medias no se muestra mientras llega")
+    check(vibe == "festejo", "el sticker se recupera para mandarlo al final")
+    check(any(t == "respuesta" and n == "primer_texto" for t, n, _ in turno.spans),
+          "se registra el tiempo al primer texto visible")
+
+    print()
+    if fallos:
+        print(f"💥 {len(fallos)} fallo(s) en streaming.")
+        sys.exit(1)
+    print("🎉 Streaming OK.")
+
+
+if __name__ == "__main__":
+    main()
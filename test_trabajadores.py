@@ -0,0 +1,176 @@
+"""Test del pool de procesos de medios (processing.trabajadores).
+
+Con tareas falsas (dormir, fallar, morir) verifica que los trabajos corren en
+procesos aparte y en paralelo, que un trabajo colgado se mata al vencer su tope y el
+trabajador se reemplaza (y el nuevo recarga los modelos del anterior), que un error o una caída del trabajador llegan como
+excepción sin tumbar el pool, que cada trabajador publica qué modelos tiene cargados,
+que el OCR tiene su propio pool y no deja esperando al audio, y que en el planificador un turno de texto no espera
+detrás de los turnos de medios.
+
+Uso:  python3 test_trabajadores.py
+"""
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+
+from processing import trabajadores
+from planificador import Planificador
+
+fallos = []
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+# ── Tareas falsas (corren dentro de los trabajadores) ─────────────────────────
+
+def _dormir(segundos):
+    time.sleep(segundos)
+    return os.getpid()
+
+
+def _fallar():
+    raise ValueError("ticket ilegible")
+
+
+def _morir():
+    os._exit(3)
+
+
+def _fingir_modelo(nombre, cargado):
+    """Como si processing.modelos cargara (o liberara por TTL) el modelo."""
+    from processing import modelos
+    modelos._avisar(nombre, cargado)
+
+
+def _fingir_carga(nombre):
+    """Como la tarea "cargar", sin cargar el modelo de verdad."""
+    _fingir_modelo(nombre, True)
+
+
+trabajadores.TAREAS.update({
+    "dormir": ("test_trabajadores", "_dormir"),
+    "fallar": ("test_trabajadores", "_fallar"),
+    "morir": ("test_trabajadores", "_morir"),
+    "fingir_modelo": ("test_trabajadores", "_fingir_modelo"),
+})
+
+
+def _pool_medios():
+    pool = trabajadores.PoolMedios(2)
+    pids = pool.en_cada("dormir", 0)   # espera a que ambos arranquen
+    check(len(set(pids)) == 2 and os.getpid() not in pids,
+          f"en_cada llega a los 2 trabajadores, fuera del proceso ({pids})")
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(2) as hilos:
+        res = list(hilos.map(lambda _: pool.ejecutar("dormir", 0.5), range(2)))
+    dur = time.perf_counter() - t0
+    check(dur < 0.9 and len(set(res)) == 2, f"2 trabajos de 0.5 s en paralelo ({dur:.2f} s)")
+
+    t0 = time.perf_counter()
+    try:
+        pool.ejecutar("dormir", 30, timeout=0.5)
+        check(False, "un trabajo colgado lanza TiempoAgotado")
+    except trabajadores.TiempoAgotado:
+        check(time.perf_counter() - t0 < 5, "un trabajo colgado se corta al vencer el tope")
+    check(pool.stats["tiempos_agotados"] == 1 and pool.stats["reinicios"] == 1,
+          f"el colgado cuenta y su trabajador se reinicia ({pool.stats})")
+    pids_nuevos = pool.en_cada("dormir", 0)
+    check(len(set(pids_nuevos)) == 2 and set(pids_nuevos) != set(pids),
+          f"el pool sigue con 2 trabajadores, uno nuevo ({pids_nuevos})")
+
+    try:
+        pool.ejecutar("fallar")
+        check(False, "un error de la tarea llega como excepción")
+    except RuntimeError as e:
+        check("ticket ilegible" in str(e), f"el error de la tarea llega al bot ({e})")
+
+    try:
+        pool.ejecutar("morir")
+        check(False, "la caída del trabajador llega como excepción")
+    except RuntimeError as e:
+        check("murió" in str(e), f"la caída del trabajador llega como excepción ({e})")
+    check(pool.ejecutar("dormir", 0) > 0 and pool.stats["reinicios"] == 2,
+          f"tras la caída el pool sigue atendiendo ({pool.stats})")
+
+    check(not pool.cargado("whisper"), "al arrancar ningún trabajador tiene Whisper")
+    pool.ejecutar("fingir_modelo", "whisper", True, trabajador=1)
+    check(pool.cargado("whisper") and not pool.cargado("ocr"),
+          "el trabajador publica el modelo que cargó (memoria compartida)")
+    pool.ejecutar("fingir_modelo", "whisper", False, trabajador=1)
+    check(not pool.cargado("whisper"), "y también cuando lo libera por inactividad")
+
+    trabajadores.TAREAS["cargar"] = ("test_trabajadores", "_fingir_carga")
+    pool.ejecutar("fingir_modelo", "whisper", True, trabajador=1)
+    try:
+        pool.ejecutar("dormir", 30, trabajador=1, timeout=0.3)
+        check(False, "el trabajo colgado lanza TiempoAgotado")
+    except trabajadores.TiempoAgotado:
+        pass
+    fin = time.perf_counter() + 10
+    while not pool.cargado("whisper") and time.perf_counter() < fin:
+        time.sleep(0.05)
+    check(pool.cargado("whisper"), "el trabajador nuevo recarga los modelos que tenía el anterior")
+    trabajadores.TAREAS["cargar"] = ("processing.modelos", "obtener")
+    pool.cerrar()
+
+
+def _pools_separados():
+    trabajadores.TRABAJADORES, trabajadores.TRABAJADORES_OCR = 1, 1
+    trabajadores.TAREAS["ocr"] = ("test_trabajadores", "_dormir")
+    audio, ocr = trabajadores.pool("audio"), trabajadores.pool("ocr")
+    check(audio is not ocr and trabajadores.pool() is audio, "audio y OCR tienen cada uno su pool")
+    audio.en_cada("dormir", 0), ocr.en_cada("dormir", 0)   # que ya estén arriba
+    with ThreadPoolExecutor(1) as hilos:
+        foto = hilos.submit(trabajadores.ejecutar, "ocr", 1.0)
+        time.sleep(0.1)
+        t0 = time.perf_counter()
+        pid_audio = trabajadores.ejecutar("dormir", 0)
+        espera = time.perf_counter() - t0
+        pid_ocr = foto.result()
+    check(espera < 0.5 and pid_audio != pid_ocr,
+          f"con 1 trabajador por pool, un OCR de 1 s no retrasa el audio ({espera:.2f} s)")
+    check(trabajadores.estadisticas()["trabajos"] >= 4, "las estadísticas suman los dos pools")
+    trabajadores.cerrar()
+    trabajadores.TAREAS["ocr"] = ("processing.imagen", "_ocr_texto")
+
+
+async def _carriles():
+    plan = Planificador(max_turnos=1, max_medios=1)
+    medios = [asyncio.ensure_future(plan.correr(time.sleep, 0.6, carril="medios")) for _ in range(3)]
+    await asyncio.sleep(0.05)
+    t0 = time.perf_counter()
+    await plan.correr(time.sleep, 0.05)
+    espera = time.perf_counter() - t0
+    check(espera < 0.3, f"un turno de texto no espera detrás de 3 de medios ({espera:.2f} s)")
+    await asyncio.gather(*medios)
+    plan.cerrar()
+
+
+def main():
+    _pool_medios()
+    _pools_separados()
+    asyncio.run(_carriles())
+
+    trabajadores.TRABAJADORES = 0
+    check(trabajadores.ejecutar("dormir", 0) == os.getpid(),
+          "con MEDIOS_TRABAJADORES=0 corre en el mismo proceso")
+
+    print()
+    if fallos:
+        print(f"❌ {len(fallos)} fallo(s)")
+        sys.exit(1)
+    print("✅ Todo bien")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Test de las trazas por turno y del endpoint /metrics.
+
+Corre un turno de juguete (nodo + LLM falso + herramienta + consultas SQLite en un
+hilo del planificador) y verifica que cada span queda en el turno correcto, que los
+histogramas salen en formato Prometheus por HTTP y que un turno lento se loguea
+con su desglose.
+
+Uso:  python3 test_trazas.py
+"""
+import asyncio
+import logging
+import os
+import sys
+import urllib.request
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+os.environ.setdefault("DATABASE_PATH", "/tmp/kontos_trazas.db")
+if os.path.exists(os.environ["DATABASE_PATH"]):
+    os.remove(os.environ["DATABASE_PATH"])
+
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.tools import tool
+
+import db
+import trazas
+from planificador import Planificador
+
+fallos = []
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+@tool
+def consultar_algo(x: str) -> str:
+    """Herramienta de juguete que consulta la DB."""
+    with db.get_conn() as conn:
+        return str(conn.execute("SELECT COUNT(*) FROM movimientos").fetchone()[0])
+
+
+_llm = FakeListChatModel(responses=["hola"])
+
+
+def _nodo_falso(state):
+    config = {"callbacks": [trazas.callbacks]}
+    _llm.invoke("¿?", config=config)
+    consultar_algo.invoke({"x": "1"}, config=config)
+    return state
+
+
+class _Captura(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.mensajes = []
+
+    def emit(self, record):
+        self.mensajes.append(record.getMessage())
+
+
+async def _escenario():
+    plan = Planificador(max_turnos=2)
+    nodo = trazas.nodo("falso", _nodo_falso)
+    turnos = {}
+
+    async def turno(uid):
+        with trazas.iniciar_turno(uid, "texto") as t:
+            turnos[uid] = t
+            await plan.correr(nodo, {})
+
+    await asyncio.gather(turno("u1"), turno("u2"))
+    plan.cerrar()
+    return turnos
+
+
+def main():
+    db.init_db()
+    captura = _Captura()
+    logging.getLogger("trazas").addHandler(captura)
+    trazas.UMBRAL_MS = 0   # todo turno cuenta como lento: debe loguear desglose
+
+    turnos = asyncio.run(_escenario())
+    for uid, t in turnos.items():
+        tipos = {tipo for tipo, _, _ in t.spans}
+        check({"nodo", "llm", "tool", "db", "cola"} <= tipos,
+              f"turno {uid} tiene spans de nodo, llm, tool, db y cola ({sorted(tipos)})")
+        check(sum(1 for tipo, n, _ in t.spans if tipo == "tool") == 1,
+              f"turno {uid}: la herramienta se cuenta una vez (no se cruza con el otro turno)")
+    check(any(n == "SELECT movimientos" for _, n, _ in turnos["u1"].spans),
+          "la consulta SQLite se etiqueta como 'SELECT movimientos'")
+    check(sum("Turno lento" in m for m in captura.mensajes) == 2
+          and all("tool consultar_algo" in m for m in captura.mensajes if "Turno lento" in m),
+          "turno sobre el umbral loguea su desglose")
+
+    trazas.registrar_gauge("kontos_prueba", "Gauge de prueba.", lambda: 7)
+    servidor = trazas.servir_metricas("127.0.0.1", 0)
+    puerto = servidor.server_address[1]
+    texto = urllib.request.urlopen(f"http://127.0.0.1:{puerto}/metrics").read().decode()
+    servidor.shutdown()
+    check('kontos_span_segundos_count{tipo="turno",nombre="texto"} 2' in texto,
+          "/metrics expone el histograma de turnos")
+    check('kontos_span_segundos_bucket{tipo="tool",nombre="consultar_algo",le="+Inf"} 2' in texto,
+          "/metrics expone el histograma por herramienta")
+    check('tipo="llm"' in texto and "kontos_prueba 7.0" in texto, "/metrics incluye LLM y gauges")
+    db.cerrar_conexiones()
+
+    print()
+    if fallos:
+        print(f"💥 {len(fallos)} fallo(s) en trazas.")
+        sys.exit(1)
+    print("🎉 Trazas OK.")
+
+
+if __name__ == "__main__":
+    main()
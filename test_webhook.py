@@ -0,0 +1,186 @@
+"""Test del modo webhook, sin red.
+
+Levanta la Application real con un transporte falso que responde la Bot API (getMe,
+setWebhook, sendMessage…) y el servidor del webhook en localhost; luego hace POST de
+updates grabados (test_data/updates/) y verifica que pasan por los mismos handlers
+que en polling. También revisa el secret token y /healthz, /readyz y /metrics.
+
+Uso:  python3 test_webhook.py
+"""
+import asyncio
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+import warnings
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ".")
+os.environ.setdefault("GEMINI_API_KEY", "test")   # el turno de prueba va por el atajo sin LLM
+os.environ.setdefault("DATABASE_PATH", "/tmp/kontos_webhook.db")
+os.environ["ALLOWED_USER_IDS"] = "42"
+if os.path.exists(os.environ["DATABASE_PATH"]):
+    os.remove(os.environ["DATABASE_PATH"])
+warnings.filterwarnings("ignore")
+
+from telegram.ext import ApplicationBuilder
+from telegram.request import BaseRequest
+
+import bot
+import db
+import salud
+
+SECRETO = "s3cr3to-de-prueba"
+fallos = []
+
+
+def check(cond, msg):
+    print(("✅" if cond else "❌"), msg)
+    if not cond:
+        fallos.append(msg)
+
+
+class _BotApiGrabada(BaseRequest):
+    """Responde la Bot API como Telegram, sin salir a la red; anota cada llamada."""
+
+    def __init__(self):
+        self.llamadas: list[tuple[str, dict]] = []
+        self._mid = 100
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @property
+    def read_timeout(self):
+        return 1.0
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        metodo = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data else {}
+        self.llamadas.append((metodo, params))
+        if metodo == "getMe":
+            res = {"id": 1, "is_bot": True, "first_name": "Kontos", "username": "kontos_bot"}
+        elif metodo == "sendMessage":
+            self._mid += 1
+            res = {"message_id": self._mid, "date": 1760600100, "text": params.get("text", ""),
+                   "chat": {"id": params.get("chat_id"), "type": "private"}}
+        else:
+            res = True
+        return 200, json.dumps({"ok": True, "result": res}).encode()
+
+    def textos(self) -> list[str]:
+        return [p.get("text", "") for m, p in self.llamadas if m == "sendMessage"]
+
+
+def _http(puerto, ruta, cuerpo=None, secreto=None):
+    req = urllib.request.Request(f"http://127.0.0.1:{puerto}{ruta}", data=cuerpo,
+                                 method="POST" if cuerpo is not None else "GET")
+    if secreto:
+        req.add_header("X-Telegram-Bot-Api-Secret-Token", secreto)
+    try:
+        with urllib.request.urlopen(req, timeout=5) as r:
+            return r.status, r.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode()
+
+
+def _grabado(nombre) -> bytes:
+    with open(os.path.join("test_data", "updates", nombre), "rb") as f:
+        return f.read()
+
+
+async def _esperar(cond, segundos=10.0):
+    for _ in range(int(segundos / 0.05)):
+        if cond():
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def _escenario():
+    api = _BotApiGrabada()
+    app = bot.construir_app(ApplicationBuilder().token("123:ABC").request(api).get_updates_request(api))
+    servidor = await bot.iniciar_webhook(app, "https://kontos.example/tg/webhook", SECRETO, "127.0.0.1", 0)
+    puerto = servidor.puerto
+    post = lambda nombre, secreto=SECRETO: asyncio.to_thread(
+        _http, puerto, "/tg/webhook", _grabado(nombre), secreto)
+    try:
+        hook = [p for m, p in api.llamadas if m == "setWebhook"]
+        check(hook and hook[0].get("secret_token") == SECRETO
+              and hook[0].get("url") == "https://kontos.example/tg/webhook",
+              "registra el webhook en Telegram con el secret token")
+
+        check((await post("start.json", secreto="otro"))[0] == 401, "secret token incorrecto → 401")
+        check((await post("start.json", secreto=None))[0] == 401, "sin secret token → 401")
+        check(not api.textos(), "un update rechazado no llega a los handlers")
+
+        check((await post("start.json"))[0] == 200, "update con secret correcto → 200")
+        check(await _esperar(lambda: any("Soy Kontos" in t for t in api.textos())),
+              "/start grabado pasa por cmd_start")
+
+        check((await post("texto_despensa.json"))[0] == 200, "update de texto → 200")
+        check(await _esperar(lambda: any("Registrado: Soriana" in t for t in api.textos())),
+              "el texto grabado recorre handler → planificador → grafo → respuesta")
+        with db.get_conn() as conn:
+            n = conn.execute("SELECT COUNT(*) FROM movimientos WHERE user_id='42'").fetchone()[0]
+        check(n == 1, "el gasto quedó en la DB")
+
+        await post("no_autorizado.json")
+        check(await _esperar(lambda: any("No tienes acceso" in t for t in api.textos())),
+              "usuario no autorizado recibe el rechazo")
+
+        check((await asyncio.to_thread(_http, puerto, "/tg/webhook"))[0] == 405, "GET al webhook → 405")
+        check((await asyncio.to_thread(_http, puerto, "/nada"))[0] == 404, "ruta desconocida → 404")
+        check(await asyncio.to_thread(_http, puerto, "/healthz") == (200, "ok\n"), "/healthz → 200")
+
+        salud.registrar("whisper", lambda: None)
+        salud.registrar("ocr", lambda: 1 / 0, opcional=True)
+        estado, cuerpo = await asyncio.to_thread(_http, puerto, "/readyz")
+        check(estado == 503 and json.loads(cuerpo)["componentes"]["whisper"]["estado"] == "frio",
+              "/readyz → 503 mientras Whisper está frío")
+        await asyncio.to_thread(salud.precalentar().join)
+        estado, cuerpo = await asyncio.to_thread(_http, puerto, "/readyz")
+        check(estado == 200 and json.loads(cuerpo)["componentes"]["ocr"]["estado"] == "error",
+              "/readyz → 200 ya caliente (un opcional con error no lo frena)")
+
+        # Estado en vivo del modelo: cuenta la carga al primer uso y la liberación por TTL.
+        en_memoria = {"whisper": False}
+        salud.registrar("whisper", lambda: None, cargado=lambda: en_memoria["whisper"])
+        salud.registrar("llm", lambda: None)
+        check((await asyncio.to_thread(_http, puerto, "/readyz"))[0] == 503, "/readyz → 503 sin precalentar")
+        en_memoria["whisper"] = True   # se cargó con la primera nota de voz
+        salud.marcar("llm")            # y el LLM con la primera respuesta
+        check((await asyncio.to_thread(_http, puerto, "/readyz"))[0] == 200,
+              "/readyz → 200 tras cargarse al primer uso")
+        en_memoria["whisper"] = False  # processing.modelos lo liberó por inactividad
+        estado, cuerpo = await asyncio.to_thread(_http, puerto, "/readyz")
+        check(estado == 503 and json.loads(cuerpo)["componentes"]["whisper"]["estado"] == "frio",
+              "/readyz → 503 cuando el modelo se libera")
+        salud.bajo_demanda()
+        check((await asyncio.to_thread(_http, puerto, "/readyz"))[0] == 200,
+              "/readyz → 200 con BOT_PRECALENTAR=0 aunque haya modelos fríos")
+
+        estado, cuerpo = await asyncio.to_thread(_http, puerto, "/metrics")
+        check(estado == 200 and 'kontos_span_segundos_count{tipo="turno",nombre="texto"}' in cuerpo,
+              "/metrics sirve las trazas de los turnos")
+    finally:
+        await bot.detener_webhook(app, servidor)
+
+
+def main():
+    db.init_db()
+    asyncio.run(_escenario())
+
+    print()
+    if fallos:
+        print(f"💥 {len(fallos)} fallo(s) en el webhook.")
+        sys.exit(1)
+    print("🎉 Webhook OK.")
+
+
+if __name__ == "__main__":
+    main()
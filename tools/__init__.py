@@ -33,6 +33,10 @@ from tools.despensa import (
     generar_lista_despensa,
     consultar_prediccion_despensa,
 )
+from tools.precios import (
+    comparar_precios,
+    historial_precio,
+)
 from tools.presupuestos import (
     crear_presupuesto,
     ver_presupuestos,
@@ -45,6 +49,7 @@ from tools.analisis import (
 )
 from tools.imagen import (
     clasificar_imagen_pendiente,
+    vincular_producto_ticket,
     listar_tickets,
     eliminar_ticket,
 )
@@ -79,6 +84,8 @@ ALL_TOOLS = [
     eliminar_compra_despensa,
     generar_lista_despensa,
     consultar_prediccion_despensa,
+    comparar_precios,
+    historial_precio,
     # Presupuestos
     crear_presupuesto,
     ver_presupuestos,
@@ -86,6 +93,7 @@ ALL_TOOLS = [
     eliminar_presupuesto,
     # Imagen (solo aclaración + tickets)
     clasificar_imagen_pendiente,
+    vincular_producto_ticket,
     listar_tickets,
     eliminar_ticket,
 ]
@@ -12,6 +12,7 @@ from datetime import datetime
 from langchain_core.tools import tool
 from db import get_conn
 from context import get_user_id
+from utils.dinero import Dinero
 
 
 # ── Calculadora segura ────────────────────────────────────────────────────────
@@ -69,26 +70,26 @@ def resumen_financiero() -> str:
 
     with get_conn() as conn:
         total = conn.execute(
-            "SELECT COALESCE(SUM(monto),0) FROM movimientos WHERE user_id=? AND fecha BETWEEN ? AND ?",
+            "SELECT COALESCE(SUM(monto_centavos),0) FROM movimientos WHERE user_id=? AND fecha BETWEEN ? AND ?",
             (user_id, mes_inicio, hoy_str),
         ).fetchone()[0]
         por_cat = conn.execute(
-            """SELECT COALESCE(c.nombre,'General') cat, SUM(m.monto) t
+            """SELECT COALESCE(c.nombre,'General') cat, SUM(m.monto_centavos) t
                FROM movimientos m LEFT JOIN categorias c ON m.categoria_id=c.id
                WHERE m.user_id=? AND m.fecha BETWEEN ? AND ?
                GROUP BY c.nombre ORDER BY t DESC""",
             (user_id, mes_inicio, hoy_str),
         ).fetchall()
         ingresos = conn.execute(
-            "SELECT COALESCE(SUM(monto),0) FROM ingresos_fijos WHERE user_id=?", (user_id,)
+            "SELECT COALESCE(SUM(monto_centavos),0) FROM ingresos_fijos WHERE user_id=?", (user_id,)
         ).fetchone()[0]
         fijos = conn.execute(
-            "SELECT COALESCE(SUM(monto),0) FROM gastos_fijos WHERE user_id=? AND concepto NOT LIKE '%MSI%'",
+            "SELECT COALESCE(SUM(monto_centavos),0) FROM gastos_fijos WHERE user_id=? AND concepto NOT LIKE '%MSI%'",
             (user_id,),
         ).fetchone()[0]
         presupuestos = conn.execute(
-            """SELECT c.nombre cat, p.monto_limite lim,
-                      COALESCE((SELECT SUM(m.monto) FROM movimientos m
+            """SELECT c.nombre cat, p.limite_centavos lim,
+                      COALESCE((SELECT SUM(m.monto_centavos) FROM movimientos m
                                 LEFT JOIN categorias mc ON m.categoria_id=mc.id
                                 WHERE m.user_id=p.user_id AND mc.nombre=c.nombre
                                 AND m.fecha BETWEEN ? AND ?),0) gastado
@@ -97,17 +98,19 @@ def resumen_financiero() -> str:
             (mes_inicio, hoy_str, user_id),
         ).fetchall()
 
+    total, ingresos, fijos = Dinero(total), Dinero(ingresos), Dinero(fijos)
     balance = ingresos - total - fijos
     L = [f"Mes en curso: {mes_inicio[:7]} · día {dia_actual}/{dias_mes} ({pct_mes}% del mes transcurrido)"]
     L.append(f"Gastado este mes (variable): ${total:,.2f}")
     if por_cat:
-        L.append("Por categoría: " + "; ".join(f"{r['cat']} ${r['t']:,.2f}" for r in por_cat))
+        L.append("Por categoría: " + "; ".join(f"{r['cat']} ${Dinero(r['t']):,.2f}" for r in por_cat))
     L.append(f"Ingresos fijos: ${ingresos:,.2f} · Gastos fijos: ${fijos:,.2f} · Balance disponible: ${balance:,.2f}")
     if presupuestos:
         partes = []
         for r in presupuestos:
-            pct = round(r["gastado"] / r["lim"] * 100) if r["lim"] else 0
-            partes.append(f"{r['cat']} ${r['gastado']:,.2f}/${r['lim']:,.2f} ({pct}%)")
+            gastado, lim = Dinero(r["gastado"]), Dinero(r["lim"])
+            pct = round(gastado / lim * 100) if lim else 0
+            partes.append(f"{r['cat']} ${gastado:,.2f}/${lim:,.2f} ({pct}%)")
         L.append("Presupuestos: " + "; ".join(partes))
     else:
         L.append("Presupuestos: ninguno configurado")
@@ -1,42 +1,21 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional
 from langchain_core.tools import tool
 from db import get_conn, upsert_usuario, get_or_create_categoria
+from db_async import en_escritor
 from context import get_user_id, get_username
+from processing import lista_despensa, patrones, precios, pronostico
+from utils.dinero import Dinero
 
 
 def _hoy() -> str:
     return datetime.now().strftime("%Y-%m-%d")
 
 
-def _recalcular_patron(conn, producto_id: int):
-    rows = conn.execute(
-        "SELECT fecha FROM compras_despensa WHERE producto_id = ? ORDER BY fecha ASC", (producto_id,)
-    ).fetchall()
-    num = len(rows)
-    if num == 0:
-        conn.execute("DELETE FROM patrones_despensa WHERE producto_id = ?", (producto_id,)); return
-    ultima = rows[-1]["fecha"]
-    if num >= 2:
-        fechas = [datetime.strptime(r["fecha"], "%Y-%m-%d") for r in rows]
-        intervalos = [(fechas[i + 1] - fechas[i]).days for i in range(len(fechas) - 1)]
-        frec = sum(intervalos) / len(intervalos)
-        proxima = (datetime.strptime(ultima, "%Y-%m-%d") + timedelta(days=frec)).strftime("%Y-%m-%d")
-    else:
-        frec = proxima = None
-    conn.execute(
-        """INSERT INTO patrones_despensa (producto_id, frec_prom_dias, ultima_compra, proxima_estimada, num_registros, updated_at)
-           VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-           ON CONFLICT(producto_id) DO UPDATE SET frec_prom_dias=excluded.frec_prom_dias,
-           ultima_compra=excluded.ultima_compra, proxima_estimada=excluded.proxima_estimada,
-           num_registros=excluded.num_registros, updated_at=CURRENT_TIMESTAMP""",
-        (producto_id, frec, ultima, proxima, num),
-    )
-
-
 # ── Productos ─────────────────────────────────────────────────────────────────
 
 @tool
+@en_escritor
 def agregar_producto_despensa(nombre: str, tienda: Optional[str] = None, unidad: Optional[str] = None, marca: Optional[str] = None, categoria: str = "Despensa") -> str:
     """Agrega un nuevo producto al catálogo de despensa. No registra una compra, solo agrega el producto.
     Úsala cuando el usuario quiera agregar un producto que compra regularmente.
@@ -52,10 +31,11 @@ def agregar_producto_despensa(nombre: str, tienda: Optional[str] = None, unidad:
     with get_conn() as conn:
         upsert_usuario(conn, user_id, get_username())
         cat_id = get_or_create_categoria(conn, categoria, "gasto")
-        conn.execute(
+        cur = conn.execute(
             "INSERT INTO productos (user_id, categoria_id, nombre, marca, unidad, tienda_pref) VALUES (?,?,?,?,?,?)",
             (user_id, cat_id, nombre, marca, unidad, tienda),
         )
+        lista_despensa.actualizar(conn, user_id, cur.lastrowid)
     return f"✅ Producto agregado: {nombre}" + (f" ({tienda})" if tienda else "")
 
 
@@ -89,6 +69,7 @@ def listar_productos_despensa(categoria: Optional[str] = None, tienda: Optional[
 
 
 @tool
+@en_escritor
 def editar_producto_despensa(id: int, nombre: Optional[str] = None, marca: Optional[str] = None, unidad: Optional[str] = None, tienda: Optional[str] = None, categoria: Optional[str] = None) -> str:
     """Edita un producto de la despensa por su ID. Usa listar_productos_despensa primero si el usuario no sabe el ID.
 
@@ -117,6 +98,7 @@ def editar_producto_despensa(id: int, nombre: Optional[str] = None, marca: Optio
 
 
 @tool
+@en_escritor
 def quitar_producto_despensa(id: int) -> str:
     """Desactiva un producto de la despensa por su ID. No lo elimina permanentemente.
     Úsala cuando el usuario ya no quiera ver un producto en su despensa.
@@ -129,12 +111,14 @@ def quitar_producto_despensa(id: int) -> str:
         row = conn.execute("SELECT nombre FROM productos WHERE id = ? AND user_id = ?", (id, user_id)).fetchone()
         if not row: return f"❌ No encontré el producto ID {id}."
         conn.execute("UPDATE productos SET activo = 0 WHERE id = ? AND user_id = ?", (id, user_id))
+        lista_despensa.actualizar(conn, user_id, id)
     return f"✅ '{row['nombre']}' quitado de tu despensa."
 
 
 # ── Compras ───────────────────────────────────────────────────────────────────
 
 @tool
+@en_escritor
 def registrar_compra_despensa(producto: str, precio: Optional[float] = None, cantidad: float = 1, tienda: Optional[str] = None, fecha: Optional[str] = None) -> str:
     """Registra que el usuario compró un producto de su despensa.
     Úsala cuando el usuario diga que fue al súper, a Costco, o que compró algo de su despensa.
@@ -148,6 +132,7 @@ def registrar_compra_despensa(producto: str, precio: Optional[float] = None, can
         fecha: Fecha YYYY-MM-DD; usa hoy si no se menciona
     """
     user_id = get_user_id()
+    precio = Dinero.opcional(precio)
     ARTICULOS = {"el", "la", "los", "las", "un", "una", "del", "al"}
     with get_conn() as conn:
         row = conn.execute(
@@ -163,11 +148,14 @@ def registrar_compra_despensa(producto: str, precio: Optional[float] = None, can
                 if row: break
         if not row:
             return f"⚠️ '{producto}' no está en tu despensa. Agrégalo primero."
+        fecha = fecha or _hoy()
         conn.execute(
-            "INSERT INTO compras_despensa (producto_id, user_id, fecha, precio, cantidad, tienda, fuente) VALUES (?,?,?,?,?,?,'manual')",
-            (row["id"], user_id, fecha or _hoy(), precio, cantidad, tienda),
+            "INSERT INTO compras_despensa (producto_id, user_id, fecha, precio_centavos, cantidad, tienda, fuente) VALUES (?,?,?,?,?,?,'manual')",
+            (row["id"], user_id, fecha, precio, cantidad, tienda),
         )
-        _recalcular_patron(conn, row["id"])
+        patrones.agregar_compra(conn, row["id"], fecha)
+        precios.agregar_compra(conn, user_id, row["id"], tienda, fecha, precio, cantidad)
+        lista_despensa.actualizar(conn, user_id, row["id"])
     precio_str = f"${precio:.2f}" if precio else "sin precio"
     return f"✅ Compra registrada: {row['nombre']} x{cantidad} {precio_str}"
 
@@ -182,7 +170,7 @@ def listar_compras_despensa(producto: Optional[str] = None, desde: Optional[str]
         hasta: Fecha fin YYYY-MM-DD (opcional)
     """
     user_id = get_user_id()
-    query = """SELECT cd.id, p.nombre, cd.fecha, cd.precio, cd.cantidad, cd.tienda
+    query = """SELECT cd.id, p.nombre, cd.fecha, cd.precio_centavos, cd.cantidad, cd.tienda
                FROM compras_despensa cd JOIN productos p ON cd.producto_id = p.id
                WHERE cd.user_id = ?"""
     params = [user_id]
@@ -196,7 +184,7 @@ def listar_compras_despensa(producto: Optional[str] = None, desde: Optional[str]
         return "ℹ️ No hay compras de despensa registradas."
     lines = [
         f"ID:{r['id']} {r['fecha']} | {r['nombre']} | " +
-        (f"${r['precio']:.2f}" if r['precio'] else "—") +
+        (f"${Dinero(r['precio_centavos']):.2f}" if r['precio_centavos'] else "—") +
         f" x{r['cantidad']} | {r['tienda'] or '—'}"
         for r in rows
     ]
@@ -204,6 +192,7 @@ def listar_compras_despensa(producto: Optional[str] = None, desde: Optional[str]
 
 
 @tool
+@en_escritor
 def editar_compra_despensa(id: int, precio: Optional[float] = None, cantidad: Optional[float] = None, tienda: Optional[str] = None, fecha: Optional[str] = None) -> str:
     """Edita una compra de despensa por su ID.
 
@@ -216,7 +205,7 @@ def editar_compra_despensa(id: int, precio: Optional[float] = None, cantidad: Op
     """
     user_id = get_user_id()
     campos, valores = [], []
-    if precio is not None: campos.append("precio = ?"); valores.append(precio)
+    if precio is not None: campos.append("precio_centavos = ?"); valores.append(Dinero.de_pesos(precio))
     if cantidad is not None: campos.append("cantidad = ?"); valores.append(cantidad)
     if tienda: campos.append("tienda = ?"); valores.append(tienda)
     if fecha: campos.append("fecha = ?"); valores.append(fecha)
@@ -226,11 +215,17 @@ def editar_compra_despensa(id: int, precio: Optional[float] = None, cantidad: Op
         row = conn.execute("SELECT producto_id FROM compras_despensa WHERE id = ? AND user_id = ?", (id, user_id)).fetchone()
         if not row: return f"❌ No encontré la compra ID {id}."
         conn.execute(f"UPDATE compras_despensa SET {', '.join(campos)} WHERE id = ? AND user_id = ?", valores)
-        _recalcular_patron(conn, row["producto_id"])
+        if fecha:
+            patrones.recalcular(conn, row["producto_id"])
+        if fecha or precio is not None or cantidad is not None or tienda:
+            precios.recalcular(conn, user_id, row["producto_id"])
+        if fecha or cantidad is not None:
+            lista_despensa.actualizar(conn, user_id, row["producto_id"])
     return f"✅ Compra {id} actualizada."
 
 
 @tool
+@en_escritor
 def eliminar_compra_despensa(id: int) -> str:
     """Elimina una compra de despensa por su ID y recalcula el patrón del producto.
 
@@ -242,48 +237,43 @@ def eliminar_compra_despensa(id: int) -> str:
         row = conn.execute("SELECT producto_id FROM compras_despensa WHERE id = ? AND user_id = ?", (id, user_id)).fetchone()
         if not row: return f"❌ No encontré la compra ID {id}."
         conn.execute("DELETE FROM compras_despensa WHERE id = ? AND user_id = ?", (id, user_id))
-        _recalcular_patron(conn, row["producto_id"])
+        patrones.recalcular(conn, row["producto_id"])
+        precios.recalcular(conn, user_id, row["producto_id"])
+        lista_despensa.actualizar(conn, user_id, row["producto_id"])
     return f"🗑️ Compra {id} eliminada."
 
 
 # ── Lista y predicción ────────────────────────────────────────────────────────
 
 @tool
+@en_escritor
 def generar_lista_despensa() -> str:
     """Genera la lista de compras de despensa basada en patrones de consumo.
     Muestra qué productos toca comprar pronto vs. cuáles tienen tiempo.
     Úsala cuando el usuario pregunte qué necesita comprar o pida su lista de despensa.
     """
     user_id = get_user_id()
-    hoy = datetime.now()
-    limite = (hoy + timedelta(days=7)).strftime("%Y-%m-%d")
     with get_conn() as conn:
-        rows = conn.execute(
-            """SELECT p.nombre, p.tienda_pref, pd.frec_prom_dias, pd.ultima_compra, pd.proxima_estimada, pd.num_registros
-               FROM productos p LEFT JOIN patrones_despensa pd ON p.id = pd.producto_id
-               WHERE p.user_id = ? AND p.activo = 1 ORDER BY p.nombre""", (user_id,)
-        ).fetchall()
-    if not rows:
+        lista = lista_despensa.leer(conn, user_id)
+    toca, pronto, sin_datos = lista["toca"], lista["pronto"], lista["sin_patron"]
+    if not (toca or pronto or sin_datos):
         return "ℹ️ No tienes productos en tu despensa. Agrega productos y registra compras para activar predicciones."
-    con_patron = [r for r in rows if (r["num_registros"] or 0) >= 3]
-    sin_datos = [r for r in rows if (r["num_registros"] or 0) < 3]
-    if not con_patron:
-        lines = [f"• {r['nombre']} | {r['tienda_pref'] or '—'} | {r['num_registros'] or 0} registros" for r in rows]
+    if not (toca or pronto):
+        lines = [f"• {r['nombre']} | {r['tienda_pref'] or '—'} | {r['num_registros'] or 0} registros" for r in sin_datos]
         return "🛒 Lista completa — sin predicciones aún\n_(Necesito 3+ compras por producto para predecir)\n\n" + "\n".join(lines)
-    toca = [r for r in con_patron if r["proxima_estimada"] and r["proxima_estimada"] <= limite]
-    pronto = [r for r in con_patron if r["proxima_estimada"] and r["proxima_estimada"] > limite]
-    respuesta = f"🛒 Lista de despensa — {hoy.strftime('%d/%m/%Y')}\n"
+    respuesta = f"🛒 Lista de despensa — {datetime.now().strftime('%d/%m/%Y')}\n"
     if toca:
         lines = []
         for r in toca:
-            dias = (datetime.strptime(r["proxima_estimada"], "%Y-%m-%d") - hoy).days
-            urgencia = "⚠️ YA" if dias <= 0 else f"en {dias}d"
+            urgencia = "⚠️ YA" if r["dias"] <= 0 else f"en {r['dias']}d"
+            if r["dias_desde"] != r["dias_hasta"] and r["dias_hasta"] > 0:
+                urgencia += f" ({max(r['dias_desde'], 0)}–{r['dias_hasta']}d)"
             lines.append(f"• {r['nombre']} | {r['tienda_pref'] or '—'} | {urgencia}")
         respuesta += f"\n🔴 Comprar ahora ({len(toca)}):\n" + "\n".join(lines)
     else:
         respuesta += "\n✅ Todo al día."
     if pronto:
-        lines = [f"• {r['nombre']} — en ~{(datetime.strptime(r['proxima_estimada'],'%Y-%m-%d')-hoy).days}d" for r in pronto]
+        lines = [f"• {r['nombre']} — en ~{r['dias']}d" for r in pronto]
         respuesta += f"\n\n🟡 Próximamente:\n" + "\n".join(lines)
     if sin_datos:
         respuesta += f"\n\n⚪ Sin patrón aún:\n" + "\n".join(f"• {r['nombre']} ({r['num_registros'] or 0} registros)" for r in sin_datos)
@@ -303,7 +293,7 @@ def consultar_prediccion_despensa(producto: str) -> str:
     nombre_busqueda = " ".join(w for w in producto.split() if w.lower() not in ARTICULOS)
     with get_conn() as conn:
         row = conn.execute(
-            """SELECT p.nombre, p.tienda_pref, pd.frec_prom_dias, pd.ultima_compra, pd.proxima_estimada, pd.num_registros
+            """SELECT p.id, p.nombre, p.tienda_pref, pd.num_registros
                FROM productos p LEFT JOIN patrones_despensa pd ON p.id = pd.producto_id
                WHERE p.user_id = ? AND p.nombre LIKE ? AND p.activo = 1 LIMIT 1""",
             (user_id, f"%{nombre_busqueda}%"),
@@ -311,18 +301,20 @@ def consultar_prediccion_despensa(producto: str) -> str:
         if not row:
             for palabra in [p for p in nombre_busqueda.split() if len(p) > 2]:
                 row = conn.execute(
-                    """SELECT p.nombre, p.tienda_pref, pd.frec_prom_dias, pd.ultima_compra, pd.proxima_estimada, pd.num_registros
+                    """SELECT p.id, p.nombre, p.tienda_pref, pd.num_registros
                        FROM productos p LEFT JOIN patrones_despensa pd ON p.id = pd.producto_id
                        WHERE p.user_id = ? AND p.nombre LIKE ? AND p.activo = 1 LIMIT 1""",
                     (user_id, f"%{palabra}%"),
                 ).fetchone()
                 if row: break
+        p = pronostico.pronosticar(conn, user_id, row["id"]).get(row["id"]) if row else None
     if not row: return f"❌ No encontré '{producto}' en tu despensa."
     num = row["num_registros"] or 0
-    if num < 3: return f"📊 {row['nombre']}: solo {num} registro(s). Necesito 3+ compras para predecir."
-    dias_frec = int(row["frec_prom_dias"])
-    dias_restantes = (datetime.strptime(row["proxima_estimada"], "%Y-%m-%d") - datetime.now()).days
-    estado = "⚠️ Ya debería haberlo comprado" if dias_restantes < 0 else f"en {dias_restantes} días ({row['proxima_estimada']})"
-    return (f"📊 Predicción — {row['nombre']}\n• Frecuencia: cada {dias_frec} días\n"
-            f"• Última compra: {row['ultima_compra']}\n• Próxima: {estado}\n"
+    if p is None: return f"📊 {row['nombre']}: solo {num} registro(s). Necesito 3+ compras para predecir."
+    dias_restantes = (datetime.strptime(p.proxima, "%Y-%m-%d") - datetime.now()).days
+    estado = "⚠️ Ya debería haberlo comprado" if dias_restantes < 0 else f"en {dias_restantes} días ({p.proxima})"
+    unidades = f"{p.cantidad_ultima:g} unidad" + ("es" if p.cantidad_ultima != 1 else "")
+    return (f"📊 Predicción — {row['nombre']}\n• Consumo: 1 unidad cada ~{p.dias_por_unidad:.0f} días\n"
+            f"• Última compra: {p.ultima_compra} ({unidades})\n• Próxima: {estado}\n"
+            f"• Rango probable: {p.desde} a {p.hasta}\n"
             f"• Tienda: {row['tienda_pref'] or '—'}\n• Basado en {num} compras")
@@ -2,7 +2,9 @@ from datetime import datetime
 from typing import Optional
 from langchain_core.tools import tool
 from db import get_conn, upsert_usuario, get_or_create_categoria
+from db_async import en_escritor
 from context import get_user_id, get_username
+from utils.dinero import Dinero
 
 
 def _hoy() -> str:
@@ -10,6 +12,7 @@ def _hoy() -> str:
 
 
 @tool
+@en_escritor
 def registrar_gasto_fijo(concepto: str, monto: float, periodicidad: str = "mensual", categoria: str = "General", fecha_inicio: Optional[str] = None) -> str:
     """Registra un gasto fijo o recurrente (renta, servicios, suscripciones, pagos mensuales).
     Úsala cuando el usuario mencione un pago que se repite regularmente.
@@ -22,11 +25,12 @@ def registrar_gasto_fijo(concepto: str, monto: float, periodicidad: str = "mensu
         fecha_inicio: Fecha inicio YYYY-MM-DD; usa hoy si no se indica
     """
     user_id = get_user_id()
+    monto = Dinero.de_pesos(monto)
     with get_conn() as conn:
         upsert_usuario(conn, user_id, get_username())
         cat_id = get_or_create_categoria(conn, categoria, "gasto")
         conn.execute(
-            "INSERT INTO gastos_fijos (user_id, categoria_id, concepto, monto, fecha_inicio, periodicidad) VALUES (?,?,?,?,?,?)",
+            "INSERT INTO gastos_fijos (user_id, categoria_id, concepto, monto_centavos, fecha_inicio, periodicidad) VALUES (?,?,?,?,?,?)",
             (user_id, cat_id, concepto, monto, fecha_inicio or _hoy(), periodicidad),
         )
     return f"✅ Gasto fijo: {concepto} ${monto:.2f} — {periodicidad}"
@@ -40,18 +44,19 @@ def listar_gastos_fijos() -> str:
     user_id = get_user_id()
     with get_conn() as conn:
         rows = conn.execute(
-            """SELECT gf.id, gf.concepto, gf.monto, c.nombre, gf.periodicidad
+            """SELECT gf.id, gf.concepto, gf.monto_centavos, c.nombre, gf.periodicidad
                FROM gastos_fijos gf LEFT JOIN categorias c ON gf.categoria_id = c.id
                WHERE gf.user_id = ? ORDER BY gf.id""", (user_id,)
         ).fetchall()
     if not rows:
         return "ℹ️ No tienes gastos fijos registrados."
-    total = sum(r["monto"] for r in rows)
-    lines = [f"ID:{r['id']} {r['concepto']} | ${r['monto']:.2f} | {r['periodicidad']}" for r in rows]
+    total = Dinero(sum(r["monto_centavos"] for r in rows))
+    lines = [f"ID:{r['id']} {r['concepto']} | ${Dinero(r['monto_centavos']):.2f} | {r['periodicidad']}" for r in rows]
     return f"📋 Gastos fijos ({len(rows)}):\n" + "\n".join(lines) + f"\n\nTotal mensual: ${total:.2f}"
 
 
 @tool
+@en_escritor
 def editar_gasto_fijo(id: int, concepto: Optional[str] = None, monto: Optional[float] = None, periodicidad: Optional[str] = None, categoria: Optional[str] = None) -> str:
     """Edita un gasto fijo por su ID. Usa listar_gastos_fijos primero si el usuario no sabe el ID.
 
@@ -66,7 +71,7 @@ def editar_gasto_fijo(id: int, concepto: Optional[str] = None, monto: Optional[f
     campos, valores = [], []
     with get_conn() as conn:
         if concepto: campos.append("concepto = ?"); valores.append(concepto)
-        if monto is not None: campos.append("monto = ?"); valores.append(monto)
+        if monto is not None: campos.append("monto_centavos = ?"); valores.append(Dinero.de_pesos(monto))
         if periodicidad: campos.append("periodicidad = ?"); valores.append(periodicidad)
         if categoria:
             cat_id = get_or_create_categoria(conn, categoria, "gasto")
@@ -78,6 +83,7 @@ def editar_gasto_fijo(id: int, concepto: Optional[str] = None, monto: Optional[f
 
 
 @tool
+@en_escritor
 def eliminar_gasto_fijo(id: int) -> str:
     """Elimina un gasto fijo por su ID.
 
@@ -91,6 +97,7 @@ def eliminar_gasto_fijo(id: int) -> str:
 
 
 @tool
+@en_escritor
 def registrar_ingreso_fijo(concepto: str, monto: float, periodicidad: str = "mensual", categoria: str = "Ingresos", fecha_inicio: Optional[str] = None) -> str:
     """Registra un ingreso fijo o recurrente (sueldo, pensión, renta cobrada).
     Úsala cuando el usuario mencione un ingreso que recibe de forma regular.
@@ -103,11 +110,12 @@ def registrar_ingreso_fijo(concepto: str, monto: float, periodicidad: str = "men
         fecha_inicio: Fecha inicio YYYY-MM-DD
     """
     user_id = get_user_id()
+    monto = Dinero.de_pesos(monto)
     with get_conn() as conn:
         upsert_usuario(conn, user_id, get_username())
         cat_id = get_or_create_categoria(conn, categoria, "ingreso")
         conn.execute(
-            "INSERT INTO ingresos_fijos (user_id, categoria_id, concepto, monto, fecha_inicio, periodicidad) VALUES (?,?,?,?,?,?)",
+            "INSERT INTO ingresos_fijos (user_id, categoria_id, concepto, monto_centavos, fecha_inicio, periodicidad) VALUES (?,?,?,?,?,?)",
             (user_id, cat_id, concepto, monto, fecha_inicio or _hoy(), periodicidad),
         )
     return f"✅ Ingreso fijo: {concepto} ${monto:.2f} — {periodicidad}"
@@ -121,17 +129,18 @@ def listar_ingresos_fijos() -> str:
     user_id = get_user_id()
     with get_conn() as conn:
         rows = conn.execute(
-            """SELECT inf.id, inf.concepto, inf.monto, inf.periodicidad
+            """SELECT inf.id, inf.concepto, inf.monto_centavos, inf.periodicidad
                FROM ingresos_fijos inf WHERE inf.user_id = ? ORDER BY inf.id""", (user_id,)
         ).fetchall()
     if not rows:
         return "ℹ️ No tienes ingresos fijos registrados."
-    total = sum(r["monto"] for r in rows)
-    lines = [f"ID:{r['id']} {r['concepto']} | ${r['monto']:.2f} | {r['periodicidad']}" for r in rows]
+    total = Dinero(sum(r["monto_centavos"] for r in rows))
+    lines = [f"ID:{r['id']} {r['concepto']} | ${Dinero(r['monto_centavos']):.2f} | {r['periodicidad']}" for r in rows]
     return f"💰 Ingresos fijos ({len(rows)}):\n" + "\n".join(lines) + f"\n\nTotal mensual: ${total:.2f}"
 
 
 @tool
+@en_escritor
 def editar_ingreso_fijo(id: int, concepto: Optional[str] = None, monto: Optional[float] = None, periodicidad: Optional[str] = None) -> str:
     """Edita un ingreso fijo por su ID. Usa listar_ingresos_fijos primero si el usuario no sabe el ID.
 
@@ -144,7 +153,7 @@ def editar_ingreso_fijo(id: int, concepto: Optional[str] = None, monto: Optional
     user_id = get_user_id()
     campos, valores = [], []
     if concepto: campos.append("concepto = ?"); valores.append(concepto)
-    if monto is not None: campos.append("monto = ?"); valores.append(monto)
+    if monto is not None: campos.append("monto_centavos = ?"); valores.append(Dinero.de_pesos(monto))
     if periodicidad: campos.append("periodicidad = ?"); valores.append(periodicidad)
     if not campos: return "❌ No se indicó ningún campo a modificar."
     valores.extend([id, user_id])
@@ -154,6 +163,7 @@ def editar_ingreso_fijo(id: int, concepto: Optional[str] = None, monto: Optional
 
 
 @tool
+@en_escritor
 def eliminar_ingreso_fijo(id: int) -> str:
     """Elimina un ingreso fijo por su ID.
 
@@ -3,7 +3,9 @@ from datetime import datetime
 from typing import Optional
 from langchain_core.tools import tool
 from db import get_conn, upsert_usuario, get_or_create_categoria
+from db_async import en_escritor
 from context import get_user_id, get_username
+from utils.dinero import Dinero
 
 CATEGORIA_MSI = "Mensualidades"
 
@@ -30,7 +32,7 @@ def _hoy() -> str:
     return datetime.now().strftime("%Y-%m-%d")
 
 
-def _tabla_gastos(rows, total: float) -> str:
+def _tabla_gastos(rows, total: Dinero) -> str:
     """Tabla monoespaciada (4 columnas) envuelta en ``` para que Telegram la
     pinte como <pre> con columnas alineadas. El concepto se recorta a CONC_W."""
     ID_W, FECHA_W, CONC_W, MONTO_W = 3, 5, 14, 10
@@ -42,14 +44,15 @@ def _tabla_gastos(rows, total: float) -> str:
     header = fila("ID", "Fecha", "Concepto", "Monto")
     sep = "─" * len(header)
     cuerpo = "\n".join(
-        fila(r["id"], r["fecha"][5:], r["concepto"] or "", f"{r['monto']:,.2f}") for r in rows
+        fila(r["id"], r["fecha"][5:], r["concepto"] or "", f"{Dinero(r['monto_centavos']):,.2f}")
+        for r in rows
     )
     label_w = ID_W + 1 + FECHA_W + 1 + CONC_W
     total_line = f"{'Total':>{label_w}} {total:>{MONTO_W},.2f}"
     return f"```\n{header}\n{sep}\n{cuerpo}\n{sep}\n{total_line}\n```"
 
 
-def _tabla_categorias(rows, total: float) -> str:
+def _tabla_categorias(rows, total: Dinero) -> str:
     """Tabla monoespaciada (categoría · monto) envuelta en ``` para Telegram."""
     CAT_W, MONTO_W = 16, 11
 
@@ -58,12 +61,13 @@ def _tabla_categorias(rows, total: float) -> str:
 
     header = fila("Categoría", "Monto")
     sep = "─" * len(header)
-    cuerpo = "\n".join(fila(r["nombre"] or "General", f"{r['total']:,.2f}") for r in rows)
+    cuerpo = "\n".join(fila(r["nombre"] or "General", f"{Dinero(r['total']):,.2f}") for r in rows)
     total_line = fila("Total", f"{total:,.2f}")
     return f"```\n{header}\n{sep}\n{cuerpo}\n{sep}\n{total_line}\n```"
 
 
 @tool
+@en_escritor
 def registrar_gasto(
     concepto: str,
     monto: float,
@@ -82,6 +86,7 @@ def registrar_gasto(
         fecha: Fecha en YYYY-MM-DD; omitir si no se menciona
     """
     fecha = fecha or _hoy()
+    monto = Dinero.de_pesos(monto)
     # Detección automática de MSI: si no se forzó otra categoría y el concepto
     # parece una mensualidad, se etiqueta como Mensualidades (separa del gasto variable).
     if categoria == "General" and _es_msi(concepto):
@@ -93,7 +98,7 @@ def registrar_gasto(
         upsert_usuario(conn, user_id, username)
         cat_id = get_or_create_categoria(conn, categoria, "gasto")
         conn.execute(
-            "INSERT INTO movimientos (user_id, username, fecha, concepto, monto, categoria_id, origen) VALUES (?,?,?,?,?,?,'telegram')",
+            "INSERT INTO movimientos (user_id, username, fecha, concepto, monto_centavos, categoria_id, origen) VALUES (?,?,?,?,?,?,'telegram')",
             (user_id, username, fecha, concepto, monto, cat_id),
         )
 
@@ -125,7 +130,7 @@ def listar_gastos(
     fin = f"{fin_anio}-{fin_mes:02d}-01"
 
     query = """
-        SELECT m.id, m.fecha, m.concepto, m.monto, c.nombre
+        SELECT m.id, m.fecha, m.concepto, m.monto_centavos, c.nombre
         FROM movimientos m
         LEFT JOIN categorias c ON m.categoria_id = c.id
         WHERE m.user_id = ? AND m.fecha >= ? AND m.fecha < ?
@@ -141,12 +146,13 @@ def listar_gastos(
     if not rows:
         return f"ℹ️ No hay gastos registrados para {mes:02d}/{anio}."
 
-    total = sum(r["monto"] for r in rows)
+    total = Dinero(sum(r["monto_centavos"] for r in rows))
     # La tabla viene en un bloque ``` ya alineado: el modelo debe copiarla tal cual.
     return f"Gastos {mes:02d}/{anio} ({len(rows)}):\n" + _tabla_gastos(rows, total)
 
 
 @tool
+@en_escritor
 def editar_gasto(
     id: int,
     concepto: Optional[str] = None,
@@ -171,7 +177,7 @@ def editar_gasto(
         if concepto:
             campos.append("concepto = ?"); valores.append(concepto)
         if monto is not None:
-            campos.append("monto = ?"); valores.append(monto)
+            campos.append("monto_centavos = ?"); valores.append(Dinero.de_pesos(monto))
         if fecha:
             campos.append("fecha = ?"); valores.append(fecha)
         if categoria:
@@ -188,6 +194,7 @@ def editar_gasto(
 
 
 @tool
+@en_escritor
 def eliminar_gasto(id: int) -> str:
     """Elimina un gasto por su ID. Usa listar_gastos primero si el usuario no sabe el ID.
 
@@ -220,23 +227,23 @@ def consultar_total(
 
     with get_conn() as conn:
         rows = conn.execute(
-            """SELECT c.nombre, SUM(m.monto) as total
+            """SELECT c.nombre, SUM(m.monto_centavos) as total
                FROM movimientos m LEFT JOIN categorias c ON m.categoria_id = c.id
                WHERE m.user_id = ? AND m.fecha BETWEEN ? AND ?
                GROUP BY c.nombre ORDER BY total DESC""",
             (user_id, desde, hasta),
         ).fetchall()
         total_general = conn.execute(
-            "SELECT COALESCE(SUM(monto), 0) FROM movimientos WHERE user_id = ? AND fecha BETWEEN ? AND ?",
+            "SELECT COALESCE(SUM(monto_centavos), 0) FROM movimientos WHERE user_id = ? AND fecha BETWEEN ? AND ?",
             (user_id, desde, hasta),
         ).fetchone()[0]
         ingresos = conn.execute(
-            "SELECT COALESCE(SUM(monto), 0) FROM ingresos_fijos WHERE user_id = ?", (user_id,)
+            "SELECT COALESCE(SUM(monto_centavos), 0) FROM ingresos_fijos WHERE user_id = ?", (user_id,)
         ).fetchone()[0]
         # Gastos fijos: se restan al balance. Se excluyen los MSI porque esos ya
         # entran como movimientos (categoría Mensualidades) y se contarían doble.
         fijos = conn.execute(
-            "SELECT COALESCE(SUM(monto), 0) FROM gastos_fijos "
+            "SELECT COALESCE(SUM(monto_centavos), 0) FROM gastos_fijos "
             "WHERE user_id = ? AND concepto NOT LIKE '%MSI%'",
             (user_id,),
         ).fetchone()[0]
@@ -245,6 +252,7 @@ def consultar_total(
         return f"ℹ️ No hay gastos del {desde} al {hasta}."
 
     # La tabla viene en un bloque ``` ya alineado: el modelo debe copiarla tal cual.
+    total_general, ingresos, fijos = Dinero(total_general), Dinero(ingresos), Dinero(fijos)
     respuesta = f"Gastos {desde} → {hasta}:\n" + _tabla_categorias(rows, total_general)
     if ingresos:
         balance = ingresos - total_general - fijos
@@ -2,41 +2,42 @@
 
 `registrar_movimientos` / `registrar_ticket` son funciones planas que invoca el nodo
 `extraer_imagen` para registrar de forma determinista (sin pasar por el agente).
-`clasificar_imagen_pendiente` es la ÚNICA tool de imagen del agente: se usa solo cuando
-la extracción fue ambigua, Ángel aclaró qué era, y hay que registrar los datos cacheados.
+`clasificar_imagen_pendiente` se usa solo cuando la extracción fue ambigua, Ángel aclaró
+qué era, y hay que registrar los datos cacheados; `vincular_producto_ticket` guarda el
+alias de un renglón de ticket que no se emparejó solo (ver processing.catalogo).
 """
 import logging
 from langchain_core.tools import tool
 from db import get_conn, upsert_usuario, get_or_create_categoria
+from db_async import en_escritor
 from context import (
     get_user_id, get_username, get_datos_imagen, set_datos_imagen, set_imagen_pendiente,
 )
-from tools.despensa import _recalcular_patron
+from processing import catalogo, lista_despensa, patrones, precios
+from utils.dinero import Dinero
 
 logger = logging.getLogger(__name__)
 
 
-def _catalogo(conn, user_id: str):
-    return conn.execute(
-        "SELECT id, nombre FROM productos WHERE user_id = ? AND activo = 1", (user_id,)
-    ).fetchall()
-
-
+@en_escritor
 def registrar_movimientos(user_id: str, username: str, data: dict) -> str:
     """Registra cada cargo de una captura bancaria como gasto. Devuelve un resumen en texto."""
     movs = data.get("movimientos") or []
-    registrados, total = [], 0.0
+    registrados, total = [], Dinero(0)
     with get_conn() as conn:
         upsert_usuario(conn, user_id, username)
         for m in movs:
-            monto = m.get("monto")
-            if monto is None or monto <= 0:
+            try:
+                monto = Dinero.opcional(m.get("monto"))
+            except ArithmeticError:
+                continue
+            if monto is None or monto <= Dinero(0):
                 continue
             concepto = (m.get("concepto") or "Cargo").strip()
             fecha = m.get("fecha")
             cat_id = get_or_create_categoria(conn, m.get("categoria") or "General", "gasto")
             conn.execute(
-                "INSERT INTO movimientos (user_id, username, fecha, concepto, monto, categoria_id, origen) "
+                "INSERT INTO movimientos (user_id, username, fecha, concepto, monto_centavos, categoria_id, origen) "
                 "VALUES (?,?,?,?,?,?,'ocr')",
                 (user_id, username, fecha, concepto, monto, cat_id),
             )
@@ -50,41 +51,52 @@ def registrar_movimientos(user_id: str, username: str, data: dict) -> str:
             + "\n".join(lineas))
 
 
+@en_escritor
 def registrar_ticket(user_id: str, username: str, data: dict) -> str:
     """Registra los productos de un ticket en la despensa (no cuenta como gasto)."""
     tienda = data.get("tienda")
-    total = data.get("total")
+    total = Dinero.opcional(data.get("total"))
     fecha = data.get("fecha")
     with get_conn() as conn:
         upsert_usuario(conn, user_id, username)
-        catalogo = _catalogo(conn, user_id)
+        emparejador = catalogo.cargar(conn, user_id)
         cur = conn.execute(
-            "INSERT INTO tickets_ocr (user_id, fecha, tienda, total, imagen_path, procesado) "
+            "INSERT INTO tickets_ocr (user_id, fecha, tienda, total_centavos, imagen_path, procesado) "
             "VALUES (?,?,?,?,?,1)",
             (user_id, fecha, tienda, total, None),
         )
         ticket_id = cur.lastrowid
-        cat_map = {r["nombre"].lower(): r["id"] for r in catalogo}
-        registradas, ignoradas = [], []
+        registradas, ignoradas, tocados = [], [], set()
         for item in data.get("productos") or []:
-            nombre_cat = item.get("nombre_catalogo")
-            if not nombre_cat or nombre_cat.lower() not in cat_map:
-                ignoradas.append(item.get("nombre_ticket", "?")); continue
-            producto_id = cat_map[nombre_cat.lower()]
+            nombre_ticket = item.get("nombre_ticket") or item.get("nombre_catalogo") or ""
+            # Extracciones viejas (del caché) traen el nombre del catálogo que eligió el modelo.
+            coincidencia = (emparejador.emparejar(item["nombre_catalogo"]) if item.get("nombre_catalogo")
+                            else None) or emparejador.emparejar(nombre_ticket)
+            if coincidencia is None:
+                ignoradas.append(nombre_ticket or "?"); continue
+            if coincidencia.via == "alias":
+                catalogo.contar_uso(conn, user_id, nombre_ticket)
+            producto_id = coincidencia.producto_id
+            precio, cantidad = Dinero.opcional(item.get("precio")), item.get("cantidad", 1)
             conn.execute(
-                "INSERT INTO compras_despensa (producto_id, user_id, ticket_id, fecha, precio, cantidad, tienda, fuente) "
+                "INSERT INTO compras_despensa (producto_id, user_id, ticket_id, fecha, precio_centavos, cantidad, tienda, fuente) "
                 "VALUES (?,?,?,?,?,?,?,'ocr')",
-                (producto_id, user_id, ticket_id, fecha, item.get("precio"), item.get("cantidad", 1), tienda),
+                (producto_id, user_id, ticket_id, fecha, precio, cantidad, tienda),
             )
-            _recalcular_patron(conn, producto_id)
-            registradas.append(nombre_cat)
+            patrones.agregar_compra(conn, producto_id, fecha)
+            precios.agregar_compra(conn, user_id, producto_id, tienda, fecha, precio, cantidad, "ocr")
+            registradas.append(coincidencia.nombre)
+            tocados.add(producto_id)
+        for producto_id in tocados:
+            lista_despensa.actualizar(conn, user_id, producto_id)
 
     partes = [f"Ticket de {tienda or 'tienda desconocida'}" + (f" (total ${total:,.2f}, no cuenta como gasto)" if total else "")]
     if registradas:
         partes.append(f"Despensa actualizada ({len(registradas)}): " + ", ".join(registradas))
     if ignoradas:
         partes.append(f"No están en la despensa ({len(ignoradas)}): " + ", ".join(ignoradas)
-                      + ". Se pueden agregar con 'agregar producto'.")
+                      + ". Se pueden agregar con 'agregar producto'; si alguno ya está con otro "
+                      "nombre, con 'vincular_producto_ticket' se aprende para los próximos tickets.")
     return "\n".join(partes)
 
 
@@ -113,26 +125,48 @@ def clasificar_imagen_pendiente(tipo: str) -> str:
     return resumen
 
 
+@tool
+@en_escritor
+def vincular_producto_ticket(nombre_ticket: str, producto: str) -> str:
+    """Aprende que un renglón de ticket corresponde a un producto de la despensa, para
+    emparejarlo solo en los próximos tickets. Úsala cuando un ticket dejó renglones sin
+    emparejar y Ángel dice a qué producto corresponde uno (p. ej. "KS PAPEL HIG es el papel").
+
+    Args:
+        nombre_ticket: el renglón tal como salió en el ticket (ej: 'KS PAPEL HIG 36R')
+        producto: nombre del producto de la despensa (búsqueda parcial, ej: 'papel higiénico')
+    """
+    user_id = get_user_id()
+    with get_conn() as conn:
+        coincidencia = catalogo.cargar(conn, user_id).emparejar(producto)
+        if coincidencia is None:
+            return f"⚠️ '{producto}' no está en tu despensa (o hay más de uno parecido). Agrégalo o sé más específico."
+        if not catalogo.aprender(conn, user_id, nombre_ticket, coincidencia.producto_id):
+            return f"❌ '{nombre_ticket}' no tiene nada que se pueda reconocer."
+    return f"✅ Listo: '{nombre_ticket}' en un ticket será {coincidencia.nombre}."
+
+
 @tool
 def listar_tickets() -> str:
     """Lista los tickets de compra escaneados. Úsala cuando Ángel quiera ver sus tickets procesados."""
     user_id = get_user_id()
     with get_conn() as conn:
         rows = conn.execute(
-            "SELECT id, fecha, tienda, total, procesado FROM tickets_ocr WHERE user_id = ? ORDER BY id DESC LIMIT 20",
+            "SELECT id, fecha, tienda, total_centavos, procesado FROM tickets_ocr WHERE user_id = ? ORDER BY id DESC LIMIT 20",
             (user_id,),
         ).fetchall()
     if not rows:
         return "ℹ️ No hay tickets escaneados."
     lines = [
         f"{'✅' if r['procesado'] else '⏳'} ID:{r['id']} {r['fecha']} | {r['tienda'] or '—'} | "
-        + (f"${r['total']:.2f}" if r['total'] else "—")
+        + (f"${Dinero(r['total_centavos']):.2f}" if r['total_centavos'] else "—")
         for r in rows
     ]
     return "🧾 Tickets:\n" + "\n".join(lines)
 
 
 @tool
+@en_escritor
 def eliminar_ticket(id: int) -> str:
     """Elimina un ticket y todas sus compras asociadas.
 
@@ -141,6 +175,12 @@ def eliminar_ticket(id: int) -> str:
     """
     user_id = get_user_id()
     with get_conn() as conn:
+        productos = [r[0] for r in conn.execute(
+            "SELECT DISTINCT producto_id FROM compras_despensa WHERE ticket_id = ? AND user_id = ?", (id, user_id))]
         conn.execute("DELETE FROM compras_despensa WHERE ticket_id = ? AND user_id = ?", (id, user_id))
         cur = conn.execute("DELETE FROM tickets_ocr WHERE id = ? AND user_id = ?", (id, user_id))
+        for producto_id in productos:
+            patrones.recalcular(conn, producto_id)
+            precios.recalcular(conn, user_id, producto_id)
+            lista_despensa.actualizar(conn, user_id, producto_id)
     return f"🗑️ Ticket {id} eliminado." if cur.rowcount else f"❌ No encontré el ticket ID {id}."
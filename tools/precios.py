@@ -0,0 +1,97 @@
+"""Precios de la despensa: comparar tiendas y ver cómo ha cambiado un producto.
+
+Leen el índice de processing/precios.py (una consulta por la llave primaria), así el
+agente no tiene que traer compras con `listar_compras_despensa` y hacer cuentas. El
+mínimo y el promedio son de los últimos precios.VENTANA_DIAS días de cada tienda.
+"""
+from langchain_core.tools import tool
+from db import get_conn
+from context import get_user_id
+from processing import precios
+
+ARTICULOS = {"el", "la", "los", "las", "un", "una", "del", "al"}
+
+
+def _buscar_producto(conn, user_id: str, producto: str):
+    """Producto activo por nombre parcial; si no aparece, por cada palabra."""
+    nombre_busqueda = " ".join(w for w in producto.split() if w.lower() not in ARTICULOS)
+    for termino in [nombre_busqueda] + [p for p in nombre_busqueda.split() if len(p) > 2]:
+        row = conn.execute(
+            "SELECT id, nombre FROM productos WHERE user_id = ? AND nombre LIKE ? AND activo = 1 LIMIT 1",
+            (user_id, f"%{termino}%"),
+        ).fetchone()
+        if row: return row
+    return None
+
+
+def _tienda(p) -> str:
+    return p.tienda or "sin tienda"
+
+
+def _variacion(antes, despues) -> str:
+    diferencia = despues - antes
+    signo = "+" if diferencia.centavos >= 0 else "-"
+    return f"{signo}${abs(diferencia):,.2f} ({signo}{abs(diferencia / antes) * 100:.1f}%)"
+
+
+@tool
+def comparar_precios(producto: str) -> str:
+    """Compara el precio por unidad de un producto de la despensa entre las tiendas donde se ha comprado:
+    último, y mínimo y promedio recientes en cada una, y dónde sale más barato.
+    Úsala cuando el usuario pregunte dónde conviene comprar algo o en qué tienda está más barato.
+
+    Args:
+        producto: Nombre del producto (ej: 'Persil', 'Leche')
+    """
+    user_id = get_user_id()
+    with get_conn() as conn:
+        row = _buscar_producto(conn, user_id, producto)
+        filas = precios.consultar(conn, user_id, row["id"]) if row else []
+    if not row: return f"❌ No encontré '{producto}' en tu despensa."
+    if not filas: return f"ℹ️ {row['nombre']}: no hay compras con precio registradas."
+    lines = [
+        f"• {_tienda(p)}: último ${p.ultimo:,.2f} ({p.ultima_fecha}) | mín ${p.minimo:,.2f} | "
+        f"prom ${p.promedio:,.2f} | {p.compras} compra(s)"
+        for p in filas
+    ]
+    respuesta = (f"💲 Precios — {row['nombre']} (por unidad; mín y prom de los últimos "
+                 f"{precios.VENTANA_DIAS} días)\n" + "\n".join(lines))
+    if len(filas) > 1:
+        barata, cara = filas[0], filas[-1]
+        respuesta += (f"\n\nMás barato: {_tienda(barata)} (${barata.ultimo:,.2f}), "
+                      f"${cara.ultimo - barata.ultimo:,.2f} menos que en {_tienda(cara)}.")
+    return respuesta
+
+
+@tool
+def historial_precio(producto: str) -> str:
+    """Muestra cómo ha cambiado el precio por unidad de un producto de la despensa: primera y última
+    compra, variación total y contra la compra anterior, promedio y mínimo recientes.
+    Úsala cuando el usuario pregunte cuánto ha subido o bajado algo, o si está caro.
+
+    Args:
+        producto: Nombre del producto (ej: 'Persil', 'Leche')
+    """
+    user_id = get_user_id()
+    with get_conn() as conn:
+        row = _buscar_producto(conn, user_id, producto)
+        filas = precios.consultar(conn, user_id, row["id"]) if row else []
+    if not row: return f"❌ No encontré '{producto}' en tu despensa."
+    if not filas: return f"ℹ️ {row['nombre']}: no hay compras con precio registradas."
+    primera = min(filas, key=lambda p: p.primera_fecha)
+    ultima = max(filas, key=lambda p: p.ultima_fecha)
+    minimo = min(filas, key=lambda p: p.minimo)
+    compras = sum(p.compras for p in filas)
+    promedio = sum(p.suma for p in filas) / compras
+    lines = [f"• Primera: ${primera.primero:,.2f} ({primera.primera_fecha}, {_tienda(primera)})",
+             f"• Última: ${ultima.ultimo:,.2f} ({ultima.ultima_fecha}, {_tienda(ultima)})"]
+    if compras > 1:
+        lines.append(f"• Cambio total: {_variacion(primera.primero, ultima.ultimo)}")
+    if ultima.anterior:
+        lines.append(f"• Contra la compra anterior en {_tienda(ultima)}: {_variacion(ultima.anterior, ultima.ultimo)}")
+    lines.append(f"• Últimos {precios.VENTANA_DIAS} días: promedio ${promedio:,.2f} en {compras} compra(s) | "
+                 f"mínimo ${minimo.minimo:,.2f} ({_tienda(minimo)})")
+    if len(filas) > 1:
+        lines += [f"• En {_tienda(p)}: ${p.primero:,.2f} → ${p.ultimo:,.2f} ({_variacion(p.primero, p.ultimo)})"
+                  for p in filas if p.compras > 1]
+    return f"📈 Precio de {row['nombre']} (por unidad)\n" + "\n".join(lines)
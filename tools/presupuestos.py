@@ -2,10 +2,13 @@ from datetime import datetime
 from typing import Optional
 from langchain_core.tools import tool
 from db import get_conn, upsert_usuario, get_or_create_categoria
+from db_async import en_escritor
 from context import get_user_id, get_username
+from utils.dinero import Dinero
 
 
 @tool
+@en_escritor
 def crear_presupuesto(categoria: str, monto_limite: float, periodo: str = "mensual") -> str:
     """Crea un presupuesto máximo para una categoría de gastos.
     Úsala cuando el usuario quiera poner un límite de gasto para una categoría.
@@ -16,10 +19,11 @@ def crear_presupuesto(categoria: str, monto_limite: float, periodo: str = "mensu
         periodo: 'mensual', 'quincenal' o 'semanal'
     """
     user_id = get_user_id()
+    monto_limite = Dinero.de_pesos(monto_limite)
     with get_conn() as conn:
         upsert_usuario(conn, user_id, get_username())
         cat_id = get_or_create_categoria(conn, categoria, "gasto")
-        conn.execute("INSERT INTO presupuestos (user_id, categoria_id, monto_limite, periodo) VALUES (?,?,?,?)",
+        conn.execute("INSERT INTO presupuestos (user_id, categoria_id, limite_centavos, periodo) VALUES (?,?,?,?)",
                      (user_id, cat_id, monto_limite, periodo))
     return f"✅ Presupuesto: {categoria} — ${monto_limite:.2f} {periodo}"
 
@@ -35,8 +39,8 @@ def ver_presupuestos() -> str:
     mes_fin = hoy.strftime("%Y-%m-%d")
     with get_conn() as conn:
         rows = conn.execute(
-            """SELECT p.id, c.nombre, p.monto_limite, p.periodo,
-                      COALESCE((SELECT SUM(m.monto) FROM movimientos m
+            """SELECT p.id, c.nombre, p.limite_centavos, p.periodo,
+                      COALESCE((SELECT SUM(m.monto_centavos) FROM movimientos m
                                 LEFT JOIN categorias mc ON m.categoria_id = mc.id
                                 WHERE m.user_id = p.user_id AND mc.nombre = c.nombre
                                 AND m.fecha BETWEEN ? AND ?), 0) as gastado
@@ -47,14 +51,16 @@ def ver_presupuestos() -> str:
     if not rows: return "ℹ️ No tienes presupuestos configurados."
     lines = []
     for r in rows:
-        pct = (r["gastado"] / r["monto_limite"] * 100) if r["monto_limite"] else 0
+        gastado, limite = Dinero(r["gastado"]), Dinero(r["limite_centavos"])
+        pct = (gastado / limite * 100) if limite else 0
         barra = "█" * int(pct // 10) + "░" * (10 - int(pct // 10))
         alerta = " ⚠️" if pct >= 90 else ""
-        lines.append(f"ID:{r['id']} {r['nombre']} [{r['periodo']}]{alerta}\n  {barra} {pct:.0f}%  ${r['gastado']:.2f} / ${r['monto_limite']:.2f}")
+        lines.append(f"ID:{r['id']} {r['nombre']} [{r['periodo']}]{alerta}\n  {barra} {pct:.0f}%  ${gastado:.2f} / ${limite:.2f}")
     return "📊 Presupuestos — " + mes_inicio[:7] + ":\n\n" + "\n\n".join(lines)
 
 
 @tool
+@en_escritor
 def editar_presupuesto(id: int, monto_limite: Optional[float] = None, periodo: Optional[str] = None, categoria: Optional[str] = None) -> str:
     """Edita un presupuesto por su ID. Usa ver_presupuestos primero si el usuario no sabe el ID.
 
@@ -67,7 +73,7 @@ def editar_presupuesto(id: int, monto_limite: Optional[float] = None, periodo: O
     user_id = get_user_id()
     campos, valores = [], []
     with get_conn() as conn:
-        if monto_limite is not None: campos.append("monto_limite = ?"); valores.append(monto_limite)
+        if monto_limite is not None: campos.append("limite_centavos = ?"); valores.append(Dinero.de_pesos(monto_limite))
         if periodo: campos.append("periodo = ?"); valores.append(periodo)
         if categoria:
             cat_id = get_or_create_categoria(conn, categoria, "gasto")
@@ -79,6 +85,7 @@ def editar_presupuesto(id: int, monto_limite: Optional[float] = None, periodo: O
 
 
 @tool
+@en_escritor
 def eliminar_presupuesto(id: int) -> str:
     """Elimina un presupuesto por su ID.
 
@@ -0,0 +1,290 @@
+"""Trazas de latencia por turno y métricas estilo Prometheus.
+
+Cada turno del bot abre un `Turno` (id + user_id) en una ContextVar; todo lo que se
+mida mientras tanto queda etiquetado con él, aunque corra en otro hilo (el
+planificador y db_async copian el contexto):
+
+- nodos del grafo      → `nodo("agente", agente_node)` en graph.py
+- LLM y herramientas   → `CallbacksTrazas` en el config de `graph.invoke`
+- consultas a SQLite   → la conexión del pool de db.py mide cada execute
+
+Cada span alimenta el histograma `kontos_span_segundos{tipo,nombre}` (sin user_id:
+la cardinalidad no debe crecer con los usuarios) que sirve `servir_metricas()` en
+/metrics. Si un turno pasa de TRAZAS_UMBRAL_MS se loguea su desglose.
+"""
+import bisect
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache, wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+UMBRAL_MS = float(os.getenv("TRAZAS_UMBRAL_MS", "8000"))
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+# ── Histogramas ───────────────────────────────────────────────────────────────
+
+class Histograma:
+    """Histograma acumulativo con etiquetas (tipo, nombre), seguro entre hilos."""
+
+    def __init__(self, nombre: str, ayuda: str, buckets=BUCKETS):
+        self.nombre, self.ayuda, self.buckets = nombre, ayuda, buckets
+        self._series: dict[tuple, list] = {}   # etiquetas -> [conteos por bucket, suma, total]
+        self._lock = threading.Lock()
+
+    def observar(self, etiquetas: tuple, segundos: float):
+        i = bisect.bisect_left(self.buckets, segundos)
+        with self._lock:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                serie = self._series[etiquetas] = [[0] * len(self.buckets), 0.0, 0]
+            if i < len(self.buckets):
+                serie[0][i] += 1
+            serie[1] += segundos
+            serie[2] += 1
+
+    def exportar(self) -> list[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            series = {k: (list(v[0]), v[1], v[2]) for k, v in self._series.items()}
+        for (tipo, nombre), (conteos, suma, total) in sorted(series.items()):
+            base = f'tipo="{_escapar(tipo)}",nombre="{_escapar(nombre)}"'
+            acumulado = 0
+            for le, n in zip(self.buckets, conteos):
+                acumulado += n
+                lineas.append(f'{self.nombre}_bucket{{{base},le="{le}"}} {acumulado}')
+            lineas.append(f'{self.nombre}_bucket{{{base},le="+Inf"}} {total}')
+            lineas.append(f"{self.nombre}_sum{{{base}}} {suma:.6f}")
+            lineas.append(f"{self.nombre}_count{{{base}}} {total}")
+        return lineas
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+spans = Histograma("kontos_span_segundos",
+                   "Duración de turnos, nodos, llamadas al LLM, herramientas y consultas SQLite.")
+
+# Valores calculados al vuelo (p. ej. la cola del planificador):
+# nombre -> (ayuda, tipo Prometheus, fn).
+_gauges: dict[str, tuple[str, str, Callable[[], float]]] = {}
+
+
+def registrar_gauge(nombre: str, ayuda: str, fn: Callable[[], float], tipo: str = "gauge"):
+    """`tipo="counter"` para totales que solo crecen (aciertos, evaluados…)."""
+    _gauges[nombre] = (ayuda, tipo, fn)
+
+
+def exportar() -> str:
+    """Todas las métricas en formato de texto de Prometheus."""
+    lineas = spans.exportar()
+    for nombre, (ayuda, tipo, fn) in sorted(_gauges.items()):
+        try:
+            valor = float(fn())
+        except Exception as e:
+            logger.warning("Gauge %s falló: %s", nombre, e)
+            continue
+        lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}", f"{nombre} {valor}"]
+    return "\n".join(lineas) + "\n"
+
+
+# ── Turnos y spans ────────────────────────────────────────────────────────────
+
+class Turno:
+    __slots__ = ("id", "user_id", "tipo", "t0", "spans", "_lock")
+
+    def __init__(self, user_id: str, tipo: str = ""):
+        self.id = uuid.uuid4().hex[:8]
+        self.user_id, self.tipo = user_id, tipo
+        self.t0 = time.perf_counter()
+        self.spans: list[tuple[str, str, float]] = []   # (tipo, nombre, segundos)
+        self._lock = threading.Lock()
+
+    def agregar(self, tipo: str, nombre: str, segundos: float):
+        with self._lock:
+            self.spans.append((tipo, nombre, segundos))
+
+    def desglose(self, maximo: int = 8) -> str:
+        """'llm gemini-2.5-flash ×3 8.20 s · tool resumen_financiero 0.41 s · …'"""
+        grupos: dict[tuple, list] = {}
+        with self._lock:
+            for tipo, nombre, seg in self.spans:
+                g = grupos.setdefault((tipo, nombre), [0, 0.0])
+                g[0] += 1
+                g[1] += seg
+        orden = sorted(grupos.items(), key=lambda kv: -kv[1][1])[:maximo]
+        return " · ".join(f"{t} {n}{f' ×{c}' if c > 1 else ''} {s:.2f} s" for (t, n), (c, s) in orden)
+
+
+_turno: ContextVar[Optional[Turno]] = ContextVar("turno", default=None)
+
+
+def turno_actual() -> Optional[Turno]:
+    return _turno.get()
+
+
+@contextmanager
+def iniciar_turno(user_id: str, tipo: str = ""):
+    """Abre el turno: todo span medido dentro (en este contexto o en copias) se le suma."""
+    turno = Turno(user_id, tipo)
+    token = _turno.set(turno)
+    try:
+        yield turno
+    finally:
+        _turno.reset(token)
+        segundos = time.perf_counter() - turno.t0
+        spans.observar(("turno", tipo or "-"), segundos)
+        if segundos * 1000 >= UMBRAL_MS:
+            logger.warning("Turno lento %s user=%s %s: %.2f s — %s",
+                           turno.id, user_id, tipo, segundos, turno.desglose())
+        else:
+            logger.debug("Turno %s user=%s %s: %.2f s — %s",
+                         turno.id, user_id, tipo, segundos, turno.desglose())
+
+
+class _Span:
+    __slots__ = ("tipo", "nombre", "t0")
+
+    def __init__(self, tipo: str, nombre: str):
+        self.tipo, self.nombre = tipo, nombre
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registrar(self.tipo, self.nombre, time.perf_counter() - self.t0)
+        return False
+
+
+def span(tipo: str, nombre: str) -> _Span:
+    """`with span("tool", "resumen_financiero"): ...` mide el bloque."""
+    return _Span(tipo, nombre)
+
+
+def registrar(tipo: str, nombre: str, segundos: float, turno: Optional[Turno] = None):
+    spans.observar((tipo, nombre), segundos)
+    turno = turno or _turno.get()
+    if turno is not None:
+        turno.agregar(tipo, nombre, segundos)
+
+
+def nodo(nombre: str, fn: Callable) -> Callable:
+    """Envuelve un nodo del grafo para medirlo como span 'nodo'."""
+    @wraps(fn)
+    def medido(state):
+        with span("nodo", nombre):
+            return fn(state)
+    return medido
+
+
+_SQL = re.compile(r"^\s*(\w+)(?:.*?\b(?:FROM|INTO|UPDATE|TABLE)\s+(\w+))?",
+                  re.IGNORECASE | re.DOTALL)
+
+
+@lru_cache(maxsize=512)
+def nombre_sql(sql: str) -> str:
+    """'SELECT … FROM movimientos …' -> 'SELECT movimientos' (etiqueta de baja cardinalidad)."""
+    m = _SQL.match(sql)
+    if not m:
+        return "?"
+    verbo = m.group(1).upper()
+    return f"{verbo} {m.group(2)}" if m.group(2) and verbo != "PRAGMA" else verbo
+
+
+# ── LLM y herramientas (callbacks de LangChain) ───────────────────────────────
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+except ImportError:  # scripts sin LangChain (migraciones, benchmarks de DB)
+    BaseCallbackHandler = object
+
+
+class CallbacksTrazas(BaseCallbackHandler):
+    """Mide cada ida y vuelta al LLM y cada herramienta. Se pasa en
+    `graph.invoke(state, config={"callbacks": [callbacks]})` y LangChain lo propaga
+    al ReAct y a los LLM que invoquen los nodos."""
+
+    run_inline = True
+
+    def __init__(self):
+        self._abiertos: dict = {}   # run_id -> (tipo, nombre, t0, turno)
+        self._lock = threading.Lock()
+
+    def _abrir(self, run_id, tipo, nombre):
+        with self._lock:
+            self._abiertos[run_id] = (tipo, nombre, time.perf_counter(), _turno.get())
+
+    def _cerrar(self, run_id, sufijo: str = ""):
+        with self._lock:
+            abierto = self._abiertos.pop(run_id, None)
+        if abierto:
+            tipo, nombre, t0, turno = abierto
+            registrar(tipo, nombre + sufijo, time.perf_counter() - t0, turno)
+
+    @staticmethod
+    def _modelo(serialized, kwargs) -> str:
+        meta = kwargs.get("metadata") or {}
+        return (meta.get("ls_model_name")
+                or ((serialized or {}).get("kwargs") or {}).get("model")
+                or (serialized or {}).get("name") or "llm")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._abrir(run_id, "llm", self._modelo(serialized, kwargs))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._abrir(run_id, "llm", self._modelo(serialized, kwargs))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._cerrar(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._cerrar(run_id, " (error)")
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._abrir(run_id, "tool", (serialized or {}).get("name") or kwargs.get("name") or "tool")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._cerrar(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._cerrar(run_id, " (error)")
+
+
+callbacks = CallbacksTrazas()
+
+
+# ── Endpoint /metrics ─────────────────────────────────────────────────────────
+
+class _Metricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        cuerpo = exportar().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def servir_metricas(host: str = "127.0.0.1", puerto: int = 9464) -> ThreadingHTTPServer:
+    """Levanta /metrics en un hilo de fondo y devuelve el servidor (para .shutdown())."""
+    servidor = ThreadingHTTPServer((host, puerto), _Metricas)
+    threading.Thread(target=servidor.serve_forever, name="metricas", daemon=True).start()
+    logger.info("📈 Métricas en http://%s:%d/metrics", host, servidor.server_address[1])
+    return servidor
@@ -0,0 +1,123 @@
+"""Dinero en centavos enteros.
+
+La DB guarda montos como INTEGER (centavos) y toda la aritmética —sumas, restas,
+balances— se hace con enteros: nunca se acumula error de punto flotante. Los floats
+solo existen en la frontera: lo que manda el LLM (`Dinero.de_pesos`) y lo que se
+imprime (`f"{dinero:,.2f}"`, que formatea como siempre).
+
+`Dinero` se puede pasar directo como parámetro de sqlite3 (se adapta a sus centavos).
+"""
+import sqlite3
+from decimal import Decimal, ROUND_HALF_UP
+from functools import total_ordering
+from typing import Optional
+
+_CENTAVO = Decimal("0.01")
+
+
+@total_ordering
+class Dinero:
+    __slots__ = ("centavos",)
+
+    def __init__(self, centavos: int = 0):
+        self.centavos = int(centavos)
+
+    @classmethod
+    def de_pesos(cls, valor) -> "Dinero":
+        """Convierte pesos (float/str/int del LLM o del OCR) a centavos, redondeando
+        al centavo más cercano. Pasa por str para que 428.13 no quede en 42812."""
+        if isinstance(valor, Dinero):
+            return valor
+        if isinstance(valor, str):
+            valor = valor.replace("$", "").replace(",", "").strip()
+        pesos = Decimal(str(valor)).quantize(_CENTAVO, rounding=ROUND_HALF_UP)
+        return cls(int(pesos * 100))
+
+    @classmethod
+    def opcional(cls, valor) -> Optional["Dinero"]:
+        """de_pesos que respeta None (precios y totales opcionales)."""
+        return None if valor is None else cls.de_pesos(valor)
+
+    @classmethod
+    def de_db(cls, centavos) -> Optional["Dinero"]:
+        """Envuelve una columna *_centavos leída de la DB (None se queda en None)."""
+        return None if centavos is None else cls(centavos)
+
+    @property
+    def pesos(self) -> Decimal:
+        return Decimal(self.centavos).scaleb(-2)
+
+    # ── Aritmética entera ────────────────────────────────────────────────────
+    def __add__(self, otro):
+        if isinstance(otro, Dinero):
+            return Dinero(self.centavos + otro.centavos)
+        return NotImplemented
+
+    def __radd__(self, otro):
+        # sum() arranca en 0.
+        if otro == 0 and not isinstance(otro, Dinero):
+            return self
+        return self.__add__(otro)
+
+    def __sub__(self, otro):
+        if isinstance(otro, Dinero):
+            return Dinero(self.centavos - otro.centavos)
+        return NotImplemented
+
+    def __neg__(self):
+        return Dinero(-self.centavos)
+
+    def __abs__(self):
+        return Dinero(abs(self.centavos))
+
+    def __mul__(self, factor):
+        if isinstance(factor, int):
+            return Dinero(self.centavos * factor)
+        if isinstance(factor, (float, Decimal)):
+            return Dinero(int((Decimal(self.centavos) * Decimal(str(factor)))
+                              .quantize(Decimal(1), rounding=ROUND_HALF_UP)))
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, otro):
+        """Dinero / Dinero = proporción (float); Dinero / número = Dinero redondeado."""
+        if isinstance(otro, Dinero):
+            return self.centavos / otro.centavos
+        if isinstance(otro, (int, float, Decimal)):
+            return self * (1 / Decimal(str(otro)))
+        return NotImplemented
+
+    # ── Comparación ──────────────────────────────────────────────────────────
+    def __eq__(self, otro):
+        if isinstance(otro, Dinero):
+            return self.centavos == otro.centavos
+        if otro == 0:
+            return self.centavos == 0
+        return NotImplemented
+
+    def __lt__(self, otro):
+        if isinstance(otro, Dinero):
+            return self.centavos < otro.centavos
+        if otro == 0:
+            return self.centavos < 0
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.centavos)
+
+    def __bool__(self):
+        return self.centavos != 0
+
+    # ── Formato ──────────────────────────────────────────────────────────────
+    def __format__(self, spec: str) -> str:
+        return format(self.pesos, spec or ",.2f")
+
+    def __str__(self) -> str:
+        return format(self, ",.2f")
+
+    def __repr__(self) -> str:
+        return f"Dinero({self.centavos})"
+
+
+sqlite3.register_adapter(Dinero, lambda d: d.centavos)